@@ -1,14 +1,26 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 import requests
 from dotenv import load_dotenv
 import os
 import requests
-from app.routes import pr_routes, repo_index_routes, chunk_routes, embedding_routes, vector_db_routes
+from app.services.http_client_services import close_http_clients
+from app.services.remote_embedding_services import close_remote_clients
+from app.services.profiling_services import ProfilingMiddleware, instrument_endpoints
+from app.routes import pr_routes, repo_index_routes, chunk_routes, embedding_routes, vector_db_routes, job_routes, webhook_routes, metrics_routes, profiling_routes
 
 load_dotenv()
 
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    await close_remote_clients()
+    await close_http_clients()
+
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(ProfilingMiddleware)
 
 
 app.include_router(pr_routes.router, prefix="/pr")
@@ -16,10 +28,13 @@ app.include_router(repo_index_routes.router, prefix="/repo_index")
 app.include_router(chunk_routes.router, prefix="/chunk")
 app.include_router(embedding_routes.router,prefix="/embed")
 app.include_router(vector_db_routes.router,prefix="/vector")
+app.include_router(job_routes.router,prefix="/jobs")
 
 GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
 
-#app.include_router(webhook_router, prefix="/webhook")
+app.include_router(webhook_routes.router, prefix="/webhook")
+app.include_router(metrics_routes.router)
+app.include_router(profiling_routes.router, prefix="/admin/profiles")
 
 @app.get("/")
 def read_root():
@@ -49,5 +64,5 @@ def test_files():
     return response.json()
 
 
-
-
+# After every route is registered: sync endpoints report their worker thread to the profiler
+instrument_endpoints(app)
@@ -1,7 +1,9 @@
-from fastapi import APIRouter
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
 from ..schema import *
-from ..services.chunk_services import chunk_repo_contents
-from ..services.repo_index_services import index_repo_clone
+from ..services.chunk_services import clone_chunks_source
+from ..services.pagination_services import coalesced_bulk_response, decode_cursor, parse_fields
 
 
 router = APIRouter(tags=["Chunk Routes"])
@@ -10,10 +12,34 @@ router = APIRouter(tags=["Chunk Routes"])
 ##############################################################################################
 
 @router.get("/chunk_repo",response_model= RepoChunksResponse)
-def chunk_repo_route(owner: str,repo : str, branch: str = "main") -> RepoChunksResponse :
-    
-    repo_index = index_repo_clone(owner, repo, branch)
-    return chunk_repo_contents(repo_index)
+def chunk_repo_route(
+    owner: str,
+    repo : str,
+    branch: str = "main",
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1),
+    fields: Optional[str] = None,
+    format: str = Query("json", pattern="^(json|ndjson)$")
+):
+    """
+    Clones the repository and returns its code chunks.
+
+    - limit / cursor: page through the chunks; chunk IDs continue across pages
+    - fields: e.g. `file_path,chunk_id,local_index` to skip the content
+    - format=ndjson: stream one chunk per line
+    """
+
+    try:
+        state = decode_cursor(cursor, "chunks", f"{owner}/{repo}")
+        selected = parse_fields(fields, RepoChunk)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return coalesced_bulk_response(
+        ("chunks", owner, repo, branch, cursor, limit, fields),
+        lambda: clone_chunks_source(owner, repo, branch, state),
+        "chunks", limit, selected, format
+    )
 
 ##############################################################################################
 ##############################################################################################
@@ -1,5 +1,5 @@
 from fastapi import APIRouter, HTTPException
-from ..services.embedding_services import embed_text
+from ..services.embedding_services import embed_text_async, embed_texts_async
 from ..schema import (
     EmbedRequest,
     EmbedResponse,
@@ -12,7 +12,7 @@ router = APIRouter(tags=["embedding"])
 
 # #############################################################################################################################
 @router.post("/single", response_model=EmbedResponse)
-def embed_single_route(req: EmbedRequest):
+async def embed_single_route(req: EmbedRequest):
     """
     Embed a single text string using an explicitly specified provider.
     """
@@ -24,7 +24,7 @@ def embed_single_route(req: EmbedRequest):
         )
 
     try:
-        result = embed_text(req.text, provider=req.provider)
+        result = await embed_text_async(req.text, provider=req.provider)
         return EmbedResponse(
             embedding=result["embedding"],
             provider=result["provider"]
@@ -38,7 +38,7 @@ def embed_single_route(req: EmbedRequest):
 
 # #############################################################################################################################
 @router.post("/batch", response_model=BatchEmbedResponse)
-def embed_batch(req: BatchEmbedRequest):
+async def embed_batch(req: BatchEmbedRequest):
     """
     Embed a list of texts using an explicitly specified provider.
     Provider selection applies to all texts.
@@ -50,17 +50,15 @@ def embed_batch(req: BatchEmbedRequest):
             detail="Embedding provider must be explicitly specified."
         )
 
-    embeddings = []
-
     try:
-        for text in req.texts:
-            result = embed_text(text, provider=req.provider)
-            embeddings.append(
-                EmbedResponse(
-                    embedding=result["embedding"],
-                    provider=result["provider"]
-                )
+        results = await embed_texts_async(req.texts, provider=req.provider)
+        embeddings = [
+            EmbedResponse(
+                embedding=result["embedding"],
+                provider=result["provider"]
             )
+            for result in results
+        ]
 
         return BatchEmbedResponse(embeddings=embeddings)
 
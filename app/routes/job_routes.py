@@ -0,0 +1,122 @@
+from typing import List, Union
+
+from fastapi import APIRouter, HTTPException
+from ..schema import (
+    JobStatus,
+    RepoIndexResponse,
+    RepoChunksResponse,
+    VectorRepoInitRequest
+)
+from ..services.job_services import get_job_manager
+
+
+router = APIRouter(tags=["job services"])
+
+
+def _get_or_404(job_id: str):
+    try:
+        return get_job_manager().get(job_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found.")
+
+##############################################################################################
+##############################################################################################
+
+@router.post("/index_repo_clone", response_model=JobStatus)
+def submit_index_repo_clone(owner: str, repo: str, branch: str = "main"):
+    """
+    Background version of /repo_index/index_repo_clone.
+    Returns immediately with a job ID; fetch the items from /jobs/{job_id}/result.
+    """
+    job = get_job_manager().submit("index_repo_clone", {"owner": owner, "repo": repo, "branch": branch})
+    return job.to_dict()
+
+##############################################################################################
+
+@router.post("/chunk_repo", response_model=JobStatus)
+def submit_chunk_repo(owner: str, repo: str, branch: str = "main"):
+    """
+    Background version of /chunk/chunk_repo.
+    Returns immediately with a job ID; fetch the chunks from /jobs/{job_id}/result.
+    """
+    job = get_job_manager().submit("chunk_repo", {"owner": owner, "repo": repo, "branch": branch})
+    return job.to_dict()
+
+##############################################################################################
+
+@router.post("/init_repo", response_model=JobStatus)
+def submit_init_repo(req: VectorRepoInitRequest):
+    """
+    Background version of /vector/init_repo (clone, chunk, embed, store).
+    """
+
+    if not req.embedding_provider:
+        raise HTTPException(
+            status_code=400,
+            detail="Embedding provider must be explicitly specified."
+        )
+
+    job = get_job_manager().submit("init_repo", req.model_dump())
+    return job.to_dict()
+
+##############################################################################################
+##############################################################################################
+
+@router.get("", response_model=List[JobStatus])
+def list_jobs():
+    """
+    All known jobs, newest first.
+    """
+    return [job.to_dict() for job in get_job_manager().list()]
+
+##############################################################################################
+
+@router.get("/{job_id}", response_model=JobStatus)
+def job_status(job_id: str):
+    """
+    State and progress (files / chunks processed, chunks written) of a job.
+    """
+    return _get_or_404(job_id).to_dict()
+
+##############################################################################################
+
+@router.post("/{job_id}/cancel", response_model=JobStatus)
+def cancel_job(job_id: str):
+    """
+    Request cancellation. Running jobs stop at the next file / batch boundary
+    and can be resumed later.
+    """
+    _get_or_404(job_id)
+    try:
+        return get_job_manager().cancel(job_id).to_dict()
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+##############################################################################################
+
+@router.post("/{job_id}/resume", response_model=JobStatus)
+def resume_job(job_id: str):
+    """
+    Re-queue a failed, cancelled or interrupted job from its last checkpoint.
+    """
+    _get_or_404(job_id)
+    try:
+        return get_job_manager().resume(job_id).to_dict()
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+##############################################################################################
+
+@router.get("/{job_id}/result", response_model=Union[RepoIndexResponse, RepoChunksResponse, dict])
+def job_result(job_id: str):
+    """
+    Output of a succeeded job: repo items, chunks, or the index report.
+    """
+    _get_or_404(job_id)
+    try:
+        return get_job_manager().result(job_id)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+##############################################################################################
+##############################################################################################
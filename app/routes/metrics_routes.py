@@ -0,0 +1,23 @@
+from fastapi import APIRouter
+from fastapi.responses import Response
+from ..services.metrics_services import CONTENT_TYPE, render_metrics
+
+
+router = APIRouter(tags=["metrics"])
+
+
+##############################################################################################
+##############################################################################################
+
+@router.get("/metrics", response_class=Response)
+def metrics():
+    """
+    Per-stage counters and latency histograms in Prometheus text format
+    (GitHub calls and rate-limit headroom, clones, scans, chunking,
+    embedding, vector store, single-flight coalescing).
+    """
+
+    return Response(content=render_metrics(), media_type=CONTENT_TYPE)
+
+##############################################################################################
+##############################################################################################
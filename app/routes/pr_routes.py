@@ -1,6 +1,7 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException
 from ..schema import *
-from ..services.pr_services import fetch_pr_files, fetch_all_file_contents
+from ..services.pr_services import fetch_pr_files_async, fetch_all_file_contents_async
+from ..services.context_services import assemble_pr_context
 
 
 router = APIRouter(tags=["pr services"])
@@ -10,7 +11,7 @@ router = APIRouter(tags=["pr services"])
 ##############################################################################################
 
 @router.get("/fetch_pr_files_meta", response_model=PRFilesResponse)
-def fetch_pr_files_route(owner: str, repo: str, pr_number: int):
+async def fetch_pr_files_route(owner: str, repo: str, pr_number: int):
     """
     API route to fetch list of changed files in a PR, including:
     - filename
@@ -18,25 +19,42 @@ def fetch_pr_files_route(owner: str, repo: str, pr_number: int):
     - patch (diff)
     - contents_url (for fetching full file content)
     """
-    return fetch_pr_files(owner, repo, pr_number)
+    return await fetch_pr_files_async(owner, repo, pr_number)
 
 ##############################################################################################
 ##############################################################################################
 
 @router.get("/fetch_all_file_contents", response_model=AllFilesContentResponse)
-def fetch_all_file_contents_route(owner: str, repo: str, pr_number: int):
+async def fetch_all_file_contents_route(owner: str, repo: str, pr_number: int):
     """
     API route to fetch full decoded contents for all changed files in a PR.
     Combines:
     - filename
     - patch
-    - full decoded content (if available)
+    - full decoded content (if available), fetched concurrently
     """
-    return fetch_all_file_contents(owner, repo, pr_number)
+    return await fetch_all_file_contents_async(owner, repo, pr_number)
 
 ##############################################################################################
 ##############################################################################################
 
+@router.post("/review_context", response_model=PRContextResponse)
+def review_context_route(req: PRContextRequest):
+    """
+    Review context for a PR within a token budget:
+    - the PR's patches
+    - the repository chunks most relevant to each hunk, deduplicated
+    Memoised per PR head SHA and budget.
+    """
 
+    try:
+        return assemble_pr_context(req)
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-
+##############################################################################################
+##############################################################################################
@@ -0,0 +1,65 @@
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from ..schema import ProfileListResponse
+from ..services.profiling_services import check_admin_token, get_profile_store
+
+
+router = APIRouter(tags=["profiling"])
+
+
+def _require_admin(token: Optional[str]):
+    if not check_admin_token(token):
+        raise HTTPException(status_code=401, detail="Invalid or missing X-Admin-Token.")
+
+##############################################################################################
+##############################################################################################
+
+@router.get("", response_model=ProfileListResponse)
+def list_profiles(x_admin_token: Optional[str] = Header(None)):
+    """
+    Recorded request profiles, newest first: requested with `X-Profile: 1`
+    / `?profile=1`, or captured because the request exceeded
+    PROFILE_SLOW_SECONDS.
+    """
+
+    _require_admin(x_admin_token)
+    return {"profiles": get_profile_store().list()}
+
+##############################################################################################
+
+@router.get("/{profile_id}")
+def get_profile(
+    profile_id: str,
+    format: str = Query("json", pattern="^(json|folded)$"),
+    x_admin_token: Optional[str] = Header(None)
+):
+    """
+    One profile: call tree, top functions by cumulative time and folded
+    stacks. `format=folded` returns only the folded stacks as text, for
+    flame-graph tools.
+    """
+
+    _require_admin(x_admin_token)
+    try:
+        report = get_profile_store().get(profile_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Profile '{profile_id}' not found.")
+
+    if format == "folded":
+        lines = [f"{stack} {count}" for stack, count in report["folded_stacks"].items()]
+        return PlainTextResponse("\n".join(lines) + "\n")
+    return report
+
+##############################################################################################
+
+@router.delete("")
+def clear_profiles(x_admin_token: Optional[str] = Header(None)):
+    """Delete every recorded profile."""
+
+    _require_admin(x_admin_token)
+    return {"deleted": get_profile_store().clear()}
+
+##############################################################################################
+##############################################################################################
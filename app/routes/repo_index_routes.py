@@ -1,6 +1,9 @@
-from fastapi import APIRouter
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
 from ..schema import *
-from ..services.repo_index_services import index_repo, fetch_repo_tree, index_repo_clone
+from ..services.repo_index_services import fetch_repo_tree_async, clone_files_source, crawl_files_source_async
+from ..services.pagination_services import bulk_response, coalesced_bulk_response, decode_cursor, parse_fields
 
 
 
@@ -12,39 +15,87 @@ router = APIRouter(tags=["repo_index services"])
 ##############################################################################################
 
 @router.get("/fetch_repo_tree",response_model=RepoTreeResponse)
-def fetch_repo_tree_route(owner: str, repo: str, branch: str = "main"):
+async def fetch_repo_tree_route(owner: str, repo: str, branch: str = "main"):
     """
     API route to fetch the repository tree for a given branch.
     """
-    return fetch_repo_tree(owner, repo, branch)
+    return await fetch_repo_tree_async(owner, repo, branch)
 
 ##############################################################################################
 ##############################################################################################
 
 @router.get("/index_repo_crawl",response_model=RepoIndexResponse)
-def index_repo_crawl(owner: str, repo: str, branch: str = "main"):
+async def index_repo_crawl(
+    owner: str,
+    repo: str,
+    branch: str = "main",
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1),
+    fields: Optional[str] = None,
+    format: str = Query("json", pattern="^(json|ndjson)$")
+):
     """
     Indexes the repository by fetching all files and their contents.
-    Returns a list of RepoIndexItem with path and content.
+    Returns a list of RepoIndexItem with path, content and size.
+
+    - limit / cursor: page through the files; pass `next_cursor` back
+    - fields: e.g. `path,size` (contents are then not downloaded at all)
+    - contents of a page are downloaded concurrently
+    - format=ndjson: stream one item per line
 
     Note: 1. To be used for repo indexing under 100 files if using the free token
           2. For larger repos, use the the clone method.
     """
-    return index_repo(owner, repo, branch)
+
+    try:
+        state = decode_cursor(cursor, "crawl", f"{owner}/{repo}")
+        selected = parse_fields(fields, RepoIndexItem)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    source = await crawl_files_source_async(
+        owner, repo, branch, state,
+        with_content=selected is None or "content" in selected,
+        limit=limit
+    )
+    return bulk_response(source, "items", limit, selected, format)
 
 ##############################################################################################
 ##############################################################################################
 
 @router.get("/index_repo_clone",response_model=RepoIndexResponse) 
-def index_repo_clone_route(owner: str, repo: str, branch: str = "main"):
+def index_repo_clone_route(
+    owner: str,
+    repo: str,
+    branch: str = "main",
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1),
+    fields: Optional[str] = None,
+    format: str = Query("json", pattern="^(json|ndjson)$")
+):
     """
     Indexes the repository by cloning it and reading all files and their contents.
-    Returns a list of RepoIndexItem with path and content.
+    Returns a list of RepoIndexItem with path, content and size.
+
+    - limit / cursor: page through the files; every page reads the commit
+      of the first page
+    - fields: e.g. `path,size` to list files without their content
+    - format=ndjson: stream one item per line
 
     Note: Suitable for larger repositories.
     """
-    return index_repo_clone(owner, repo, branch)
+
+    try:
+        state = decode_cursor(cursor, "files", f"{owner}/{repo}")
+        selected = parse_fields(fields, RepoIndexItem)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return coalesced_bulk_response(
+        ("files", owner, repo, branch, cursor, limit, fields),
+        lambda: clone_files_source(owner, repo, branch, state),
+        "items", limit, selected, format
+    )
 
 ##############################################################################################
 ##############################################################################################
-
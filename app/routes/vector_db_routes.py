@@ -1,17 +1,189 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException
+from ..schema import (
+    VectorRepoInitRequest,
+    VectorRepoInitResponse,
+    VectorSearchRequest,
+    VectorSearchResponse,
+    VectorBatchSearchRequest,
+    VectorBatchSearchResponse,
+    SymbolLookupRequest,
+    SymbolLookupResponse
+)
+from ..services.vector_db_services import (
+    init_repo_index,
+    get_store_stats,
+    get_search_cache_stats,
+    search_repo,
+    search_repo_batch,
+    lookup_symbol_definitions,
+    storage_report,
+    remove_index_version,
+    collect_garbage
+)
 
 router = APIRouter(tags=["vector_services"])
 
 ##############################################################################################
 ##############################################################################################
 
-@router.post("/init_repo")
-def repo_init():
-    pass
+@router.post("/init_repo", response_model=VectorRepoInitResponse)
+def repo_init(req: VectorRepoInitRequest):
+    """
+    Clone, chunk, embed and store a repository's code in its vector collection.
+
+    Idempotent: chunks already stored (same path + content) are not re-embedded
+    or re-written. Returns chunk counts and per-stage throughput.
+    """
+
+    if not req.embedding_provider:
+        raise HTTPException(
+            status_code=400,
+            detail="Embedding provider must be explicitly specified."
+        )
+
+    try:
+        return init_repo_index(req)
+    except HTTPException:
+        raise
+    except ValueError as e:
+        # provider / dimension mismatch with the existing collection
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+##############################################################################################
+##############################################################################################
+
+@router.post("/search", response_model=VectorSearchResponse)
+def search_vector(req: VectorSearchRequest):
+    """
+    Top-k chunks of a repo most similar to a single query text.
+    With `expand=N`, each hit is returned together with its ±N neighbouring chunks.
+    `path_prefixes` / `languages` scope the search before similarity scoring.
+    """
+
+    try:
+        return search_repo(
+            req.repo_name,
+            req.query,
+            top_k=req.top_k,
+            expand=req.expand,
+            path_prefixes=req.path_prefixes,
+            languages=req.languages,
+            commit=req.commit,
+            ref=req.ref
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+##############################################################################################
+##############################################################################################
+
+@router.post("/search_batch", response_model=VectorBatchSearchResponse)
+def search_vector_batch(req: VectorBatchSearchRequest):
+    """
+    Many searches in one round-trip (e.g. one query per changed hunk of a PR).
+
+    Query texts are embedded in one batch and searched with one backend call.
+    Returns per-query top-k results in input order.
+    """
+
+    try:
+        return search_repo_batch(
+            req.repo_name,
+            queries=req.queries,
+            vectors=req.vectors,
+            top_k=req.top_k,
+            expand=req.expand,
+            path_prefixes=req.path_prefixes,
+            languages=req.languages,
+            commit=req.commit,
+            ref=req.ref
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+##############################################################################################
+##############################################################################################
+
+@router.post("/symbols", response_model=SymbolLookupResponse)
+def lookup_symbols(req: SymbolLookupRequest):
+    """
+    Definition chunks of the functions / classes / types a patch refers to,
+    resolved through the repo's symbol index (no embedding call).
+    """
+
+    try:
+        return lookup_symbol_definitions(
+            req.repo_name,
+            req.patch,
+            commit=req.commit,
+            ref=req.ref,
+            max_results=req.max_results
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+##############################################################################################
+##############################################################################################
+
+@router.get("/stats")
+def vector_store_stats(repo_name: str):
+    """
+    Report the repo's vector backend, vector count, load time and query latency.
+    """
+    return get_store_stats(repo_name)
+
+##############################################################################################
+##############################################################################################
+
+@router.get("/cache_stats")
+def search_cache_stats():
+    """
+    Hit / miss metrics of the commit-scoped search result cache.
+    """
+    return get_search_cache_stats()
+
+##############################################################################################
+##############################################################################################
+
+@router.get("/versions")
+def list_index_versions(repo_name: str):
+    """
+    Indexed versions (commits and the refs pointing at them) of a repo, with a
+    storage-amplification report: logical vs physical vs referenced vectors.
+    """
+    return storage_report(repo_name)
+
+##############################################################################################
+##############################################################################################
+
+@router.delete("/versions/{commit}")
+def delete_index_version(repo_name: str, commit: str):
+    """
+    Forget one indexed commit. Shared vectors stay; run /gc to reclaim the rest.
+    """
+    try:
+        removed = remove_index_version(repo_name, commit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not removed:
+        raise HTTPException(status_code=404, detail=f"Version '{commit}' not found.")
+    return {"repo_name": repo_name, "deleted": commit}
 
 ##############################################################################################
 ##############################################################################################
 
-@router.post("/search")
-def search_vector(query: str):
-    pass
\ No newline at end of file
+@router.post("/gc")
+def garbage_collect(repo_name: str):
+    """
+    Delete vectors no longer referenced by any indexed version, and their
+    chunk text from the content store.
+    """
+    return collect_garbage(repo_name)
@@ -0,0 +1,72 @@
+import json
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException, Request
+from ..schema import WebhookAck, WebhookStatus
+from ..services import webhook_services
+from ..services.webhook_services import get_webhook_ingestor, verify_signature
+
+
+router = APIRouter(tags=["webhook services"])
+
+
+##############################################################################################
+##############################################################################################
+
+@router.post("/github", response_model=WebhookAck, status_code=202)
+async def github_webhook(
+    request: Request,
+    x_github_event: str = Header(...),
+    x_hub_signature_256: Optional[str] = Header(None),
+    x_github_delivery: Optional[str] = Header(None)
+):
+    """
+    GitHub webhook receiver for `pull_request` and `push` events.
+    - verifies X-Hub-Signature-256 against GITHUB_WEBHOOK_SECRET
+    - debounces per PR / branch: a burst of events becomes one job
+      for the latest head SHA
+    """
+
+    if not webhook_services.GITHUB_WEBHOOK_SECRET:
+        raise HTTPException(status_code=503, detail="GITHUB_WEBHOOK_SECRET is not configured.")
+
+    body = await request.body()
+    if not verify_signature(body, x_hub_signature_256, webhook_services.GITHUB_WEBHOOK_SECRET):
+        raise HTTPException(status_code=401, detail="Invalid webhook signature.")
+
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Webhook body is not valid JSON.")
+
+    try:
+        return get_webhook_ingestor().handle(x_github_event, payload, x_github_delivery)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+##############################################################################################
+##############################################################################################
+
+@router.get("/status", response_model=WebhookStatus)
+def webhook_status():
+    """
+    Event counters, debounced work waiting for its window to close, and the
+    last job submitted per PR / branch.
+    """
+    return get_webhook_ingestor().status()
+
+##############################################################################################
+
+@router.post("/flush", response_model=WebhookStatus)
+def flush_webhooks():
+    """
+    Submit all pending work now instead of waiting for the debounce window.
+    """
+    ingestor = get_webhook_ingestor()
+    ingestor.debouncer.flush(force=True)
+    return ingestor.status()
+
+##############################################################################################
+##############################################################################################
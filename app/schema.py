@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import Dict, List, Optional
 from pydantic import BaseModel
 
 
@@ -55,6 +55,7 @@ class RepoTreeItem(BaseModel):
 class RepoTreeResponse(BaseModel):
     tree: List[RepoTreeItem]
     truncated: Optional[bool] = None
+    commit_sha: Optional[str] = None
 
 
 ####################################################################################################
@@ -63,10 +64,14 @@ class RepoTreeResponse(BaseModel):
 class RepoIndexItem(BaseModel):
     path: str
     content: str
+    size: Optional[int] = None          # bytes in the source file
 
 # Response for /index_repo
 class RepoIndexResponse(BaseModel):
     items: List[RepoIndexItem]
+    commit_sha: Optional[str] = None    # commit the items were read from
+    next_cursor: Optional[str] = None   # paginated requests: pass back for the next page
+    skipped: Optional[List[str]] = None # crawl: paths whose content could not be downloaded
 
 ####################################################################################################
 
@@ -76,10 +81,15 @@ class RepoChunk(BaseModel):
     chunk_id: int
     content: str
     local_index: int
+    language: Optional[str] = None
+    file_size: Optional[int] = None     # characters in the source file
+    symbols: Optional[List[str]] = None # names defined in this chunk (symbol index)
 
 # Response for repo chunks
 class RepoChunksResponse(BaseModel):
     chunks: List[RepoChunk]
+    commit_sha: Optional[str] = None
+    next_cursor: Optional[str] = None
 
 
 ####################################################################################################
@@ -110,12 +120,51 @@ class VectorRepoInitRequest(BaseModel):
     repo: str
     branch: str = "main"
     embedding_provider: str
+    embedding_dim: Optional[int] = None   # reduced output dimension; None = model native
+    near_dup_threshold: Optional[float] = None   # None = NEAR_DUP_THRESHOLD; <= 0 disables
+
+
+class StageThroughput(BaseModel):
+    items: int
+    seconds: float
+    items_per_sec: float
+    # pipeline stages only
+    items_out: Optional[int] = None
+    blocked_seconds: Optional[float] = None  # waiting on a full downstream queue
+    utilisation: Optional[float] = None      # busy seconds / pipeline wall time
+    queue_max: Optional[int] = None          # input queue depth
+    queue_mean: Optional[float] = None
+
+
+class VectorRepoInitResponse(BaseModel):
+    repo_name: str
+    chunks_total: int
+    chunks_unique: int
+    chunks_new: int          # embedded and written in this run
+    chunks_skipped: int      # already stored, nothing written
+    chunks_near_duplicate: int = 0   # collapsed into an alias of a similar chunk
+    embeddings_saved: int = 0        # chunks that share another chunk's vector
+    commit_sha: Optional[str] = None
+    wall_seconds: Optional[float] = None     # pipeline wall time (excludes clone)
+    stages: Dict[str, StageThroughput]
 
 
 class VectorSearchRequest(BaseModel):
     repo_name: str
     query: str
     top_k: int = 5
+    expand: int = 0          # also return ±N neighbouring chunks of each hit
+    path_prefixes: Optional[List[str]] = None   # e.g. ["app/services"]; any may match
+    languages: Optional[List[str]] = None       # e.g. ["python"]; any may match
+    commit: Optional[str] = None     # indexed version to search; default = latest
+    ref: Optional[str] = None        # or the version a branch / ref points at
+
+
+class ChunkAlias(BaseModel):
+    file_path: str
+    chunk_id: int
+    local_index: int
+    similarity: float        # estimated Jaccard similarity to the returned chunk
 
 
 class VectorSearchResult(BaseModel):
@@ -124,7 +173,152 @@ class VectorSearchResult(BaseModel):
     local_index: int
     score: float
     content: str
+    neighbour_of: Optional[int] = None   # chunk_id of the hit this neighbour expands
+    aliases: Optional[List[ChunkAlias]] = None   # (near-)duplicates collapsed into this chunk
 
 
 class VectorSearchResponse(BaseModel):
     results: List[VectorSearchResult]
+
+
+class VectorBatchSearchRequest(BaseModel):
+    repo_name: str
+    queries: Optional[List[str]] = None          # texts, embedded in one batch
+    vectors: Optional[List[List[float]]] = None  # or precomputed raw embeddings
+    top_k: int = 5
+    expand: int = 0
+    path_prefixes: Optional[List[str]] = None
+    languages: Optional[List[str]] = None
+    commit: Optional[str] = None
+    ref: Optional[str] = None
+
+
+class VectorBatchSearchResponse(BaseModel):
+    results: List[VectorSearchResponse]          # one per query, in order
+
+
+class SymbolLookupRequest(BaseModel):
+    repo_name: str
+    patch: str               # unified diff of one or more files
+    commit: Optional[str] = None
+    ref: Optional[str] = None
+    max_results: int = 20
+
+
+class SymbolDefinition(BaseModel):
+    symbol: str
+    file_path: str
+    chunk_id: int
+    local_index: int
+    content: str
+
+
+class SymbolLookupResponse(BaseModel):
+    results: List[SymbolDefinition]
+    symbols_referenced: int  # identifiers found in the patch
+    symbols_resolved: int    # of those, defined in the indexed version
+
+
+####################################################################################################
+
+# PR review context schemas
+
+class PRContextRequest(BaseModel):
+    owner: str
+    repo: str
+    pr_number: int
+    repo_name: Optional[str] = None    # indexed repo; defaults to "owner/repo"
+    token_budget: int = 8000
+    top_k: int = 5                     # chunks retrieved per hunk
+    expand: int = 1                    # neighbouring chunks per hit
+    include_symbols: bool = True       # add definitions of identifiers the hunks use
+    commit: Optional[str] = None
+    ref: Optional[str] = None
+
+
+class ContextChunk(BaseModel):
+    file_path: str
+    chunk_id: int
+    tokens: int
+    score: float
+    hunks: List[int]                   # indices of the hunks this chunk serves
+
+
+class PRContextResponse(BaseModel):
+    head_sha: str
+    token_budget: int
+    tokens_used: int
+    tokenizer: str                     # tiktoken encoding, or "estimate"
+    tokens_approximate: bool = False   # counts are an upper bound (no tiktoken)
+    context: str
+    patch_files: List[str]
+    patches_dropped: List[str] = []    # patches larger than what was left of the budget
+    chunks: List[ContextChunk]
+    chunks_dropped: int                # candidates that did not fit the budget
+    cached: bool
+
+
+####################################################################################################
+
+# Background job schemas
+
+class JobStatus(BaseModel):
+    job_id: str
+    kind: str                # index_repo_clone | chunk_repo | init_repo | pr_review
+    params: Dict
+    state: str               # queued | running | succeeded | failed | cancelled | interrupted
+    progress: Dict[str, int] # files, chunks, chunks_written
+    checkpoint: Dict
+    error: Optional[str] = None
+    attempts: int
+    created: float
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    resumable: bool
+
+
+####################################################################################################
+
+# GitHub webhook schemas
+
+class WebhookAck(BaseModel):
+    status: str                   # scheduled | coalesced | submitted | ignored | dropped | duplicate | pong
+    event: str
+    key: Optional[str] = None     # e.g. "pr/owner/repo/12"
+    sha: Optional[str] = None     # latest head / pushed SHA for the key
+    events: Optional[int] = None  # events coalesced into the pending item so far
+
+
+class PendingWebhookWork(BaseModel):
+    key: str
+    kind: str
+    sha: str
+    events: int
+    superseded_shas: List[str]
+    due_in_seconds: float
+
+
+class WebhookStatus(BaseModel):
+    stats: Dict[str, int]         # events, duplicates, ignored, coalesced, jobs_submitted, jobs_superseded, flush_errors
+    pending: List[PendingWebhookWork]
+    active: Dict[str, Dict[str, str]]   # key -> {sha, job_id} of the last submitted job
+
+
+####################################################################################################
+
+# Request profiling schemas
+
+class ProfileSummary(BaseModel):
+    id: str
+    trigger: str                  # requested | slow
+    method: str
+    path: str
+    status: Optional[int] = None
+    started_at: float
+    wall_seconds: float
+    samples: int
+    waiting_seconds: float        # not running the request's code (awaited IO, other requests)
+
+
+class ProfileListResponse(BaseModel):
+    profiles: List[ProfileSummary]
@@ -1,4 +1,23 @@
 from ..schema import *
+from typing import Iterable, Iterator, List
+from .symbol_index_services import extract_definitions
+from .pagination_services import BulkSource
+from .repo_index_services import enumerate_repo_files, get_checkout_cache
+from .metrics_services import CHUNK_LATENCY, CHUNKS_PER_FILE
+
+
+# Extension -> language label stored with every chunk (used for search filters)
+LANGUAGE_BY_EXTENSION = {
+    ".py": "python",
+    ".js": "javascript", ".jsx": "javascript",
+    ".ts": "typescript", ".tsx": "typescript",
+    ".java": "java",
+    ".go": "go",
+    ".rs": "rust",
+    ".c": "c", ".h": "c",
+    ".cpp": "cpp", ".hpp": "cpp",
+    ".cs": "csharp",
+}
 
 
 ##################################################################################################################
@@ -113,51 +132,113 @@ def chunk_repo_contents(repo_index: RepoIndexResponse) -> RepoChunksResponse:
     file-local indices, enabling safe window expansion at retrieval time.
     Only source code files are indexed to maintain retrieval precision.
 
+    Each chunk also lists the names it defines (functions, classes, types),
+    which feed the per-version symbol index used for exact definition lookup.
+
     """
 
-    repo_chunks = []
-    global_chunk_id = 0
+    return RepoChunksResponse(
+        chunks=list(iter_repo_chunks(repo_index.items)),
+        commit_sha=repo_index.commit_sha
+    )
 
-    CODE_EXTENSIONS = {
-        ".py", ".js", ".ts", ".jsx", ".tsx",
-        ".java", ".go", ".rs", ".cpp", ".c",
-        ".h", ".hpp", ".cs"
-    }
+##################################################################################################################
 
-    for item in repo_index.items:
-        file_path = item.path
-        content = item.content
+CODE_EXTENSIONS = set(LANGUAGE_BY_EXTENSION)
 
-        if not content.strip():
-            continue
 
-        filename = file_path.split("/")[-1]
-        extension = "." + filename.split(".")[-1] if "." in filename else ""
+def chunk_file(item: RepoIndexItem, first_chunk_id: int = 0) -> List[RepoChunk]:
+    """
+    Chunks of one source file, with global IDs starting at `first_chunk_id`.
+    Non-code, empty and oversized files yield no chunks.
+    """
 
-        # Allowlist-based filtering
-        if extension not in CODE_EXTENSIONS:
-            continue
+    file_path = item.path
+    content = item.content
 
-        if len(content) > 200_000:
-            continue
+    if not content.strip():
+        return []
+
+    filename = file_path.split("/")[-1]
+    extension = "." + filename.split(".")[-1] if "." in filename else ""
 
-        chunks = chunk_text(content)
+    # Allowlist-based filtering
+    if extension not in CODE_EXTENSIONS:
+        return []
 
-        for local_id, chunk_content in chunks:
-            if len(chunk_content) < 200:
-                continue
+    if len(content) > 200_000:
+        return []
 
-            repo_chunks.append(
-                RepoChunk(
-                    file_path=file_path,
-                    chunk_id=global_chunk_id,   #
-                    local_index=local_id,       
-                    content=chunk_content
-                )
+    with CHUNK_LATENCY.time():
+        pieces = chunk_text(content)
+
+    file_chunks = []
+    for local_id, chunk_content in pieces:
+        if len(chunk_content) < 200:
+            continue
+
+        file_chunks.append(
+            RepoChunk(
+                file_path=file_path,
+                chunk_id=first_chunk_id + len(file_chunks),
+                local_index=local_id,
+                content=chunk_content,
+                language=LANGUAGE_BY_EXTENSION[extension],
+                file_size=len(content),
+                symbols=extract_definitions(chunk_content, LANGUAGE_BY_EXTENSION[extension])
             )
+        )
+
+    CHUNKS_PER_FILE.observe(len(file_chunks))
+    return file_chunks
+
+
+def iter_repo_chunks(items: Iterable[RepoIndexItem]) -> Iterator[RepoChunk]:
+    """
+    Yield chunks file by file, with globally increasing chunk IDs.
+    Works on a lazy file iterator, so files need not be held in memory.
+    """
+
+    global_chunk_id = 0
+    for item in items:
+        for chunk in chunk_file(item, global_chunk_id):
+            yield chunk
             global_chunk_id += 1
 
-    return RepoChunksResponse(chunks=repo_chunks)
 
 ##################################################################################################################
-##################################################################################################################
\ No newline at end of file
+##################################################################################################################
+
+##################################################################################################################
+
+def clone_chunks_source(owner: str, repo: str, branch: str = "main", cursor_state: dict = None) -> BulkSource:
+    """
+    Chunks of a clone as a paginated bulk source (see pagination_services).
+
+    Cursor state {"commit", "file", "skip", "next_id"}: resume in the
+    `file`-th file after its first `skip` chunks, whose chunk IDs start at
+    `next_id - skip`. Earlier files are not opened (see
+    `enumerate_repo_files`).
+    """
+
+    cursor_state = cursor_state or {}
+    start_file = cursor_state.get("file", 0)
+    skip = cursor_state.get("skip", 0)
+    cache = get_checkout_cache()
+    root_dir, commit_sha = cache.acquire(owner, repo, branch, cursor_state.get("commit"))
+
+    def entries():
+        next_id = cursor_state.get("next_id", 0) - skip
+        for position, item in enumerate_repo_files(root_dir, start_file):
+            file_chunks = chunk_file(item, next_id)
+            next_id += len(file_chunks)
+            for index, chunk in enumerate(file_chunks):
+                if position == start_file and index < skip:
+                    continue
+                yield chunk, {"file": position, "skip": index + 1, "next_id": chunk.chunk_id + 1}
+
+    return BulkSource(
+        "chunks", f"{owner}/{repo}", commit_sha, entries(),
+        close=lambda: cache.release(owner, repo, commit_sha)
+    )
+
@@ -0,0 +1,317 @@
+import os
+import re
+import mmap
+import zlib
+import struct
+import hashlib
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:          # in requirements.txt; without it new blobs fall back to zlib
+    zstandard = None
+
+from .neighbour_index_services import REPO_INDEX_DATA_DIR
+
+
+# ========================================
+# Chunk Content Store — Design Notes
+# ========================================
+
+# Chunk text does not live in the vector DB. The vector store keeps IDs and
+# small filterable metadata (including `content_hash`); the text itself is
+# kept once per distinct content in a content-addressed store per repo:
+
+#     <REPO_INDEX_DATA_DIR>/<collection>/content/chunks[.<gen>].dat   compressed blobs, appended
+#     <REPO_INDEX_DATA_DIR>/<collection>/content/chunks[.<gen>].idx   fixed-size offset records
+#     <REPO_INDEX_DATA_DIR>/<collection>/content/CURRENT              live generation number
+
+# Index record (48 bytes, little endian):
+#     sha256(content) 32B | offset u64 | stored length u32 | raw length u32 | codec u8 | pad 3B
+
+# - Blobs are compressed individually with zstd (`zstandard` is a
+#   requirement; if it is missing the store falls back to zlib). The codec
+#   is recorded per blob, so a store written with one codec stays readable
+#   after switching to the other.
+# - The data file is memory-mapped for reads. A batched read sorts the
+#   requested blobs by offset, so hydrating a page of search results is one
+#   forward pass over the mapping.
+# - Writes append the blob first and its index record second; a crash can
+#   only leave unreferenced bytes or a torn trailing record, both ignored.
+# - Identical content under different paths is stored once.
+# - `compact` rewrites the store keeping only live hashes (used by GC) into
+#   a new generation: both files of generation N+1 are written and synced,
+#   then CURRENT is replaced atomically, then generation N is deleted. A
+#   crash at any point leaves CURRENT naming a complete pair; leftover files
+#   of other generations are removed when the store is opened. Generation 0
+#   uses the unsuffixed names, so stores without CURRENT open as before.
+
+# ========================================
+
+
+# "zstd" (default when available) or "zlib"
+CHUNK_STORE_CODEC = os.getenv("CHUNK_STORE_CODEC", "zstd" if zstandard is not None else "zlib").lower()
+CHUNK_STORE_LEVEL = int(os.getenv("CHUNK_STORE_LEVEL", "3"))
+
+_RECORD = struct.Struct("<32sQIIB3x")
+
+_GENERATION_FILE = re.compile(r"^chunks(?:\.(\d+))?\.(dat|idx)(?:\.tmp)?$")
+
+_CODEC_ZLIB = 1
+_CODEC_ZSTD = 2
+_CODEC_IDS = {"zlib": _CODEC_ZLIB, "zstd": _CODEC_ZSTD}
+
+
+#################################################################################################################
+#################################################################################################################
+
+def content_digest(content: str) -> str:
+    """Hex sha256 of chunk text; the same value as the `content_hash` metadata."""
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+class ChunkContentStore:
+    """
+    Append-only, content-addressed store of compressed chunk text.
+    Keys are hex sha256 digests of the content.
+    """
+
+    def __init__(self, path: str, codec: str = CHUNK_STORE_CODEC, level: int = CHUNK_STORE_LEVEL):
+        if codec not in _CODEC_IDS:
+            raise ValueError(f"Unknown chunk store codec '{codec}'")
+        if codec == "zstd" and zstandard is None:
+            raise RuntimeError("Chunk store codec 'zstd' requires the 'zstandard' package.")
+
+        self.path = path
+        self.codec = codec
+        self.level = level
+
+        os.makedirs(path, exist_ok=True)
+        self._current_path = os.path.join(path, "CURRENT")
+        self.generation = self._read_generation()
+        self._data_path, self._index_path = self._generation_paths(self.generation)
+        self._remove_other_generations()
+
+        self._lock = threading.Lock()
+        self._index: Dict[bytes, Tuple[int, int, int, int]] = {}   # digest -> (offset, length, raw, codec)
+        self._data_size = 0
+        self._raw_bytes = 0
+        self._map: Optional[mmap.mmap] = None
+        self._mapped_size = 0
+
+        self._compressor = zstandard.ZstdCompressor(level=level) if codec == "zstd" else None
+        self._decompressor = zstandard.ZstdDecompressor() if zstandard is not None else None
+
+        self._load_index()
+
+    # ---- internal ----------------------------------------------------------------------------
+
+    def _read_generation(self) -> int:
+        if not os.path.exists(self._current_path):
+            return 0
+        with open(self._current_path, "r", encoding="utf-8") as f:
+            return int(f.read().strip())
+
+    def _generation_paths(self, generation: int) -> Tuple[str, str]:
+        suffix = f".{generation}" if generation else ""
+        return (
+            os.path.join(self.path, f"chunks{suffix}.dat"),
+            os.path.join(self.path, f"chunks{suffix}.idx"),
+        )
+
+    def _remove_other_generations(self):
+        """Delete files of generations CURRENT does not name (interrupted compactions)."""
+        live = {os.path.basename(self._data_path), os.path.basename(self._index_path)}
+        for name in os.listdir(self.path):
+            if _GENERATION_FILE.match(name) and name not in live:
+                os.remove(os.path.join(self.path, name))
+
+    @staticmethod
+    def _write_synced(path: str, data: bytes):
+        with open(path, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _load_index(self):
+        if os.path.exists(self._data_path):
+            self._data_size = os.path.getsize(self._data_path)
+        if not os.path.exists(self._index_path):
+            return
+
+        with open(self._index_path, "rb") as f:
+            raw = f.read()
+
+        usable = len(raw) - len(raw) % _RECORD.size        # drop a torn trailing record
+        for digest, offset, length, raw_len, codec in _RECORD.iter_unpack(raw[:usable]):
+            if offset + length > self._data_size:
+                continue
+            if digest not in self._index:
+                self._raw_bytes += raw_len
+            self._index[digest] = (offset, length, raw_len, codec)
+
+    def _compress(self, data: bytes) -> Tuple[bytes, int]:
+        if self._compressor is not None:
+            return self._compressor.compress(data), _CODEC_ZSTD
+        return zlib.compress(data, min(max(self.level, 1), 9)), _CODEC_ZLIB
+
+    def _decompress(self, blob: bytes, codec: int) -> bytes:
+        if codec == _CODEC_ZLIB:
+            return zlib.decompress(blob)
+        if codec == _CODEC_ZSTD:
+            if self._decompressor is None:
+                raise RuntimeError("Chunk store contains zstd blobs but 'zstandard' is not installed.")
+            return self._decompressor.decompress(blob)
+        raise RuntimeError(f"Unknown chunk store codec id {codec}")
+
+    def _mapping(self) -> Optional[mmap.mmap]:
+        """Read-only map of the data file, re-mapped after it has grown."""
+        if self._data_size == 0:
+            return None
+        if self._map is None or self._mapped_size < self._data_size:
+            if self._map is not None:
+                self._map.close()
+            with open(self._data_path, "rb") as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._mapped_size = len(self._map)
+        return self._map
+
+    # ---- writes ------------------------------------------------------------------------------
+
+    def put_many(self, contents: Iterable[str]) -> int:
+        """
+        Store every content not already present. Returns the number of new blobs.
+        """
+
+        with self._lock:
+            blobs, records = [], []
+            offset = self._data_size
+            for content in contents:
+                raw = content.encode("utf-8")
+                digest = hashlib.sha256(raw).digest()
+                if digest in self._index:
+                    continue
+                blob, codec = self._compress(raw)
+                self._index[digest] = (offset, len(blob), len(raw), codec)
+                records.append(_RECORD.pack(digest, offset, len(blob), len(raw), codec))
+                blobs.append(blob)
+                offset += len(blob)
+                self._raw_bytes += len(raw)
+
+            if not blobs:
+                return 0
+
+            with open(self._data_path, "ab") as f:
+                f.write(b"".join(blobs))
+                f.flush()
+                os.fsync(f.fileno())
+            with open(self._index_path, "ab") as f:
+                f.write(b"".join(records))
+
+            self._data_size = offset
+            return len(blobs)
+
+    def compact(self, live_hashes: Iterable[str]) -> int:
+        """
+        Rewrite the store keeping only `live_hashes`. Returns blobs removed.
+        """
+
+        live = {bytes.fromhex(h) for h in live_hashes}
+
+        with self._lock:
+            dead = [d for d in self._index if d not in live]
+            if not dead:
+                return 0
+
+            data = self._mapping()
+            kept = sorted(
+                ((d, entry) for d, entry in self._index.items() if d in live),
+                key=lambda item: item[1][0]
+            )
+
+            # New generation first; CURRENT is switched last, atomically
+            generation = self.generation + 1
+            data_path, index_path = self._generation_paths(generation)
+
+            index, records, offset, raw_bytes = {}, [], 0, 0
+            with open(data_path, "wb") as f:
+                for digest, (old_offset, length, raw_len, codec) in kept:
+                    f.write(data[old_offset:old_offset + length])
+                    index[digest] = (offset, length, raw_len, codec)
+                    records.append(_RECORD.pack(digest, offset, length, raw_len, codec))
+                    offset += length
+                    raw_bytes += raw_len
+                f.flush()
+                os.fsync(f.fileno())
+            self._write_synced(index_path, b"".join(records))
+            self._write_synced(self._current_path + ".tmp", str(generation).encode("ascii"))
+            os.replace(self._current_path + ".tmp", self._current_path)
+
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+            old_paths = (self._data_path, self._index_path)
+            self.generation, self._data_path, self._index_path = generation, data_path, index_path
+            for old in old_paths:
+                os.remove(old)
+
+            self._index = index
+            self._data_size = offset
+            self._raw_bytes = raw_bytes
+            self._mapped_size = 0
+            return len(dead)
+
+    # ---- reads -------------------------------------------------------------------------------
+
+    def __contains__(self, content_hash: str) -> bool:
+        return bytes.fromhex(content_hash) in self._index
+
+    def get_many(self, content_hashes: Iterable[str]) -> Dict[str, str]:
+        """
+        Batched read: {content_hash: text} for every hash present in the store.
+        Blobs are read in file order from the memory map.
+        """
+
+        with self._lock:
+            wanted = []
+            for h in set(content_hashes):
+                entry = self._index.get(bytes.fromhex(h))
+                if entry is not None:
+                    wanted.append((entry, h))
+            if not wanted:
+                return {}
+
+            data = self._mapping()
+            wanted.sort()
+            return {
+                h: self._decompress(data[offset:offset + length], codec).decode("utf-8")
+                for (offset, length, _, codec), h in wanted
+            }
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "codec": self.codec,
+                "blobs": len(self._index),
+                "raw_bytes": self._raw_bytes,
+                "stored_bytes": self._data_size,
+                "compression_ratio": round(self._raw_bytes / self._data_size, 3) if self._data_size else None,
+            }
+
+
+#################################################################################################################
+#################################################################################################################
+
+_stores: Dict[str, ChunkContentStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_chunk_store(collection_name: str) -> ChunkContentStore:
+    """Per-collection content store, opened once per process."""
+    with _stores_lock:
+        store = _stores.get(collection_name)
+        if store is None:
+            store = ChunkContentStore(os.path.join(REPO_INDEX_DATA_DIR, collection_name, "content"))
+            _stores[collection_name] = store
+        return store
@@ -0,0 +1,421 @@
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import tiktoken
+except ImportError:          # optional: byte-count upper bound when unavailable
+    tiktoken = None
+
+from ..schema import PRContextRequest, PRContextResponse
+from .pr_services import fetch_pr_files, fetch_pr_head_sha
+from .pipeline_services import PipelineCancelled
+from .neighbour_index_services import REPO_INDEX_DATA_DIR
+
+
+# ========================================
+# PR Context Assembly — Design Notes
+# ========================================
+
+# Turns a PR's patches plus retrieved repository chunks into one prompt
+# context that fits a token budget (the ~8k window `chunk_text` sizes its
+# chunks for).
+
+# 1. Patches are split into hunks. Every hunk is one retrieval query: all
+#    hunks are searched in one batched vector search (with neighbour
+#    expansion), and the identifiers all hunks reference are resolved in
+#    one symbol-index lookup (no embedding).
+# 2. Candidates are deduplicated: the same chunk reached from several hunks
+#    or neighbour windows, and identical text under different paths, are
+#    kept once with their best score per hunk.
+# 3. Per hunk, candidates are ranked by relevance (symbol definitions first,
+#    then similarity). Packing is round-robin over hunks, greedy within each:
+#    every hunk gets its best chunk before any hunk gets its second, and a
+#    chunk that does not fit is skipped in favour of smaller ones.
+# 4. Patches go in first, whole or not at all: a patch is never truncated,
+#    and one that does not fit the budget is left out and listed in
+#    `patches_dropped` rather than silently missing. Chunks fill the rest.
+#    With `tiktoken` installed the budget is exact: per-block counts are
+#    cached by text hash, and the final text is counted once more and
+#    trimmed from the end if block boundaries merged differently. Without
+#    it the count is an upper bound, the UTF-8 byte length: byte-level BPE
+#    never spends more than one token per byte, so the context never
+#    overflows the budget, but it typically uses only ~1/4 of it. Responses
+#    say so (`tokenizer` "estimate", `tokens_approximate`).
+
+# The assembled context is memoised per (PR head SHA, budget, retrieval
+# settings, index generation), in memory and on disk, so a re-run for an
+# unchanged PR costs one head-SHA request and nothing else. GitHub serves
+# the head SHA and the changed files from separate endpoints, so the SHA is
+# read again after the files: if a push landed in between, the files are
+# refetched (up to PR_SNAPSHOT_ATTEMPTS times) so the context is never
+# memoised under a SHA its patches do not belong to. Both caches are LRUs:
+# CONTEXT_CACHE_SIZE entries in memory, CONTEXT_DISK_CACHE_SIZE files under
+# `context/` (recency is the file's mtime, refreshed on every disk hit).
+
+# A `cancel_event` (set by the job manager when a newer push supersedes the
+# review) is checked between the fetch, search and pack steps and raises
+# PipelineCancelled.
+
+# ========================================
+
+
+CONTEXT_TOKENIZER = os.getenv("CONTEXT_TOKENIZER", "cl100k_base")
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "50000"))
+CONTEXT_CACHE_SIZE = int(os.getenv("CONTEXT_CACHE_SIZE", "256"))
+CONTEXT_DISK_CACHE_SIZE = int(os.getenv("CONTEXT_DISK_CACHE_SIZE", "1024"))
+CONTEXT_CACHE_DIR = os.path.join(REPO_INDEX_DATA_DIR, "context")
+
+# Fetches of a PR's files before giving up on a head that keeps moving
+PR_SNAPSHOT_ATTEMPTS = int(os.getenv("PR_SNAPSHOT_ATTEMPTS", "3"))
+
+# Score given to chunks that define an identifier the hunk references
+SYMBOL_SCORE = 2.0
+
+# Longest hunk text used as a retrieval query
+MAX_QUERY_CHARS = 2000
+
+
+#################################################################################################################
+#################################################################################################################
+
+_encoding = None
+_token_counts: "OrderedDict[str, int]" = OrderedDict()
+_token_lock = threading.Lock()
+
+
+def tokenizer_name() -> str:
+    return CONTEXT_TOKENIZER if tiktoken is not None else "estimate"
+
+
+def count_tokens(text: str) -> int:
+    """
+    Token count of `text`, cached by content hash (LRU of TOKEN_CACHE_SIZE).
+    Exact with `tiktoken`; otherwise an approximation that never undercounts
+    (one token per UTF-8 byte), so budgets hold but are used conservatively.
+    """
+
+    global _encoding
+
+    key = hashlib.sha1(text.encode("utf-8")).hexdigest()
+    with _token_lock:
+        cached = _token_counts.get(key)
+        if cached is not None:
+            _token_counts.move_to_end(key)
+            return cached
+
+    if tiktoken is not None:
+        if _encoding is None:
+            _encoding = tiktoken.get_encoding(CONTEXT_TOKENIZER)
+        count = len(_encoding.encode(text, disallowed_special=()))
+    else:
+        count = len(text.encode("utf-8"))
+
+    with _token_lock:
+        _token_counts[key] = count
+        while len(_token_counts) > TOKEN_CACHE_SIZE:
+            _token_counts.popitem(last=False)
+    return count
+
+#################################################################################################################
+
+@dataclass
+class Hunk:
+    file_path: str
+    text: str                # the hunk as it appears in the patch
+
+    def query(self) -> str:
+        """Post-change code of the hunk (context + added lines)."""
+        lines = [
+            line[1:] for line in self.text.split("\n")[1:]
+            if line[:1] in (" ", "+")
+        ]
+        return ("\n".join(lines).strip() or self.text)[:MAX_QUERY_CHARS]
+
+
+def split_hunks(file_path: str, patch: Optional[str]) -> List[Hunk]:
+    if not patch:
+        return []
+    hunks, current = [], []
+    for line in patch.split("\n"):
+        if line.startswith("@@") and current:
+            hunks.append(Hunk(file_path, "\n".join(current)))
+            current = []
+        current.append(line)
+    if current:
+        hunks.append(Hunk(file_path, "\n".join(current)))
+    return hunks
+
+#################################################################################################################
+
+@dataclass
+class _Candidate:
+    file_path: str
+    chunk_id: int
+    content: str
+    scores: Dict[int, float] = field(default_factory=dict)     # hunk index -> best score
+
+    def block(self) -> str:
+        return f"### {self.file_path} (chunk {self.chunk_id})\n```\n{self.content}\n```\n"
+
+
+def _collect_candidates(
+    hits_per_hunk: List[List[Tuple[str, int, str, float]]]
+) -> List[_Candidate]:
+    """
+    Merge (file_path, chunk_id, content, score) hits of all hunks. A chunk,
+    or identical text under another path, becomes one candidate that keeps
+    its best score per hunk.
+    """
+
+    by_content: Dict[str, _Candidate] = {}
+    for hunk_index, hits in enumerate(hits_per_hunk):
+        for file_path, chunk_id, content, score in hits:
+            if not content:
+                continue
+            key = hashlib.sha256(content.encode("utf-8")).hexdigest()
+            candidate = by_content.get(key)
+            if candidate is None:
+                candidate = by_content[key] = _Candidate(file_path, chunk_id, content)
+            candidate.scores[hunk_index] = max(score, candidate.scores.get(hunk_index, float("-inf")))
+    return list(by_content.values())
+
+
+def pack_context(
+    header: str,
+    patch_blocks: List[Tuple[str, str]],
+    hunk_count: int,
+    candidates: List[_Candidate],
+    token_budget: int
+):
+    """
+    Greedy round-robin packing (see design notes).
+    Returns (text, tokens, included patch files, dropped patch files,
+    [(candidate, tokens, hunks)], dropped chunk count).
+    """
+
+    parts = [header]
+    used = count_tokens(header)
+    files, dropped_files = [], []
+    for file_path, block in patch_blocks:
+        tokens = count_tokens(block)
+        if used + tokens <= token_budget:
+            parts.append(block)
+            used += tokens
+            files.append(file_path)
+        else:
+            dropped_files.append(file_path)
+
+    ranked = [
+        sorted((c for c in candidates if h in c.scores), key=lambda c: -c.scores[h])
+        for h in range(hunk_count)
+    ]
+    cursors = [0] * hunk_count
+    chosen: List[Tuple[_Candidate, int]] = []
+    taken = set()
+
+    progress = True
+    while progress:
+        progress = False
+        for h in range(hunk_count):
+            queue = ranked[h]
+            while cursors[h] < len(queue):
+                candidate = queue[cursors[h]]
+                cursors[h] += 1
+                if id(candidate) in taken:
+                    continue
+                tokens = count_tokens(candidate.block())
+                if used + tokens > token_budget:
+                    continue                          # try this hunk's next (smaller) chunk
+                taken.add(id(candidate))
+                chosen.append((candidate, tokens))
+                used += tokens
+                progress = True
+                break
+
+    # Exact check on the final text; trim from the end if boundaries merged
+    text = "".join(parts + [c.block() for c, _ in chosen])
+    total = count_tokens(text)
+    while total > token_budget and chosen:
+        chosen.pop()
+        text = "".join(parts + [c.block() for c, _ in chosen])
+        total = count_tokens(text)
+
+    included = [(c, tokens, sorted(c.scores)) for c, tokens in chosen]
+    return text, total, files, dropped_files, included, len(candidates) - len(chosen)
+
+#################################################################################################################
+#################################################################################################################
+
+_memo: "OrderedDict[str, dict]" = OrderedDict()
+_memo_lock = threading.Lock()
+
+
+def _memo_get(key: str) -> Optional[dict]:
+    with _memo_lock:
+        value = _memo.get(key)
+        if value is not None:
+            _memo.move_to_end(key)
+            return value
+
+    path = os.path.join(CONTEXT_CACHE_DIR, key + ".json")
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            value = json.load(f)
+        os.utime(path)
+    except FileNotFoundError:                 # never written, or pruned meanwhile
+        return None
+    _memo_put(key, value, persist=False)
+    return value
+
+
+def _memo_put(key: str, value: dict, persist: bool = True):
+    with _memo_lock:
+        _memo[key] = value
+        while len(_memo) > CONTEXT_CACHE_SIZE:
+            _memo.popitem(last=False)
+
+    if persist:
+        os.makedirs(CONTEXT_CACHE_DIR, exist_ok=True)
+        path = os.path.join(CONTEXT_CACHE_DIR, key + ".json")
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(value, f)
+        os.replace(path + ".tmp", path)
+        _prune_disk_memo()
+
+
+def _prune_disk_memo():
+    """Remove the least recently used memo files beyond CONTEXT_DISK_CACHE_SIZE."""
+    with os.scandir(CONTEXT_CACHE_DIR) as it:
+        entries = [e for e in it if e.name.endswith(".json")]
+    if len(entries) <= CONTEXT_DISK_CACHE_SIZE:
+        return
+
+    def mtime(entry):
+        try:
+            return entry.stat().st_mtime
+        except FileNotFoundError:
+            return 0.0
+
+    entries.sort(key=mtime)
+    for entry in entries[:len(entries) - CONTEXT_DISK_CACHE_SIZE]:
+        try:
+            os.remove(entry.path)
+        except FileNotFoundError:
+            pass
+
+#################################################################################################################
+
+def _check_cancelled(cancel_event: Optional[threading.Event]):
+    if cancel_event is not None and cancel_event.is_set():
+        raise PipelineCancelled("PR context assembly was cancelled.")
+
+
+def _fetch_pr_snapshot(owner: str, repo: str, pr_number: int, head_sha: str) -> Tuple[str, list]:
+    """
+    The PR's changed files together with the head SHA they belong to: the
+    head is re-read after the files and the files refetched if it moved.
+    """
+
+    for _ in range(PR_SNAPSHOT_ATTEMPTS):
+        files = fetch_pr_files(owner, repo, pr_number).files
+        current = fetch_pr_head_sha(owner, repo, pr_number)
+        if current == head_sha:
+            return head_sha, files
+        head_sha = current
+
+    raise RuntimeError(
+        f"Head of {owner}/{repo}#{pr_number} changed on each of {PR_SNAPSHOT_ATTEMPTS} attempts to fetch its files."
+    )
+
+
+def assemble_pr_context(req: PRContextRequest, cancel_event: Optional[threading.Event] = None) -> PRContextResponse:
+    """
+    Token-budgeted review context for a PR: patches, then the most relevant
+    repository chunks per hunk. Memoised per PR head SHA and budget.
+    Setting `cancel_event` stops it between steps (PipelineCancelled).
+    """
+
+    from .vector_db_services import get_vector_store, search_repo_batch, lookup_symbol_definitions_batch
+
+    repo_name = req.repo_name or f"{req.owner}/{req.repo}"
+    _check_cancelled(cancel_event)
+    head_sha = fetch_pr_head_sha(req.owner, req.repo, req.pr_number)
+    generation = get_vector_store(repo_name).metadata().get("index_generation", 0)
+
+    def memo_key(head_sha: str) -> str:
+        return hashlib.sha256(json.dumps([
+            repo_name, req.owner, req.repo, req.pr_number, head_sha, req.token_budget,
+            req.top_k, req.expand, req.include_symbols, req.commit, req.ref, generation,
+            tokenizer_name()
+        ]).encode("utf-8")).hexdigest()
+
+    key = memo_key(head_sha)
+    cached = _memo_get(key)
+    if cached is not None:
+        return PRContextResponse(**{**cached, "cached": True})
+
+    _check_cancelled(cancel_event)
+    head_sha, files = _fetch_pr_snapshot(req.owner, req.repo, req.pr_number, head_sha)
+    key = memo_key(head_sha)
+    hunks = [hunk for f in files for hunk in split_hunks(f.filename, f.patch)]
+
+    hits_per_hunk: List[List[Tuple[str, int, str, float]]] = [[] for _ in hunks]
+    if hunks:
+        _check_cancelled(cancel_event)
+        searched = search_repo_batch(
+            repo_name,
+            queries=[hunk.query() for hunk in hunks],
+            top_k=req.top_k,
+            expand=req.expand,
+            commit=req.commit,
+            ref=req.ref
+        )
+        for i, response in enumerate(searched.results):
+            hits_per_hunk[i].extend((r.file_path, r.chunk_id, r.content, r.score) for r in response.results)
+
+        if req.include_symbols:
+            _check_cancelled(cancel_event)
+            try:
+                lookups = lookup_symbol_definitions_batch(
+                    repo_name, [hunk.text for hunk in hunks], commit=req.commit, ref=req.ref
+                )
+            except ValueError:                        # version indexed without a symbol table
+                lookups = []
+            for i, definitions in enumerate(lookups):
+                hits_per_hunk[i].extend(
+                    (d.file_path, d.chunk_id, d.content, SYMBOL_SCORE) for d in definitions.results
+                )
+
+    _check_cancelled(cancel_event)
+    header = f"# Pull request {req.owner}/{req.repo}#{req.pr_number} @ {head_sha}\n"
+    patch_blocks = [
+        (f.filename, f"## {f.filename} ({f.status})\n```diff\n{f.patch}\n```\n")
+        for f in files if f.patch
+    ]
+    text, tokens, patch_files, patches_dropped, included, dropped = pack_context(
+        header, patch_blocks, len(hunks), _collect_candidates(hits_per_hunk), req.token_budget
+    )
+
+    result = {
+        "head_sha": head_sha,
+        "token_budget": req.token_budget,
+        "tokens_used": tokens,
+        "tokenizer": tokenizer_name(),
+        "tokens_approximate": tiktoken is None,
+        "context": text,
+        "patch_files": patch_files,
+        "patches_dropped": patches_dropped,
+        "chunks": [
+            {"file_path": c.file_path, "chunk_id": c.chunk_id, "tokens": t, "score": max(c.scores.values()), "hunks": h}
+            for c, t, h in included
+        ],
+        "chunks_dropped": dropped,
+        "cached": False,
+    }
+    _memo_put(key, result)
+    return PRContextResponse(**result)
@@ -0,0 +1,258 @@
+import os
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Iterable, Iterator, List, Optional
+
+from .embedding_services import LOCAL_MODEL_NAME
+
+
+# ========================================
+# Local Embedding Pool — Design Notes
+# ========================================
+
+# A single SentenceTransformer instance in a single process cannot use more
+# than a handful of cores efficiently: tokenisation is single-threaded and
+# torch intra-op parallelism flattens out quickly for small models.
+
+# For full-repo indexing the chunk list is split into fixed-size batches that
+# are sharded across N worker processes. Each worker:
+# - loads its own copy of the local model exactly once
+# - pins its torch / BLAS thread count so workers do not oversubscribe cores
+
+# Results are streamed back in chunk order: completed batches are buffered
+# until every earlier batch has been yielded. Only a bounded number of batches
+# is in flight at any time, so memory stays flat regardless of repo size.
+
+# If a worker dies (OOM kill, segfault in native code) the pool is rebuilt and
+# every batch that had not been yielded yet is resubmitted. A batch that keeps
+# crashing workers fails loudly after `max_retries`, in line with the
+# fail-fast policy of `embedding_services`.
+
+# Provider invariant: the pool only ever produces "local" embeddings.
+
+# ========================================
+
+
+_worker_model = None
+
+_THREAD_ENV_VARS = (
+    "OMP_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+)
+
+
+########################################################################################################
+# WORKER SIDE
+
+def _init_worker(model_name: str, threads: int):
+    """
+    Process initializer: pin thread counts, then load the model once.
+    Environment variables must be set before torch is imported.
+    """
+    global _worker_model
+
+    for var in _THREAD_ENV_VARS:
+        os.environ[var] = str(threads)
+    os.environ["TOKENIZERS_PARALLELISM"] = "false"
+
+    import torch
+    torch.set_num_threads(threads)
+
+    from sentence_transformers import SentenceTransformer
+    _worker_model = SentenceTransformer(model_name)
+
+
+def _encode_batch(texts: List[str]) -> List[List[float]]:
+    return _worker_model.encode(texts, batch_size=len(texts)).tolist()
+
+
+########################################################################################################
+# PARENT SIDE
+
+class LocalEmbeddingPool:
+    """
+    Multi-process pool for local (MiniLM) embeddings.
+
+    Usage:
+        with LocalEmbeddingPool(workers=4) as pool:
+            for embedding in pool.embed_stream(texts):
+                ...
+
+    Guarantees:
+    - Output order matches input order
+    - At most `workers * prefetch` batches in flight
+    - Crashed workers are replaced; unfinished batches are retried
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        threads_per_worker: Optional[int] = None,
+        batch_size: int = 64,
+        prefetch: int = 2,
+        max_retries: int = 2,
+        model_name: str = LOCAL_MODEL_NAME
+    ):
+        cpu_count = os.cpu_count() or 1
+
+        self.workers = workers or cpu_count
+        self.threads_per_worker = threads_per_worker or max(1, cpu_count // self.workers)
+        self.batch_size = batch_size
+        self.max_in_flight = self.workers * max(1, prefetch)
+        self.max_retries = max_retries
+        self.model_name = model_name
+
+        self.restarts = 0
+        self._executor = None
+
+    # ---------------------------------------------------------------------------------------------
+
+    def __enter__(self):
+        self._ensure_executor()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    def _ensure_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                # spawn: never fork a parent that may already hold torch threads
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.model_name, self.threads_per_worker)
+            )
+        return self._executor
+
+    def _restart(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        self.restarts += 1
+
+    # ---------------------------------------------------------------------------------------------
+
+    def _batches(self, texts: Iterable[str]) -> Iterator[List[str]]:
+        batch = []
+        for text in texts:
+            batch.append(text)
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def embed_stream(self, texts: Iterable[str]) -> Iterator[List[float]]:
+        """
+        Embed `texts` across the worker pool, yielding one embedding per text
+        in input order. `texts` may be a lazy iterable; it is consumed only as
+        fast as the workers can keep up.
+        """
+
+        source = enumerate(self._batches(texts))
+        source_done = False
+
+        pending = {}        # batch index -> (texts, future)
+        attempts = {}       # batch index -> crash count
+        completed = {}      # batch index -> embeddings, waiting for order
+        order = deque()     # batch indices not yet yielded, in order
+
+        def submit(idx: int, batch: List[str]):
+            future = self._ensure_executor().submit(_encode_batch, batch)
+            pending[idx] = (batch, future)
+
+        try:
+            while True:
+                # 1. Keep the pipeline full
+                while not source_done and len(pending) + len(completed) < self.max_in_flight:
+                    try:
+                        idx, batch = next(source)
+                    except StopIteration:
+                        source_done = True
+                        break
+                    attempts[idx] = 0
+                    order.append(idx)
+                    submit(idx, batch)
+
+                if not order:
+                    return
+
+                # 2. Wait for the oldest outstanding batch
+                head = order[0]
+                if head not in completed:
+                    batch, future = pending[head]
+                    try:
+                        completed[head] = future.result()
+                        del pending[head]
+                    except BrokenProcessPool:
+                        self._recover(pending, attempts, submit)
+                        continue
+
+                # 3. Drain every batch that is now in order
+                while order and order[0] in completed:
+                    idx = order.popleft()
+                    attempts.pop(idx, None)
+                    for embedding in completed.pop(idx):
+                        yield embedding
+
+                # 4. Collect anything else that already finished
+                for idx in list(pending):
+                    batch, future = pending[idx]
+                    if future.done() and future.exception() is None:
+                        completed[idx] = future.result()
+                        del pending[idx]
+        finally:
+            for _, future in pending.values():
+                future.cancel()
+
+    def _recover(self, pending: dict, attempts: dict, submit):
+        """
+        A worker died. Every in-flight future is now broken, and there is no
+        way to tell which batch caused it, so all of them are charged one
+        attempt and resubmitted on a fresh pool.
+        """
+
+        self._restart()
+
+        for idx in sorted(pending):
+            attempts[idx] += 1
+            if attempts[idx] > self.max_retries:
+                raise RuntimeError(
+                    f"Local embedding worker crashed {attempts[idx]} times "
+                    f"while processing batch {idx}; giving up."
+                )
+
+        for idx in sorted(pending):
+            batch, _ = pending[idx]
+            submit(idx, batch)
+
+    def embed(self, texts: Iterable[str]) -> List[List[float]]:
+        return list(self.embed_stream(texts))
+
+
+########################################################################################################
+
+def embed_local_parallel(
+    texts: List[str],
+    workers: Optional[int] = None,
+    batch_size: int = 64
+) -> List[dict]:
+    """
+    One-shot helper: embed `texts` with a temporary pool and return results in
+    the same `{"embedding", "provider"}` shape as `embed_local`.
+    """
+
+    with LocalEmbeddingPool(workers=workers, batch_size=batch_size) as pool:
+        return [
+            {"embedding": emb, "provider": "local"}
+            for emb in pool.embed_stream(texts)
+        ]
@@ -1,8 +1,12 @@
 import os
 import requests
 import json
-from sentence_transformers import SentenceTransformer
-from typing import Optional
+import time
+import asyncio
+from typing import List, Optional
+from .remote_embedding_services import embed_remote_batch, embed_remote_async, _PROVIDERS
+from .http_client_services import http_request
+from .metrics_services import record_embedding_batch
 
 
 # ========================================
@@ -104,6 +108,21 @@ from typing import Optional
 
 # ----------------------------------------
 
+# 6. OUTPUT DIMENSIONALITY
+# ------------------------
+# Output dimension is an optional, repo-level setting (like the provider),
+# recorded in the collection metadata as `embedding_dim`.
+
+# - openai / gemini: requested from the API (`dimensions` /
+#   `outputDimensionality`), which returns Matryoshka-truncated vectors.
+# - local / claude-fallback: truncated here by `truncate_embedding`.
+
+# A truncated Matryoshka prefix is only meaningful after renormalisation, so
+# `truncate_embedding` renormalises. This is the one exception to rule 5;
+# renormalising again at the DB boundary is a no-op.
+
+# ----------------------------------------
+
 # SUMMARY
 # -------
 # This embedding layer was deliberately hardened early to enforce strong
@@ -114,8 +133,21 @@ from typing import Optional
 # ========================================
 
 
-# Load local model once
-_local_model = SentenceTransformer("all-MiniLM-L6-v2")
+LOCAL_MODEL_NAME = "all-MiniLM-L6-v2"
+
+# Local model is loaded once, on first use, so that importing this module
+# (e.g. from embedding worker processes) does not pay for a model load.
+_local_model = None
+
+
+def _get_local_model():
+    global _local_model
+
+    if _local_model is None:
+        from sentence_transformers import SentenceTransformer
+        _local_model = SentenceTransformer(LOCAL_MODEL_NAME)
+
+    return _local_model
 
 
 ########################################################################################################
@@ -128,17 +160,42 @@ def _wrap(embedding: list[float], provider: str):
 
 ########################################################################################################
 # LOCAL FALLBACK
-def embed_local(text: str):
+def embed_local(text: str, dimensions: Optional[int] = None):
     """Local fallback embedding using MiniLM."""
-    emb = _local_model.encode(text).tolist()
-    return _wrap(emb, "local")
+    emb = _get_local_model().encode(text).tolist()
+    return _wrap(truncate_embedding(emb, dimensions), "local")
+
+
+########################################################################################################
+# LOCAL DIMENSIONALITY REDUCTION
+def truncate_embedding(embedding: List[float], dimensions: Optional[int]) -> List[float]:
+    """
+    Matryoshka-style reduction: keep the first `dimensions` components and
+    renormalise to unit length. Returns the embedding unchanged when
+    `dimensions` is None or not smaller than the native size.
+    """
+
+    if dimensions is None or dimensions >= len(embedding):
+        return embedding
+
+    if dimensions <= 0:
+        raise ValueError(f"Invalid embedding dimension {dimensions}")
+
+    head = embedding[:dimensions]
+    norm = sum(x * x for x in head) ** 0.5
+    if norm == 0:
+        return head
+
+    return [x / norm for x in head]
 
 
 ########################################################################################################
 # OPENAI
-def embed_openai(text: str, api_key: str):
+def embed_openai(text: str, api_key: str, dimensions: Optional[int] = None):
     url = "https://api.openai.com/v1/embeddings"
     payload = {"model": "text-embedding-3-large", "input": text}
+    if dimensions is not None:
+        payload["dimensions"] = dimensions
     headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
 
     try:
@@ -152,13 +209,15 @@ def embed_openai(text: str, api_key: str):
 
 ########################################################################################################
 # GEMINI
-def embed_gemini(text: str, api_key: str):
+def embed_gemini(text: str, api_key: str, dimensions: Optional[int] = None):
     url = (
         f"https://generativelanguage.googleapis.com/v1beta/models/"
         "text-embedding-004:embedText?key="
         + api_key
     )
     payload = {"text": text}
+    if dimensions is not None:
+        payload["outputDimensionality"] = dimensions
 
     try:
         resp = requests.post(url, json=payload)
@@ -171,14 +230,14 @@ def embed_gemini(text: str, api_key: str):
 
 ########################################################################################################
 # CLAUDE (NO REAL EMBEDDINGS)
-def embed_claude(text: str, api_key: str):
+def embed_claude(text: str, api_key: str, dimensions: Optional[int] = None):
     """
     Anthropic has no embedding endpoint.
     We use local embedding but label provider as 'claude-fallback'
     """
     try:
-        emb = _local_model.encode(text).tolist()
-        return _wrap(emb, "claude-fallback")
+        emb = _get_local_model().encode(text).tolist()
+        return _wrap(truncate_embedding(emb, dimensions), "claude-fallback")
     except Exception as e:
         raise Exception(f"Claude fallback embedding error → {str(e)}")
 
@@ -186,7 +245,7 @@ def embed_claude(text: str, api_key: str):
 ########################################################################################################
 # MAIN EMBEDDING LOGIC
 
-def embed_text(text: str, provider: str):
+def embed_text(text: str, provider: str, dimensions: Optional[int] = None):
     """
     Generate embeddings using an explicitly specified provider.
 
@@ -194,6 +253,8 @@ def embed_text(text: str, provider: str):
     Auto-selection is intentionally disallowed to guarantee
     embedding consistency within a repository.
 
+    `dimensions` optionally reduces the output size (see design note 6).
+
     Returns:
     {
         "embedding": [...],
@@ -210,23 +271,71 @@ def embed_text(text: str, provider: str):
     gemini_key = os.getenv("GEMINI_API_KEY")
     claude_key = os.getenv("ANTHROPIC_API_KEY")
 
+    start = time.perf_counter()
     try:
         if provider == "openai":
             if not openai_key:
                 raise ValueError("Missing OPENAI_API_KEY")
-            return embed_openai(text, openai_key)
+            return embed_openai(text, openai_key, dimensions)
 
         if provider == "gemini":
             if not gemini_key:
                 raise ValueError("Missing GEMINI_API_KEY")
-            return embed_gemini(text, gemini_key)
+            return embed_gemini(text, gemini_key, dimensions)
 
         if provider == "claude":
             # Claude has no embedding endpoint → fallback is explicit
-            return embed_claude(text, claude_key)
+            return embed_claude(text, claude_key, dimensions)
 
         if provider == "local":
-            return embed_local(text)
+            return embed_local(text, dimensions)
+
+        raise ValueError(f"Unknown embedding provider '{provider}'")
+
+    except Exception as e:
+        # Fail loudly — do NOT silently fall back
+        raise RuntimeError(
+            f"Embedding failed using provider '{provider}': {str(e)}"
+        )
+    finally:
+        _record_batch(provider, 1, start)
+
+
+########################################################################################################
+# BATCH EMBEDDING LOGIC
+
+def embed_texts(texts: List[str], provider: str, dimensions: Optional[int] = None):
+    """
+    Batch counterpart of `embed_text`, with the same provider rules.
+
+    - "openai" / "gemini" go through the pooled, rate-limited
+      `RemoteEmbeddingClient` (one request per provider batch, not per text)
+    - "local" / "claude" encode the whole list in one model call
+
+    Returns a list of `{"embedding", "provider"}` dicts in input order.
+    """
+
+    if not provider:
+        raise ValueError("Embedding provider must be explicitly specified.")
+
+    provider = provider.lower()
+
+    if not texts:
+        return []
+
+    start = time.perf_counter()
+    try:
+        if provider in ("openai", "gemini"):
+            api_key = os.getenv(f"{provider.upper()}_API_KEY")
+            if not api_key:
+                raise ValueError(f"Missing {provider.upper()}_API_KEY")
+            embeddings = embed_remote_batch(texts, provider, api_key, dimensions=dimensions)
+            return [_wrap(emb, provider) for emb in embeddings]
+
+        if provider in ("claude", "local"):
+            label = "claude-fallback" if provider == "claude" else "local"
+            embeddings = _get_local_model().encode(texts).tolist()
+            return [_wrap(truncate_embedding(emb, dimensions), label) for emb in embeddings]
 
         raise ValueError(f"Unknown embedding provider '{provider}'")
 
@@ -235,4 +344,79 @@ def embed_text(text: str, provider: str):
         raise RuntimeError(
             f"Embedding failed using provider '{provider}': {str(e)}"
         )
+    finally:
+        _record_batch(provider, len(texts), start)
+
+
+# Providers recorded in metrics (other names are rejected above; keeping
+# them out bounds the label set)
+_METRIC_PROVIDERS = ("openai", "gemini", "claude", "local")
+
+
+def _record_batch(provider: str, size: int, start: float):
+    if provider in _METRIC_PROVIDERS:
+        record_embedding_batch(provider, size, time.perf_counter() - start)
+
+
+########################################################################################################
+# ASYNC EMBEDDING LOGIC
+#
+# Same provider rules as above, for async routes. Remote providers are
+# awaited on the loop's shared HTTP client: directly for single texts,
+# through the loop's shared `RemoteEmbeddingClient` (batching, rate budget)
+# for lists. Local model inference is CPU work and runs in a worker thread.
+
+async def embed_text_async(text: str, provider: str, dimensions: Optional[int] = None):
+    if not provider:
+        raise ValueError("Embedding provider must be explicitly specified.")
+
+    provider = provider.lower()
+
+    if provider not in ("openai", "gemini"):
+        return await asyncio.to_thread(embed_text, text, provider, dimensions)
+
+    start = time.perf_counter()
+    try:
+        api_key = os.getenv(f"{provider.upper()}_API_KEY")
+        if not api_key:
+            raise ValueError(f"Missing {provider.upper()}_API_KEY")
+
+        build, parse, base_url, model = _PROVIDERS[provider]
+        url, headers, payload = build(base_url, model, api_key, [text], dimensions)
+        resp = await http_request("POST", url, headers=headers, json=payload)
+        if resp.status_code != 200:
+            raise Exception(f"{provider} embedding error ({resp.status_code}) → {resp.text}")
+        return _wrap(parse(resp.json())[0], provider)
 
+    except Exception as e:
+        # Fail loudly — do NOT silently fall back
+        raise RuntimeError(
+            f"Embedding failed using provider '{provider}': {str(e)}"
+        )
+    finally:
+        _record_batch(provider, 1, start)
+
+
+async def embed_texts_async(texts: List[str], provider: str, dimensions: Optional[int] = None):
+    if not provider:
+        raise ValueError("Embedding provider must be explicitly specified.")
+
+    provider = provider.lower()
+
+    if provider not in ("openai", "gemini") or not texts:
+        return await asyncio.to_thread(embed_texts, texts, provider, dimensions)
+
+    start = time.perf_counter()
+    try:
+        api_key = os.getenv(f"{provider.upper()}_API_KEY")
+        if not api_key:
+            raise ValueError(f"Missing {provider.upper()}_API_KEY")
+        embeddings = await embed_remote_async(texts, provider, api_key, dimensions=dimensions)
+        return [_wrap(emb, provider) for emb in embeddings]
+
+    except Exception as e:
+        raise RuntimeError(
+            f"Embedding failed using provider '{provider}': {str(e)}"
+        )
+    finally:
+        _record_batch(provider, len(texts), start)
@@ -0,0 +1,110 @@
+import os
+import asyncio
+import weakref
+from typing import Optional
+
+import httpx
+
+
+# ========================================
+# Shared Async HTTP Client — Design Notes
+# ========================================
+
+# Every route used to be a sync `def` calling blocking `requests`. Each
+# in-flight GitHub or embedding call held one of Starlette's threadpool
+# slots (40 by default), so ~40 slow upstream calls saturated the server
+# even though it was only waiting.
+
+# The async request path (`*_async` services, `async def` routes) awaits
+# upstream calls on the event loop instead, through ONE shared
+# `httpx.AsyncClient` per event loop:
+
+# - keep-alive connections and TLS sessions are reused across requests
+#   (HTTP_MAX_CONNECTIONS total, HTTP_MAX_KEEPALIVE idle)
+# - concurrency is bounded by the pool, not by the threadpool. Requests
+#   beyond HTTP_MAX_CONNECTIONS wait on a semaphore in `http_request`
+#   rather than inside httpx's pool, whose waiter queue gets expensive
+#   with hundreds of queued requests
+# - the client is closed when the app shuts down (`close_http_clients`)
+
+# Work that really blocks on the async path — local model inference — is
+# pushed off the loop explicitly with `asyncio.to_thread`. Clone-based
+# routes stay sync `def`: their work is git and disk IO, which Starlette
+# already runs in its threadpool.
+
+# GITHUB_API_URL points both the sync and async paths at another GitHub API
+# (GitHub Enterprise, or a local stand-in for load tests).
+
+# ========================================
+
+
+GITHUB_API_URL = os.getenv("GITHUB_API_URL", "https://api.github.com").rstrip("/")
+
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "30"))
+
+# Concurrent upstream requests issued by one fan-out (e.g. file contents of a PR)
+HTTP_FANOUT = int(os.getenv("HTTP_FANOUT", "16"))
+
+
+#################################################################################################################
+#################################################################################################################
+
+def github_headers() -> dict:
+    return {
+        "Authorization": f"Bearer {os.getenv('GITHUB_TOKEN')}",
+        "Accept": "application/vnd.github.v3+json"
+    }
+
+
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, tuple]" = weakref.WeakKeyDictionary()
+
+
+def _loop_client():
+    loop = asyncio.get_running_loop()
+    entry = _clients.get(loop)
+    if entry is None or entry[0].is_closed:
+        client = httpx.AsyncClient(
+            timeout=HTTP_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE
+            )
+        )
+        entry = (client, asyncio.Semaphore(HTTP_MAX_CONNECTIONS))
+        _clients[loop] = entry
+    return entry
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Shared AsyncClient of the running event loop (connections cannot move
+    between loops, so each loop gets its own pool).
+    """
+    return _loop_client()[0]
+
+
+async def http_request(method: str, url: str, **kwargs) -> httpx.Response:
+    """Request on the shared client, at most HTTP_MAX_CONNECTIONS in flight."""
+    client, semaphore = _loop_client()
+    async with semaphore:
+        return await client.request(method, url, **kwargs)
+
+
+async def close_http_clients():
+    """Close the running loop's shared client (app shutdown)."""
+    entry = _clients.pop(asyncio.get_running_loop(), None)
+    if entry is not None:
+        await entry[0].aclose()
+
+
+async def gather_bounded(coroutines, limit: Optional[int] = None) -> list:
+    """`asyncio.gather` with at most `limit` (HTTP_FANOUT) running at once."""
+    semaphore = asyncio.Semaphore(limit or HTTP_FANOUT)
+
+    async def run(coroutine):
+        async with semaphore:
+            return await coroutine
+
+    return await asyncio.gather(*(run(c) for c in coroutines))
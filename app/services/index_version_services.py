@@ -0,0 +1,274 @@
+import os
+import re
+import json
+import time
+import shutil
+import threading
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from .neighbour_index_services import REPO_INDEX_DATA_DIR
+
+
+# ========================================
+# Index Versions — Design Notes
+# ========================================
+
+# One vector collection per repository holds the vectors of EVERY indexed
+# commit. Vector IDs are derived from (file_path, content hash), so a chunk
+# that is unchanged between `main`, a release branch and a PR head is one
+# vector, embedded once and stored once (copy-on-write at chunk level).
+
+# What makes a commit searchable is its manifest:
+
+#     <REPO_INDEX_DATA_DIR>/<collection>/versions/<commit>/manifest.json
+#         {"commit", "refs", "created", "logical_chunks", "vector_ids": [...],
+#          "locations": {vector_id: [chunk_id, local_index]},
+#          "aliases": {vector_id: [[file_path, chunk_id, local_index, similarity], ...]},
+#          "content_hashes": [...]}
+#     <REPO_INDEX_DATA_DIR>/<collection>/refs.json
+#         {"main": "<commit>", "feature-x": "<commit>", ...}
+
+# Searches resolve (commit | ref | latest) to a manifest and are restricted
+# to its vector IDs. Deleting a version only drops its manifest; vectors no
+# longer referenced by any manifest are removed by garbage collection.
+
+# A shared vector's stored metadata is its first writer's: `chunk_id` is a
+# repo-wide ordinal that shifts whenever an earlier file changes, so
+# `locations` records where each vector sits in THIS commit, and search
+# results report that.
+
+# `aliases` lists, per vector, the other chunk locations of this commit that
+# were collapsed onto it (exact or near duplicates, see
+# near_duplicate_services); they are reported alongside search hits.
+
+# `content_hashes` lists the text of EVERY chunk of this commit, aliases
+# included. Alias chunks have no vector row, so garbage collection takes
+# the content store's live set from the manifests (and the symbol tables
+# next to them), not from vector metadata.
+
+# Versions come from clients (search `commit`, DELETE /versions/{commit},
+# cursors) and become directory names, so every path is built through
+# `version_dir`: the version must be a hex SHA (7-40) or "unversioned", and
+# the resolved path must stay under the collection's versions/ root.
+
+# ========================================
+
+
+UNVERSIONED = "unversioned"      # used when the indexed commit is unknown
+
+_VERSION_RE = re.compile(r"^([0-9a-f]{7,40}|unversioned)$")
+
+_manifests: Dict[str, Tuple[float, dict]] = {}
+_manifests_lock = threading.Lock()
+_refs_lock = threading.Lock()
+
+
+#################################################################################################################
+#################################################################################################################
+
+def version_key(commit_sha: Optional[str]) -> str:
+    return commit_sha or UNVERSIONED
+
+
+def _collection_dir(collection_name: str) -> str:
+    return os.path.join(REPO_INDEX_DATA_DIR, collection_name)
+
+
+def validate_version(version: str) -> str:
+    """
+    Return `version` if it is a commit SHA (7-40 lowercase hex) or
+    "unversioned", else raise ValueError.
+    """
+    if not isinstance(version, str) or not _VERSION_RE.match(version):
+        raise ValueError(f"Invalid version '{version}': expected a commit SHA.")
+    return version
+
+
+def version_dir(collection_name: str, version: str) -> str:
+    """
+    Directory of one version. Raises ValueError for anything that is not a
+    valid version or that would resolve outside the versions root.
+    """
+    validate_version(version)
+    root = os.path.realpath(os.path.join(_collection_dir(collection_name), "versions"))
+    path = os.path.realpath(os.path.join(root, version))
+    if os.path.dirname(path) != root:
+        raise ValueError(f"Invalid version '{version}'.")
+    return path
+
+
+def _refs_path(collection_name: str) -> str:
+    return os.path.join(_collection_dir(collection_name), "refs.json")
+
+
+def _write_json(path: str, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+def _load_refs(collection_name: str) -> Dict[str, str]:
+    path = _refs_path(collection_name)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+#################################################################################################################
+
+def save_version(
+    collection_name: str,
+    commit_sha: Optional[str],
+    ref: Optional[str],
+    vector_ids: Iterable[str],
+    logical_chunks: int,
+    aliases: Optional[Dict[str, list]] = None,
+    locations: Optional[Dict[str, list]] = None,
+    content_hashes: Optional[Iterable[str]] = None
+):
+    """
+    Record the set of vectors that make up one indexed commit, and point
+    `ref` (branch / PR head name) at it. `locations` maps a vector ID to its
+    [chunk_id, local_index] in this commit; `aliases` maps it to the
+    duplicate chunk locations it stands in for; `content_hashes` are the
+    texts of all its chunks.
+    """
+
+    version = version_key(commit_sha)
+    ids = sorted(set(vector_ids))
+
+    with _refs_lock:
+        refs = _load_refs(collection_name)
+        if ref:
+            refs[ref] = version
+            _write_json(_refs_path(collection_name), refs)
+
+    _write_json(
+        os.path.join(version_dir(collection_name, version), "manifest.json"),
+        {
+            "commit": version,
+            "refs": sorted(r for r, v in refs.items() if v == version),
+            "created": time.time(),
+            "logical_chunks": logical_chunks,
+            "vector_ids": ids,
+            "locations": locations or {},
+            "aliases": aliases or {},
+            "content_hashes": sorted(set(content_hashes or ())),
+        }
+    )
+
+
+def load_version(collection_name: str, version: str) -> Optional[dict]:
+    """
+    Manifest of a version, with `vector_ids` as a frozenset. Cached until the
+    manifest file changes.
+    """
+
+    path = os.path.join(version_dir(collection_name, version), "manifest.json")
+    if not os.path.exists(path):
+        return None
+
+    mtime = os.path.getmtime(path)
+    with _manifests_lock:
+        cached = _manifests.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+
+    with open(path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    manifest["vector_ids"] = frozenset(manifest["vector_ids"])
+
+    with _manifests_lock:
+        _manifests[path] = (mtime, manifest)
+    return manifest
+
+
+def resolve_version(
+    collection_name: str,
+    commit: Optional[str] = None,
+    ref: Optional[str] = None,
+    default: Optional[str] = None
+) -> Optional[str]:
+    """
+    Pick the version to search: explicit commit, else the commit a ref points
+    at, else `default` (the most recently indexed commit).
+    """
+
+    if commit:
+        return validate_version(commit)
+
+    if ref:
+        version = _load_refs(collection_name).get(ref)
+        if version is None:
+            raise ValueError(f"Ref '{ref}' has not been indexed.")
+        return validate_version(version)
+
+    return default
+
+#################################################################################################################
+
+def list_versions(collection_name: str) -> List[dict]:
+    """
+    Summary of every indexed version (no vector ID lists).
+    """
+
+    root = os.path.join(_collection_dir(collection_name), "versions")
+    if not os.path.isdir(root):
+        return []
+
+    refs = _load_refs(collection_name)
+    versions = []
+    for version in sorted(os.listdir(root)):
+        if not _VERSION_RE.match(version):
+            continue
+        manifest = load_version(collection_name, version)
+        if manifest is None:
+            continue
+        versions.append({
+            "commit": version,
+            "refs": sorted(r for r, v in refs.items() if v == version),
+            "created": manifest["created"],
+            "logical_chunks": manifest["logical_chunks"],
+            "vectors": len(manifest["vector_ids"]),
+            "aliases": sum(len(a) for a in manifest.get("aliases", {}).values()),
+        })
+    return versions
+
+
+def delete_version(collection_name: str, version: str) -> bool:
+    """
+    Drop a version's manifest and any refs pointing at it. Vectors are left
+    in place until garbage collection. Raises ValueError for an invalid
+    version.
+    """
+
+    path = version_dir(collection_name, version)
+    if not os.path.isdir(path):
+        return False
+
+    with _refs_lock:
+        refs = _load_refs(collection_name)
+        remaining = {r: v for r, v in refs.items() if v != version}
+        if remaining != refs:
+            _write_json(_refs_path(collection_name), remaining)
+
+    shutil.rmtree(path)
+    return True
+
+
+def referenced_contents(collection_name: str) -> FrozenSet[str]:
+    """Union of the chunk content hashes recorded by all live versions."""
+    hashes = set()
+    for version in list_versions(collection_name):
+        hashes.update(load_version(collection_name, version["commit"]).get("content_hashes", ()))
+    return frozenset(hashes)
+
+
+def referenced_ids(collection_name: str) -> FrozenSet[str]:
+    """Union of the vector IDs of all live versions."""
+    ids = set()
+    for version in list_versions(collection_name):
+        ids |= load_version(collection_name, version["commit"])["vector_ids"]
+    return frozenset(ids)
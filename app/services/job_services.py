@@ -0,0 +1,414 @@
+import os
+import json
+import time
+import uuid
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from ..schema import (
+    RepoIndexItem,
+    RepoIndexResponse,
+    RepoChunk,
+    RepoChunksResponse,
+    PRContextRequest,
+    VectorRepoInitRequest
+)
+from .repo_index_services import clone_repo, iter_repo_files
+from .chunk_services import chunk_file
+from .pipeline_services import PipelineCancelled
+from .neighbour_index_services import REPO_INDEX_DATA_DIR
+
+
+# ========================================
+# Background Jobs — Design Notes
+# ========================================
+
+# Cloning and chunking a large repo inside an HTTP request runs into proxy
+# timeouts, and a retry starts from zero. Jobs move that work off the
+# request:
+
+# - submit  -> job ID, work runs on a local thread pool (JOB_WORKERS);
+#              no external queue service
+# - status  -> state + progress counters (files, chunks, chunks_written)
+# - cancel  -> queued jobs never start; running jobs stop at the next file /
+#              pipeline item
+# - resume  -> failed, cancelled or interrupted jobs continue from their last
+#              checkpoint
+
+# Every job is a directory under REPO_INDEX_DATA_DIR/jobs/<job_id>/:
+#     job.json       state, params, progress, checkpoint, error (atomic rewrite)
+#     result.ndjson  clone / chunk jobs: one item or chunk per line
+#     result.json    init_repo jobs: the index report;
+#                    pr_review jobs: the assembled review context
+
+# Checkpoints:
+# - The first checkpoint pins the cloned commit SHA; a resume clones that
+#   exact commit, so file positions and content stay the same even if the
+#   branch moved.
+# - Clone / chunk jobs commit every JOB_CHECKPOINT_FILES files: results are
+#   fsynced, then (files_done, result_bytes, next_chunk_id) are recorded.
+#   A resume truncates the result file to `result_bytes` and skips the
+#   first `files_done` files of the (deterministically ordered) walk.
+# - init_repo jobs checkpoint after every vector upsert batch. Indexing is
+#   idempotent by content-derived vector IDs, so a resume re-reads and
+#   re-chunks the commit but only embeds chunks not yet written.
+
+# Jobs found `queued` / `running` when the process starts were cut off by a
+# restart and are marked `interrupted` (resumable).
+
+# ========================================
+
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_CHECKPOINT_FILES = int(os.getenv("JOB_CHECKPOINT_FILES", "200"))
+JOBS_DIR = os.path.join(REPO_INDEX_DATA_DIR, "jobs")
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+INTERRUPTED = "interrupted"
+
+RESUMABLE_STATES = {FAILED, CANCELLED, INTERRUPTED}
+FINAL_STATES = {SUCCEEDED} | RESUMABLE_STATES
+
+# Seconds between progress-only writes of job.json
+_PROGRESS_SAVE_INTERVAL = 1.0
+
+
+class JobCancelled(Exception):
+    pass
+
+
+#################################################################################################################
+#################################################################################################################
+
+class Job:
+    """
+    One background job and its persisted record.
+    """
+
+    def __init__(self, record: dict):
+        self.id = record["job_id"]
+        self.kind = record["kind"]
+        self.params = record["params"]
+        self.state = record.get("state", QUEUED)
+        self.progress: Dict[str, int] = record.get("progress", {})
+        self.checkpoint: dict = record.get("checkpoint", {})
+        self.error: Optional[str] = record.get("error")
+        self.attempts = record.get("attempts", 0)
+        self.created = record.get("created", time.time())
+        self.started: Optional[float] = record.get("started")
+        self.finished: Optional[float] = record.get("finished")
+
+        self.cancel_event = threading.Event()
+        self._lock = threading.Lock()
+        self._last_save = 0.0
+
+    @property
+    def dir(self) -> str:
+        return os.path.join(JOBS_DIR, self.id)
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.dir, name)
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "params": self.params,
+            "state": self.state,
+            "progress": dict(self.progress),
+            "checkpoint": dict(self.checkpoint),
+            "error": self.error,
+            "attempts": self.attempts,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+            "resumable": self.state in RESUMABLE_STATES,
+        }
+
+    def save(self):
+        with self._lock:
+            os.makedirs(self.dir, exist_ok=True)
+            tmp = self.path("job.json.tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.to_dict(), f)
+            os.replace(tmp, self.path("job.json"))
+            self._last_save = time.monotonic()
+
+    # ---- hooks used by the runners -----------------------------------------------------------
+
+    def advance(self, **increments: int):
+        """Add to progress counters; persisted at most every second."""
+        with self._lock:
+            for key, value in increments.items():
+                self.progress[key] = self.progress.get(key, 0) + value
+            due = time.monotonic() - self._last_save >= _PROGRESS_SAVE_INTERVAL
+        if due:
+            self.save()
+
+    def commit(self, **values):
+        """Record a checkpoint; always persisted."""
+        with self._lock:
+            self.checkpoint.update(values)
+        self.save()
+
+    def check_cancelled(self):
+        if self.cancel_event.is_set():
+            raise JobCancelled()
+
+#################################################################################################################
+#################################################################################################################
+
+def _run_files_job(job: Job, chunked: bool):
+    """
+    Clone and read (and chunk) a repo, appending results to result.ndjson
+    and checkpointing every JOB_CHECKPOINT_FILES files.
+    """
+
+    params = job.params
+    checkpoint = job.checkpoint
+
+    temp_dir, commit_sha = clone_repo(
+        params["owner"], params["repo"], params.get("branch", "main"),
+        commit_sha=checkpoint.get("commit_sha")
+    )
+    try:
+        if "commit_sha" not in checkpoint:
+            job.commit(commit_sha=commit_sha, files_done=0, result_bytes=0, next_chunk_id=0)
+
+        files_done = checkpoint["files_done"]
+        next_chunk_id = checkpoint["next_chunk_id"]
+        job.progress = {"files": files_done, "chunks": next_chunk_id} if chunked else {"files": files_done}
+
+        # Drop anything written after the last checkpoint, then append
+        with open(job.path("result.ndjson"), "ab") as f:
+            f.truncate(checkpoint["result_bytes"])
+            for position, item in enumerate(iter_repo_files(temp_dir)):
+                if position < files_done:
+                    continue
+                job.check_cancelled()
+
+                if chunked:
+                    records = chunk_file(item, next_chunk_id)
+                    next_chunk_id += len(records)
+                    job.advance(files=1, chunks=len(records))
+                else:
+                    records = [item]
+                    job.advance(files=1)
+
+                for record in records:
+                    f.write(record.model_dump_json().encode("utf-8") + b"\n")
+
+                if (position + 1) % JOB_CHECKPOINT_FILES == 0:
+                    f.flush()
+                    os.fsync(f.fileno())
+                    job.commit(files_done=position + 1, result_bytes=f.tell(), next_chunk_id=next_chunk_id)
+
+            f.flush()
+            os.fsync(f.fileno())
+            job.commit(files_done=job.progress["files"], result_bytes=f.tell(), next_chunk_id=next_chunk_id)
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def _run_init_repo_job(job: Job):
+    """
+    Full vector indexing (see `init_repo_index`), pinned to the checkpointed
+    commit on resume.
+    """
+
+    from .vector_db_services import init_repo_index
+
+    # Webhook-triggered jobs pin the pushed commit in their params
+    params = dict(job.params)
+    pinned_sha = params.pop("commit_sha", None)
+
+    job.progress = {"files": 0, "chunks": 0, "chunks_written": 0}
+    written_before = job.checkpoint.get("chunks_written_total", 0)
+
+    def checkpoint(**values):
+        if "chunks_written" in values:
+            job.progress["chunks_written"] = values["chunks_written"]
+            values = {"chunks_written_total": written_before + values.pop("chunks_written")}
+        job.commit(**values)
+
+    report = init_repo_index(
+        VectorRepoInitRequest(**params),
+        commit_sha=job.checkpoint.get("commit_sha") or pinned_sha,
+        progress=job.advance,
+        checkpoint=checkpoint,
+        cancel_event=job.cancel_event
+    )
+
+    with open(job.path("result.json"), "w", encoding="utf-8") as f:
+        json.dump(report, f)
+
+
+def _run_pr_review_job(job: Job):
+    """
+    Review context for a PR (see `assemble_pr_context`). `head_sha` in the
+    params is the SHA the triggering event reported; the context is built
+    for the PR's current head, which is recorded alongside.
+    """
+
+    from .context_services import assemble_pr_context
+
+    params = dict(job.params)
+    requested_sha = params.pop("head_sha", None)
+    job.check_cancelled()
+
+    response = assemble_pr_context(PRContextRequest(**params), cancel_event=job.cancel_event)
+    job.commit(head_sha=response.head_sha, requested_sha=requested_sha)
+
+    with open(job.path("result.json"), "w", encoding="utf-8") as f:
+        f.write(response.model_dump_json())
+
+
+_RUNNERS: Dict[str, Callable[[Job], None]] = {
+    "index_repo_clone": lambda job: _run_files_job(job, chunked=False),
+    "chunk_repo": lambda job: _run_files_job(job, chunked=True),
+    "init_repo": _run_init_repo_job,
+    "pr_review": _run_pr_review_job,
+}
+
+#################################################################################################################
+#################################################################################################################
+
+class JobManager:
+    """
+    Submits, tracks, cancels and resumes jobs on a local thread pool.
+    """
+
+    def __init__(self, workers: int = JOB_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not os.path.isdir(JOBS_DIR):
+            return
+        for job_id in os.listdir(JOBS_DIR):
+            path = os.path.join(JOBS_DIR, job_id, "job.json")
+            if not os.path.exists(path):
+                continue
+            with open(path, "r", encoding="utf-8") as f:
+                job = Job(json.load(f))
+            if job.state in (QUEUED, RUNNING):
+                job.state = INTERRUPTED
+                job.save()
+            self._jobs[job.id] = job
+
+    # ---- lifecycle ---------------------------------------------------------------------------
+
+    def submit(self, kind: str, params: dict) -> Job:
+        if kind not in _RUNNERS:
+            raise ValueError(f"Unknown job kind '{kind}'")
+
+        job = Job({"job_id": uuid.uuid4().hex, "kind": kind, "params": params})
+        job.save()
+        with self._lock:
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job)
+        return job
+
+    def _run(self, job: Job):
+        if job.cancel_event.is_set():
+            job.state = CANCELLED
+            job.finished = time.time()
+            job.save()
+            return
+
+        job.state = RUNNING
+        job.error = None
+        job.attempts += 1
+        job.started = time.time()
+        job.finished = None
+        job.save()
+
+        try:
+            _RUNNERS[job.kind](job)
+            job.state = SUCCEEDED
+        except (JobCancelled, PipelineCancelled):
+            job.state = CANCELLED
+        except Exception as e:
+            job.state = FAILED
+            job.error = getattr(e, "detail", None) or str(e) or type(e).__name__
+        finally:
+            job.finished = time.time()
+            job.save()
+
+    def get(self, job_id: str) -> Job:
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            raise KeyError(job_id)
+        return job
+
+    def list(self) -> List[Job]:
+        with self._lock:
+            return sorted(self._jobs.values(), key=lambda j: j.created, reverse=True)
+
+    def cancel(self, job_id: str) -> Job:
+        job = self.get(job_id)
+        if job.state in FINAL_STATES:
+            raise ValueError(f"Job '{job_id}' is already {job.state}.")
+        job.cancel_event.set()
+        return job
+
+    def resume(self, job_id: str) -> Job:
+        job = self.get(job_id)
+        if job.state not in RESUMABLE_STATES:
+            raise ValueError(f"Job '{job_id}' is {job.state}; only failed, cancelled or interrupted jobs resume.")
+
+        job.cancel_event = threading.Event()
+        job.state = QUEUED
+        job.save()
+        self._executor.submit(self._run, job)
+        return job
+
+    # ---- results -----------------------------------------------------------------------------
+
+    def result(self, job_id: str):
+        """
+        RepoIndexResponse / RepoChunksResponse for clone / chunk jobs, the
+        index report for init_repo jobs, the review context for pr_review jobs.
+        """
+
+        job = self.get(job_id)
+        if job.state != SUCCEEDED:
+            raise ValueError(f"Job '{job_id}' is {job.state}; no result yet.")
+
+        if job.kind in ("init_repo", "pr_review"):
+            with open(job.path("result.json"), "r", encoding="utf-8") as f:
+                return json.load(f)
+
+        model = RepoChunk if job.kind == "chunk_repo" else RepoIndexItem
+        with open(job.path("result.ndjson"), "r", encoding="utf-8") as f:
+            records = [model.model_validate_json(line) for line in f if line.strip()]
+
+        commit_sha = job.checkpoint.get("commit_sha")
+        if job.kind == "chunk_repo":
+            return RepoChunksResponse(chunks=records, commit_sha=commit_sha)
+        return RepoIndexResponse(items=records, commit_sha=commit_sha)
+
+
+#################################################################################################################
+
+_manager: Optional[JobManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_job_manager() -> JobManager:
+    """Process-wide job manager (loads persisted jobs on first use)."""
+    global _manager
+
+    with _manager_lock:
+        if _manager is None:
+            _manager = JobManager()
+        return _manager
@@ -0,0 +1,337 @@
+import os
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+from .single_flight_services import get_single_flight
+
+
+# ========================================
+# Metrics — Design Notes
+# ========================================
+
+# GET /metrics serves counters, gauges and histograms in the Prometheus
+# text exposition format (0.0.4), one series per stage:
+
+# - GitHub API: requests by call type (pr, pr_files, contents, ref,
+#   commit, tree) and status, latency per call type, and the rate-limit
+#   headroom reported by the last response (X-RateLimit-* headers)
+# - git clone: duration (branch head / pinned commit), pack bytes, failures
+# - checkout scans (`iter_repo_files`, used by index_repo_clone, chunking
+#   and jobs): files scanned, files skipped by reason
+# - chunking: `chunk_text` time and chunks kept per file
+# - embedding: batch size and latency per provider
+# - vector store: upsert and search latency per backend
+# - single-flight coalescing counters (read at scrape time)
+# - embedding rate budgets: requests / tokens left per provider (read at
+#   scrape time, registered by remote_embedding_services)
+
+# The registry is a small in-process one rather than prometheus_client,
+# which is not a dependency. Recording is a dict update under a per-metric
+# lock; nothing runs between scrapes. Values computed from other services
+# are registered as collectors and evaluated only when /metrics is read.
+# METRICS_ENABLED=0 turns recording into a no-op; values that cost work to
+# measure (clone pack size: a `git count-objects` run) are checked against
+# `metrics_enabled()` first and not computed at all.
+
+# Metrics are per process: with several uvicorn workers, each one reports
+# its own values.
+
+# ========================================
+
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") != "0"
+METRICS_NAMESPACE = os.getenv("METRICS_NAMESPACE", "pr_review")
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+FAST_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+SIZE_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000)
+BYTES_BUCKETS = (2 ** 16, 2 ** 18, 2 ** 20, 2 ** 22, 2 ** 24, 2 ** 26, 2 ** 28, 2 ** 30, 2 ** 32)
+
+
+def metrics_enabled() -> bool:
+    return METRICS_ENABLED
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _series(name: str, labels: Sequence[Tuple[str, str]], value: float) -> str:
+    if labels:
+        inner = ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels)
+        return f"{name}{{{inner}}} {_format_value(value)}"
+    return f"{name} {_format_value(value)}"
+
+
+#################################################################################################################
+#################################################################################################################
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = f"{METRICS_NAMESPACE}_{name}" if METRICS_NAMESPACE else name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[tuple, object] = {}
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def _labels(self, key: tuple) -> List[Tuple[str, str]]:
+        return list(zip(self.labelnames, key))
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(_series(self.name, self._labels(key), value))
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        if not METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        if not METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    """
+    Cumulative-bucket histogram. Each observation increments one bucket;
+    buckets are accumulated when rendered.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        if not METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of the `with` block (also when it raises)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted((key, (list(state[0]), state[1], state[2])) for key, state in self._values.items())
+
+        for key, (counts, total, count) in items:
+            labels = self._labels(key)
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                lines.append(_series(f"{self.name}_bucket", labels + [("le", _format_value(bound))], cumulative))
+            lines.append(_series(f"{self.name}_sum", labels, total))
+            lines.append(_series(f"{self.name}_count", labels, count))
+        return lines
+
+#################################################################################################################
+
+# A collector returns (name, kind, documentation, [(labels dict, value), ...])
+Collector = Callable[[], Iterable[Tuple[str, str, str, List[Tuple[dict, float]]]]]
+
+
+class MetricsRegistry:
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Collector] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collector: Collector):
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+
+        for collector in self._collectors:
+            try:
+                families = list(collector())
+            except Exception:
+                # A broken collector must not take the whole scrape down
+                continue
+            for name, kind, documentation, samples in families:
+                full_name = f"{METRICS_NAMESPACE}_{name}" if METRICS_NAMESPACE else name
+                lines.append(f"# HELP {full_name} {documentation}")
+                lines.append(f"# TYPE {full_name} {kind}")
+                for labels, value in samples:
+                    lines.append(_series(full_name, sorted(labels.items()), value))
+
+        return "\n".join(lines) + "\n"
+
+
+_registry = MetricsRegistry()
+
+
+def get_metrics_registry() -> MetricsRegistry:
+    return _registry
+
+#################################################################################################################
+#################################################################################################################
+
+# ---- GitHub API -------------------------------------------------------------------------------
+
+GITHUB_REQUESTS = _registry.counter(
+    "github_api_requests_total", "GitHub API requests by call type and HTTP status.", ("call", "status"))
+GITHUB_LATENCY = _registry.histogram(
+    "github_api_request_seconds", "GitHub API request latency by call type.", ("call",))
+GITHUB_RATE_REMAINING = _registry.gauge(
+    "github_rate_limit_remaining", "Requests left in the current GitHub rate-limit window.", ("resource",))
+GITHUB_RATE_LIMIT = _registry.gauge(
+    "github_rate_limit_limit", "GitHub rate-limit window size.", ("resource",))
+GITHUB_RATE_RESET = _registry.gauge(
+    "github_rate_limit_reset_timestamp_seconds", "Unix time the GitHub rate-limit window resets.", ("resource",))
+
+# ---- git clone --------------------------------------------------------------------------------
+
+CLONE_LATENCY = _registry.histogram(
+    "git_clone_seconds", "git clone / fetch duration (mode: branch or commit).", ("mode",))
+CLONE_BYTES = _registry.histogram(
+    "git_clone_bytes", "Object bytes of a fresh checkout (packed + loose).", ("mode",), BYTES_BUCKETS)
+CLONE_FAILURES = _registry.counter(
+    "git_clone_failures_total", "Failed git clones.", ("mode",))
+
+# ---- checkout scans ---------------------------------------------------------------------------
+
+FILES_SCANNED = _registry.counter(
+    "repo_files_scanned_total", "Files read from checkouts.")
+FILES_SKIPPED = _registry.counter(
+    "repo_files_skipped_total", "Files skipped while scanning checkouts, by reason.", ("reason",))
+
+# ---- chunking ---------------------------------------------------------------------------------
+
+CHUNK_LATENCY = _registry.histogram(
+    "chunk_text_seconds", "chunk_text duration per file.", buckets=FAST_BUCKETS)
+CHUNKS_PER_FILE = _registry.histogram(
+    "chunks_per_file", "Chunks kept per chunked file.", buckets=SIZE_BUCKETS)
+
+# ---- embedding --------------------------------------------------------------------------------
+
+EMBED_LATENCY = _registry.histogram(
+    "embedding_batch_seconds", "Embedding call latency per provider.", ("provider",))
+EMBED_BATCH_SIZE = _registry.histogram(
+    "embedding_batch_size", "Texts per embedding call per provider.", ("provider",), SIZE_BUCKETS)
+
+# ---- vector store -----------------------------------------------------------------------------
+
+VECTOR_UPSERT_LATENCY = _registry.histogram(
+    "vector_upsert_seconds", "Vector store upsert latency per backend.", ("backend",))
+VECTOR_SEARCH_LATENCY = _registry.histogram(
+    "vector_search_seconds", "Vector store query latency per backend (one batched call).", ("backend",))
+
+#################################################################################################################
+
+def record_github_call(call: str, response):
+    """
+    Count a GitHub response (requests or httpx) and keep the rate-limit
+    headroom it reports.
+    """
+    if not METRICS_ENABLED:
+        return
+
+    GITHUB_REQUESTS.inc(call=call, status=str(response.status_code))
+    try:
+        GITHUB_LATENCY.observe(response.elapsed.total_seconds(), call=call)
+    except (AttributeError, RuntimeError):
+        pass
+
+    headers = response.headers
+    remaining = headers.get("X-RateLimit-Remaining")
+    if remaining is None:
+        return
+    resource = headers.get("X-RateLimit-Resource", "core")
+    try:
+        GITHUB_RATE_REMAINING.set(float(remaining), resource=resource)
+        if headers.get("X-RateLimit-Limit") is not None:
+            GITHUB_RATE_LIMIT.set(float(headers["X-RateLimit-Limit"]), resource=resource)
+        if headers.get("X-RateLimit-Reset") is not None:
+            GITHUB_RATE_RESET.set(float(headers["X-RateLimit-Reset"]), resource=resource)
+    except ValueError:
+        pass
+
+
+def record_embedding_batch(provider: str, size: int, seconds: float):
+    EMBED_LATENCY.observe(seconds, provider=provider)
+    EMBED_BATCH_SIZE.observe(size, provider=provider)
+
+
+def _single_flight_collector():
+    snapshot = get_single_flight().snapshot()
+    yield ("single_flight_calls_total", "counter", "Coalesced calls by outcome.", [
+        ({"outcome": "executed"}, snapshot["executions"]),
+        ({"outcome": "shared"}, snapshot["shared"]),
+        ({"outcome": "reused"}, snapshot["reused"]),
+    ])
+    yield ("single_flight_errors_total", "counter", "Coalesced executions that raised.", [({}, snapshot["errors"])])
+    yield ("single_flight_in_flight", "gauge", "Executions currently in flight.", [({}, snapshot["in_flight"])])
+
+
+_registry.add_collector(_single_flight_collector)
+
+
+def render_metrics() -> str:
+    return _registry.render()
@@ -0,0 +1,170 @@
+import os
+import re
+import zlib
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+
+# ========================================
+# Near-Duplicate Collapsing — Design Notes
+# ========================================
+
+# Generated code, copy-pasted handlers and fixtures produce many chunks that
+# are almost identical. Each one costs an embedding and a vector slot, and a
+# cluster of them can fill the whole top-k of a search.
+
+# Between chunking and embedding, chunks are compared with MinHash + LSH:
+
+# 1. Shingles: token 5-grams (identifiers, numbers, punctuation), so
+#    whitespace and formatting differences do not matter.
+# 2. MinHash signature: NEAR_DUP_NUM_PERM hash permutations, minimum per
+#    permutation; equal-position agreement estimates Jaccard similarity.
+# 3. LSH banding: the signature is cut into bands; chunks sharing any band
+#    bucket are candidates. Band / row counts are picked so the LSH
+#    threshold sits just below NEAR_DUP_THRESHOLD.
+# 4. Candidates are confirmed with the signature estimate >= threshold.
+
+# The index is incremental: chunks are added one at a time, in chunk order.
+# The first chunk of a near-duplicate group becomes its representative and
+# is embedded; later members become aliases of it (no embedding, no vector).
+# The result is deterministic for a given chunk order.
+
+# ========================================
+
+
+# Jaccard similarity at or above which chunks are collapsed; <= 0 disables
+NEAR_DUP_THRESHOLD = float(os.getenv("NEAR_DUP_THRESHOLD", "0.9"))
+NEAR_DUP_NUM_PERM = int(os.getenv("NEAR_DUP_NUM_PERM", "128"))
+NEAR_DUP_SHINGLE_SIZE = 5
+
+_TOKEN = re.compile(r"\w+|[^\w\s]")
+_SEED = 0x5EED
+
+
+#################################################################################################################
+#################################################################################################################
+
+def _lsh_params(threshold: float, num_perm: int) -> Tuple[int, int]:
+    """
+    (bands, rows) with bands * rows <= num_perm whose LSH threshold
+    (1/bands)^(1/rows) is the closest one not above `threshold`.
+    """
+    best = None
+    for rows in range(1, num_perm + 1):
+        bands = num_perm // rows
+        t = (1.0 / bands) ** (1.0 / rows)
+        if t > threshold:
+            continue
+        if best is None or t > best[0]:
+            best = (t, bands, rows)
+    if best is None:
+        return num_perm, 1
+    return best[1], best[2]
+
+
+def _shingle_hashes(text: str, size: int) -> np.ndarray:
+    tokens = _TOKEN.findall(text)
+    if len(tokens) <= size:
+        grams = [" ".join(tokens)]
+    else:
+        grams = [" ".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)]
+    return np.fromiter((zlib.crc32(g.encode("utf-8")) for g in set(grams)), dtype=np.uint64)
+
+#################################################################################################################
+
+class NearDuplicateIndex:
+    """
+    Incremental MinHash / LSH index of representative chunks.
+
+    `add(key, text)` returns `(representative_key, similarity)` when the text
+    is a near-duplicate of an already added representative; otherwise the
+    text becomes a representative itself and `None` is returned.
+    """
+
+    def __init__(
+        self,
+        threshold: float = NEAR_DUP_THRESHOLD,
+        num_perm: int = NEAR_DUP_NUM_PERM,
+        shingle_size: int = NEAR_DUP_SHINGLE_SIZE
+    ):
+        if not 0 < threshold <= 1:
+            raise ValueError(f"Near-duplicate threshold must be in (0, 1], got {threshold}")
+
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.bands, self.rows = _lsh_params(threshold, num_perm)
+
+        rng = np.random.default_rng(_SEED)
+        self._a = rng.integers(1, 2**63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+        self._b = rng.integers(0, 2**63, size=num_perm, dtype=np.uint64)
+
+        self._buckets: List[Dict[bytes, List[Hashable]]] = [{} for _ in range(self.bands)]
+        self._signatures: Dict[Hashable, np.ndarray] = {}
+        self.duplicates = 0
+
+    def signature(self, text: str) -> np.ndarray:
+        shingles = _shingle_hashes(text, self.shingle_size)
+        # multiply-shift hashing; uint64 arithmetic wraps
+        hashed = (np.outer(self._a, shingles) + self._b[:, None]) >> np.uint64(32)
+        return hashed.min(axis=1).astype(np.uint32)
+
+    def _band_keys(self, sig: np.ndarray) -> List[bytes]:
+        return [sig[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def add(self, key: Hashable, text: str) -> Optional[Tuple[Hashable, float]]:
+        sig = self.signature(text)
+        band_keys = self._band_keys(sig)
+
+        best, best_sim, seen = None, 0.0, set()
+        for band, band_key in enumerate(band_keys):
+            for candidate in self._buckets[band].get(band_key, ()):
+                if candidate in seen:
+                    continue
+                seen.add(candidate)
+                sim = float(np.mean(self._signatures[candidate] == sig))
+                if sim > best_sim:
+                    best, best_sim = candidate, sim
+
+        if best is not None and best_sim >= self.threshold:
+            self.duplicates += 1
+            return best, round(best_sim, 4)
+
+        self._signatures[key] = sig
+        for band, band_key in enumerate(band_keys):
+            self._buckets[band].setdefault(band_key, []).append(key)
+        return None
+
+    def stats(self) -> dict:
+        return {
+            "threshold": self.threshold,
+            "bands": self.bands,
+            "rows": self.rows,
+            "representatives": len(self._signatures),
+            "duplicates": self.duplicates,
+        }
+
+#################################################################################################################
+
+def collapse_near_duplicates(
+    items: Iterable[Tuple[Hashable, str]],
+    threshold: Optional[float] = None
+) -> Dict[Hashable, Tuple[Hashable, float]]:
+    """
+    Map every near-duplicate key to `(representative_key, similarity)`.
+    Keys absent from the result are representatives. `threshold` defaults to
+    NEAR_DUP_THRESHOLD; a value <= 0 disables collapsing.
+    """
+
+    threshold = NEAR_DUP_THRESHOLD if threshold is None else threshold
+    if threshold <= 0:
+        return {}
+
+    index = NearDuplicateIndex(threshold=threshold)
+    aliases = {}
+    for key, text in items:
+        match = index.add(key, text)
+        if match is not None:
+            aliases[key] = match
+    return aliases
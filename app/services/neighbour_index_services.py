@@ -0,0 +1,128 @@
+import os
+import json
+import threading
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+# ========================================
+# Neighbour Index — Design Notes
+# ========================================
+
+# `chunk_repo_contents` keeps locality through `local_index` instead of
+# static overlap, so that retrieval can widen a hit to its surrounding
+# chunks. Doing that by querying the vector DB for (file_path, local_index)
+# neighbours costs one metadata lookup per hit.
+
+# Instead, an adjacency index is built at store time:
+
+#     file_path -> [(local_index, vector_id), ...]   sorted by local_index
+
+# Neighbours are positional within that list, not `local_index ± n`:
+# chunks shorter than the minimum size are dropped during chunking, so
+# local indices can have gaps.
+
+# A near-duplicate chunk is listed under the vector of its representative,
+# which belongs to another file. Windows are therefore located by the hit's
+# own (file_path, local_index) (`window_at`), never by vector ID alone, and
+# the caller drops listed vectors whose file is not the hit's.
+
+# The index is a small JSON sidecar per indexed version (commit) under
+# REPO_INDEX_DATA_DIR and is cached in-process until the file changes.
+
+# ========================================
+
+
+REPO_INDEX_DATA_DIR = os.getenv("REPO_INDEX_DATA_DIR", "./.repo_index_data")
+
+_NEIGHBOUR_FILE = "neighbours.json"
+
+
+#################################################################################################################
+#################################################################################################################
+
+class NeighbourIndex:
+    """
+    Ordered per-file chunk lists, searched by (file_path, local_index).
+    """
+
+    def __init__(self, files: Dict[str, List[Tuple[int, str]]]):
+        self.files = files
+
+    @classmethod
+    def build(cls, entries: Iterable[Tuple[str, int, str]]) -> "NeighbourIndex":
+        """Build from (file_path, local_index, vector_id) triples."""
+        files: Dict[str, List[Tuple[int, str]]] = {}
+        for file_path, local_index, vector_id in entries:
+            files.setdefault(file_path, []).append((local_index, vector_id))
+        for entries_ in files.values():
+            entries_.sort()
+        return cls(files)
+
+    def window_at(self, file_path: str, local_index: int, n: int) -> List[str]:
+        """
+        IDs of the chunk at (file_path, local_index) and its ±n positional
+        neighbours in that file, in file order. Empty if it is not indexed.
+        """
+        entries = self.files.get(file_path, [])
+        pos = bisect_left(entries, (local_index, ""))
+        if pos >= len(entries) or entries[pos][0] != local_index:
+            return []
+        lo, hi = max(0, pos - max(n, 0)), min(len(entries), pos + max(n, 0) + 1)
+        return [vid for _, vid in entries[lo:hi]]
+
+    def to_json(self) -> dict:
+        return {path: [[li, vid] for li, vid in entries] for path, entries in self.files.items()}
+
+    @classmethod
+    def from_json(cls, data: dict) -> "NeighbourIndex":
+        return cls({path: [(li, vid) for li, vid in entries] for path, entries in data.items()})
+
+
+#################################################################################################################
+#################################################################################################################
+
+_loaded: Dict[str, Tuple[float, NeighbourIndex]] = {}
+_loaded_lock = threading.Lock()
+
+
+def _index_path(collection_name: str, version: str) -> str:
+    # Imported here: index_version_services imports REPO_INDEX_DATA_DIR from this module
+    from .index_version_services import version_dir
+    return os.path.join(version_dir(collection_name, version), _NEIGHBOUR_FILE)
+
+
+def save_neighbour_index(collection_name: str, version: str, index: NeighbourIndex):
+    path = _index_path(collection_name, version)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(index.to_json(), f)
+    os.replace(tmp, path)
+
+    with _loaded_lock:
+        _loaded[path] = (os.path.getmtime(path), index)
+
+
+def load_neighbour_index(collection_name: str, version: str) -> Optional[NeighbourIndex]:
+    """
+    Return the adjacency index of one indexed version, or None if that
+    version has no neighbour index.
+    """
+    path = _index_path(collection_name, version)
+    if not os.path.exists(path):
+        return None
+
+    mtime = os.path.getmtime(path)
+    with _loaded_lock:
+        cached = _loaded.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+
+    with open(path, "r", encoding="utf-8") as f:
+        index = NeighbourIndex.from_json(json.load(f))
+
+    with _loaded_lock:
+        _loaded[path] = (mtime, index)
+    return index
@@ -0,0 +1,237 @@
+import re
+import json
+import base64
+from typing import Callable, Iterator, List, Optional, Set, Tuple, Type
+
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel
+
+from .single_flight_services import get_single_flight
+
+
+# ========================================
+# Bulk Responses — Design Notes
+# ========================================
+
+# The bulk routes (/repo_index/index_repo_clone, /repo_index/index_repo_crawl,
+# /chunk/chunk_repo) used to build one Pydantic model holding every file or
+# chunk. FastAPI then re-validated it and JSON-encoded it through
+# `jsonable_encoder`, so large repos cost hundreds of MB and most of the
+# request time in serialisation.
+
+# A bulk source is a lazy iterator of (record, cursor_state) pairs, where
+# `cursor_state` is the position just after that record. On top of it:
+
+# - Pagination: `limit` records per page. `next_cursor` is an opaque token
+#   (base64url JSON) holding the position and the commit the first page was
+#   read from, so later pages read the same commit even if the branch moves.
+#   None means the last page was returned. Sources that can fail on single
+#   records (the crawl downloads each file) skip them and list their paths
+#   in `skipped` (JSON envelope / `_meta`) instead of dropping them
+#   silently; the page still holds `limit` records. Cursors are not signed: the
+#   commit in a cursor is client input and must be a 40-hex SHA (it
+#   reaches `git fetch` and GitHub URLs).
+# - Projection: `fields=path,size` serialises only those fields; sources
+#   can skip work for fields that are not requested (e.g. the crawl does
+#   not download contents).
+# - NDJSON (`format=ndjson`): one record per line, written while the source
+#   is read, so memory stays at one record. The last line is
+#   {"_meta": {"commit_sha", "next_cursor", "count"}}.
+# - Fast JSON: records are already-validated models, so each one is dumped
+#   with `model_dump_json` (pydantic-core) and the envelope is joined
+#   around them. The route returns a raw `Response`; FastAPI skips
+#   `response_model` validation and `jsonable_encoder`.
+# - Coalescing: identical concurrent JSON requests on the clone-based
+#   routes share one page body (`coalesced_bulk_response`, see
+#   single_flight_services).
+
+# ========================================
+
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+_COMMIT_SHA_RE = re.compile(r"^[0-9a-f]{40}$")
+
+
+#################################################################################################################
+#################################################################################################################
+
+def encode_cursor(state: dict) -> str:
+    raw = json.dumps(state, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str], kind: str, repo_name: str) -> dict:
+    """
+    Cursor state, or {} for the first page. Raises ValueError for malformed
+    cursors (including a commit that is not a full SHA) and cursors issued
+    for another route or repo.
+    """
+    if not cursor:
+        return {}
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        state = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Malformed cursor.")
+    if not isinstance(state, dict) or state.get("kind") != kind or state.get("repo") != repo_name:
+        raise ValueError(f"Cursor was not issued for this {kind} listing of '{repo_name}'.")
+    commit = state.get("commit")
+    if commit is not None and not (isinstance(commit, str) and _COMMIT_SHA_RE.match(commit)):
+        raise ValueError("Malformed cursor.")
+    return state
+
+
+def parse_fields(fields: Optional[str], model: Type[BaseModel]) -> Optional[Set[str]]:
+    """`fields=a,b` -> {"a", "b"}; None selects every field."""
+    if not fields:
+        return None
+    selected = {f.strip() for f in fields.split(",") if f.strip()}
+    unknown = selected - set(model.model_fields)
+    if unknown:
+        raise ValueError(
+            f"Unknown field(s) {sorted(unknown)}; available: {sorted(model.model_fields)}."
+        )
+    return selected
+
+#################################################################################################################
+
+class BulkSource:
+    """
+    Lazy records of one bulk listing.
+    - commit_sha: commit the records are read from
+    - entries: iterator of (record, cursor_state)
+    - close: releases what the source holds (e.g. a checkout)
+    - skipped: paths that could not be read, for sources that can skip
+      records (None for the others; the envelope then omits it)
+    """
+
+    def __init__(
+        self,
+        kind: str,
+        repo_name: str,
+        commit_sha: Optional[str],
+        entries: Iterator[Tuple[BaseModel, dict]],
+        close: Optional[Callable[[], None]] = None,
+        skipped: Optional[List[str]] = None
+    ):
+        self.kind = kind
+        self.repo_name = repo_name
+        self.commit_sha = commit_sha
+        self.entries = entries
+        self.skipped = skipped
+        self._close = close
+
+    def close(self):
+        if self._close is not None:
+            self._close()
+            self._close = None
+
+    def next_cursor(self, state: Optional[dict]) -> Optional[str]:
+        if state is None:
+            return None
+        return encode_cursor({"kind": self.kind, "repo": self.repo_name, "commit": self.commit_sha, **state})
+
+
+def _take(source: BulkSource, limit: Optional[int]) -> Iterator[Tuple[BaseModel, Optional[dict]]]:
+    """
+    Up to `limit` entries, one entry behind the source: the last one is
+    yielded with state None when the source had nothing after it.
+    """
+    previous, count = None, 0
+    for entry in source.entries:
+        if previous is not None:
+            yield previous
+            if limit is not None and count == limit:
+                return
+        previous = entry
+        count += 1
+    if previous is not None:
+        yield previous[0], None
+
+#################################################################################################################
+
+def json_page_body(source: BulkSource, key: str, limit: Optional[int], fields: Optional[Set[str]]) -> bytes:
+    """
+    `{key: [...], "commit_sha": ..., "next_cursor": ...}` (plus
+    "skipped" for sources that track it) serialised record by record,
+    without re-validation.
+    """
+    try:
+        parts: List[bytes] = []
+        last_state = None
+        for record, state in _take(source, limit):
+            parts.append(record.model_dump_json(include=fields).encode("utf-8"))
+            last_state = state
+        next_cursor = source.next_cursor(last_state)
+    finally:
+        source.close()
+
+    skipped = b""
+    if source.skipped is not None:
+        skipped = b',"skipped":' + json.dumps(source.skipped).encode("utf-8")
+
+    return b"".join([
+        b'{"', key.encode("utf-8"), b'":[', b",".join(parts), b'],"commit_sha":',
+        json.dumps(source.commit_sha).encode("utf-8"), b',"next_cursor":',
+        json.dumps(next_cursor).encode("utf-8"), skipped, b"}",
+    ])
+
+
+def json_page_response(source: BulkSource, key: str, limit: Optional[int], fields: Optional[Set[str]]) -> Response:
+    return Response(content=json_page_body(source, key, limit, fields), media_type="application/json")
+
+
+def ndjson_page_response(source: BulkSource, limit: Optional[int], fields: Optional[Set[str]]) -> StreamingResponse:
+    """One record per line while the source is read, then a `_meta` line."""
+
+    def lines():
+        try:
+            count, last_state = 0, None
+            for record, state in _take(source, limit):
+                yield record.model_dump_json(include=fields).encode("utf-8") + b"\n"
+                count += 1
+                last_state = state
+            meta = {"commit_sha": source.commit_sha, "next_cursor": source.next_cursor(last_state), "count": count}
+            if source.skipped is not None:
+                meta["skipped"] = source.skipped
+            yield json.dumps({"_meta": meta}).encode("utf-8") + b"\n"
+        finally:
+            source.close()
+
+    headers = {"X-Commit-Sha": source.commit_sha} if source.commit_sha else None
+    return StreamingResponse(lines(), media_type=NDJSON_MEDIA_TYPE, headers=headers)
+
+
+def bulk_response(
+    source: BulkSource,
+    key: str,
+    limit: Optional[int],
+    fields: Optional[Set[str]],
+    output: str
+):
+    if output == "ndjson":
+        return ndjson_page_response(source, limit, fields)
+    return json_page_response(source, key, limit, fields)
+
+
+def coalesced_bulk_response(
+    flight_key: tuple,
+    open_source: Callable[[], BulkSource],
+    key: str,
+    limit: Optional[int],
+    fields: Optional[Set[str]],
+    output: str
+):
+    """
+    `bulk_response` for a source opened by `open_source()`, where identical
+    concurrent JSON requests (same `flight_key`) share one page body.
+    NDJSON is streamed per client and never shared.
+    """
+    if output == "ndjson":
+        return ndjson_page_response(open_source(), limit, fields)
+    body = get_single_flight().do(
+        ("bulk_page", *flight_key),
+        lambda: json_page_body(open_source(), key, limit, fields)
+    )
+    return Response(content=body, media_type="application/json")
@@ -0,0 +1,304 @@
+import os
+import time
+import queue
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+
+# ========================================
+# Staged Pipeline — Design Notes
+# ========================================
+
+# Indexing used to run clone -> chunk -> embed -> store strictly one after
+# another, each step holding its complete output. The total time was the
+# SUM of the stages and peak memory held every file and every chunk.
+
+# `Pipeline` runs a source and a chain of stages concurrently on threads,
+# connected by bounded queues:
+
+#     source --q--> stage 1 --q--> stage 2 --q--> ... --> last stage (sink)
+
+# - A full queue blocks its producer: a slow stage applies backpressure
+#   upstream instead of letting work pile up in memory. Peak memory is
+#   bounded by queue sizes x item size.
+# - Total time approaches that of the slowest stage.
+# - A stage may run several workers (order is then not preserved), batch
+#   its input (`batch_size`) and flatten list outputs into single items.
+#   Returning None emits nothing.
+# - The first exception in any thread cancels the whole pipeline and is
+#   re-raised by `run()`. `cancel()` stops it from outside (PipelineCancelled).
+
+# Threads are enough here: the heavy stages release the GIL (git / file IO,
+# HTTP embedding calls, numpy) or hand off to the local embedding process
+# pool.
+
+# Per stage, `report()` gives items in / out, busy seconds (inside the stage
+# function), blocked seconds (waiting on a full downstream queue — i.e. the
+# backpressure it received), and input queue depth (max / mean sampled).
+
+# ========================================
+
+
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "8"))
+
+_END = object()
+
+
+class PipelineCancelled(RuntimeError):
+    pass
+
+
+#################################################################################################################
+#################################################################################################################
+
+class Stage:
+    """
+    One pipeline step: `fn(item)`, or `fn(list_of_items)` when `batch_size`
+    is set. `count(item)` is how many units an input item represents in the
+    throughput report (e.g. `len` for stages that receive batches).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        fn: Callable[[Any], Any],
+        workers: int = 1,
+        batch_size: Optional[int] = None,
+        flatten: bool = False,
+        queue_size: int = PIPELINE_QUEUE_SIZE,
+        count: Optional[Callable[[Any], int]] = None
+    ):
+        self.name = name
+        self.fn = fn
+        self.workers = max(1, workers)
+        self.batch_size = batch_size
+        self.flatten = flatten
+        self.queue_size = queue_size
+        self.count = count
+
+
+class _StageMetrics:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.items_in = 0
+        self.items_out = 0
+        self.busy = 0.0
+        self.blocked = 0.0
+        self.depth_max = 0
+        self.depth_sum = 0
+        self.depth_samples = 0
+
+    def report(self, wall: float) -> dict:
+        busy = self.busy
+        return {
+            "items": self.items_in,
+            "items_out": self.items_out,
+            "seconds": round(busy, 4),
+            "items_per_sec": round(self.items_in / busy, 1) if busy > 0 else 0.0,
+            "blocked_seconds": round(self.blocked, 4),
+            "utilisation": round(busy / wall, 3) if wall > 0 else 0.0,
+            "queue_max": self.depth_max,
+            "queue_mean": round(self.depth_sum / self.depth_samples, 2) if self.depth_samples else 0.0,
+        }
+
+#################################################################################################################
+
+class Pipeline:
+    """
+    Bounded-queue, multi-threaded pipeline:
+        Pipeline(source_iterable, [Stage(...), ...], source_name="read").run()
+    """
+
+    def __init__(
+        self,
+        source: Iterable,
+        stages: List[Stage],
+        source_name: str = "source",
+        cancel_event: Optional[threading.Event] = None
+    ):
+        if not stages:
+            raise ValueError("A pipeline needs at least one stage.")
+
+        self.source = source
+        self.source_name = source_name
+        self.stages = stages
+
+        self._queues = [queue.Queue(maxsize=stage.queue_size) for stage in stages]
+        self._metrics: Dict[str, _StageMetrics] = {
+            name: _StageMetrics() for name in [source_name] + [s.name for s in stages]
+        }
+        self._remaining = [stage.workers for stage in stages]
+        self._remaining_lock = threading.Lock()
+
+        # An external event lets the owner (e.g. a background job) cancel the run
+        self._cancel = cancel_event or threading.Event()
+        self._error: Optional[BaseException] = None
+        self._wall = 0.0
+
+    # ---- control -----------------------------------------------------------------------------
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def _fail(self, exc: BaseException):
+        with self._remaining_lock:
+            if self._error is None:
+                self._error = exc
+        self._cancel.set()
+
+    # ---- queue helpers -----------------------------------------------------------------------
+
+    def _put(self, index: int, item, metrics: _StageMetrics) -> bool:
+        """Blocking put into queue `index`; False if the pipeline was cancelled."""
+        q = self._queues[index]
+        start = time.perf_counter()
+        while not self._cancel.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                with metrics.lock:
+                    metrics.blocked += time.perf_counter() - start
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, index: int, metrics: _StageMetrics):
+        q = self._queues[index]
+        while not self._cancel.is_set():
+            try:
+                item = q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if item is _END:
+                return item
+            depth = q.qsize()
+            with metrics.lock:
+                metrics.depth_max = max(metrics.depth_max, depth + 1)
+                metrics.depth_sum += depth + 1
+                metrics.depth_samples += 1
+            return item
+        return _END
+
+    def _emit(self, index: int, result, metrics: _StageMetrics) -> bool:
+        """Forward a stage result to the next queue (nothing after the last stage)."""
+        if result is None:
+            return True
+        items = result if self.stages[index].flatten else [result]
+        for item in items:
+            with metrics.lock:
+                metrics.items_out += 1
+            if index + 1 < len(self.stages) and not self._put(index + 1, item, metrics):
+                return False
+        return True
+
+    # ---- threads -----------------------------------------------------------------------------
+
+    def _run_source(self):
+        metrics = self._metrics[self.source_name]
+        try:
+            iterator = iter(self.source)
+            while not self._cancel.is_set():
+                start = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    break
+                finally:
+                    metrics.busy += time.perf_counter() - start
+                metrics.items_in += 1
+                metrics.items_out += 1
+                if not self._put(0, item, metrics):
+                    return
+        except BaseException as exc:
+            self._fail(exc)
+            return
+
+        for _ in range(self.stages[0].workers):
+            if not self._put(0, _END, metrics):
+                return
+
+    def _run_worker(self, index: int):
+        stage = self.stages[index]
+        metrics = self._metrics[stage.name]
+        batch = []
+
+        def call(arg) -> bool:
+            start = time.perf_counter()
+            result = stage.fn(arg)
+            with metrics.lock:
+                metrics.busy += time.perf_counter() - start
+            return self._emit(index, result, metrics)
+
+        try:
+            while True:
+                item = self._get(index, metrics)
+                if item is _END:
+                    break
+                with metrics.lock:
+                    metrics.items_in += stage.count(item) if stage.count else 1
+
+                if stage.batch_size:
+                    batch.append(item)
+                    if len(batch) < stage.batch_size:
+                        continue
+                    item, batch = batch, []
+
+                if not call(item):
+                    return
+
+            if self._cancel.is_set():
+                return
+            if batch and not call(batch):
+                return
+        except BaseException as exc:
+            self._fail(exc)
+            return
+
+        # The last worker of a stage to finish closes the next stage's input
+        with self._remaining_lock:
+            self._remaining[index] -= 1
+            last = self._remaining[index] == 0
+        if last and index + 1 < len(self.stages):
+            for _ in range(self.stages[index + 1].workers):
+                if not self._put(index + 1, _END, metrics):
+                    return
+
+    # ---- run ---------------------------------------------------------------------------------
+
+    def run(self) -> Dict[str, dict]:
+        """
+        Run to completion and return `report()`. Raises the first stage
+        error, or PipelineCancelled if `cancel()` was called.
+        """
+
+        threads = [threading.Thread(target=self._run_source, name=f"pipeline-{self.source_name}", daemon=True)]
+        for index, stage in enumerate(self.stages):
+            for n in range(stage.workers):
+                threads.append(
+                    threading.Thread(target=self._run_worker, args=(index,), name=f"pipeline-{stage.name}-{n}", daemon=True)
+                )
+
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self._wall = time.perf_counter() - start
+
+        if self._error is not None:
+            raise self._error
+        if self._cancel.is_set():
+            raise PipelineCancelled("Pipeline was cancelled.")
+        return self.report()
+
+    def report(self) -> Dict[str, dict]:
+        return {name: metrics.report(self._wall) for name, metrics in self._metrics.items()}
+
+    @property
+    def wall_seconds(self) -> float:
+        return self._wall
@@ -1,12 +1,16 @@
 from fastapi import HTTPException
 from ..schema import *
 import requests, os
-from ..utils import fetch_file_content
+from ..utils import fetch_file_content, fetch_file_content_async
+from .http_client_services import GITHUB_API_URL, http_request, github_headers, gather_bounded
+from .single_flight_services import single_flight
+from .metrics_services import record_github_call
 
 
 #################################################################################################################
 #################################################################################################################
 
+@single_flight("fetch_pr_files")
 def fetch_pr_files(owner: str, repo: str, pr_number: int):
     """
     Fetches list of changed files in a PR, including:
@@ -16,7 +20,7 @@ def fetch_pr_files(owner: str, repo: str, pr_number: int):
     - contents_url (for fetching full file content)
     """
 
-    url = f"https://api.github.com/repos/{owner}/{repo}/pulls/{pr_number}/files"
+    url = f"{GITHUB_API_URL}/repos/{owner}/{repo}/pulls/{pr_number}/files"
 
     headers = {
         "Authorization": f"Bearer {os.getenv('GITHUB_TOKEN')}",
@@ -24,6 +28,7 @@ def fetch_pr_files(owner: str, repo: str, pr_number: int):
     }
 
     response = requests.get(url, headers=headers)
+    record_github_call("pr_files", response)
 
     if response.status_code != 200:
         raise HTTPException(
@@ -31,7 +36,10 @@ def fetch_pr_files(owner: str, repo: str, pr_number: int):
             detail=f"GitHub API error: {response.text}"
         )
 
-    raw_files = response.json()
+    return _parse_pr_files(response.json())
+
+
+def _parse_pr_files(raw_files: list) -> PRFilesResponse:
     cleaned_files = []
 
     for f in raw_files:
@@ -49,6 +57,7 @@ def fetch_pr_files(owner: str, repo: str, pr_number: int):
 #################################################################################################################
 #################################################################################################################
 
+@single_flight("fetch_all_file_contents")
 def fetch_all_file_contents(owner: str, repo: str, pr_number: int):
     """
     Fetches full decoded contents for all changed files in a PR.
@@ -87,4 +96,72 @@ def fetch_all_file_contents(owner: str, repo: str, pr_number: int):
             )
         )
 
-    return AllFilesContentResponse(files=expanded_files)
\ No newline at end of file
+    return AllFilesContentResponse(files=expanded_files)
+
+#################################################################################################################
+#################################################################################################################
+
+@single_flight("fetch_pr_head_sha")
+def fetch_pr_head_sha(owner: str, repo: str, pr_number: int) -> str:
+    """
+    Current head commit SHA of a PR. Changes on every push, so it scopes
+    anything derived from the PR's diff.
+    """
+
+    url = f"{GITHUB_API_URL}/repos/{owner}/{repo}/pulls/{pr_number}"
+
+    headers = {
+        "Authorization": f"Bearer {os.getenv('GITHUB_TOKEN')}",
+        "Accept": "application/vnd.github.v3+json"
+    }
+
+    response = requests.get(url, headers=headers)
+    record_github_call("pr", response)
+
+    if response.status_code != 200:
+        raise HTTPException(
+            status_code=502,
+            detail=f"GitHub API error: {response.text}"
+        )
+
+    return response.json()["head"]["sha"]
+
+#################################################################################################################
+#################################################################################################################
+
+# Async variants: same results, awaited on the shared HTTP client
+# (see http_client_services) instead of holding a threadpool slot.
+# Async calls coalesce with each other, not with sync ones.
+
+@single_flight("fetch_pr_files")
+async def fetch_pr_files_async(owner: str, repo: str, pr_number: int) -> PRFilesResponse:
+    url = f"{GITHUB_API_URL}/repos/{owner}/{repo}/pulls/{pr_number}/files"
+    response = await http_request("GET", url, headers=github_headers())
+    record_github_call("pr_files", response)
+
+    if response.status_code != 200:
+        raise HTTPException(
+            status_code=502,
+            detail=f"GitHub API error: {response.text}"
+        )
+
+    return _parse_pr_files(response.json())
+
+
+@single_flight("fetch_all_file_contents")
+async def fetch_all_file_contents_async(owner: str, repo: str, pr_number: int) -> AllFilesContentResponse:
+    """
+    Like `fetch_all_file_contents`, with the file contents fetched
+    concurrently (at most HTTP_FANOUT at a time).
+    """
+
+    files = (await fetch_pr_files_async(owner, repo, pr_number)).files
+
+    async def expand(file: FileChange) -> ExpandedFile:
+        content = None
+        if file.contents_url:  # removed files have none
+            content = (await fetch_file_content_async(file.contents_url)).get("file_content")
+        return ExpandedFile(filename=file.filename, patch=file.patch, content=content)
+
+    return AllFilesContentResponse(files=await gather_bounded(expand(f) for f in files))
+
@@ -0,0 +1,486 @@
+import os
+import sys
+import json
+import time
+import uuid
+import asyncio
+import functools
+import threading
+import contextvars
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+from .neighbour_index_services import REPO_INDEX_DATA_DIR
+
+
+# ========================================
+# Request Profiling — Design Notes
+# ========================================
+
+# A slow /chunk/chunk_repo or /pr/fetch_all_file_contents call gave no clue
+# whether the time went to the network, `chunk_text`, Pydantic or JSON
+# encoding. `ProfilingMiddleware` records a sampling profile of single
+# requests:
+
+# - on demand: header `X-Profile: 1` or query `?profile=1`, sampled every
+#   PROFILE_INTERVAL (5 ms). The response carries `X-Profile-Id`.
+# - slow-request capture, opt-in: with PROFILE_SLOW_SECONDS > 0 every
+#   request is sampled coarsely (PROFILE_SLOW_INTERVAL, 20 ms) and kept
+#   only if it took longer than that. Default 0: requests that do not ask
+#   for a profile are not sampled at all.
+
+# One sampler thread runs while at least one profiled request is in flight.
+# It reads the other threads' stacks (`sys._current_frames`) and attributes
+# each sample to requests:
+# - event-loop thread: only stacks passing through the request's own
+#   middleware frame, so concurrent async requests are told apart
+#   (routing, async endpoints, response validation and encoding)
+# - worker threads: sync endpoints are wrapped (`instrument_endpoints`) to
+#   register the thread running them for the request
+# Samples are taken when the running thread yields the GIL, which CPU-bound
+# code does once per switch interval (5 ms). Otherwise most samples would
+# land on the next blocking call after a CPU burst (a file `stat` instead of
+# `chunk_text`). While an on-demand profile is active the process-wide
+# interval is lowered to 1/20 of its sampling interval, and restored when
+# the last one ends. Slow-request sampling never changes it (it would tax
+# every request): its attribution is coarser. A tick counts for the time since the previous one, capped
+# at one sampling interval, so seconds are estimates (wall_seconds is
+# exact).
+# Time where neither thread runs the request's code is `waiting_seconds`:
+# awaited network IO, or the loop busy with other
+# requests. Bodies of streamed responses (format=ndjson) are produced in a
+# separate task and count as waiting.
+
+# Each profile holds the call tree, the top functions by cumulative and
+# self time, and folded stacks (`function;function;...  count`, the input
+# of flame-graph tools). Profiles are kept in an on-disk ring buffer of
+# PROFILE_RING_SIZE files under REPO_INDEX_DATA_DIR/profiles and served by
+# /admin/profiles. If PROFILE_ADMIN_TOKEN is set, both the admin endpoints
+# and the on-demand flag require it in `X-Admin-Token`.
+
+# ========================================
+
+
+PROFILE_DIR = os.path.join(REPO_INDEX_DATA_DIR, "profiles")
+
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.005"))
+PROFILE_SLOW_SECONDS = float(os.getenv("PROFILE_SLOW_SECONDS", "0"))
+PROFILE_SLOW_INTERVAL = float(os.getenv("PROFILE_SLOW_INTERVAL", "0.02"))
+PROFILE_RING_SIZE = int(os.getenv("PROFILE_RING_SIZE", "50"))
+PROFILE_TOP_N = int(os.getenv("PROFILE_TOP_N", "30"))
+PROFILE_ADMIN_TOKEN = os.getenv("PROFILE_ADMIN_TOKEN")
+
+# Call-tree nodes below this share of the samples are folded away
+PROFILE_TREE_MIN_FRACTION = 0.01
+
+ADMIN_PATH_PREFIX = "/admin/profiles"
+
+_WORKER_ROOT = ("[worker thread]", "", 0)
+
+_current: "contextvars.ContextVar[Optional[RequestProfile]]" = contextvars.ContextVar("request_profile", default=None)
+
+
+#################################################################################################################
+#################################################################################################################
+
+def _frame_key(frame) -> Tuple[str, str, int]:
+    code = frame.f_code
+    return code.co_name, code.co_filename, code.co_firstlineno
+
+
+def _short_path(path: str) -> str:
+    marker = "site-packages" + os.sep
+    if marker in path:
+        return path.split(marker, 1)[1]
+    try:
+        relative = os.path.relpath(path)
+    except ValueError:
+        return path
+    return path if relative.startswith("..") else relative
+
+
+def _label(key: Tuple[str, str, int]) -> str:
+    name, path, line = key
+    return f"{name} ({_short_path(path)}:{line})" if path else name
+
+
+class RequestProfile:
+    """
+    Samples of one request. `anchor` is the middleware frame on the event
+    loop thread; worker threads are attached while they run its endpoint.
+    """
+
+    def __init__(self, anchor, loop_thread: int, interval: float, trigger: str):
+        self.id = uuid.uuid4().hex[:16]
+        self.anchor = anchor
+        self.loop_thread = loop_thread
+        self.interval = interval
+        self.trigger = trigger
+
+        self.started_at = time.time()
+        self.started = time.perf_counter()
+        self.next_due = self.started
+        self.last_sample = self.started
+
+        self.stacks: Counter = Counter()   # stack -> seconds
+        self.samples = 0
+        self.waiting_seconds = 0.0
+
+        self._lock = threading.Lock()
+        self._threads: Dict[int, object] = {}   # thread id -> frame the request's code starts below
+
+    def attach(self, thread_id: int, entry_frame):
+        with self._lock:
+            self._threads[thread_id] = entry_frame
+
+    def detach(self, thread_id: int):
+        with self._lock:
+            self._threads.pop(thread_id, None)
+
+    def sample(self, frames: dict, now: float):
+        """
+        Record one tick from a `sys._current_frames()` snapshot (sampler
+        thread), weighted by the time since the previous tick, at most one
+        interval (a late tick was waiting for the GIL; the stack it sees
+        does not stand for the whole wait).
+        """
+        weight = min(now - self.last_sample, self.interval)
+        self.last_sample = now
+        attributed = False
+
+        frame = frames.get(self.loop_thread)
+        stack = []
+        while frame is not None and frame is not self.anchor:
+            stack.append(_frame_key(frame))
+            frame = frame.f_back
+        if frame is self.anchor and stack:
+            self.stacks[tuple(reversed(stack))] += weight
+            attributed = True
+
+        with self._lock:
+            threads = list(self._threads.items())
+        for thread_id, entry in threads:
+            frame = frames.get(thread_id)
+            stack = []
+            while frame is not None and frame is not entry:
+                stack.append(_frame_key(frame))
+                frame = frame.f_back
+            if frame is entry and stack:
+                stack.append(_WORKER_ROOT)
+                self.stacks[tuple(reversed(stack))] += weight
+                attributed = True
+
+        self.samples += 1
+        if not attributed:
+            self.waiting_seconds += weight
+
+    # ---- report ------------------------------------------------------------------------------
+
+    def report(self, method: str, path: str, query: str, status: Optional[int]) -> dict:
+        wall = time.perf_counter() - self.started
+        stacks = dict(self.stacks)
+        stacked = sum(stacks.values())
+
+        cumulative, own = Counter(), Counter()
+        for stack, seconds in stacks.items():
+            for key in set(stack):
+                cumulative[key] += seconds
+            own[stack[-1]] += seconds
+
+        top = [
+            {
+                "function": _label(key),
+                "cumulative_seconds": round(seconds, 4),
+                "self_seconds": round(own.get(key, 0.0), 4),
+            }
+            for key, seconds in cumulative.most_common()
+            if key != _WORKER_ROOT
+        ][:PROFILE_TOP_N]
+
+        return {
+            "id": self.id,
+            "trigger": self.trigger,
+            "method": method,
+            "path": path,
+            "query": query,
+            "status": status,
+            "started_at": self.started_at,
+            "wall_seconds": round(wall, 4),
+            "interval": self.interval,
+            "samples": self.samples,
+            "sampled_seconds": round(stacked, 4),
+            "waiting_seconds": round(self.waiting_seconds, 4),
+            "top_functions": top,
+            "call_tree": _call_tree(stacks, stacked * PROFILE_TREE_MIN_FRACTION),
+            # Flame-graph tools expect integer counts: milliseconds
+            "folded_stacks": {
+                ";".join(_label(k) for k in stack): max(1, round(seconds * 1000)) for stack, seconds in stacks.items()
+            },
+        }
+
+
+def _call_tree(stacks: Dict[tuple, float], min_seconds: float) -> List[dict]:
+    root: dict = {"children": {}}
+    for stack, seconds in stacks.items():
+        node = root
+        for key in stack:
+            node = node["children"].setdefault(key, {"seconds": 0.0, "children": {}})
+            node["seconds"] += seconds
+
+    def build(children: dict) -> List[dict]:
+        nodes = []
+        for key, child in sorted(children.items(), key=lambda kv: -kv[1]["seconds"]):
+            if child["seconds"] < min_seconds:
+                continue
+            nodes.append({
+                "function": _label(key),
+                "seconds": round(child["seconds"], 4),
+                "children": build(child["children"])
+            })
+        return nodes
+
+    return build(root["children"])
+
+#################################################################################################################
+
+class _Sampler:
+    """One background thread sampling every active profile at its interval."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._profiles = set()
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, profile: RequestProfile):
+        with self._lock:
+            self._profiles.add(profile)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+                self._thread.start()
+
+    def remove(self, profile: RequestProfile):
+        with self._lock:
+            self._profiles.discard(profile)
+
+    def _run(self):
+        own = threading.get_ident()
+        original_switch = sys.getswitchinterval()
+        while True:
+            with self._lock:
+                if not self._profiles:
+                    self._thread = None
+                    sys.setswitchinterval(original_switch)
+                    return
+                profiles = list(self._profiles)
+
+            # A thread's stack can only be read when it yields the GIL; only
+            # on-demand profiles pay for a finer switch interval
+            requested = [p.interval for p in profiles if p.trigger == "requested"]
+            switch = min(original_switch, min(requested) / 20) if requested else original_switch
+            if sys.getswitchinterval() != switch:
+                sys.setswitchinterval(switch)
+
+            now = time.perf_counter()
+            due = [p for p in profiles if p.next_due <= now]
+            if due:
+                frames = sys._current_frames()
+                frames.pop(own, None)
+                for profile in due:
+                    profile.sample(frames, now)
+                    profile.next_due = now + profile.interval
+                del frames
+
+            delay = min(p.next_due for p in profiles) - time.perf_counter()
+            time.sleep(max(delay, 0.001))
+
+
+_sampler = _Sampler()
+
+#################################################################################################################
+
+class ProfileStore:
+    """
+    Ring buffer of profile files `<seq>-<id>.json`; the oldest files are
+    removed beyond `size`.
+    """
+
+    def __init__(self, directory: str = PROFILE_DIR, size: int = PROFILE_RING_SIZE):
+        self.directory = directory
+        self.size = size
+        self._lock = threading.Lock()
+        self._seq = None
+
+    def _files(self) -> List[str]:
+        try:
+            return sorted(f for f in os.listdir(self.directory) if f.endswith(".json"))
+        except FileNotFoundError:
+            return []
+
+    def save(self, report: dict):
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            files = self._files()
+            if self._seq is None:
+                self._seq = int(files[-1].split("-", 1)[0]) if files else 0
+            self._seq += 1
+
+            path = os.path.join(self.directory, f"{self._seq:010d}-{report['id']}.json")
+            tmp = path + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump(report, f)
+            os.replace(tmp, path)
+
+            for old in (files + [os.path.basename(path)])[:-self.size or None]:
+                try:
+                    os.remove(os.path.join(self.directory, old))
+                except FileNotFoundError:
+                    pass
+
+    def get(self, profile_id: str) -> dict:
+        for name in self._files():
+            if name[:-5].split("-", 1)[1] == profile_id:
+                with open(os.path.join(self.directory, name)) as f:
+                    return json.load(f)
+        raise KeyError(profile_id)
+
+    def list(self) -> List[dict]:
+        """Summaries, newest first."""
+        summaries = []
+        for name in reversed(self._files()):
+            try:
+                with open(os.path.join(self.directory, name)) as f:
+                    report = json.load(f)
+            except (OSError, ValueError):
+                continue
+            summaries.append({
+                key: report.get(key)
+                for key in ("id", "trigger", "method", "path", "status", "started_at", "wall_seconds", "samples", "waiting_seconds")
+            })
+        return summaries
+
+    def clear(self) -> int:
+        with self._lock:
+            files = self._files()
+            for name in files:
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    pass
+            return len(files)
+
+
+_store = ProfileStore()
+
+
+def get_profile_store() -> ProfileStore:
+    return _store
+
+#################################################################################################################
+#################################################################################################################
+
+def check_admin_token(token: Optional[str]) -> bool:
+    return not PROFILE_ADMIN_TOKEN or token == PROFILE_ADMIN_TOKEN
+
+
+def _header(scope, name: bytes) -> Optional[str]:
+    for key, value in scope.get("headers", []):
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+def _requested(scope) -> bool:
+    flag = _header(scope, b"x-profile")
+    if flag is None:
+        values = parse_qs(scope.get("query_string", b"").decode("latin-1")).get("profile")
+        flag = values[-1] if values else None
+    if flag is None or flag.lower() not in ("1", "true", "yes"):
+        return False
+    return check_admin_token(_header(scope, b"x-admin-token"))
+
+
+class ProfilingMiddleware:
+    """
+    Pure ASGI middleware (no BaseHTTPMiddleware: the endpoint must run in
+    the same task, below this frame, for loop samples to be attributed).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(ADMIN_PATH_PREFIX):
+            await self.app(scope, receive, send)
+            return
+
+        requested = _requested(scope)
+        if not requested and PROFILE_SLOW_SECONDS <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(
+            anchor=sys._getframe(),
+            loop_thread=threading.get_ident(),
+            interval=PROFILE_INTERVAL if requested else PROFILE_SLOW_INTERVAL,
+            trigger="requested" if requested else "slow"
+        )
+        status = None
+
+        async def send_with_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if requested:
+                    message = {**message, "headers": list(message.get("headers", [])) + [(b"x-profile-id", profile.id.encode())]}
+            await send(message)
+
+        token = _current.set(profile)
+        _sampler.add(profile)
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            _sampler.remove(profile)
+            _current.reset(token)
+
+            if requested or time.perf_counter() - profile.started >= PROFILE_SLOW_SECONDS:
+                report = profile.report(
+                    scope["method"], scope["path"], scope.get("query_string", b"").decode("latin-1"), status
+                )
+                await asyncio.to_thread(_store.save, report)
+
+
+def _attach_worker(fn):
+    """Sync endpoint wrapper: while it runs, its thread is sampled for the request."""
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        profile = _current.get()     # contextvars are copied into the threadpool
+        if profile is None:
+            return fn(*args, **kwargs)
+
+        thread_id = threading.get_ident()
+        profile.attach(thread_id, sys._getframe())
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            profile.detach(thread_id)
+
+    wrapper._profiled = True
+    return wrapper
+
+
+def instrument_endpoints(app):
+    """
+    Wrap the app's sync endpoints (run in the threadpool) so their worker
+    thread is sampled. Call after every route is registered.
+    """
+    from fastapi.routing import APIRoute
+
+    for route in app.routes:
+        if not isinstance(route, APIRoute):
+            continue
+        call = route.dependant.call
+        if asyncio.iscoroutinefunction(call) or getattr(call, "_profiled", False):
+            continue
+        route.dependant.call = _attach_worker(call)
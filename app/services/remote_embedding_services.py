@@ -0,0 +1,567 @@
+import os
+import time
+import random
+import asyncio
+import weakref
+import threading
+from email.utils import parsedate_to_datetime
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+from .http_client_services import get_http_client
+from .metrics_services import get_metrics_registry
+
+
+# ========================================
+# Remote Embedding Client — Design Notes
+# ========================================
+
+# `embed_openai` / `embed_gemini` issue one blocking request per text. That is
+# fine for a query, and hopeless for a repository: thousands of TLS
+# handshakes, no retry on throttling, and no notion of the provider's quota.
+
+# This module provides an async client used for bulk embedding:
+
+# 1. CONNECTION POOLING
+#    Keep-alive connections are reused across batches. A standalone client
+#    opens its own `httpx.AsyncClient`; the shared clients behind
+#    `embed_remote_async` / `embed_remote_batch` (one per provider, api_key,
+#    dimensions and event loop) send through the loop's shared client from
+#    http_client_services. Sync callers (pipeline embed workers,
+#    `embed_texts`) all run on one background loop, so they share its pool.
+
+# 2. BOUNDED CONCURRENCY
+#    At most `max_concurrency` batches are in flight (semaphore), matching the
+#    connection pool size.
+
+# 3. BUDGET SCHEDULER
+#    A request-per-minute and token-per-minute token bucket. Each batch
+#    reserves one request and its estimated token count before it is sent, so
+#    the client paces itself below the quota instead of discovering it via 429.
+#    There is one budget per (provider, api_key) for the whole process
+#    (`get_rate_budget`): every client, loop and thread draws from it, since
+#    that is the unit the provider enforces. What is left in each bucket is
+#    exported at scrape time (`embedding_rate_headroom`, per provider).
+
+# 4. BACKOFF
+#    429 and 5xx responses (and transport errors) are retried with capped,
+#    jittered exponential backoff. A `Retry-After` header overrides the
+#    computed delay and pauses the whole budget, not just the failing batch.
+#    It is capped at `backoff_max`, like the computed delay: a bogus or
+#    hostile value (an HTTP date days away) must not stall every caller.
+
+# 5. PARTIAL-BATCH RETRY
+#    Provider batches are atomic on the wire, but results are tracked per
+#    input index. Inputs missing from a response are retried on their own, and
+#    a batch rejected for its content (400, 413, 422) is bisected so that one
+#    bad input does not sink its neighbours. A single input that still fails
+#    raises. Other errors (401/403/404: key or endpoint problems that every
+#    half would hit too) raise immediately.
+
+# `base_url` is injectable so the client can be pointed at a local stand-in
+# HTTP server.
+
+# Provider invariant from `embedding_services` still holds: this client never
+# switches provider and never falls back silently.
+
+# ========================================
+
+
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com")
+GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL", "https://generativelanguage.googleapis.com")
+
+OPENAI_EMBED_MODEL = "text-embedding-3-large"
+GEMINI_EMBED_MODEL = "text-embedding-004"
+
+# Conservative per-provider defaults; override with <PROVIDER>_RPM / <PROVIDER>_TPM
+DEFAULT_LIMITS = {
+    "openai": {"rpm": 3000, "tpm": 1_000_000, "batch_size": 256},
+    "gemini": {"rpm": 1500, "tpm": 1_000_000, "batch_size": 100},
+}
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+# Rejections caused by the batch content, worth splitting the batch for
+BISECT_STATUS = {400, 413, 422}
+
+
+class EmbeddingRequestError(Exception):
+    """Raised when a batch cannot be embedded after all retries."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+########################################################################################################
+# Helpers
+
+def _estimate_tokens(text: str) -> int:
+    """Cheap upper-bound-ish token estimate (~4 characters per token)."""
+    return max(1, len(text) // 4 + 1)
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a Retry-After header, either delta-seconds or an HTTP date.
+    Returns seconds to wait, or None if absent / unparseable.
+    """
+
+    if not value:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+########################################################################################################
+# Budget scheduler
+
+class RateBudget:
+    """
+    Token-bucket scheduler for request-per-minute and token-per-minute quotas.
+
+    `acquire(tokens)` waits until one request and `tokens` tokens are
+    available, then consumes them. `pause(seconds)` blocks every caller, used
+    when the provider returns Retry-After.
+
+    State is guarded by a thread lock and waits happen outside it, so one
+    budget can be shared by coroutines of different event loops.
+    """
+
+    def __init__(self, rpm: Optional[int] = None, tpm: Optional[int] = None):
+        self.rpm = rpm
+        self.tpm = tpm
+
+        self._requests = float(rpm) if rpm else 0.0
+        self._tokens = float(tpm) if tpm else 0.0
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        elapsed = now - self._updated
+        self._updated = now
+        if self.rpm:
+            self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60.0)
+        if self.tpm:
+            self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60.0)
+
+    def _wait_time(self, now: float, tokens: int) -> float:
+        wait = max(0.0, self._paused_until - now)
+        if self.rpm and self._requests < 1:
+            wait = max(wait, (1 - self._requests) * 60.0 / self.rpm)
+        if self.tpm:
+            # A single batch larger than the whole bucket is allowed through
+            # once the bucket is full, otherwise it would wait forever.
+            needed = min(tokens, self.tpm)
+            if self._tokens < needed:
+                wait = max(wait, (needed - self._tokens) * 60.0 / self.tpm)
+        return wait
+
+    def try_acquire(self, tokens: int = 1) -> float:
+        """
+        Consume one request and `tokens` tokens if available and return 0,
+        else return the seconds to wait before trying again.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            wait = self._wait_time(now, tokens)
+            if wait > 0:
+                return wait
+            if self.rpm:
+                self._requests -= 1
+            if self.tpm:
+                self._tokens -= tokens
+            return 0.0
+
+    async def acquire(self, tokens: int = 1):
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+    def pause(self, seconds: float):
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def headroom(self) -> Dict[str, Optional[float]]:
+        """Requests and tokens left in the buckets now (None: no limit)."""
+        with self._lock:
+            self._refill(time.monotonic())
+            return {
+                "requests": self._requests if self.rpm else None,
+                "tokens": self._tokens if self.tpm else None,
+            }
+
+
+_budgets: Dict[tuple, RateBudget] = {}
+_budgets_lock = threading.Lock()
+
+
+def get_rate_budget(provider: str, api_key: str) -> RateBudget:
+    """
+    The process-wide budget of one provider account, with limits from
+    <PROVIDER>_RPM / <PROVIDER>_TPM or the provider defaults.
+    """
+    provider = provider.lower()
+    with _budgets_lock:
+        budget = _budgets.get((provider, api_key))
+        if budget is None:
+            defaults, env = DEFAULT_LIMITS[provider], provider.upper()
+            budget = _budgets[(provider, api_key)] = RateBudget(
+                rpm=int(os.getenv(f"{env}_RPM", defaults["rpm"])),
+                tpm=int(os.getenv(f"{env}_TPM", defaults["tpm"]))
+            )
+        return budget
+
+
+def _rate_budget_collector():
+    headroom: Dict[Tuple[str, str], float] = {}
+    with _budgets_lock:
+        budgets = list(_budgets.items())
+    for (provider, _), budget in budgets:
+        # Accounts of one provider are summed: api keys never become labels
+        for resource, left in budget.headroom().items():
+            if left is not None:
+                headroom[(provider, resource)] = headroom.get((provider, resource), 0.0) + left
+    yield ("embedding_rate_headroom", "gauge",
+           "Requests / tokens left in the embedding providers' per-minute budgets.", [
+        ({"provider": provider, "resource": resource}, left)
+        for (provider, resource), left in sorted(headroom.items())
+    ])
+
+
+get_metrics_registry().add_collector(_rate_budget_collector)
+
+
+########################################################################################################
+# Provider adapters
+
+def _openai_request(base_url: str, model: str, api_key: str, texts: List[str], dimensions: Optional[int]):
+    payload = {"model": model, "input": texts}
+    if dimensions is not None:
+        payload["dimensions"] = dimensions
+    return (
+        f"{base_url}/v1/embeddings",
+        {"Authorization": f"Bearer {api_key}"},
+        payload,
+    )
+
+
+def _openai_parse(data: dict) -> Dict[int, List[float]]:
+    return {item["index"]: item["embedding"] for item in data.get("data", [])}
+
+
+def _gemini_request(base_url: str, model: str, api_key: str, texts: List[str], dimensions: Optional[int]):
+    requests_ = []
+    for text in texts:
+        req = {"model": f"models/{model}", "content": {"parts": [{"text": text}]}}
+        if dimensions is not None:
+            req["outputDimensionality"] = dimensions
+        requests_.append(req)
+    return (
+        f"{base_url}/v1beta/models/{model}:batchEmbedContents",
+        {"x-goog-api-key": api_key},
+        {"requests": requests_},
+    )
+
+
+def _gemini_parse(data: dict) -> Dict[int, List[float]]:
+    return {
+        i: item["values"]
+        for i, item in enumerate(data.get("embeddings", []))
+        if item and item.get("values")
+    }
+
+
+_PROVIDERS = {
+    "openai": (_openai_request, _openai_parse, OPENAI_BASE_URL, OPENAI_EMBED_MODEL),
+    "gemini": (_gemini_request, _gemini_parse, GEMINI_BASE_URL, GEMINI_EMBED_MODEL),
+}
+
+
+########################################################################################################
+# Client
+
+class RemoteEmbeddingClient:
+    """
+    Async, pooled, rate-limited embedding client for a single provider.
+    Draws from the shared budget of (provider, api_key) unless `rpm` / `tpm`
+    are given.
+
+    Usage:
+        async with RemoteEmbeddingClient("openai", api_key) as client:
+            vectors = await client.embed(texts)
+    """
+
+    def __init__(
+        self,
+        provider: str,
+        api_key: str,
+        base_url: Optional[str] = None,
+        model: Optional[str] = None,
+        batch_size: Optional[int] = None,
+        max_concurrency: int = 8,
+        rpm: Optional[int] = None,
+        tpm: Optional[int] = None,
+        max_retries: int = 6,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0,
+        timeout: float = 60.0,
+        dimensions: Optional[int] = None,
+        http_client: Optional[httpx.AsyncClient] = None
+    ):
+        provider = provider.lower()
+        if provider not in _PROVIDERS:
+            raise ValueError(f"Unknown remote embedding provider '{provider}'")
+
+        build, parse, default_url, default_model = _PROVIDERS[provider]
+        defaults = DEFAULT_LIMITS[provider]
+        env = provider.upper()
+
+        self.provider = provider
+        self.api_key = api_key
+        self.base_url = (base_url or default_url).rstrip("/")
+        self.model = model or default_model
+        self.batch_size = batch_size or defaults["batch_size"]
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.dimensions = dimensions
+
+        if rpm or tpm:
+            self.budget = RateBudget(
+                rpm=rpm or int(os.getenv(f"{env}_RPM", defaults["rpm"])),
+                tpm=tpm or int(os.getenv(f"{env}_TPM", defaults["tpm"]))
+            )
+        else:
+            self.budget = get_rate_budget(provider, api_key)
+
+        self._build = build
+        self._parse = parse
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        # A borrowed client (http_client_services) is used but never closed here
+        self._http: Optional[httpx.AsyncClient] = http_client
+        self._owns_http = http_client is None
+
+        self.stats = {"requests": 0, "retries": 0, "throttled": 0, "splits": 0}
+
+    # ---------------------------------------------------------------------------------------------
+
+    def _open(self):
+        if self._http is not None:
+            return
+        self._http = httpx.AsyncClient(
+            timeout=self.timeout,
+            limits=httpx.Limits(
+                max_connections=self.max_concurrency,
+                max_keepalive_connections=self.max_concurrency
+            )
+        )
+
+    async def __aenter__(self):
+        self._open()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
+
+    async def aclose(self):
+        if self._http is not None and self._owns_http:
+            await self._http.aclose()
+        self._http = None
+
+    # ---------------------------------------------------------------------------------------------
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed `texts`, preserving order. Raises EmbeddingRequestError if any
+        input cannot be embedded.
+        """
+
+        if self._http is None:
+            raise RuntimeError("RemoteEmbeddingClient must be used as an async context manager.")
+
+        batches = [
+            texts[i:i + self.batch_size]
+            for i in range(0, len(texts), self.batch_size)
+        ]
+        results = await asyncio.gather(*(self._embed_batch(batch) for batch in batches))
+
+        return [emb for batch in results for emb in batch]
+
+    async def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed one batch, retrying only the inputs that did not come back and
+        bisecting batches the provider rejects outright.
+        """
+
+        out: List[Optional[List[float]]] = [None] * len(texts)
+        missing = list(range(len(texts)))
+
+        for _ in range(self.max_retries + 1):
+            try:
+                got = await self._post([texts[i] for i in missing])
+            except EmbeddingRequestError as e:
+                if len(missing) == 1 or e.status_code not in BISECT_STATUS:
+                    raise
+                # Batch rejected for its content: isolate the bad input(s)
+                self.stats["splits"] += 1
+                mid = len(missing) // 2
+                left, right = missing[:mid], missing[mid:]
+                halves = await asyncio.gather(
+                    self._embed_batch([texts[i] for i in left]),
+                    self._embed_batch([texts[i] for i in right])
+                )
+                for idxs, embs in zip((left, right), halves):
+                    for i, emb in zip(idxs, embs):
+                        out[i] = emb
+                return out
+
+            for pos, emb in got.items():
+                if 0 <= pos < len(missing):
+                    out[missing[pos]] = emb
+
+            missing = [i for i in missing if out[i] is None]
+            if not missing:
+                return out
+
+            self.stats["retries"] += 1
+
+        raise EmbeddingRequestError(
+            f"{self.provider}: {len(missing)} input(s) missing from responses after retries"
+        )
+
+    async def _post(self, texts: List[str]) -> Dict[int, List[float]]:
+        """
+        Send a single request under the concurrency and budget limits,
+        retrying throttling, server errors and transport errors.
+        """
+
+        url, headers, payload = self._build(
+            self.base_url, self.model, self.api_key, texts, self.dimensions
+        )
+        tokens = sum(_estimate_tokens(t) for t in texts)
+        last_error = None
+
+        for attempt in range(self.max_retries + 1):
+            await self.budget.acquire(tokens)
+
+            async with self._semaphore:
+                self.stats["requests"] += 1
+                try:
+                    resp = await self._http.post(url, headers=headers, json=payload, timeout=self.timeout)
+                except httpx.TransportError as e:
+                    resp, last_error = None, EmbeddingRequestError(f"{self.provider}: {e!r}")
+
+            if resp is not None:
+                if resp.status_code == 200:
+                    return self._parse(resp.json())
+
+                last_error = EmbeddingRequestError(
+                    f"{self.provider} embedding error ({resp.status_code}) → {resp.text}",
+                    status_code=resp.status_code
+                )
+                if resp.status_code not in RETRYABLE_STATUS:
+                    raise last_error
+
+            if attempt == self.max_retries:
+                break
+
+            delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+            delay *= 0.5 + random.random() / 2
+
+            retry_after = _parse_retry_after(resp.headers.get("retry-after")) if resp is not None else None
+            if retry_after is not None:
+                delay = min(self.backoff_max, retry_after)
+                self.budget.pause(delay)
+
+            if resp is not None and resp.status_code == 429:
+                self.stats["throttled"] += 1
+
+            self.stats["retries"] += 1
+            await asyncio.sleep(delay)
+
+        raise last_error
+
+
+########################################################################################################
+
+# Shared clients: one per (provider, api_key, dimensions) and event loop
+
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[tuple, RemoteEmbeddingClient]]" = (
+    weakref.WeakKeyDictionary()
+)
+_clients_lock = threading.Lock()
+
+_sync_loop: Optional[asyncio.AbstractEventLoop] = None
+_sync_loop_lock = threading.Lock()
+
+
+def _shared_client(provider: str, api_key: str, dimensions: Optional[int]) -> RemoteEmbeddingClient:
+    loop = asyncio.get_running_loop()
+    key = (provider.lower(), api_key, dimensions)
+    with _clients_lock:
+        clients = _clients.setdefault(loop, {})
+        client = clients.get(key)
+        if client is None or client._http is None or client._http.is_closed:
+            client = clients[key] = RemoteEmbeddingClient(
+                provider, api_key, dimensions=dimensions, http_client=get_http_client()
+            )
+        return client
+
+
+async def close_remote_clients():
+    """
+    Forget the running loop's shared clients (app shutdown); their HTTP
+    pool is closed by `close_http_clients`.
+    """
+    with _clients_lock:
+        clients = _clients.pop(asyncio.get_running_loop(), {})
+    for client in clients.values():
+        await client.aclose()
+
+
+async def embed_remote_async(texts: List[str], provider: str, api_key: str, dimensions: Optional[int] = None) -> List[List[float]]:
+    return await _shared_client(provider, api_key, dimensions).embed(texts)
+
+
+def _background_loop() -> asyncio.AbstractEventLoop:
+    global _sync_loop
+    with _sync_loop_lock:
+        if _sync_loop is None:
+            _sync_loop = asyncio.new_event_loop()
+            threading.Thread(target=_sync_loop.run_forever, name="remote-embedding", daemon=True).start()
+        return _sync_loop
+
+
+def embed_remote_batch(texts: List[str], provider: str, api_key: str, dimensions: Optional[int] = None) -> List[List[float]]:
+    """
+    Blocking wrapper around `embed_remote_async` for sync call sites: runs
+    on one background event loop shared by every sync caller. Must not be
+    called from inside a running event loop.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        pass
+    else:
+        raise RuntimeError("embed_remote_batch cannot be called from a running event loop; await embed_remote_async.")
+
+    future = asyncio.run_coroutine_threadsafe(
+        embed_remote_async(texts, provider, api_key, dimensions), _background_loop()
+    )
+    return future.result()
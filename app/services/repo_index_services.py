@@ -1,11 +1,22 @@
 from fastapi import HTTPException
 from ..schema import *
 import requests, os
-from ..utils import fetch_file_content
+from ..utils import fetch_file_content, fetch_file_content_async
 import tempfile
 import subprocess
 import shutil
 import os
+import re
+import time
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+from .pagination_services import BulkSource
+from .http_client_services import GITHUB_API_URL, http_request, github_headers, gather_bounded
+from .single_flight_services import get_single_flight, single_flight
+from .metrics_services import (
+    record_github_call, metrics_enabled, CLONE_LATENCY, CLONE_BYTES, CLONE_FAILURES, FILES_SCANNED, FILES_SKIPPED
+)
 
 
 
@@ -13,30 +24,39 @@ import os
 #################################################################################################################
 
 
-def fetch_repo_tree(owner: str, repo: str, branch: str = "main"):
+@single_flight("fetch_repo_tree")
+def fetch_repo_tree(owner: str, repo: str, branch: str = "main", commit_sha: str = None):
 
     """
-    Fetches the repository tree for a given branch.
+    Fetches the repository tree for a given branch, or for exactly
+    `commit_sha` when given (used to page through one commit's files).
     """
-    # Get the reference for the branch to find the latest commit
-    ref_url = f"https://api.github.com/repos/{owner}/{repo}/git/refs/heads/{branch}"
     headers = {
         "Authorization": f"Bearer {os.getenv('GITHUB_TOKEN')}",
         "Accept": "application/vnd.github.v3+json"
     }
-    ref_response = requests.get(url=ref_url, headers=headers)
-    if ref_response.status_code != 200:
-        raise HTTPException(
-            status_code=502,
-            detail=f"GitHub API error (ref): {ref_response.text}"
-        )
-    
-    ref_data = ref_response.json()
 
+    if commit_sha:
+        commit_url = f"{GITHUB_API_URL}/repos/{owner}/{repo}/git/commits/{commit_sha}"
+    else:
+        # Get the reference for the branch to find the latest commit
+        ref_url = f"{GITHUB_API_URL}/repos/{owner}/{repo}/git/refs/heads/{branch}"
+        ref_response = requests.get(url=ref_url, headers=headers)
+        record_github_call("ref", ref_response)
+        if ref_response.status_code != 200:
+            raise HTTPException(
+                status_code=502,
+                detail=f"GitHub API error (ref): {ref_response.text}"
+            )
+
+        ref_data = ref_response.json()
+        commit_sha = ref_data["object"].get("sha")
+
+        # Get the commit URL from the ref data
+        commit_url = ref_data["object"]["url"]
 
-    # Get the commit URL from the ref data
-    commit_url = ref_data["object"]["url"]
     commit_response = requests.get(url=commit_url, headers=headers)
+    record_github_call("commit", commit_response)
     if commit_response.status_code != 200:
         raise HTTPException(
             status_code=502,
@@ -47,14 +67,17 @@ def fetch_repo_tree(owner: str, repo: str, branch: str = "main"):
     # Get the tree URL from the commit data
     tree_url = commit_data["tree"]["url"] + "?recursive=1"
     tree_response = requests.get(url=tree_url, headers=headers)
+    record_github_call("tree", tree_response)
     if tree_response.status_code != 200:
         raise HTTPException(
             status_code=502,
             detail=f"GitHub API error (tree): {tree_response.text}"
         )
 
-    tree_data = tree_response.json()
+    return _parse_tree(tree_response.json(), commit_sha)
 
+
+def _parse_tree(tree_data: dict, commit_sha: str) -> RepoTreeResponse:
     tree_items = []
     for item in tree_data.get("tree", []):
         tree_items.append(
@@ -69,7 +92,11 @@ def fetch_repo_tree(owner: str, repo: str, branch: str = "main"):
         )
 
 
-    return RepoTreeResponse(tree=tree_items, truncated=tree_data.get("truncated"))
+    return RepoTreeResponse(
+        tree=tree_items,
+        truncated=tree_data.get("truncated"),
+        commit_sha=commit_sha
+    )
 
 
 #################################################################################################################
@@ -99,7 +126,7 @@ def index_repo(owner: str, repo: str, branch: str = "main"):
 
         # Build contents API URL
         contents_url = (
-            f"https://api.github.com/repos/{owner}/{repo}/contents/{item.path}"
+            f"{GITHUB_API_URL}/repos/{owner}/{repo}/contents/{item.path}"
             f"?ref={branch}"
         )
 
@@ -112,98 +139,459 @@ def index_repo(owner: str, repo: str, branch: str = "main"):
         index_items.append(
             RepoIndexItem(
                 path=item.path,
-                content=file_data.get("file_content", "")
+                content=file_data.get("file_content", ""),
+                size=item.size
             )
         )
 
-    return RepoIndexResponse(items=index_items)
+    return RepoIndexResponse(items=index_items, commit_sha=tree_response.commit_sha)
 
 
 
 #################################################################################################################
 #################################################################################################################
 
-def index_repo_clone(owner: str, repo: str, branch: str = "main"):
+SKIP_DIRS = {
+    ".git", "node_modules", "venv", "env", "__pycache__",
+    "dist", "build", "target", ".idea", ".vscode"
+}
+
+BINARY_EXTS = {
+    ".png", ".jpg", ".jpeg", ".gif", ".ico",
+    ".pdf", ".zip", ".tar", ".gz", ".exe", ".dll",
+    ".so", ".dylib", ".7z", ".mp4", ".mp3"
+}
+
+MAX_FILE_SIZE = 2 * 1024 * 1024  # 2MB
+
+# Clone URL template; e.g. "file:///srv/mirrors/{owner}/{repo}.git" for a
+# local mirror or the benchmark suite's synthetic remote
+GITHUB_CLONE_URL = os.getenv("GITHUB_CLONE_URL", "https://github.com/{owner}/{repo}.git")
+
+_COMMIT_SHA_RE = re.compile(r"^[0-9a-f]{40}$")
+
+#################################################################################################################
+
+def clone_repo(owner: str, repo: str, branch: str = "main", commit_sha: str = None):
     """
-    Index the repository by cloning it locally and reading files directly.
-    This avoids GitHub API rate limits and works even for large repos.
+    Shallow-clone a branch into a temporary directory, or exactly
+    `commit_sha` when given (used to resume a job on the same commit even if
+    the branch has moved).
+    Returns (directory, commit_sha); the caller removes the directory.
     """
 
-    temp_dir = tempfile.mkdtemp()
-    repo_url = f"https://github.com/{owner}/{repo}.git"
+    # Passed to git as arguments: never let a value be parsed as an option
+    if commit_sha and not _COMMIT_SHA_RE.match(commit_sha):
+        raise ValueError(f"Invalid commit SHA '{commit_sha}'.")
 
+    temp_dir = tempfile.mkdtemp()
+    repo_url = GITHUB_CLONE_URL.format(owner=owner, repo=repo)
+
+    if commit_sha:
+        commands = [
+            ["git", "init", "--quiet", temp_dir],
+            ["git", "-C", temp_dir, "fetch", "--quiet", "--depth", "1", "--", repo_url, commit_sha],
+            ["git", "-C", temp_dir, "checkout", "--quiet", "--detach", "FETCH_HEAD"],
+        ]
+    else:
+        commands = [[
+            "git", "clone",
+            "--branch", branch,
+            "--single-branch",
+            "--depth", "1",
+            "--",
+            repo_url,
+            temp_dir
+        ]]
+
+    mode = "commit" if commit_sha else "branch"
+    start = time.perf_counter()
     try:
-        subprocess.run(
-            [
-                "git", "clone",
-                "--branch", branch,
-                "--single-branch",
-                "--depth", "1",
-                repo_url,
-                temp_dir
-            ],
-            check=True,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True
-        )
+        for command in commands:
+            subprocess.run(
+                command,
+                check=True,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True
+            )
     except subprocess.CalledProcessError as e:
         shutil.rmtree(temp_dir)
+        CLONE_FAILURES.inc(mode=mode)
         raise HTTPException(500, f"Git clone failed: {e.stderr}")
+    CLONE_LATENCY.observe(time.perf_counter() - start, mode=mode)
+    if metrics_enabled():
+        CLONE_BYTES.observe(_object_bytes(temp_dir), mode=mode)
+
+    # Record exactly which commit was indexed (used to scope caches / versions)
+    commit_sha = subprocess.run(
+        ["git", "-C", temp_dir, "rev-parse", "HEAD"],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True
+    ).stdout.strip() or None
+
+    return temp_dir, commit_sha
+
+
+def _object_bytes(repo_dir: str) -> int:
+    """Packed + loose object bytes of a checkout (`git count-objects`)."""
+    output = subprocess.run(
+        ["git", "-C", repo_dir, "count-objects", "-v"],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True
+    ).stdout
+
+    kib = 0
+    for line in output.splitlines():
+        name, _, value = line.partition(":")
+        if name in ("size", "size-pack"):
+            kib += int(value.strip() or 0)
+    return kib * 1024
 
-    index_items = []
+#################################################################################################################
 
-    SKIP_DIRS = {
-        ".git", "node_modules", "venv", "env", "__pycache__", 
-        "dist", "build", "target", ".idea", ".vscode"
-    }
+def iter_repo_files(root_dir: str):
+    """
+    Yield a RepoIndexItem per readable text file of a checkout, one file at
+    a time (skipped directories, binary extensions and files > 2MB excluded).
+    Only one file's content is held at a time.
 
-    BINARY_EXTS = {
-        ".png", ".jpg", ".jpeg", ".gif", ".ico",
-        ".pdf", ".zip", ".tar", ".gz", ".exe", ".dll",
-        ".so", ".dylib", ".7z", ".mp4", ".mp3"
-    }
+    Order is deterministic (sorted walk), so the N-th file of a commit is
+    always the same file; background jobs resume by file position.
+    """
 
-    MAX_FILE_SIZE = 2 * 1024 * 1024  # 2MB
+    for _, item in enumerate_repo_files(root_dir):
+        yield item
 
-    for root, dirs, files in os.walk(temp_dir):
 
-        # Skip unwanted directories
-        if any(skip in root.split(os.sep) for skip in SKIP_DIRS):
-            continue
+def enumerate_repo_files(root_dir: str, start: int = 0):
+    """
+    `iter_repo_files` as (position, RepoIndexItem) pairs, starting at
+    `start`. Positions count candidate files (those that pass the directory,
+    extension and size filters), readable or not, so the first `start` are
+    passed over from the sorted walk and a stat alone, without being opened.
+    Paginated sources resume at a cursor position this way.
 
-        for filename in files:
+    Metrics count only from `start` on: a file is scanned when it is yielded.
+    """
 
-            # Skip binary extensions
-            if any(filename.lower().endswith(ext) for ext in BINARY_EXTS):
-                continue
+    # Counted locally and published once (also when the consumer stops early)
+    position, scanned, binary, too_large, unreadable = 0, 0, 0, 0, 0
+    try:
+        for root, dirs, files in os.walk(root_dir):
 
-            file_path = os.path.join(root, filename)
+            # Skip unwanted directories (pruned, so they are not walked at all)
+            dirs[:] = sorted(d for d in dirs if d not in SKIP_DIRS)
 
-            # Skip large files (>2MB)
-            if os.path.getsize(file_path) > MAX_FILE_SIZE:
-                continue
+            for filename in sorted(files):
+                # Skip binary extensions
+                if any(filename.lower().endswith(ext) for ext in BINARY_EXTS):
+                    binary += position >= start
+                    continue
 
-            rel_path = os.path.relpath(file_path, temp_dir)
+                file_path = os.path.join(root, filename)
 
-            try:
-                with open(file_path, "r", encoding="utf-8") as f:
-                    content = f.read()
-            except Exception:
-                continue
+                # Skip large files (>2MB)
+                size = os.path.getsize(file_path)
+                if size > MAX_FILE_SIZE:
+                    too_large += position >= start
+                    continue
+
+                position += 1
+                if position <= start:
+                    continue
+
+                rel_path = os.path.relpath(file_path, root_dir)
 
-            index_items.append(
-                RepoIndexItem(
+                try:
+                    with open(file_path, "r", encoding="utf-8") as f:
+                        content = f.read()
+                except Exception:
+                    unreadable += 1
+                    continue
+
+                scanned += 1
+                yield position - 1, RepoIndexItem(
                     path=rel_path,
-                    content=content
+                    content=content,
+                    size=size
                 )
+    finally:
+        FILES_SCANNED.inc(scanned)
+        FILES_SKIPPED.inc(binary, reason="binary")
+        FILES_SKIPPED.inc(too_large, reason="too_large")
+        FILES_SKIPPED.inc(unreadable, reason="unreadable")
+
+#################################################################################################################
+
+def index_repo_clone(owner: str, repo: str, branch: str = "main"):
+    """
+    Index the repository by cloning it locally and reading files directly.
+    This avoids GitHub API rate limits and works even for large repos.
+    """
+
+    temp_dir, commit_sha = clone_repo(owner, repo, branch)
+    try:
+        index_items = list(iter_repo_files(temp_dir))
+    finally:
+        shutil.rmtree(temp_dir)
+
+    return RepoIndexResponse(items=index_items, commit_sha=commit_sha)
+
+
+#################################################################################################################
+#################################################################################################################
+
+#################################################################################################################
+#################################################################################################################
+
+# Paginated listings re-read the same commit for every page. Recent checkouts
+# are kept (CHECKOUT_CACHE_SIZE, idle for at most CHECKOUT_CACHE_TTL seconds)
+# so a page costs a directory walk instead of a clone.
+CHECKOUT_CACHE_SIZE = int(os.getenv("CHECKOUT_CACHE_SIZE", "4"))
+CHECKOUT_CACHE_TTL = float(os.getenv("CHECKOUT_CACHE_TTL", "600"))
+
+
+class CheckoutCache:
+    """
+    Shallow checkouts keyed by (owner, repo, commit_sha), reference counted:
+    a checkout in use (e.g. while a response streams) is never removed.
+    """
+
+    def __init__(self, size: int = CHECKOUT_CACHE_SIZE, ttl: float = CHECKOUT_CACHE_TTL):
+        self.size = size
+        self.ttl = ttl
+        self._entries: "OrderedDict[tuple, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def acquire(self, owner: str, repo: str, branch: str = "main", commit_sha: str = None):
+        """
+        (directory, commit_sha) of a checkout; `commit_sha` pins the commit,
+        otherwise the branch head is cloned. Pair with `release`.
+        """
+
+        if commit_sha:
+            with self._lock:
+                entry = self._entries.get((owner, repo, commit_sha))
+                if entry is not None:
+                    entry["users"] += 1
+                    self._entries.move_to_end((owner, repo, commit_sha))
+                    return entry["dir"], commit_sha
+
+        # Concurrent requests for the same branch head / commit share one clone.
+        # The clone is registered inside the shared call, counting the
+        # leader's use; followers count theirs only if that same entry is
+        # still cached (the leader may have released it and had it evicted),
+        # otherwise they clone again.
+        while True:
+            led = []
+
+            def clone_and_register():
+                directory, sha = clone_repo(owner, repo, branch, commit_sha=commit_sha)
+                key = (owner, repo, sha)
+                with self._lock:
+                    entry = self._entries.get(key)
+                    if entry is None:
+                        entry = self._entries[key] = {"dir": directory, "users": 0, "last_used": time.monotonic()}
+                        directory = None
+                    entry["users"] += 1
+                    self._entries.move_to_end(key)
+                    led.append(True)
+                if directory is not None:
+                    # A separate clone of the same commit was registered first
+                    shutil.rmtree(directory, ignore_errors=True)
+                return key, entry
+
+            key, entry = get_single_flight().do(
+                ("clone", owner, repo, commit_sha or branch), clone_and_register, ttl=0
             )
+            if led:
+                break
+            with self._lock:
+                if self._entries.get(key) is entry:
+                    entry["users"] += 1
+                    self._entries.move_to_end(key)
+                    break
+
+        self._evict()
+        return entry["dir"], key[2]
+
+    def release(self, owner: str, repo: str, commit_sha: str):
+        with self._lock:
+            entry = self._entries.get((owner, repo, commit_sha))
+            if entry is not None:
+                entry["users"] -= 1
+                entry["last_used"] = time.monotonic()
+        self._evict()
+
+    def _evict(self):
+        now = time.monotonic()
+        removed = []
+        with self._lock:
+            idle = [key for key, entry in self._entries.items() if entry["users"] <= 0]
+            excess = len(self._entries) - self.size
+            for key in idle:                                    # oldest first
+                if excess > 0 or now - self._entries[key]["last_used"] > self.ttl:
+                    removed.append(self._entries.pop(key)["dir"])
+                    excess -= 1
+        for directory in removed:
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+_checkouts = CheckoutCache()
+
+
+def get_checkout_cache() -> CheckoutCache:
+    return _checkouts
 
-    shutil.rmtree(temp_dir)
-    return RepoIndexResponse(items=index_items)
+#################################################################################################################
 
+def clone_files_source(owner: str, repo: str, branch: str = "main", cursor_state: dict = None) -> BulkSource:
+    """
+    Files of a clone as a paginated bulk source (see pagination_services).
+    Cursor state: {"commit", "offset"}.
+    """
+
+    cursor_state = cursor_state or {}
+    offset = cursor_state.get("offset", 0)
+    cache = get_checkout_cache()
+    root_dir, commit_sha = cache.acquire(owner, repo, branch, cursor_state.get("commit"))
+
+    def entries():
+        for position, item in enumerate_repo_files(root_dir, offset):
+            yield item, {"offset": position + 1}
+
+    return BulkSource(
+        "files", f"{owner}/{repo}", commit_sha, entries(),
+        close=lambda: cache.release(owner, repo, commit_sha)
+    )
+
+
+def crawl_files_source(
+    owner: str,
+    repo: str,
+    branch: str = "main",
+    cursor_state: dict = None,
+    with_content: bool = True
+) -> BulkSource:
+    """
+    Files via the GitHub API (as `index_repo`) as a paginated bulk source.
+    Contents are downloaded only for the files of the requested page, and
+    not at all without `with_content` (path and size come from the tree).
+    Files whose download fails are listed in `skipped`.
+    Cursor state: {"commit", "offset"} (position among the tree's blobs).
+    """
+
+    cursor_state = cursor_state or {}
+    offset = cursor_state.get("offset", 0)
+    tree = fetch_repo_tree(owner, repo, branch, commit_sha=cursor_state.get("commit"))
+    blobs = [item for item in tree.tree if item.type == "blob"]
+    skipped: List[str] = []
+
+    def entries():
+        for position in range(offset, len(blobs)):
+            item = blobs[position]
+            content = ""
+            if with_content:
+                contents_url = (
+                    f"{GITHUB_API_URL}/repos/{owner}/{repo}/contents/{item.path}"
+                    f"?ref={tree.commit_sha or branch}"
+                )
+                try:
+                    content = fetch_file_content(contents_url).get("file_content", "")
+                except Exception:
+                    skipped.append(item.path)
+                    continue
+            yield RepoIndexItem(path=item.path, content=content, size=item.size), {"offset": position + 1}
+
+    return BulkSource("crawl", f"{owner}/{repo}", tree.commit_sha, entries(), skipped=skipped)
 
 #################################################################################################################
 #################################################################################################################
 
+# Async variants (see http_client_services): GitHub calls are awaited on the
+# shared client. (The clone-based listings stay sync routes: their work is
+# git and disk IO, which Starlette already runs in its threadpool.)
+
+async def _github_json(url: str, what: str) -> dict:
+    response = await http_request("GET", url, headers=github_headers())
+    record_github_call(what, response)
+    if response.status_code != 200:
+        raise HTTPException(
+            status_code=502,
+            detail=f"GitHub API error ({what}): {response.text}"
+        )
+    return response.json()
+
+
+@single_flight("fetch_repo_tree")
+async def fetch_repo_tree_async(owner: str, repo: str, branch: str = "main", commit_sha: str = None) -> RepoTreeResponse:
+    if commit_sha:
+        commit_url = f"{GITHUB_API_URL}/repos/{owner}/{repo}/git/commits/{commit_sha}"
+    else:
+        ref_data = await _github_json(f"{GITHUB_API_URL}/repos/{owner}/{repo}/git/refs/heads/{branch}", "ref")
+        commit_sha = ref_data["object"].get("sha")
+        commit_url = ref_data["object"]["url"]
+
+    commit_data = await _github_json(commit_url, "commit")
+    tree_data = await _github_json(commit_data["tree"]["url"] + "?recursive=1", "tree")
+    return _parse_tree(tree_data, commit_sha)
+
+
+async def crawl_files_source_async(
+    owner: str,
+    repo: str,
+    branch: str = "main",
+    cursor_state: dict = None,
+    with_content: bool = True,
+    limit: int = None
+) -> BulkSource:
+    """
+    Like `crawl_files_source`, but the contents of the page (`limit` files,
+    or all) are downloaded concurrently before the response is written.
+
+    Failed downloads are skipped and listed in `skipped`; more blobs are
+    fetched until the page has `limit` files plus the one extra that tells
+    whether a next page exists, or the tree is exhausted. Each file's
+    cursor points at the next downloaded file, so the failures of a page
+    are reported once and not retried by the next one.
+    """
 
+    cursor_state = cursor_state or {}
+    offset = cursor_state.get("offset", 0)
+    tree = await fetch_repo_tree_async(owner, repo, branch, commit_sha=cursor_state.get("commit"))
+    blobs = [item for item in tree.tree if item.type == "blob"]
+
+    async def fetch(position: int, item: RepoTreeItem):
+        content = ""
+        if with_content:
+            contents_url = (
+                f"{GITHUB_API_URL}/repos/{owner}/{repo}/contents/{item.path}"
+                f"?ref={tree.commit_sha or branch}"
+            )
+            try:
+                content = (await fetch_file_content_async(contents_url)).get("file_content", "")
+            except Exception:
+                return None
+        return RepoIndexItem(path=item.path, content=content, size=item.size)
+
+    # One extra file tells whether a next page exists
+    wanted = None if limit is None else limit + 1
+    fetched: List[Tuple[int, Optional[RepoIndexItem]]] = []
+    position, found = offset, 0
+    while position < len(blobs) and (wanted is None or found < wanted):
+        window = range(position, len(blobs) if wanted is None else min(len(blobs), position + wanted - found))
+        for p, record in zip(window, await gather_bounded(fetch(p, blobs[p]) for p in window)):
+            fetched.append((p, record))
+            found += record is not None
+        position = window[-1] + 1
+
+    records = [(p, record) for p, record in fetched if record is not None]
+    skipped = [blobs[p].path for p, record in fetched if record is None]
+    entries = [
+        (record, {"offset": records[i + 1][0] if i + 1 < len(records) else position})
+        for i, (_, record) in enumerate(records)
+    ]
+    return BulkSource("crawl", f"{owner}/{repo}", tree.commit_sha, iter(entries), skipped=skipped)
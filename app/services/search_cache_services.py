@@ -0,0 +1,206 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import List, Optional
+
+import numpy as np
+
+
+# ========================================
+# Search Result Cache — Design Notes
+# ========================================
+
+# Re-reviews of a PR (new pushes, retries, re-runs) issue the same retrieval
+# queries against an index that has not changed. Results are cached per query
+# vector, in two tiers:
+
+# - memory: LRU of up to SEARCH_CACHE_SIZE entries
+# - disk:   optional SQLite LRU under SEARCH_CACHE_DIR (survives restarts)
+
+# Key = (collection, indexed commit SHA, index generation,
+#        hash of the normalised query embedding, top_k, filters)
+
+# The indexed commit and generation are read from the vector store metadata
+# at query time, and `store_repo_embedding` bumps the generation whenever it
+# writes. A re-index therefore changes every key for that collection, so
+# stale entries can never be served; `invalidate(collection)` additionally
+# drops them eagerly to free space.
+
+# ========================================
+
+
+SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", "4096"))
+SEARCH_CACHE_DIR = os.getenv("SEARCH_CACHE_DIR")           # unset = memory only
+SEARCH_CACHE_DISK_SIZE = int(os.getenv("SEARCH_CACHE_DISK_SIZE", "100000"))
+
+
+#################################################################################################################
+#################################################################################################################
+
+def _vector_hash(vector: List[float]) -> str:
+    """
+    Hash of a normalised query vector. Rounded to float16 so that bit-level
+    noise between identical embedding calls does not defeat the cache.
+    """
+    return hashlib.sha256(np.asarray(vector, dtype=np.float16).tobytes()).hexdigest()
+
+
+def make_cache_key(
+    collection: str,
+    commit_sha: Optional[str],
+    generation: int,
+    vector: List[float],
+    top_k: int,
+    filters: Optional[dict] = None
+) -> str:
+    parts = [
+        collection,
+        commit_sha or "",
+        str(generation),
+        _vector_hash(vector),
+        str(top_k),
+        json.dumps(filters or {}, sort_keys=True),
+    ]
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+
+#################################################################################################################
+#################################################################################################################
+
+class SearchResultCache:
+    """
+    Two-tier LRU for per-query vector search hits.
+    Values are JSON-serialisable hit lists as returned by `VectorStore.query`.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = SEARCH_CACHE_SIZE,
+        disk_dir: Optional[str] = SEARCH_CACHE_DIR,
+        disk_max_entries: int = SEARCH_CACHE_DISK_SIZE
+    ):
+        self.max_entries = max_entries
+        self.disk_max_entries = disk_max_entries
+
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()   # key -> (collection, value)
+        self._lock = threading.Lock()
+        self._db = None
+
+        self._counters = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "puts": 0,
+            "invalidations": 0,
+        }
+
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+            self._db = sqlite3.connect(
+                os.path.join(disk_dir, "search_cache.sqlite3"),
+                check_same_thread=False
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                " key TEXT PRIMARY KEY, collection TEXT, value TEXT, accessed REAL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS cache_collection ON cache(collection)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS cache_accessed ON cache(accessed)")
+            self._db.commit()
+
+    # ---------------------------------------------------------------------------------------------
+
+    def _remember(self, key: str, collection: str, value: list):
+        self._memory[key] = (collection, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[list]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self._counters["memory_hits"] += 1
+                return entry[1]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT collection, value FROM cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    self._db.execute("UPDATE cache SET accessed = ? WHERE key = ?", (time.time(), key))
+                    self._db.commit()
+                    value = json.loads(row[1])
+                    self._remember(key, row[0], value)
+                    self._counters["disk_hits"] += 1
+                    return value
+
+            self._counters["misses"] += 1
+            return None
+
+    def put(self, key: str, collection: str, value: list):
+        with self._lock:
+            self._remember(key, collection, value)
+            self._counters["puts"] += 1
+
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO cache (key, collection, value, accessed) VALUES (?, ?, ?, ?)",
+                    (key, collection, json.dumps(value), time.time())
+                )
+                overflow = self._db.execute("SELECT COUNT(*) FROM cache").fetchone()[0] - self.disk_max_entries
+                if overflow > 0:
+                    self._db.execute(
+                        "DELETE FROM cache WHERE key IN ("
+                        " SELECT key FROM cache ORDER BY accessed ASC LIMIT ?)",
+                        (overflow,)
+                    )
+                self._db.commit()
+
+    def invalidate(self, collection: str):
+        """Drop every cached result for a collection (called on re-index)."""
+        with self._lock:
+            for key in [k for k, (c, _) in self._memory.items() if c == collection]:
+                del self._memory[key]
+            if self._db is not None:
+                self._db.execute("DELETE FROM cache WHERE collection = ?", (collection,))
+                self._db.commit()
+            self._counters["invalidations"] += 1
+
+    # ---------------------------------------------------------------------------------------------
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._counters["memory_hits"] + self._counters["disk_hits"] + self._counters["misses"]
+            hits = lookups - self._counters["misses"]
+            disk_entries = (
+                self._db.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+                if self._db is not None else None
+            )
+            return {
+                **self._counters,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "disk_entries": disk_entries,
+            }
+
+
+#################################################################################################################
+
+_cache: Optional[SearchResultCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_search_cache() -> SearchResultCache:
+    """Process-wide cache singleton."""
+    global _cache
+
+    with _cache_lock:
+        if _cache is None:
+            _cache = SearchResultCache()
+        return _cache
@@ -0,0 +1,221 @@
+import os
+import time
+import asyncio
+import weakref
+import functools
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+
+# ========================================
+# Single-Flight Coalescing — Design Notes
+# ========================================
+
+# Two reviewers, or a client retry, asking for the same repo at the same
+# time used to clone it twice into separate temp dirs and do all the work
+# twice. GitHub fetches were duplicated the same way.
+
+# `SingleFlight.do(key, fn)` runs `fn` once per key at a time: the first
+# caller (leader) runs it, identical calls arriving while it runs wait and
+# receive the same result, or the same exception. Keys are
+# (operation, owner, repo, ref, ...) tuples.
+
+# - Sync callers (threadpool routes, jobs) wait on a threading.Event.
+# - Async callers share one asyncio Task per key and event loop, awaited
+#   through `asyncio.shield`: a client that disconnects does not cancel
+#   the work for the others.
+# - Optional reuse: with `ttl > 0` a successful result is also returned to
+#   calls arriving up to `ttl` seconds after completion
+#   (SINGLE_FLIGHT_TTL, default 0 = only in-flight calls are shared).
+#   Failures are never kept.
+
+# Shared results are the same object for every caller and must be
+# treated as read-only.
+
+# Applied to:
+# - GitHub fetch functions (sync and async), via the `single_flight`
+#   decorator
+# - cloning a branch head in the checkout cache
+# - JSON bodies of the clone-based bulk routes
+#   (/repo_index/index_repo_clone, /chunk/chunk_repo), keyed by every
+#   request parameter. NDJSON streams are written per client and are not
+#   shared.
+
+# ========================================
+
+
+SINGLE_FLIGHT_TTL = float(os.getenv("SINGLE_FLIGHT_TTL", "0"))
+SINGLE_FLIGHT_MAX_RECENT = int(os.getenv("SINGLE_FLIGHT_MAX_RECENT", "256"))
+
+_MISS = object()
+
+
+class _Call:
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+#################################################################################################################
+#################################################################################################################
+
+class SingleFlight:
+    """
+    Per-key deduplication of concurrent calls, for threads (`do`) and
+    coroutines (`do_async`).
+    """
+
+    def __init__(self, ttl: float = SINGLE_FLIGHT_TTL, max_recent: int = SINGLE_FLIGHT_MAX_RECENT):
+        self.ttl = ttl
+        self.max_recent = max_recent
+
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._tasks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Hashable, asyncio.Task]]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._recent: "OrderedDict[Hashable, tuple]" = OrderedDict()      # key -> (expires_at, result)
+
+        self.stats = {"calls": 0, "executions": 0, "shared": 0, "reused": 0, "errors": 0}
+
+    # ---- recent results ----------------------------------------------------------------------
+
+    def _recent_get(self, key: Hashable):
+        """Caller holds the lock."""
+        entry = self._recent.get(key)
+        if entry is None:
+            return _MISS
+        if entry[0] < time.monotonic():
+            del self._recent[key]
+            return _MISS
+        return entry[1]
+
+    def _remember(self, key: Hashable, result: Any, ttl: float):
+        """Caller holds the lock."""
+        if ttl <= 0:
+            return
+        self._recent[key] = (time.monotonic() + ttl, result)
+        self._recent.move_to_end(key)
+        while len(self._recent) > self.max_recent:
+            self._recent.popitem(last=False)
+
+    def forget(self, key: Hashable):
+        with self._lock:
+            self._recent.pop(key, None)
+
+    # ---- sync --------------------------------------------------------------------------------
+
+    def do(self, key: Hashable, fn: Callable[[], Any], ttl: Optional[float] = None) -> Any:
+        ttl = self.ttl if ttl is None else ttl
+
+        with self._lock:
+            self.stats["calls"] += 1
+            recent = self._recent_get(key)
+            if recent is not _MISS:
+                self.stats["reused"] += 1
+                return recent
+
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.stats["executions"] += 1
+            else:
+                self.stats["shared"] += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+                if call.error is None:
+                    self._remember(key, call.result, ttl)
+                else:
+                    self.stats["errors"] += 1
+            call.event.set()
+        return call.result
+
+    # ---- async -------------------------------------------------------------------------------
+
+    async def do_async(self, key: Hashable, fn: Callable[[], Awaitable[Any]], ttl: Optional[float] = None) -> Any:
+        ttl = self.ttl if ttl is None else ttl
+        loop = asyncio.get_running_loop()
+
+        with self._lock:
+            self.stats["calls"] += 1
+            recent = self._recent_get(key)
+            if recent is not _MISS:
+                self.stats["reused"] += 1
+                return recent
+
+            tasks = self._tasks.setdefault(loop, {})
+            task = tasks.get(key)
+            if task is None:
+                task = tasks[key] = loop.create_task(self._lead(key, fn, ttl, tasks))
+                self.stats["executions"] += 1
+            else:
+                self.stats["shared"] += 1
+
+        return await asyncio.shield(task)
+
+    async def _lead(self, key: Hashable, fn: Callable[[], Awaitable[Any]], ttl: float, tasks: dict) -> Any:
+        try:
+            result = await fn()
+        except BaseException:
+            with self._lock:
+                tasks.pop(key, None)
+                self.stats["errors"] += 1
+            raise
+
+        with self._lock:
+            tasks.pop(key, None)
+            self._remember(key, result, ttl)
+        return result
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {**self.stats, "in_flight": len(self._calls) + sum(len(t) for t in self._tasks.values())}
+
+
+#################################################################################################################
+
+_flight = SingleFlight()
+
+
+def get_single_flight() -> SingleFlight:
+    return _flight
+
+
+def single_flight(operation: str, ttl: Optional[float] = None):
+    """
+    Decorator: concurrent calls with equal arguments share one execution.
+    Works for plain and `async def` functions; arguments must be hashable.
+    """
+
+    def decorate(fn):
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                key = (operation, args, tuple(sorted(kwargs.items())))
+                return await _flight.do_async(key, lambda: fn(*args, **kwargs), ttl)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            key = (operation, args, tuple(sorted(kwargs.items())))
+            return _flight.do(key, lambda: fn(*args, **kwargs), ttl)
+        return wrapper
+
+    return decorate
@@ -0,0 +1,231 @@
+import os
+import re
+import json
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .index_version_services import version_dir
+
+
+# ========================================
+# Symbol Index — Design Notes
+# ========================================
+
+# For a review, the most useful context is usually the definition of the
+# functions and classes a diff calls. Vector search finds those fuzzily and
+# costs an embedding per query; a symbol table finds them exactly and for
+# free.
+
+# Definitions are detected per chunk in `chunk_repo_contents` with the same
+# line-start heuristics `chunk_text` uses for boundaries (`def `, `class `,
+# top-level blocks), extended per language (func / fn / struct / interface /
+# arrow functions / C-style signatures ...). The result is stored on the
+# chunk (`RepoChunk.symbols`).
+
+# At store time the symbols of a commit are written next to its version
+# manifest:
+
+#     <REPO_INDEX_DATA_DIR>/<collection>/versions/<commit>/symbols.json
+#         {identifier: [[file_path, chunk_id, local_index, content_hash], ...]}
+
+# Lookup extracts identifiers from a patch, resolves them through this
+# table and reads the definition chunks from the content store: one dict
+# lookup per identifier, no embedding and no vector query.
+
+# ========================================
+
+
+_IDENT = r"([A-Za-z_$][\w$]*)"
+
+_C_LIKE_SIGNATURE = re.compile(
+    r"^\s*(?!(?:return|new|else|throw|case|delete|await|yield)\b)(?:[\w:<>,*&\[\]]+\s+)+\**" + _IDENT + r"\s*\([^;]*$"
+)
+
+DEFINITION_PATTERNS: Dict[str, List["re.Pattern"]] = {
+    "python": [
+        re.compile(r"^\s*(?:async\s+)?def\s+" + _IDENT),
+        re.compile(r"^\s*class\s+" + _IDENT),
+        re.compile(r"^" + _IDENT + r"\s*(?::[^=]+)?=(?!=)"),             # module-level constant
+    ],
+    "javascript": [
+        re.compile(r"^\s*(?:export\s+)?(?:default\s+)?(?:async\s+)?function\s*\*?\s*" + _IDENT),
+        re.compile(r"^\s*(?:export\s+)?(?:default\s+)?class\s+" + _IDENT),
+        re.compile(r"^\s*(?:export\s+)?(?:const|let|var)\s+" + _IDENT + r"\s*=\s*(?:async\s*)?(?:function|\([^)]*\)\s*=>|[\w$]+\s*=>)"),
+        re.compile(r"^\s+(?:static\s+)?(?:async\s+)?(?!if\b|for\b|while\b|switch\b|catch\b|return\b)" + _IDENT + r"\s*\([^)]*\)\s*\{"),
+    ],
+    "go": [
+        re.compile(r"^func\s+(?:\([^)]*\)\s*)?" + _IDENT),
+        re.compile(r"^type\s+" + _IDENT),
+    ],
+    "rust": [
+        re.compile(r"^\s*(?:pub(?:\([^)]*\))?\s+)?(?:const\s+)?(?:async\s+)?(?:unsafe\s+)?fn\s+" + _IDENT),
+        re.compile(r"^\s*(?:pub(?:\([^)]*\))?\s+)?(?:struct|enum|trait|type|mod|union)\s+" + _IDENT),
+        re.compile(r"^\s*macro_rules!\s*" + _IDENT),
+    ],
+    "java": [
+        re.compile(r"^\s*(?:[\w@]+\s+)*(?:class|interface|enum|record)\s+" + _IDENT),
+        _C_LIKE_SIGNATURE,
+    ],
+    "c": [
+        re.compile(r"^\s*(?:typedef\s+)?(?:struct|union|enum)\s+" + _IDENT + r"\s*\{?\s*$"),
+        re.compile(r"^\s*#\s*define\s+" + _IDENT),
+        _C_LIKE_SIGNATURE,
+    ],
+}
+DEFINITION_PATTERNS["typescript"] = DEFINITION_PATTERNS["javascript"] + [
+    re.compile(r"^\s*(?:export\s+)?(?:declare\s+)?(?:abstract\s+)?(?:interface|type|enum|namespace)\s+" + _IDENT),
+]
+DEFINITION_PATTERNS["csharp"] = DEFINITION_PATTERNS["java"] + [
+    re.compile(r"^\s*(?:[\w]+\s+)*struct\s+" + _IDENT),
+]
+DEFINITION_PATTERNS["cpp"] = DEFINITION_PATTERNS["c"] + [
+    re.compile(r"^\s*(?:template\s*<[^>]*>\s*)?(?:class|struct|namespace)\s+" + _IDENT),
+]
+
+# Keywords that signature heuristics or patch tokenising can mistake for names
+_NOT_SYMBOLS = {
+    "if", "for", "while", "switch", "return", "catch", "else", "new", "delete",
+    "sizeof", "case", "throw", "do", "try", "elif", "with", "import", "from",
+    "self", "this", "super", "None", "True", "False", "null", "true", "false",
+    "def", "class", "function", "const", "let", "var", "async", "await", "pass",
+    "in", "is", "not", "and", "or", "lambda", "yield", "raise", "except", "finally",
+    "break", "continue", "public", "private", "protected", "static", "void",
+    "func", "fn", "pub", "impl", "struct", "interface", "enum", "export", "default",
+}
+
+_REFERENCE = re.compile(r"[A-Za-z_$][\w$]*")
+
+# Identifiers with more definitions than this are too generic to resolve
+# (`__init__`, `get`, `main` ...)
+MAX_DEFINITIONS_PER_SYMBOL = int(os.getenv("MAX_DEFINITIONS_PER_SYMBOL", "5"))
+
+
+#################################################################################################################
+#################################################################################################################
+
+def extract_definitions(content: str, language: Optional[str]) -> List[str]:
+    """
+    Names defined in a chunk of source, in order of appearance, without
+    duplicates. Unknown languages yield nothing.
+    """
+
+    patterns = DEFINITION_PATTERNS.get(language or "")
+    if not patterns:
+        return []
+
+    names = []
+    for line in content.split("\n"):
+        for pattern in patterns:
+            match = pattern.match(line)
+            if match:
+                name = match.group(1)
+                if name not in _NOT_SYMBOLS and len(name) > 1 and name not in names:
+                    names.append(name)
+                break
+    return names
+
+
+def extract_references(patch: str) -> List[str]:
+    """
+    Identifiers a unified diff refers to, most relevant first: names on added
+    lines, then on context and removed lines, each in order of appearance.
+    """
+
+    added, other = [], []
+    for line in patch.split("\n"):
+        if line.startswith(("+++", "---", "@@", "diff ", "index ")):
+            continue
+        target = added if line.startswith("+") else other
+        target.extend(_REFERENCE.findall(line[1:] if line[:1] in "+- " else line))
+
+    seen, ordered = set(), []
+    for name in added + other:
+        if name not in seen and name not in _NOT_SYMBOLS and len(name) > 1:
+            seen.add(name)
+            ordered.append(name)
+    return ordered
+
+#################################################################################################################
+
+class SymbolIndex:
+    """
+    identifier -> [(file_path, chunk_id, local_index, content_hash), ...]
+    """
+
+    def __init__(self, symbols: Optional[Dict[str, List[Tuple[str, int, int, str]]]] = None):
+        self.symbols = symbols or {}
+
+    def add(self, name: str, file_path: str, chunk_id: int, local_index: int, content_hash: str):
+        self.symbols.setdefault(name, []).append((file_path, chunk_id, local_index, content_hash))
+
+    def lookup(self, name: str) -> List[Tuple[str, int, int, str]]:
+        return self.symbols.get(name, [])
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def content_hashes(self) -> set:
+        return {entry[3] for entries in self.symbols.values() for entry in entries}
+
+    def to_json(self) -> dict:
+        return {name: [list(entry) for entry in entries] for name, entries in self.symbols.items()}
+
+    @classmethod
+    def from_json(cls, data: dict) -> "SymbolIndex":
+        return cls({name: [tuple(entry) for entry in entries] for name, entries in data.items()})
+
+
+#################################################################################################################
+#################################################################################################################
+
+_loaded: Dict[str, Tuple[float, SymbolIndex]] = {}
+_loaded_lock = threading.Lock()
+
+
+def _index_path(collection_name: str, version: str) -> str:
+    return os.path.join(version_dir(collection_name, version), "symbols.json")
+
+
+def save_symbol_index(collection_name: str, version: str, index: SymbolIndex):
+    path = _index_path(collection_name, version)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(index.to_json(), f)
+    os.replace(tmp, path)
+
+    with _loaded_lock:
+        _loaded[path] = (os.path.getmtime(path), index)
+
+
+def load_symbol_index(collection_name: str, version: str) -> Optional[SymbolIndex]:
+    """
+    Symbol table of one indexed version, or None if it has none.
+    Cached in-process until the file changes.
+    """
+    path = _index_path(collection_name, version)
+    if not os.path.exists(path):
+        return None
+
+    mtime = os.path.getmtime(path)
+    with _loaded_lock:
+        cached = _loaded.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+
+    with open(path, "r", encoding="utf-8") as f:
+        index = SymbolIndex.from_json(json.load(f))
+
+    with _loaded_lock:
+        _loaded[path] = (mtime, index)
+    return index
+
+
+def build_symbol_index(entries: Iterable[Tuple[Iterable[str], str, int, int, str]]) -> SymbolIndex:
+    """Build from (names, file_path, chunk_id, local_index, content_hash) per chunk."""
+    index = SymbolIndex()
+    for names, file_path, chunk_id, local_index, content_hash in entries:
+        for name in names:
+            index.add(name, file_path, chunk_id, local_index, content_hash)
+    return index
@@ -1,12 +1,88 @@
-from ..schema import  RepoChunksResponse
+from ..schema import (
+    RepoChunksResponse,
+    RepoChunk,
+    VectorRepoInitRequest,
+    VectorSearchResult,
+    ChunkAlias,
+    VectorSearchResponse,
+    VectorBatchSearchResponse,
+    SymbolDefinition,
+    SymbolLookupResponse
+)
+from .embedding_services import embed_texts, truncate_embedding
+from .embedding_pool_services import LocalEmbeddingPool
+from .chunk_services import chunk_file
+from .repo_index_services import clone_repo, iter_repo_files
+from .pipeline_services import Pipeline, Stage
+from .vector_store_services import (
+    VectorStore,
+    ChromaVectorStore,
+    FlatVectorStore,
+    SearchFilter,
+    FLAT_INDEX_DIR,
+    path_prefix_metadata
+)
+from .search_cache_services import get_search_cache, make_cache_key
+from .metrics_services import VECTOR_UPSERT_LATENCY, record_embedding_batch
+from .chunk_store_services import get_chunk_store
+from .near_duplicate_services import NearDuplicateIndex, NEAR_DUP_THRESHOLD
+from .symbol_index_services import (
+    MAX_DEFINITIONS_PER_SYMBOL,
+    build_symbol_index,
+    extract_definitions,
+    extract_references,
+    save_symbol_index,
+    load_symbol_index
+)
+from .neighbour_index_services import NeighbourIndex, save_neighbour_index, load_neighbour_index
+from .index_version_services import (
+    version_key,
+    save_version,
+    load_version,
+    resolve_version,
+    list_versions,
+    delete_version,
+    referenced_contents,
+    referenced_ids
+)
 import chromadb
 from chromadb.config import Settings
+import numpy as np
+import hashlib
+import shutil
+import threading
+import time
 import os
-from typing import Optional
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
 
 
 CHROMA_PERSISTANT_DIR = os.getenv("CHROMA_PERSISTANT_DIR","./.chroma_db")
 
+# "chroma" (default) or "flat" (in-process memory-mapped exact index)
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma").lower()
+
+# Ids checked / vectors written per vector-DB call
+UPSERT_BATCH_SIZE = int(os.getenv("VECTOR_UPSERT_BATCH_SIZE", "1000"))
+# Texts handed to the embedding provider per call
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "256"))
+# >1 enables the multi-process pool for provider "local"
+LOCAL_EMBED_WORKERS = int(os.getenv("LOCAL_EMBED_WORKERS", "1"))
+# Concurrent embedding batches in the indexing pipeline (remote providers)
+EMBED_PIPELINE_WORKERS = int(os.getenv("EMBED_PIPELINE_WORKERS", "2"))
+
+# Bump when the per-chunk metadata layout changes; stored chunks written with
+# an older layout are re-written on the next index run.
+CHUNK_METADATA_VERSION = 2
+
+_client = None
+
+_stores: Dict[str, VectorStore] = {}
+_stores_lock = threading.Lock()
+
+# Serialises indexing and garbage collection of the same repo, so GC never
+# sees vectors whose version manifest has not been written yet.
+_collection_locks: Dict[str, threading.Lock] = {}
+
 #################################################################################################################
 #################################################################################################################
 
@@ -45,7 +121,21 @@ def _normalize_collection_name(repo_name: str) -> str:
 
 #################################################################################################################
 
-def get_collection(repo_name: str, embedding_dim: Optional[int] = None):
+def _dim_reduction_method(embedding_provider: Optional[str]) -> str:
+    """
+    How a reduced output dimension is produced for a provider:
+    - "api": requested from the provider (`dimensions` / `outputDimensionality`)
+    - "truncate": local Matryoshka-style truncate-and-renormalise
+    """
+    return "api" if embedding_provider in ("openai", "gemini") else "truncate"
+
+#################################################################################################################
+
+def get_collection(
+    repo_name: str,
+    embedding_dim: Optional[int] = None,
+    embedding_provider: Optional[str] = None
+):
     """
     Return the vector collection associated with a repository.
 
@@ -56,45 +146,1052 @@ def get_collection(repo_name: str, embedding_dim: Optional[int] = None):
     - One collection per repository
     - Deterministic, safe collection naming
     - Optional validation of embedding dimensionality
+
+    `embedding_dim` is the repo's (possibly reduced) output dimension. It is
+    recorded together with the provider and the reduction method, and every
+    later call that passes it is validated against the stored value.
     """
 
     client = get_client()
     collection_name = _normalize_collection_name(repo_name=repo_name)
 
+    metadata = {"repo_name": repo_name}
+    if embedding_dim is not None:
+        metadata["embedding_dim"] = embedding_dim
+    if embedding_provider is not None:
+        metadata["embedding_provider"] = embedding_provider
+        metadata["dim_reduction"] = _dim_reduction_method(embedding_provider)
+
     collection = client.get_or_create_collection(
-    name=collection_name,
-    metadata={"repo_name": repo_name} if embedding_dim is None else {
-        "repo_name": repo_name,
-        "embedding_dim": embedding_dim
-    }
-)
+        name=collection_name,
+        metadata=metadata
+    )
+
+    stored = collection.metadata or {}
+    _validate_repo_config(repo_name, stored, embedding_dim, embedding_provider)
+
+    # `metadata=` above only applies when the collection is created. Keys
+    # first known on a later call (e.g. the native dimension, learned from
+    # the first embedded batch) are recorded with `modify`.
+    missing = {k: v for k, v in metadata.items() if k not in stored}
+    if missing:
+        collection.modify(metadata={**stored, **missing})
+
+    return collection
+
+#################################################################################################################
+
+def _validate_repo_config(
+    repo_name: str,
+    stored: dict,
+    embedding_dim: Optional[int],
+    embedding_provider: Optional[str]
+):
+    """
+    Enforce the repo-level provider / dimension invariants against the
+    metadata already recorded for the repo's vector store.
+    """
 
     # if embedding_dim is present, validate against the value in metadata
 
     if embedding_dim is not None:
-        stored_dim = collection.meta_data.get("embedding_dim") 
+        stored_dim = stored.get("embedding_dim")
         if stored_dim is not None and stored_dim != embedding_dim:
             raise ValueError(
                 f"Embedding dimension mismatch for repo '{repo_name}'. "
                 f"Expected {stored_dim}, got {embedding_dim}."
             )
-        
-    return collection
 
-    
+    if embedding_provider is not None:
+        stored_provider = stored.get("embedding_provider")
+        if stored_provider is not None and stored_provider != embedding_provider:
+            raise ValueError(
+                f"Embedding provider mismatch for repo '{repo_name}'. "
+                f"Expected '{stored_provider}', got '{embedding_provider}'."
+            )
+
+#################################################################################################################
+
+def get_vector_store(
+    repo_name: str,
+    embedding_dim: Optional[int] = None,
+    embedding_provider: Optional[str] = None
+) -> VectorStore:
+    """
+    Return the repo's vector store for the configured backend (VECTOR_BACKEND).
+
+    Same guarantees as `get_collection`, for either backend. Stores are
+    opened once per process and cached, so the reported load time is that of
+    the first open and query latency accumulates across requests.
+    """
+
+    collection_name = _normalize_collection_name(repo_name=repo_name)
+
+    with _stores_lock:
+        store = _stores.get(collection_name)
+        if store is None:
+            start = time.perf_counter()
+            if VECTOR_BACKEND == "chroma":
+                store = ChromaVectorStore(get_collection(repo_name))
+            elif VECTOR_BACKEND == "flat":
+                store = FlatVectorStore(os.path.join(FLAT_INDEX_DIR, collection_name))
+            else:
+                raise ValueError(f"Unknown vector backend '{VECTOR_BACKEND}'")
+            store.load_seconds = time.perf_counter() - start
+            _stores[collection_name] = store
+
+    stored = store.metadata()
+    _validate_repo_config(repo_name, stored, embedding_dim, embedding_provider)
+
+    metadata = {"repo_name": repo_name}
+    if embedding_dim is not None:
+        metadata["embedding_dim"] = embedding_dim
+    if embedding_provider is not None:
+        metadata["embedding_provider"] = embedding_provider
+        metadata["dim_reduction"] = _dim_reduction_method(embedding_provider)
+
+    missing = {k: v for k, v in metadata.items() if k not in stored}
+    if missing:
+        store.update_metadata(missing)
+
+    return store
+
+#################################################################################################################
+#################################################################################################################
+
+def _content_hash(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def _chunk_vector_id(file_path: str, content_hash: str) -> str:
+    """
+    Stable vector ID derived from (path, content hash).
+
+    Unchanged chunks keep their ID across re-indexing runs, which is what
+    makes `store_repo_embedding` idempotent. The global `chunk_id` is not
+    used: it shifts whenever any earlier file changes.
+    """
+    return hashlib.sha256(f"{file_path}\0{content_hash}".encode("utf-8")).hexdigest()[:32]
+
+
+def _normalize_vectors(vectors: List[List[float]]) -> List[List[float]]:
+    """
+    L2-normalise vectors at the DB boundary (see embedding_services, rule 5).
+    """
+    matrix = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).tolist()
+
+
+def _chunk_metadata(chunk: RepoChunk, content_hash: str) -> dict:
+    """
+    Small, filterable metadata stored next to each vector: location,
+    content hash, language / extension, file size and directory prefixes.
+    """
+    filename = chunk.file_path.split("/")[-1]
+    metadata = {
+        "file_path": chunk.file_path,
+        "chunk_id": chunk.chunk_id,
+        "local_index": chunk.local_index,
+        "content_hash": content_hash,
+        "extension": "." + filename.split(".")[-1] if "." in filename else "",
+        **path_prefix_metadata(chunk.file_path),
+    }
+    if chunk.language is not None:
+        metadata["language"] = chunk.language
+    if chunk.file_size is not None:
+        metadata["file_size"] = chunk.file_size
+    return metadata
+
+
+def _batched(items: list, size: int):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+#################################################################################################################
+
+class _StageStats:
+    """
+    Accumulates items and wall time per pipeline stage for throughput reports.
+    """
+
+    def __init__(self):
+        self._stages: Dict[str, Dict[str, float]] = {}
+
+    def record(self, stage: str, items: int, seconds: float):
+        entry = self._stages.setdefault(stage, {"items": 0, "seconds": 0.0})
+        entry["items"] += items
+        entry["seconds"] += seconds
+
+    def report(self) -> Dict[str, Dict[str, float]]:
+        return {
+            stage: {
+                "items": int(entry["items"]),
+                "seconds": round(entry["seconds"], 4),
+                "items_per_sec": round(entry["items"] / entry["seconds"], 1) if entry["seconds"] > 0 else 0.0
+            }
+            for stage, entry in self._stages.items()
+        }
 
 #################################################################################################################
+
+def _collection_lock(repo_name: str) -> threading.Lock:
+    with _stores_lock:
+        return _collection_locks.setdefault(_normalize_collection_name(repo_name), threading.Lock())
+
 #################################################################################################################
 
-def store_repo_embedding(repo_name: str, chunks: RepoChunksResponse):
-    
-    
+class _IndexBuild:
+    """
+    State of one index run. Chunks arrive in chunk order, in batches.
+
+    `prepare`, `embed` and `write` are the per-batch pipeline stages; `finish`
+    writes the per-version sidecars and returns the report. For the whole run
+    only per-chunk locations and IDs are kept, never chunk text.
+    """
+
+    def __init__(
+        self,
+        repo_name: str,
+        embedding_provider: str,
+        embedding_dim: Optional[int],
+        ref: Optional[str],
+        near_dup_threshold: Optional[float],
+        commit_sha: Optional[str],
+        checkpoint: Optional[Callable[..., None]] = None
+    ):
+        self.repo_name = repo_name
+        self.provider = embedding_provider.lower()
+        self.ref = ref
+        self.commit_sha = commit_sha
+        self.collection_name = _normalize_collection_name(repo_name)
+        self.stats = _StageStats()
+
+        self.store = get_vector_store(repo_name, embedding_dim=embedding_dim, embedding_provider=self.provider)
+        metadata = self.store.metadata()
+        # Output dimension is a repo-level setting: reuse the recorded one
+        self.embedding_dim = embedding_dim if embedding_dim is not None else metadata.get("embedding_dim")
+        # Stored chunks written with an older metadata layout are re-written
+        self.check_existing = metadata.get("chunk_metadata_version") == CHUNK_METADATA_VERSION
+        self.content_store = get_chunk_store(self.collection_name)
+
+        threshold = NEAR_DUP_THRESHOLD if near_dup_threshold is None else near_dup_threshold
+        self.near_index = NearDuplicateIndex(threshold=threshold) if threshold > 0 else None
+
+        # per chunk: (file_path, chunk_id, local_index, symbols, content_hash, vector_id it resolves to)
+        self.locations: List[tuple] = []
+        self.vector_ids: List[str] = []                   # representatives, first-seen order
+        self.alias_of: Dict[str, tuple] = {}              # vector_id -> (representative, similarity)
+        self.aliases: Dict[str, list] = {}
+        self.positions: Dict[str, list] = {}              # representative -> [chunk_id, local_index] in this commit
+        self._seen = set()
+
+        self.chunks_new = 0
+        self.chunks_skipped = 0
+        self.near_duplicates = 0
+
+        self.pool: Optional[LocalEmbeddingPool] = None
+        self._pending: List[tuple] = []
+        self._checkpoint = checkpoint
+        self.chunks_written = 0
+
+    def __enter__(self):
+        if self.provider == "local" and LOCAL_EMBED_WORKERS > 1:
+            self.pool = LocalEmbeddingPool(workers=LOCAL_EMBED_WORKERS, batch_size=EMBED_BATCH_SIZE)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool = None
+
+    @property
+    def embed_workers(self) -> int:
+        # Remote providers overlap HTTP batches; local models are already parallel (or single-model)
+        return EMBED_PIPELINE_WORKERS if self.provider in ("openai", "gemini") else 1
+
+    # ---- stages ------------------------------------------------------------------------------
+
+    def prepare(self, chunks: List[RepoChunk]):
+        """
+        Hash, store chunk text, collapse duplicates and near-duplicates, and
+        drop chunks whose vector is already stored. Returns what must be
+        embedded as [(vector_id, chunk, content_hash)], or None.
+        """
+
+        self.content_store.put_many(chunk.content for chunk in chunks)
+
+        candidates = []
+        for chunk in chunks:
+            content_hash = _content_hash(chunk.content)
+            vector_id = _chunk_vector_id(chunk.file_path, content_hash)
+
+            if vector_id in self._seen:
+                # Same path + content again: an alias of whatever that ID resolved to
+                target, similarity = self.alias_of.get(vector_id, (vector_id, 1.0))
+                self.aliases.setdefault(target, []).append([chunk.file_path, chunk.chunk_id, chunk.local_index, similarity])
+            else:
+                self._seen.add(vector_id)
+                match = self.near_index.add(vector_id, chunk.content) if self.near_index else None
+                if match is not None:
+                    target, similarity = match
+                    self.alias_of[vector_id] = match
+                    self.aliases.setdefault(target, []).append([chunk.file_path, chunk.chunk_id, chunk.local_index, similarity])
+                    self.near_duplicates += 1
+                else:
+                    target = vector_id
+                    self.vector_ids.append(vector_id)
+                    self.positions[vector_id] = [chunk.chunk_id, chunk.local_index]
+                    candidates.append((vector_id, chunk, content_hash))
+
+            symbols = chunk.symbols if chunk.symbols is not None else extract_definitions(chunk.content, chunk.language)
+            self.locations.append((chunk.file_path, chunk.chunk_id, chunk.local_index, symbols, content_hash, target))
+
+        existing = set()
+        if self.check_existing and candidates:
+            existing = self.store.existing_ids([vid for vid, _, _ in candidates])
+        new = [c for c in candidates if c[0] not in existing]
+
+        self.chunks_skipped += len(candidates) - len(new)
+        self.chunks_new += len(new)
+        return new or None
+
+    def embed(self, batch: List[tuple]):
+        texts = [chunk.content for _, chunk, _ in batch]
+        if self.pool is not None:
+            start = time.perf_counter()
+            vectors = [truncate_embedding(emb, self.embedding_dim) for emb in self.pool.embed(texts)]
+            record_embedding_batch("local", len(texts), time.perf_counter() - start)
+        else:
+            vectors = [r["embedding"] for r in embed_texts(texts, self.provider, dimensions=self.embedding_dim)]
+        return list(zip(batch, vectors))
+
+    def write(self, embedded: List[tuple]):
+        """Buffer embedded chunks and upsert every UPSERT_BATCH_SIZE (single worker)."""
+
+        if self.embedding_dim is None and embedded:
+            # First write records the native dimension for later validation
+            self.embedding_dim = len(embedded[0][1])
+            self.store = get_vector_store(self.repo_name, embedding_dim=self.embedding_dim, embedding_provider=self.provider)
+
+        self._pending.extend(embedded)
+        if len(self._pending) >= UPSERT_BATCH_SIZE:
+            self._flush()
+
+    def _flush(self):
+        if not self._pending:
+            return
+        with VECTOR_UPSERT_LATENCY.time(backend=self.store.backend):
+            self.store.upsert(
+                ids=[vid for (vid, _, _), _ in self._pending],
+                embeddings=_normalize_vectors([vector for _, vector in self._pending]),
+                metadatas=[_chunk_metadata(chunk, content_hash) for (_, chunk, content_hash), _ in self._pending]
+            )
+        self.chunks_written += len(self._pending)
+        self._pending = []
+
+        # Written vectors are durable: a resumed run skips them in `prepare`
+        if self._checkpoint is not None:
+            self._checkpoint(chunks_written=self.chunks_written)
+
+    # ---- completion --------------------------------------------------------------------------
+
+    def finish(self) -> dict:
+        start = time.perf_counter()
+        pending = len(self._pending)
+        self._flush()
+        self.stats.record("flush", pending, time.perf_counter() - start)
+
+        version = version_key(self.commit_sha)
+
+        # Adjacency for retrieval-time window expansion
+        start = time.perf_counter()
+        save_neighbour_index(
+            self.collection_name,
+            version,
+            NeighbourIndex.build(
+                (file_path, local_index, vector_id)
+                for file_path, _, local_index, _, _, vector_id in self.locations
+            )
+        )
+        self.stats.record("neighbours", len(self.locations), time.perf_counter() - start)
+
+        # Definitions for exact, embedding-free symbol lookup
+        start = time.perf_counter()
+        save_symbol_index(
+            self.collection_name,
+            version,
+            build_symbol_index(
+                (symbols, file_path, chunk_id, local_index, content_hash)
+                for file_path, chunk_id, local_index, symbols, content_hash, _ in self.locations
+            )
+        )
+        self.stats.record("symbols", len(self.locations), time.perf_counter() - start)
+
+        # Version manifest (copy-on-write: references, not copies)
+        start = time.perf_counter()
+        save_version(
+            self.collection_name,
+            self.commit_sha,
+            self.ref,
+            self.vector_ids,
+            logical_chunks=len(self.locations),
+            aliases=self.aliases,
+            locations=self.positions,
+            content_hashes=(content_hash for _, _, _, _, content_hash, _ in self.locations)
+        )
+        self.stats.record("manifest", len(self.vector_ids), time.perf_counter() - start)
+
+        # Record what is now indexed; any change retires cached search results
+        metadata = self.store.metadata()
+        if self.chunks_new or metadata.get("indexed_commit") != self.commit_sha:
+            self.store.update_metadata({
+                "indexed_commit": self.commit_sha or "",
+                "index_generation": int(metadata.get("index_generation", 0)) + 1,
+                "chunk_metadata_version": CHUNK_METADATA_VERSION
+            })
+            get_search_cache().invalidate(self.collection_name)
+
+        return {
+            "repo_name": self.repo_name,
+            "chunks_total": len(self.locations),
+            "chunks_unique": len(self.vector_ids),
+            "chunks_new": self.chunks_new,
+            "chunks_skipped": self.chunks_skipped,
+            "chunks_near_duplicate": self.near_duplicates,
+            "embeddings_saved": len(self.locations) - len(self.vector_ids),
+            "commit_sha": self.commit_sha,
+            "stages": self.stats.report()
+        }
 
 #################################################################################################################
+
+def _run_index_pipeline(
+    build: _IndexBuild,
+    source: Iterable,
+    source_name: str,
+    head: List[Stage],
+    cancel_event: Optional[threading.Event] = None
+) -> dict:
+    """
+    Run `source -> head stages -> prepare -> embed -> write` as one pipeline
+    with bounded queues, then finish the build. Stage reports from the
+    pipeline and from `finish` are merged into one `stages` dict.
+    Setting `cancel_event` stops the run (PipelineCancelled).
+    """
+
+    with build:
+        pipeline = Pipeline(
+            source,
+            head + [
+                Stage("prepare", build.prepare, batch_size=EMBED_BATCH_SIZE),
+                Stage("embed", build.embed, workers=build.embed_workers, count=len),
+                Stage("write", build.write, count=len),
+            ],
+            source_name=source_name,
+            cancel_event=cancel_event
+        )
+        stage_report = pipeline.run()
+        report = build.finish()
+
+    report["stages"] = {**stage_report, **report["stages"]}
+    report["wall_seconds"] = round(pipeline.wall_seconds, 4)
+    return report
+
 #################################################################################################################
 
-def search_repo(repo_name: str, chunk_id: int, content: str, top_k : int = 5):
-    pass
+def store_repo_embedding(
+    repo_name: str,
+    chunks: RepoChunksResponse,
+    embedding_provider: str,
+    embedding_dim: Optional[int] = None,
+    ref: Optional[str] = None,
+    near_dup_threshold: Optional[float] = None
+) -> dict:
+    """
+    Embed and store all chunks of a repository, idempotently.
+
+    Steps (overlapped as pipeline stages, see `_IndexBuild`):
+    1. Derive a stable vector ID per chunk from (file_path, content hash),
+       then collapse near-duplicate chunks onto one representative vector
+       (MinHash / LSH, `near_dup_threshold`); the others become aliases
+    2. Look up which IDs are already stored (batched)
+    3. Embed only the missing chunks, in batches
+    4. Normalise at the DB boundary and upsert IDs, vectors and metadata in
+       large batches; chunk text goes to the compressed content store
+    5. Save the (file_path, local_index) -> ID neighbour index and the
+       identifier -> definition chunk symbol index
+    6. Record the commit's version manifest and point `ref` at it
+
+    Re-running on an unchanged repo embeds and writes nothing. Indexing
+    another commit or branch only embeds chunks that differ; unchanged
+    chunks are shared between versions through their content-derived IDs.
+
+    Returns a report with chunk counts and per-stage throughput (chunks/sec).
+    """
+
+    with _collection_lock(repo_name):
+        build = _IndexBuild(repo_name, embedding_provider, embedding_dim, ref, near_dup_threshold, chunks.commit_sha)
+        return _run_index_pipeline(build, chunks.chunks, "chunks", [])
 
 #################################################################################################################
-#################################################################################################################
\ No newline at end of file
+
+def init_repo_index(
+    req: VectorRepoInitRequest,
+    commit_sha: Optional[str] = None,
+    progress: Optional[Callable[..., None]] = None,
+    checkpoint: Optional[Callable[..., None]] = None,
+    cancel_event: Optional[threading.Event] = None
+) -> dict:
+    """
+    Clone, then stream files -> chunks -> embeddings -> vector store through
+    one bounded-queue pipeline. Files are read and chunked while earlier
+    batches are being embedded and written, so the run takes about as long
+    as its slowest stage, and only a few batches are in memory at a time.
+
+    Hooks used by background jobs:
+    - commit_sha: index exactly this commit instead of the branch head
+    - progress(files=, chunks=): increments as files are chunked
+    - checkpoint(commit_sha=) after the clone, checkpoint(chunks_written=)
+      after every committed upsert batch
+    - cancel_event: stops the run between items
+    """
+
+    repo_name = f"{req.owner}/{req.repo}"
+
+    start = time.perf_counter()
+    temp_dir, commit_sha = clone_repo(req.owner, req.repo, req.branch, commit_sha=commit_sha)
+    clone_seconds = time.perf_counter() - start
+
+    if checkpoint is not None:
+        checkpoint(commit_sha=commit_sha)
+
+    try:
+        next_chunk_id = [0]
+
+        def chunk(item):
+            file_chunks = chunk_file(item, next_chunk_id[0])
+            next_chunk_id[0] += len(file_chunks)
+            if progress is not None:
+                progress(files=1, chunks=len(file_chunks))
+            return file_chunks
+
+        with _collection_lock(repo_name):
+            build = _IndexBuild(
+                repo_name,
+                req.embedding_provider,
+                req.embedding_dim,
+                req.branch,
+                req.near_dup_threshold,
+                commit_sha,
+                checkpoint=checkpoint
+            )
+            report = _run_index_pipeline(
+                build,
+                iter_repo_files(temp_dir),
+                "read",
+                [Stage("chunk", chunk, flatten=True)],
+                cancel_event=cancel_event
+            )
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+    stats = _StageStats()
+    stats.record("clone", 1, clone_seconds)
+    report["stages"] = {**stats.report(), **report["stages"]}
+
+    return report
+
+#################################################################################################################
+#################################################################################################################
+
+def _repo_embedding_config(store: VectorStore, repo_name: str):
+    """
+    Provider and output dimension recorded when the repo was indexed.
+    Queries must be embedded exactly the same way.
+    """
+    metadata = store.metadata()
+    provider = metadata.get("embedding_provider")
+    if not provider:
+        raise ValueError(f"Repo '{repo_name}' has not been indexed yet.")
+    return provider, metadata.get("embedding_dim")
+
+
+def _hydrate(repo_name: str, records: List[dict]) -> Dict[str, str]:
+    """
+    Chunk text for a page of hits, by content hash, in one batched read from
+    the content store. Records written before the content store existed still
+    carry their text as `document` and are skipped.
+    """
+    hashes = {
+        rec["metadata"].get("content_hash")
+        for rec in records
+        if not rec.get("document")
+    }
+    hashes.discard(None)
+    if not hashes:
+        return {}
+    return get_chunk_store(_normalize_collection_name(repo_name)).get_many(hashes)
+
+
+def _hit_location(hit: dict, locations: Dict[str, list]) -> Tuple[int, int]:
+    """
+    (chunk_id, local_index) of a hit in the searched version. Vector metadata
+    is the first writer's and is only used for versions without locations.
+    """
+    location = locations.get(hit["id"])
+    if location is not None:
+        return location[0], location[1]
+    meta = hit["metadata"]
+    return meta.get("chunk_id", -1), meta.get("local_index", -1)
+
+
+def _hit_to_result(
+    hit: dict,
+    contents: Dict[str, str],
+    aliases: Dict[str, list],
+    locations: Dict[str, list],
+    neighbour_of: Optional[int] = None
+) -> VectorSearchResult:
+    meta = hit["metadata"]
+    alias_entries = aliases.get(hit["id"])
+    chunk_id, local_index = _hit_location(hit, locations)
+    return VectorSearchResult(
+        chunk_id=chunk_id,
+        file_path=meta.get("file_path", ""),
+        local_index=local_index,
+        score=hit["score"],
+        content=hit.get("document") or contents.get(meta.get("content_hash"), ""),
+        neighbour_of=neighbour_of,
+        aliases=[
+            ChunkAlias(file_path=path, chunk_id=chunk_id, local_index=local_index, similarity=similarity)
+            for path, chunk_id, local_index, similarity in alias_entries
+        ] if alias_entries else None
+    )
+
+#################################################################################################################
+
+def _expand_hits(store: VectorStore, repo_name: str, version: Optional[str], hits: List[List[dict]], expand: int) -> List[List[VectorSearchResult]]:
+    """
+    Widen every hit to its ±`expand` positional neighbours in the same file.
+
+    Neighbour IDs come from the precomputed adjacency index, located by the
+    hit's (file_path, local_index) in the searched version; all neighbours of
+    all queries are fetched with a single `store.get`. Per query, each hit is
+    emitted with its window in file order, and every chunk appears once.
+    Neighbours carry the score of the hit they were pulled in by. Window
+    entries that resolve to another file's vector (near-duplicate aliases)
+    are skipped.
+
+    Chunk text of everything returned is hydrated with one content-store read,
+    and each result lists the duplicate chunks collapsed into it.
+    """
+
+    collection = _normalize_collection_name(repo_name)
+    manifest = load_version(collection, version) if version else None
+    aliases = manifest.get("aliases", {}) if manifest else {}
+    locations = manifest.get("locations", {}) if manifest else {}
+
+    index = load_neighbour_index(collection, version) if version else None
+    if index is None or expand <= 0:
+        contents = _hydrate(repo_name, [hit for query_hits in hits for hit in query_hits])
+        return [[_hit_to_result(hit, contents, aliases, locations) for hit in query_hits] for query_hits in hits]
+
+    def window(hit: dict) -> List[str]:
+        file_path = hit["metadata"].get("file_path", "")
+        return index.window_at(file_path, _hit_location(hit, locations)[1], expand) or [hit["id"]]
+
+    # 1. One batched fetch for every neighbour not already returned as a hit
+    known = {hit["id"]: hit for query_hits in hits for hit in query_hits}
+    windows = {hit["id"]: window(hit) for hit in known.values()}
+    wanted = {vid for ids in windows.values() for vid in ids if vid not in known}
+    fetched = {rec["id"]: rec for rec in store.get(sorted(wanted))}
+    fetched.update(known)   # hits of other queries can be neighbours here
+    contents = _hydrate(repo_name, list(fetched.values()))
+
+    # 2. Merge per query
+    results = []
+    for query_hits in hits:
+        own_hits = {hit["id"]: hit for hit in query_hits}
+        emitted = set()
+        merged = []
+        for hit in query_hits:
+            if hit["id"] in emitted:
+                continue
+            hit_chunk_id = _hit_location(hit, locations)[0]
+            hit_file = hit["metadata"].get("file_path", "")
+            for vid in windows[hit["id"]]:
+                if vid in emitted:
+                    continue
+                if vid in fetched and fetched[vid]["metadata"].get("file_path", "") != hit_file:
+                    continue                          # near-duplicate of another file's chunk
+                if vid in own_hits:
+                    merged.append(_hit_to_result(own_hits[vid], contents, aliases, locations))
+                elif vid in fetched:
+                    merged.append(_hit_to_result(
+                        {**fetched[vid], "score": hit["score"]}, contents, aliases, locations, neighbour_of=hit_chunk_id
+                    ))
+                else:
+                    continue
+                emitted.add(vid)
+        results.append(merged)
+    return results
+
+#################################################################################################################
+
+def _cached_query(
+    store: VectorStore,
+    repo_name: str,
+    version: Optional[str],
+    vectors: List[List[float]],
+    top_k: int,
+    filters: Optional[SearchFilter] = None
+):
+    """
+    `store.query` behind the commit-scoped result cache. Only cache misses
+    reach the backend, still as a single batched call.
+    """
+
+    cache = get_search_cache()
+    collection = _normalize_collection_name(repo_name)
+    generation = int(store.metadata().get("index_generation", 0))
+    commit_sha = version
+
+    filter_key = filters.to_dict() if filters else None
+    keys = [make_cache_key(collection, commit_sha, generation, v, top_k, filter_key) for v in vectors]
+    hits = [cache.get(key) for key in keys]
+
+    missing = [i for i, h in enumerate(hits) if h is None]
+    if missing:
+        fresh = store.query([vectors[i] for i in missing], top_k, filters)
+        for i, query_hits in zip(missing, fresh):
+            hits[i] = query_hits
+            cache.put(keys[i], collection, query_hits)
+
+    return hits
+
+#################################################################################################################
+
+def _resolve_search_version(store: VectorStore, repo_name: str, commit: Optional[str], ref: Optional[str]):
+    """
+    Version to search and the vector IDs it is restricted to. The ID filter is
+    dropped when the version references every stored vector (nothing to
+    exclude), and absent for repos indexed before versioning.
+    """
+
+    collection = _normalize_collection_name(repo_name)
+    latest = store.metadata().get("indexed_commit")
+    version = resolve_version(collection, commit=commit, ref=ref, default=version_key(latest or None))
+
+    manifest = load_version(collection, version)
+    if manifest is None:
+        if commit or ref:
+            raise ValueError(f"Version '{version}' of repo '{repo_name}' has not been indexed.")
+        return version, None
+
+    member_ids = manifest["vector_ids"]
+    if len(member_ids) >= store.count():
+        return version, None
+    return version, member_ids
+
+#################################################################################################################
+
+def search_repo_batch(
+    repo_name: str,
+    queries: Optional[List[str]] = None,
+    vectors: Optional[List[List[float]]] = None,
+    top_k: int = 5,
+    expand: int = 0,
+    path_prefixes: Optional[List[str]] = None,
+    languages: Optional[List[str]] = None,
+    commit: Optional[str] = None,
+    ref: Optional[str] = None
+) -> VectorBatchSearchResponse:
+    """
+    Run many searches against a repo in one pass.
+
+    Either `queries` (texts) or `vectors` (raw embeddings from the repo's
+    provider) must be given, not both. Texts are embedded in a single batch
+    call, all vectors are normalised together, and the backend is queried
+    once with the whole matrix.
+
+    `expand=N` returns each hit together with its ±N neighbouring chunks
+    (see `_expand_hits`).
+
+    `path_prefixes` / `languages` restrict the search to matching chunks.
+    They are resolved by the backend's metadata index before any similarity
+    is computed, not applied to the top-k afterwards.
+
+    `commit` / `ref` select which indexed version to search; the default is
+    the most recently indexed commit.
+
+    Returns one `VectorSearchResponse` per query, in input order.
+    """
+
+    if (queries is None) == (vectors is None):
+        raise ValueError("Provide exactly one of 'queries' or 'vectors'.")
+
+    store = get_vector_store(repo_name)
+    provider, embedding_dim = _repo_embedding_config(store, repo_name)
+
+    version, member_ids = _resolve_search_version(store, repo_name, commit, ref)
+    filters = SearchFilter(path_prefixes=path_prefixes, languages=languages, ids=member_ids)
+
+    if queries is not None:
+        if not queries:
+            return VectorBatchSearchResponse(results=[])
+        vectors = [r["embedding"] for r in embed_texts(queries, provider, dimensions=embedding_dim)]
+
+    if not vectors:
+        return VectorBatchSearchResponse(results=[])
+
+    if embedding_dim is not None and any(len(v) != embedding_dim for v in vectors):
+        raise ValueError(
+            f"Query vector dimension mismatch for repo '{repo_name}'. Expected {embedding_dim}."
+        )
+
+    hits = _cached_query(store, repo_name, version, _normalize_vectors(vectors), top_k, filters)
+
+    return VectorBatchSearchResponse(results=[
+        VectorSearchResponse(results=query_results)
+        for query_results in _expand_hits(store, repo_name, version, hits, expand)
+    ])
+
+#################################################################################################################
+
+def search_repo(
+    repo_name: str,
+    query: str,
+    top_k: int = 5,
+    expand: int = 0,
+    path_prefixes: Optional[List[str]] = None,
+    languages: Optional[List[str]] = None,
+    commit: Optional[str] = None,
+    ref: Optional[str] = None
+) -> VectorSearchResponse:
+    """
+    Single-query search; a batch of one.
+    """
+    return search_repo_batch(
+        repo_name,
+        queries=[query],
+        top_k=top_k,
+        expand=expand,
+        path_prefixes=path_prefixes,
+        languages=languages,
+        commit=commit,
+        ref=ref
+    ).results[0]
+
+#################################################################################################################
+
+def lookup_symbol_definitions_batch(
+    repo_name: str,
+    patches: List[str],
+    commit: Optional[str] = None,
+    ref: Optional[str] = None,
+    max_results: int = 20
+) -> List[SymbolLookupResponse]:
+    """
+    Definition chunks of the identifiers each patch refers to.
+
+    Identifiers are taken from the diff (added lines first) and resolved
+    through the version's symbol index, which is loaded once for all
+    patches; chunk text for every patch is read from the content store in
+    one batch. No embedding or vector query is involved.
+
+    Identifiers defined in more than MAX_DEFINITIONS_PER_SYMBOL places are
+    treated as too generic and skipped.
+    """
+
+    store = get_vector_store(repo_name)
+    collection = _normalize_collection_name(repo_name)
+    latest = store.metadata().get("indexed_commit")
+    version = resolve_version(collection, commit=commit, ref=ref, default=version_key(latest or None))
+
+    index = load_symbol_index(collection, version)
+    if index is None:
+        raise ValueError(f"Version '{version}' of repo '{repo_name}' has no symbol index.")
+
+    per_patch = []
+    for patch in patches:
+        references = extract_references(patch)
+        resolved, found, seen = 0, [], set()
+        for name in references:
+            entries = index.lookup(name)
+            if not entries:
+                continue
+            resolved += 1
+            if len(entries) > MAX_DEFINITIONS_PER_SYMBOL:
+                continue
+            for file_path, chunk_id, local_index, content_hash in entries:
+                if chunk_id in seen or len(found) >= max_results:
+                    continue
+                seen.add(chunk_id)
+                found.append((name, file_path, chunk_id, local_index, content_hash))
+        per_patch.append((references, resolved, found))
+
+    contents = get_chunk_store(collection).get_many(
+        entry[4] for _, _, found in per_patch for entry in found
+    )
+
+    return [
+        SymbolLookupResponse(
+            results=[
+                SymbolDefinition(
+                    symbol=name,
+                    file_path=file_path,
+                    chunk_id=chunk_id,
+                    local_index=local_index,
+                    content=contents.get(content_hash, "")
+                )
+                for name, file_path, chunk_id, local_index, content_hash in found
+            ],
+            symbols_referenced=len(references),
+            symbols_resolved=resolved
+        )
+        for references, resolved, found in per_patch
+    ]
+
+
+def lookup_symbol_definitions(
+    repo_name: str,
+    patch: str,
+    commit: Optional[str] = None,
+    ref: Optional[str] = None,
+    max_results: int = 20
+) -> SymbolLookupResponse:
+    """
+    Single-patch lookup; a batch of one.
+    """
+    return lookup_symbol_definitions_batch(
+        repo_name, [patch], commit=commit, ref=ref, max_results=max_results
+    )[0]
+
+#################################################################################################################
+#################################################################################################################
+
+def storage_report(repo_name: str) -> dict:
+    """
+    How much physical storage the indexed versions of a repo use.
+
+    - logical_vectors: sum of per-version vector counts (cost without sharing)
+    - physical_vectors: vectors actually stored
+    - referenced_vectors: distinct vectors used by at least one version
+    - unreferenced_vectors: garbage, reclaimable by `collect_garbage`
+    - amplification: physical / referenced (1.0 = no garbage)
+    - sharing_ratio: logical / referenced (> 1 = vectors shared by versions)
+    - physical_bytes: the vector store's size on disk (file sizes; None for
+      backends that cannot tell, i.e. Chroma)
+    - vector_bytes / logical_bytes: raw float32 size of the stored / the
+      per-version vectors
+    """
+
+    store = get_vector_store(repo_name)
+    collection = _normalize_collection_name(repo_name)
+
+    versions = list_versions(collection)
+    referenced = referenced_ids(collection)
+    physical = store.count()
+    logical = sum(v["vectors"] for v in versions)
+    dim = store.metadata().get("embedding_dim") or 0
+
+    return {
+        "repo_name": repo_name,
+        "versions": versions,
+        "logical_vectors": logical,
+        "physical_vectors": physical,
+        "referenced_vectors": len(referenced),
+        "unreferenced_vectors": max(0, physical - len(referenced)),
+        "amplification": round(physical / len(referenced), 4) if referenced else None,
+        "sharing_ratio": round(logical / len(referenced), 4) if referenced else None,
+        "physical_bytes": store.disk_bytes(),
+        "vector_bytes": physical * dim * 4,
+        "logical_bytes": logical * dim * 4,
+        "content": get_chunk_store(collection).stats(),
+    }
+
+#################################################################################################################
+
+def remove_index_version(repo_name: str, commit: str) -> bool:
+    """
+    Forget one indexed commit. Its vectors stay until `collect_garbage`.
+    """
+    return delete_version(_normalize_collection_name(repo_name), commit)
+
+#################################################################################################################
+
+def collect_garbage(repo_name: str) -> dict:
+    """
+    Delete vectors that no live version references and compact the vector
+    store (the flat backend rewrites its files without the deleted rows),
+    then compact the content store down to the text still referenced: every
+    chunk recorded by a live manifest (aliases have no vector), every
+    definition in a live symbol table, and the text of the remaining vectors
+    (manifests written before `content_hashes` existed).
+    Repos indexed before versioning have no manifests and are left untouched.
+    """
+
+    store = get_vector_store(repo_name)
+    collection = _normalize_collection_name(repo_name)
+
+    if not list_versions(collection):
+        return {"repo_name": repo_name, "deleted_vectors": 0, "deleted_contents": 0,
+                "compacted_rows": 0, "reclaimed_bytes": 0}
+
+    with _collection_lock(repo_name):
+        referenced = referenced_ids(collection)
+        garbage = [vid for vid in store.ids() if vid not in referenced]
+        for batch in _batched(garbage, UPSERT_BATCH_SIZE):
+            store.delete(batch)
+
+        bytes_before = store.disk_bytes()
+        compacted_rows = store.compact()
+        bytes_after = store.disk_bytes()
+
+        deleted_contents = 0
+        if garbage:
+            live_hashes = set(referenced_contents(collection))
+            for version in list_versions(collection):
+                symbols = load_symbol_index(collection, version["commit"])
+                if symbols is not None:
+                    live_hashes |= symbols.content_hashes()
+            live_hashes.update(
+                rec["metadata"].get("content_hash")
+                for batch in _batched(store.ids(), UPSERT_BATCH_SIZE)
+                for rec in store.get(batch)
+            )
+            live_hashes.discard(None)
+            deleted_contents = get_chunk_store(collection).compact(live_hashes)
+
+    if garbage:
+        metadata = store.metadata()
+        store.update_metadata({"index_generation": int(metadata.get("index_generation", 0)) + 1})
+        get_search_cache().invalidate(collection)
+
+    reclaimed_bytes = bytes_before - bytes_after if bytes_before is not None else None
+    return {"repo_name": repo_name, "deleted_vectors": len(garbage), "deleted_contents": deleted_contents,
+            "compacted_rows": compacted_rows, "reclaimed_bytes": reclaimed_bytes}
+
+#################################################################################################################
+#################################################################################################################
+
+#################################################################################################################
+#################################################################################################################
+
+def get_store_stats(repo_name: str) -> dict:
+    """
+    Backend name, vector count, load time and query latency for a repo's store.
+    """
+    stats = get_vector_store(repo_name).stats()
+    stats["repo_name"] = repo_name
+    return stats
+
+#################################################################################################################
+
+def get_search_cache_stats() -> dict:
+    """
+    Hit / miss counters and entry counts of the search result cache.
+    """
+    return get_search_cache().stats()
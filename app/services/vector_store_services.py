@@ -0,0 +1,705 @@
+import os
+import re
+import json
+import time
+import threading
+from abc import ABC, abstractmethod
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from .metrics_services import VECTOR_SEARCH_LATENCY
+
+
+# ========================================
+# Vector Stores — Design Notes
+# ========================================
+
+# `vector_db_services` talks to a `VectorStore`, never to a concrete DB.
+# Two backends are provided:
+
+# 1. ChromaVectorStore
+#    Wraps a Chroma collection (the original, default backend).
+
+# 2. FlatVectorStore
+#    An in-process, file-backed exact index for per-repo collections of
+#    roughly 10k–200k chunks:
+#    - vectors.f32   : row-major float32 matrix, memory-mapped read-only
+#    - records.jsonl : sidecar array of {row, id, metadata, document};
+#                      append-only, last line for a row wins
+#                      (`document` is empty for chunks whose text lives in
+#                      the chunk content store, see chunk_store_services)
+#    - meta.json     : store-level metadata (provider, embedding_dim, ...)
+#    Search is a brute-force dot product over row blocks with per-block
+#    `argpartition` top-k, so memory stays bounded and results are exact.
+#    Deletes append tombstones; `compact` (run by garbage collection)
+#    rewrites the live rows into a new generation the way the chunk
+#    content store does: vectors.<gen>.f32 and records.<gen>.jsonl are
+#    written and synced, CURRENT is replaced atomically, then the old pair
+#    is removed. Generation 0 uses the unsuffixed names.
+
+# Contract shared by both backends:
+# - Vectors passed to `upsert` / `query` are already L2-normalised
+#   (normalisation happens at the DB boundary, in vector_db_services).
+# - `score` is cosine similarity, higher is better.
+# - Every backend reports its load time and query latency via `stats()`.
+# - `SearchFilter` (path prefixes, languages) is applied BEFORE scoring:
+#   Chroma through a metadata `where` clause, the flat index through
+#   in-memory posting lists that select candidate rows. Only candidates are
+#   scored, so a search scoped to a few directories costs proportionally less.
+# - `SearchFilter.ids` restricts a search to one index version's vectors
+#   (see index_version_services). The flat index resolves it to rows before
+#   scoring; Chroma passes it as `query(ids=...)`, so only members are
+#   ranked.
+
+# Path prefixes are indexed as per-depth metadata keys:
+#     "app/services/x.py" -> dir_0 = "app", dir_1 = "app/services"
+# so that a prefix test is a single equality on `dir_<depth-1>`.
+
+# ========================================
+
+
+FLAT_INDEX_DIR = os.getenv("FLAT_INDEX_DIR", "./.flat_index")
+
+# Rows scored per matrix multiply in FlatVectorStore
+FLAT_QUERY_BLOCK_ROWS = 65_536
+
+_FLAT_GENERATION_FILE = re.compile(r"^(vectors|records)(?:\.(\d+))?\.(f32|jsonl)$")
+
+# Directory depth indexed for path-prefix filters
+MAX_PATH_DEPTH = 8
+
+
+#################################################################################################################
+#################################################################################################################
+
+def path_prefix_metadata(file_path: str) -> Dict[str, str]:
+    """
+    Per-depth directory prefixes of a file path, as flat metadata keys.
+    Example:
+        'app/services/x.py' -> {'dir_0': 'app', 'dir_1': 'app/services'}
+    """
+    parts = file_path.replace("\\", "/").split("/")[:-1]
+    return {
+        f"dir_{depth}": "/".join(parts[:depth + 1])
+        for depth in range(min(len(parts), MAX_PATH_DEPTH))
+    }
+
+
+@dataclass
+class SearchFilter:
+    """
+    Pre-scoring restriction of a search. Within a field any value may match;
+    across fields all must match. A prefix may name a directory or a file.
+    """
+
+    path_prefixes: Optional[List[str]] = None
+    languages: Optional[List[str]] = None
+    ids: Optional[FrozenSet[str]] = None          # version membership; not part of cache keys
+
+    def __post_init__(self):
+        if self.path_prefixes:
+            self.path_prefixes = sorted({p.strip("/") for p in self.path_prefixes if p.strip("/")})
+            for prefix in self.path_prefixes:
+                if prefix.count("/") + 1 > MAX_PATH_DEPTH:
+                    raise ValueError(
+                        f"Path prefix '{prefix}' is deeper than the indexed depth ({MAX_PATH_DEPTH})."
+                    )
+        if self.languages:
+            self.languages = sorted({lang.lower() for lang in self.languages})
+
+    def is_empty(self) -> bool:
+        return not self.path_prefixes and not self.languages and self.ids is None
+
+    def has_metadata_terms(self) -> bool:
+        return bool(self.path_prefixes or self.languages)
+
+    def prefix_terms(self) -> List[Tuple[str, str]]:
+        """(metadata key, value) pairs, any of which satisfies the path filter."""
+        terms = []
+        for prefix in self.path_prefixes or []:
+            terms.append((f"dir_{prefix.count('/')}", prefix))
+            terms.append(("file_path", prefix))
+        return terms
+
+    def to_dict(self) -> dict:
+        return {"path_prefixes": self.path_prefixes or [], "languages": self.languages or []}
+
+
+#################################################################################################################
+#################################################################################################################
+
+class VectorStore(ABC):
+    """
+    Minimal interface the indexing and search services rely on.
+
+    Hits and records are plain dicts:
+        {"id": str, "score": float, "metadata": dict, "document": Optional[str]}
+    """
+
+    backend: str = "abstract"
+
+    def __init__(self):
+        self.load_seconds = 0.0
+        self._latencies = deque(maxlen=1024)
+        self._query_count = 0
+
+    # ---- metadata ----------------------------------------------------------------------------
+
+    @abstractmethod
+    def metadata(self) -> dict: ...
+
+    @abstractmethod
+    def update_metadata(self, values: dict): ...
+
+    # ---- writes ------------------------------------------------------------------------------
+
+    @abstractmethod
+    def existing_ids(self, ids: List[str]) -> set: ...
+
+    @abstractmethod
+    def upsert(self, ids: List[str], embeddings: List[List[float]], metadatas: List[dict], documents: Optional[List[str]] = None): ...
+
+    @abstractmethod
+    def delete(self, ids: List[str]): ...
+
+    def compact(self) -> int:
+        """
+        Reclaim the space of deleted vectors; returns rows removed. Backends
+        that manage their own storage (Chroma) have nothing to do.
+        """
+        return 0
+
+    def disk_bytes(self) -> Optional[int]:
+        """Bytes the store occupies on disk, or None if the backend cannot tell."""
+        return None
+
+    # ---- reads -------------------------------------------------------------------------------
+
+    @abstractmethod
+    def get(self, ids: List[str]) -> List[dict]: ...
+
+    @abstractmethod
+    def count(self) -> int: ...
+
+    @abstractmethod
+    def ids(self) -> List[str]: ...
+
+    @abstractmethod
+    def _query(self, embeddings: List[List[float]], top_k: int, filters: Optional[SearchFilter]) -> List[List[dict]]: ...
+
+    def query(self, embeddings: List[List[float]], top_k: int, filters: Optional[SearchFilter] = None) -> List[List[dict]]:
+        """
+        Top-k search for each query vector; one result list per query.
+        """
+        if filters is not None and filters.is_empty():
+            filters = None
+
+        start = time.perf_counter()
+        try:
+            return self._query(embeddings, top_k, filters)
+        finally:
+            elapsed = time.perf_counter() - start
+            self._latencies.append(elapsed)
+            self._query_count += 1
+            VECTOR_SEARCH_LATENCY.observe(elapsed, backend=self.backend)
+
+    # ---- reporting ---------------------------------------------------------------------------
+
+    def stats(self) -> dict:
+        latencies = sorted(self._latencies)
+
+        def pct(p: float) -> float:
+            if not latencies:
+                return 0.0
+            return latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000
+
+        return {
+            "backend": self.backend,
+            "count": self.count(),
+            "load_seconds": round(self.load_seconds, 4),
+            "queries": self._query_count,
+            "query_latency_ms": {
+                "mean": round(sum(latencies) / len(latencies) * 1000, 3) if latencies else 0.0,
+                "p50": round(pct(0.50), 3),
+                "p95": round(pct(0.95), 3),
+                "max": round(latencies[-1] * 1000, 3) if latencies else 0.0,
+            }
+        }
+
+
+#################################################################################################################
+#################################################################################################################
+
+class ChromaVectorStore(VectorStore):
+    """
+    VectorStore over a Chroma collection (default L2 space).
+
+    For unit vectors Chroma's squared L2 distance is 2 - 2·cos, so scores are
+    reported as 1 - distance / 2.
+    """
+
+    backend = "chroma"
+
+    def __init__(self, collection):
+        super().__init__()
+        self.collection = collection
+
+    def metadata(self) -> dict:
+        return dict(self.collection.metadata or {})
+
+    def update_metadata(self, values: dict):
+        self.collection.modify(metadata={**self.metadata(), **values})
+
+    def existing_ids(self, ids: List[str]) -> set:
+        if not ids:
+            return set()
+        return set(self.collection.get(ids=ids, include=[])["ids"])
+
+    def upsert(self, ids, embeddings, metadatas, documents=None):
+        self.collection.upsert(
+            ids=ids,
+            embeddings=embeddings,
+            metadatas=metadatas,
+            documents=documents
+        )
+
+    def delete(self, ids: List[str]):
+        if ids:
+            self.collection.delete(ids=ids)
+
+    def get(self, ids: List[str]) -> List[dict]:
+        if not ids:
+            return []
+        res = self.collection.get(ids=ids, include=["metadatas", "documents"])
+        documents = res.get("documents") or [None] * len(res["ids"])
+        by_id = {
+            vid: {"id": vid, "metadata": meta or {}, "document": doc}
+            for vid, meta, doc in zip(res["ids"], res["metadatas"], documents)
+        }
+        return [by_id[vid] for vid in ids if vid in by_id]
+
+    def count(self) -> int:
+        return self.collection.count()
+
+    def ids(self) -> List[str]:
+        out, offset, page = [], 0, 10_000
+        while True:
+            batch = self.collection.get(include=[], limit=page, offset=offset)["ids"]
+            out.extend(batch)
+            if len(batch) < page:
+                return out
+            offset += page
+
+    @staticmethod
+    def _where(filters: SearchFilter) -> dict:
+        clauses = []
+
+        terms = filters.prefix_terms()
+        if terms:
+            ors = [{key: value} for key, value in terms]
+            clauses.append(ors[0] if len(ors) == 1 else {"$or": ors})
+
+        if filters.languages:
+            clauses.append({"language": {"$in": filters.languages}})
+
+        return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+    def _query(self, embeddings, top_k, filters):
+        n = self.count()
+        if n == 0 or not embeddings:
+            return [[] for _ in embeddings]
+
+        where = self._where(filters) if filters and filters.has_metadata_terms() else None
+        members = sorted(filters.ids) if filters and filters.ids is not None else None
+        if members is not None and not members:
+            return [[] for _ in embeddings]
+
+        try:
+            return self._query_once(embeddings, min(n, top_k), where, members)
+        except Exception:
+            if members is None:
+                raise
+            # Chroma rejects unknown IDs: retry with the members actually stored
+            members = sorted(self.existing_ids(members))
+            if not members:
+                return [[] for _ in embeddings]
+            return self._query_once(embeddings, min(n, top_k), where, members)
+
+    def _query_once(self, embeddings, n_results, where, members):
+        res = self.collection.query(
+            query_embeddings=embeddings,
+            n_results=n_results,
+            where=where,
+            ids=members,
+            include=["metadatas", "documents", "distances"]
+        )
+
+        results = []
+        for q in range(len(embeddings)):
+            documents = res["documents"][q] if res.get("documents") else [None] * len(res["ids"][q])
+            results.append([
+                {"id": vid, "score": 1.0 - dist / 2.0, "metadata": meta or {}, "document": doc}
+                for vid, dist, meta, doc in zip(
+                    res["ids"][q], res["distances"][q], res["metadatas"][q], documents
+                )
+            ])
+        return results
+
+
+#################################################################################################################
+#################################################################################################################
+
+class FlatVectorStore(VectorStore):
+    """
+    File-backed exact index: memory-mapped float32 vectors plus a sidecar
+    record array. Writes go straight to disk; the mmap is refreshed lazily on
+    the next read.
+    """
+
+    backend = "flat"
+
+    def __init__(self, path: str):
+        super().__init__()
+        start = time.perf_counter()
+
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+
+        self._meta_path = os.path.join(path, "meta.json")
+        self._current_path = os.path.join(path, "CURRENT")
+        self.generation = self._read_generation()
+        self._vectors_path, self._records_path = self._generation_paths(self.generation)
+        self._remove_other_generations()
+
+        self._meta = {}
+        if os.path.exists(self._meta_path):
+            with open(self._meta_path, "r", encoding="utf-8") as f:
+                self._meta = json.load(f)
+
+        self._dim: Optional[int] = self._meta.get("_dim")
+        self._load_records()
+
+        self._vectors = None
+        self._alive = None
+        self._dirty = True
+        self._refresh()
+
+        self.load_seconds = time.perf_counter() - start
+
+    # ---- internal ----------------------------------------------------------------------------
+
+    def _read_generation(self) -> int:
+        if not os.path.exists(self._current_path):
+            return 0
+        with open(self._current_path, "r", encoding="utf-8") as f:
+            return int(f.read().strip())
+
+    def _generation_paths(self, generation: int) -> Tuple[str, str]:
+        suffix = f".{generation}" if generation else ""
+        return (
+            os.path.join(self.path, f"vectors{suffix}.f32"),
+            os.path.join(self.path, f"records{suffix}.jsonl"),
+        )
+
+    def _remove_other_generations(self):
+        """Delete files of generations CURRENT does not name (interrupted compactions)."""
+        live = {os.path.basename(self._vectors_path), os.path.basename(self._records_path)}
+        for name in os.listdir(self.path):
+            if _FLAT_GENERATION_FILE.match(name) and name not in live:
+                os.remove(os.path.join(self.path, name))
+
+    def _load_records(self):
+        self._ids: List[Optional[str]] = []
+        self._metadatas: List[dict] = []
+        self._documents: List[Optional[str]] = []
+        self._row_of: Dict[str, int] = {}
+        self._postings: Dict[Tuple[str, str], Set[int]] = {}
+
+        if os.path.exists(self._records_path):
+            with open(self._records_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    self._apply_record(json.loads(line))
+
+    @staticmethod
+    def _write_synced(path: str, data: bytes):
+        with open(path, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _apply_record(self, rec: dict):
+        row = rec["row"]
+        while len(self._ids) <= row:
+            self._ids.append(None)
+            self._metadatas.append({})
+            self._documents.append(None)
+
+        old = self._ids[row]
+        if old is not None and self._row_of.get(old) == row:
+            del self._row_of[old]
+        if old is not None:
+            self._index_row(row, self._metadatas[row], add=False)
+
+        if rec.get("deleted"):
+            self._ids[row] = None
+            self._metadatas[row] = {}
+            self._documents[row] = None
+            return
+
+        self._ids[row] = rec["id"]
+        self._metadatas[row] = rec.get("metadata") or {}
+        self._documents[row] = rec.get("document")
+        self._row_of[rec["id"]] = row
+        self._index_row(row, self._metadatas[row], add=True)
+
+    def _index_row(self, row: int, metadata: dict, add: bool):
+        """Maintain the filter posting lists for one row."""
+        for key, value in metadata.items():
+            if key in ("language", "file_path") or key.startswith("dir_"):
+                posting = self._postings.setdefault((key, value), set())
+                if add:
+                    posting.add(row)
+                else:
+                    posting.discard(row)
+
+    def _candidate_rows(self, filters: SearchFilter) -> np.ndarray:
+        """Rows satisfying the filter, resolved from posting lists only."""
+        selected: Optional[Set[int]] = None
+
+        terms = filters.prefix_terms()
+        if terms:
+            selected = set().union(*(self._postings.get(term, set()) for term in terms))
+
+        if filters.languages:
+            by_lang = set().union(*(self._postings.get(("language", lang), set()) for lang in filters.languages))
+            selected = by_lang if selected is None else selected & by_lang
+
+        if filters.ids is not None:
+            if selected is None:
+                selected = {self._row_of[vid] for vid in filters.ids if vid in self._row_of}
+            else:
+                selected = {row for row in selected if self._ids[row] in filters.ids}
+
+        return np.fromiter(sorted(selected or ()), dtype=np.int64)
+
+    def _refresh(self):
+        """Re-map the vector file after writes."""
+        if not self._dirty:
+            return
+
+        rows = len(self._ids)
+        if rows == 0 or self._dim is None or not os.path.exists(self._vectors_path):
+            self._vectors = np.zeros((0, self._dim or 0), dtype=np.float32)
+        else:
+            self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(rows, self._dim))
+
+        self._alive = np.fromiter((vid is not None for vid in self._ids), dtype=bool, count=rows)
+        self._dirty = False
+
+    def _write_meta(self):
+        tmp = self._meta_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._meta, f)
+        os.replace(tmp, self._meta_path)
+
+    def _append_records(self, records: Iterable[dict]):
+        with open(self._records_path, "a", encoding="utf-8") as f:
+            for rec in records:
+                f.write(json.dumps(rec) + "\n")
+                self._apply_record(rec)
+
+    # ---- metadata ----------------------------------------------------------------------------
+
+    def metadata(self) -> dict:
+        return {k: v for k, v in self._meta.items() if not k.startswith("_")}
+
+    def update_metadata(self, values: dict):
+        with self._lock:
+            self._meta.update(values)
+            self._write_meta()
+
+    # ---- writes ------------------------------------------------------------------------------
+
+    def existing_ids(self, ids: List[str]) -> set:
+        return {vid for vid in ids if vid in self._row_of}
+
+    def upsert(self, ids, embeddings, metadatas, documents=None):
+        if not ids:
+            return
+
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        documents = documents or [None] * len(ids)
+
+        with self._lock:
+            if self._dim is None:
+                self._dim = int(matrix.shape[1])
+                self._meta["_dim"] = self._dim
+                self._write_meta()
+            elif matrix.shape[1] != self._dim:
+                raise ValueError(f"Flat index dimension is {self._dim}, got {matrix.shape[1]}.")
+
+            # Release the read-only map before writing to the file
+            self._vectors = None
+
+            records, appended = [], []
+            with open(self._vectors_path, "r+b" if os.path.exists(self._vectors_path) else "w+b") as f:
+                next_row = len(self._ids)
+                assigned = {}
+                for i, vid in enumerate(ids):
+                    row = self._row_of.get(vid, assigned.get(vid))
+                    if row is None:
+                        row = next_row
+                        next_row += 1
+                        assigned[vid] = row
+                        appended.append(i)
+                    elif vid in assigned:
+                        # Repeated new id within one call: keep the first vector
+                        continue
+                    else:
+                        f.seek(row * self._dim * 4)
+                        f.write(matrix[i].tobytes())
+                    records.append({"row": row, "id": vid, "metadata": metadatas[i], "document": documents[i]})
+
+                if appended:
+                    f.seek(len(self._ids) * self._dim * 4)
+                    f.write(matrix[appended].tobytes())
+
+            self._append_records(records)
+            self._dirty = True
+
+    def delete(self, ids: List[str]):
+        with self._lock:
+            rows = [self._row_of[vid] for vid in ids if vid in self._row_of]
+            self._append_records({"row": row, "deleted": True} for row in rows)
+            self._dirty = True
+
+    def compact(self) -> int:
+        """
+        Rewrite the live rows into a new generation (see design notes).
+        Returns the number of dead rows dropped.
+        """
+
+        with self._lock:
+            self._refresh()
+            live_rows = sorted(self._row_of.values())
+            dead = len(self._ids) - len(live_rows)
+            if dead == 0:
+                return 0
+
+            generation = self.generation + 1
+            vectors_path, records_path = self._generation_paths(generation)
+
+            with open(vectors_path, "wb") as f:
+                for start in range(0, len(live_rows), FLAT_QUERY_BLOCK_ROWS):
+                    f.write(np.ascontiguousarray(self._vectors[live_rows[start:start + FLAT_QUERY_BLOCK_ROWS]]).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            self._write_synced(records_path, "".join(
+                json.dumps({
+                    "row": new_row,
+                    "id": self._ids[row],
+                    "metadata": self._metadatas[row],
+                    "document": self._documents[row]
+                }) + "\n"
+                for new_row, row in enumerate(live_rows)
+            ).encode("utf-8"))
+            self._write_synced(self._current_path + ".tmp", str(generation).encode("ascii"))
+            os.replace(self._current_path + ".tmp", self._current_path)
+
+            # Readers holding the old map keep it until they finish
+            self._vectors = None
+            old_paths = (self._vectors_path, self._records_path)
+            self.generation, self._vectors_path, self._records_path = generation, vectors_path, records_path
+            for old in old_paths:
+                if os.path.exists(old):
+                    os.remove(old)
+
+            self._load_records()
+            self._dirty = True
+            return dead
+
+    def disk_bytes(self) -> int:
+        return sum(
+            os.path.getsize(path)
+            for path in (self._meta_path, self._vectors_path, self._records_path)
+            if os.path.exists(path)
+        )
+
+    # ---- reads -------------------------------------------------------------------------------
+
+    def get(self, ids: List[str]) -> List[dict]:
+        out = []
+        for vid in ids:
+            row = self._row_of.get(vid)
+            if row is not None:
+                out.append({"id": vid, "metadata": self._metadatas[row], "document": self._documents[row]})
+        return out
+
+    def count(self) -> int:
+        return len(self._row_of)
+
+    def ids(self) -> List[str]:
+        return list(self._row_of)
+
+    def _query(self, embeddings, top_k, filters):
+        with self._lock:
+            self._refresh()
+            vectors, alive = self._vectors, self._alive
+            candidates = self._candidate_rows(filters) if filters else None
+
+        queries = np.asarray(embeddings, dtype=np.float32)
+        n_queries = len(queries)
+        n_rows = len(vectors) if candidates is None else len(candidates)
+        k = min(top_k, int(alive.sum()) if candidates is None else n_rows)
+        if k <= 0 or n_queries == 0:
+            return [[] for _ in range(n_queries)]
+
+        best_scores = np.empty((n_queries, 0), dtype=np.float32)
+        best_rows = np.empty((n_queries, 0), dtype=np.int64)
+
+        for start in range(0, n_rows, FLAT_QUERY_BLOCK_ROWS):
+            if candidates is None:
+                rows = np.arange(start, min(start + FLAT_QUERY_BLOCK_ROWS, n_rows))
+                block = np.asarray(vectors[start:start + FLAT_QUERY_BLOCK_ROWS])
+            else:
+                # Only filtered rows are read from the mmap and scored
+                rows = candidates[start:start + FLAT_QUERY_BLOCK_ROWS]
+                block = vectors[rows]
+
+            scores = queries @ block.T
+            dead = ~alive[rows]
+            if dead.any():
+                scores[:, dead] = -np.inf
+
+            kk = min(k, scores.shape[1])
+            part = np.argpartition(-scores, kk - 1, axis=1)[:, :kk]
+            best_scores = np.concatenate([best_scores, np.take_along_axis(scores, part, axis=1)], axis=1)
+            best_rows = np.concatenate([best_rows, rows[part]], axis=1)
+
+            if best_scores.shape[1] > k:
+                keep = np.argpartition(-best_scores, k - 1, axis=1)[:, :k]
+                best_scores = np.take_along_axis(best_scores, keep, axis=1)
+                best_rows = np.take_along_axis(best_rows, keep, axis=1)
+
+        order = np.argsort(-best_scores, axis=1)
+        best_scores = np.take_along_axis(best_scores, order, axis=1)
+        best_rows = np.take_along_axis(best_rows, order, axis=1)
+
+        results = []
+        for q in range(n_queries):
+            hits = []
+            for score, row in zip(best_scores[q], best_rows[q]):
+                if not np.isfinite(score):
+                    continue
+                hits.append({
+                    "id": self._ids[row],
+                    "score": float(score),
+                    "metadata": self._metadatas[row],
+                    "document": self._documents[row]
+                })
+            results.append(hits)
+        return results
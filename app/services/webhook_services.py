@@ -0,0 +1,421 @@
+import os
+import hmac
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+# ========================================
+# GitHub Webhook Ingestion — Design Notes
+# ========================================
+
+# Reviews used to be pulled by hand. GitHub now pushes `pull_request` and
+# `push` events to POST /webhook/github.
+
+# 1. Every delivery is authenticated: X-Hub-Signature-256 must be the
+#    HMAC-SHA256 of the raw body under GITHUB_WEBHOOK_SECRET (constant-time
+#    compare). Without a configured secret the endpoint refuses everything.
+#    Redeliveries (same X-GitHub-Delivery ID) are acknowledged and dropped.
+#    An ID is claimed while its delivery is handled and forgotten if that
+#    fails, so GitHub's redelivery of a failed one is processed.
+
+# 2. Events become work items keyed per target:
+#        pull_request opened / reopened / synchronize / ready_for_review
+#            -> ("pr", "owner/repo", number)     job: pr_review
+#        push to the default branch (WEBHOOK_EMBEDDING_PROVIDER set)
+#            -> ("push", "owner/repo", ref)       job: init_repo at `after`
+#    A closed PR drops its pending item.
+
+# 3. Items are debounced per key (trailing edge): every new event for the
+#    key replaces the pending head SHA and pushes the deadline to
+#    now + WEBHOOK_DEBOUNCE_SECONDS, but never beyond
+#    first event + WEBHOOK_MAX_DELAY_SECONDS, so an endless storm still
+#    gets processed. A burst of N force-pushes becomes ONE job for the
+#    latest head SHA.
+
+# 4. When an item is flushed while an older job for the same key is still
+#    queued or running, that job is cancelled: only the latest SHA is
+#    worth finishing.
+
+# 5. A flush that fails (the job manager refused the submit) is logged,
+#    counted as `flush_errors`, and the item is put back for another
+#    window, unless a newer event for its key has arrived meanwhile.
+#    Other items due in the same flush are still handed over.
+
+# The ingestor takes its `submit` / `cancel` callables and clock as
+# arguments, so recorded payloads can be replayed against it directly
+# (see benchmarks/bench_webhook_storm.py); the process-wide instance uses
+# the job manager. WEBHOOK_DEBOUNCE_SECONDS=0 submits immediately.
+
+# ========================================
+
+
+GITHUB_WEBHOOK_SECRET = os.getenv("GITHUB_WEBHOOK_SECRET")
+WEBHOOK_DEBOUNCE_SECONDS = float(os.getenv("WEBHOOK_DEBOUNCE_SECONDS", "30"))
+WEBHOOK_MAX_DELAY_SECONDS = float(os.getenv("WEBHOOK_MAX_DELAY_SECONDS", "300"))
+
+# Embedding provider for re-indexing on push; unset = push events are ignored
+WEBHOOK_EMBEDDING_PROVIDER = os.getenv("WEBHOOK_EMBEDDING_PROVIDER")
+WEBHOOK_TOKEN_BUDGET = int(os.getenv("WEBHOOK_TOKEN_BUDGET", "8000"))
+
+PR_ACTIONS = {"opened", "reopened", "synchronize", "ready_for_review"}
+
+# Delivery IDs remembered for redelivery detection
+_DELIVERY_MEMORY = 1000
+
+logger = logging.getLogger(__name__)
+
+
+#################################################################################################################
+#################################################################################################################
+
+def verify_signature(body: bytes, signature: Optional[str], secret: Optional[str]) -> bool:
+    """
+    True if `signature` (X-Hub-Signature-256 header, "sha256=<hex>") is the
+    HMAC-SHA256 of `body` under `secret`.
+    """
+    if not secret or not signature or not signature.startswith("sha256="):
+        return False
+    expected = "sha256=" + hmac.new(secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature)
+
+
+def sign_payload(body: bytes, secret: str) -> str:
+    """X-Hub-Signature-256 value for `body`, as GitHub computes it."""
+    return "sha256=" + hmac.new(secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+
+#################################################################################################################
+
+@dataclass
+class PendingWork:
+    key: Tuple
+    kind: str               # job kind to submit
+    params: dict            # job params for the latest event
+    sha: str                # latest head / pushed SHA
+    first_seen: float
+    deadline: float
+    events: int = 1
+    shas: List[str] = field(default_factory=list)     # superseded SHAs, oldest first
+
+    def to_dict(self, now: float) -> dict:
+        return {
+            "key": "/".join(str(part) for part in self.key),
+            "kind": self.kind,
+            "sha": self.sha,
+            "events": self.events,
+            "superseded_shas": list(self.shas),
+            "due_in_seconds": round(max(0.0, self.deadline - now), 3),
+        }
+
+
+class Debouncer:
+    """
+    Per-key trailing-edge debounce with a maximum delay. Due items are
+    handed to `on_flush` by a background thread (started on first use), or
+    explicitly via `flush()`.
+    """
+
+    def __init__(
+        self,
+        on_flush: Callable[[PendingWork], None],
+        window: float = WEBHOOK_DEBOUNCE_SECONDS,
+        max_delay: float = WEBHOOK_MAX_DELAY_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+        background: bool = True
+    ):
+        self.on_flush = on_flush
+        self.window = window
+        self.max_delay = max(max_delay, window)
+        self.clock = clock
+        self.background = background
+
+        self._pending: Dict[Tuple, PendingWork] = {}
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self.flush_errors = 0
+
+    def offer(self, key: Tuple, kind: str, params: dict, sha: str) -> Tuple[str, PendingWork]:
+        """
+        Schedule work for `key`, replacing any pending work for it.
+        Returns ("scheduled" | "coalesced" | "submitted", item).
+        """
+
+        now = self.clock()
+        with self._cond:
+            item = self._pending.get(key)
+            if item is None:
+                item = PendingWork(key, kind, params, sha, first_seen=now, deadline=now + self.window)
+                status = "scheduled"
+            else:
+                if item.sha != sha:
+                    item.shas.append(item.sha)
+                item.kind, item.params, item.sha = kind, params, sha
+                item.events += 1
+                item.deadline = min(now + self.window, item.first_seen + self.max_delay)
+                status = "coalesced"
+
+            if self.window <= 0:
+                self._pending.pop(key, None)
+            else:
+                self._pending[key] = item
+                self._ensure_thread()
+                self._cond.notify()
+
+        if self.window <= 0:
+            self.on_flush(item)
+            return "submitted", item
+        return status, item
+
+    def drop(self, key: Tuple) -> bool:
+        with self._cond:
+            return self._pending.pop(key, None) is not None
+
+    def flush(self, force: bool = False) -> List[PendingWork]:
+        """
+        Hand due items (all items with `force`) to `on_flush`. Returns the
+        items handed over; failed ones are requeued for another window.
+        """
+        now = self.clock()
+        with self._cond:
+            due = [item for item in self._pending.values() if force or item.deadline <= now]
+            for item in due:
+                del self._pending[item.key]
+
+        flushed = []
+        for item in sorted(due, key=lambda i: i.deadline):
+            try:
+                self.on_flush(item)
+                flushed.append(item)
+            except Exception:
+                logger.exception("Flushing webhook work %s failed; retrying in %ss", _key_str(item.key), self.window)
+                self._requeue(item)
+        return flushed
+
+    def _requeue(self, item: PendingWork):
+        with self._cond:
+            self.flush_errors += 1
+            if item.key in self._pending:
+                return              # superseded by a newer event
+            item.deadline = self.clock() + self.window
+            self._pending[item.key] = item
+            self._ensure_thread()
+            self._cond.notify()
+
+    def pending(self) -> List[dict]:
+        now = self.clock()
+        with self._cond:
+            return [item.to_dict(now) for item in sorted(self._pending.values(), key=lambda i: i.deadline)]
+
+    # ---- background flushing -----------------------------------------------------------------
+
+    def _ensure_thread(self):
+        if self.background and self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="webhook-debouncer", daemon=True)
+            self._thread.start()
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                delay = min(item.deadline for item in self._pending.values()) - self.clock()
+                if delay > 0:
+                    self._cond.wait(timeout=delay)
+                    continue
+            self.flush()
+
+#################################################################################################################
+#################################################################################################################
+
+class WebhookIngestor:
+    """
+    Turns verified GitHub events into debounced jobs.
+
+    `submit(kind, params) -> job_id` and `cancel(job_id)` are injected; the
+    process-wide instance uses the job manager.
+    """
+
+    def __init__(
+        self,
+        submit: Callable[[str, dict], str],
+        cancel: Callable[[str], None],
+        window: float = WEBHOOK_DEBOUNCE_SECONDS,
+        max_delay: float = WEBHOOK_MAX_DELAY_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+        background: bool = True
+    ):
+        self._submit = submit
+        self._cancel = cancel
+        self.debouncer = Debouncer(self._on_flush, window, max_delay, clock, background)
+
+        self._lock = threading.Lock()
+        self._deliveries: "OrderedDict[str, None]" = OrderedDict()
+        self._active: Dict[Tuple, Tuple[str, str]] = {}         # key -> (sha, job_id) last submitted
+        self.stats = {
+            "events": 0,
+            "duplicates": 0,
+            "ignored": 0,
+            "coalesced": 0,
+            "jobs_submitted": 0,
+            "jobs_superseded": 0,
+        }
+
+    def _count(self, name: str, n: int = 1):
+        with self._lock:
+            self.stats[name] += n
+
+    # ---- events ------------------------------------------------------------------------------
+
+    def handle(self, event: str, payload: dict, delivery_id: Optional[str] = None) -> dict:
+        """
+        Process one (already verified) delivery. Returns an acknowledgement:
+        {"status": ..., "event": ..., "key": ..., "sha": ..., "events": ...}.
+        """
+
+        self._count("events")
+        if delivery_id:
+            with self._lock:
+                if delivery_id in self._deliveries:
+                    self.stats["duplicates"] += 1
+                    return {"status": "duplicate", "event": event}
+                self._deliveries[delivery_id] = None
+                while len(self._deliveries) > _DELIVERY_MEMORY:
+                    self._deliveries.popitem(last=False)
+
+        try:
+            return self._dispatch(event, payload)
+        except Exception:
+            if delivery_id:
+                with self._lock:
+                    self._deliveries.pop(delivery_id, None)
+            raise
+
+    def _dispatch(self, event: str, payload: dict) -> dict:
+        if event == "ping":
+            return {"status": "pong", "event": event}
+        if event == "pull_request":
+            return self._pull_request(payload)
+        if event == "push":
+            return self._push(payload)
+
+        self._count("ignored")
+        return {"status": "ignored", "event": event}
+
+    def _pull_request(self, payload: dict) -> dict:
+        action = payload.get("action")
+        pr = payload.get("pull_request") or {}
+        repository = payload.get("repository") or {}
+        full_name = repository.get("full_name")
+        number = payload.get("number") or pr.get("number")
+        head_sha = (pr.get("head") or {}).get("sha")
+
+        if not full_name or not number:
+            raise ValueError("pull_request payload without repository or PR number.")
+        key = ("pr", full_name, int(number))
+
+        if action == "closed":
+            self.debouncer.drop(key)
+            self._count("ignored")
+            return {"status": "dropped", "event": "pull_request", "key": _key_str(key)}
+
+        if action not in PR_ACTIONS or not head_sha or pr.get("draft"):
+            self._count("ignored")
+            return {"status": "ignored", "event": "pull_request", "key": _key_str(key)}
+
+        owner, repo = full_name.split("/", 1)
+        params = {
+            "owner": owner,
+            "repo": repo,
+            "pr_number": int(number),
+            "head_sha": head_sha,
+            "token_budget": WEBHOOK_TOKEN_BUDGET,
+        }
+        return self._offer("pull_request", key, "pr_review", params, head_sha)
+
+    def _push(self, payload: dict) -> dict:
+        repository = payload.get("repository") or {}
+        full_name = repository.get("full_name")
+        ref = payload.get("ref") or ""
+        after = payload.get("after")
+        default_branch = repository.get("default_branch")
+
+        if not full_name:
+            raise ValueError("push payload without repository.")
+        key = ("push", full_name, ref)
+
+        if (
+            WEBHOOK_EMBEDDING_PROVIDER is None
+            or payload.get("deleted")
+            or not after
+            or ref != f"refs/heads/{default_branch}"
+        ):
+            self._count("ignored")
+            return {"status": "ignored", "event": "push", "key": _key_str(key)}
+
+        owner, repo = full_name.split("/", 1)
+        params = {
+            "owner": owner,
+            "repo": repo,
+            "branch": default_branch,
+            "embedding_provider": WEBHOOK_EMBEDDING_PROVIDER,
+            "commit_sha": after,
+        }
+        return self._offer("push", key, "init_repo", params, after)
+
+    def _offer(self, event: str, key: Tuple, kind: str, params: dict, sha: str) -> dict:
+        status, item = self.debouncer.offer(key, kind, params, sha)
+        if status == "coalesced":
+            self._count("coalesced")
+        return {"status": status, "event": event, "key": _key_str(key), "sha": sha, "events": item.events}
+
+    # ---- flushing ----------------------------------------------------------------------------
+
+    def _on_flush(self, item: PendingWork):
+        with self._lock:
+            previous = self._active.get(item.key)
+
+        if previous is not None and previous[0] != item.sha:
+            try:
+                self._cancel(previous[1])
+                self._count("jobs_superseded")
+            except (KeyError, ValueError):
+                pass              # already finished or unknown
+
+        job_id = self._submit(item.kind, item.params)
+        with self._lock:
+            self._active[item.key] = (item.sha, job_id)
+            self.stats["jobs_submitted"] += 1
+
+    def status(self) -> dict:
+        with self._lock:
+            stats = {**self.stats, "flush_errors": self.debouncer.flush_errors}
+            active = {_key_str(key): {"sha": sha, "job_id": job_id} for key, (sha, job_id) in self._active.items()}
+        return {"stats": stats, "pending": self.debouncer.pending(), "active": active}
+
+
+def _key_str(key: Tuple) -> str:
+    return "/".join(str(part) for part in key)
+
+#################################################################################################################
+
+_ingestor: Optional[WebhookIngestor] = None
+_ingestor_lock = threading.Lock()
+
+
+def get_webhook_ingestor() -> WebhookIngestor:
+    """Process-wide ingestor submitting to the job manager."""
+    global _ingestor
+
+    from .job_services import get_job_manager
+
+    with _ingestor_lock:
+        if _ingestor is None:
+            _ingestor = WebhookIngestor(
+                submit=lambda kind, params: get_job_manager().submit(kind, params).id,
+                cancel=lambda job_id: get_job_manager().cancel(job_id)
+            )
+        return _ingestor
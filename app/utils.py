@@ -1,7 +1,11 @@
 import os
 import requests
 import base64
+from .services.http_client_services import http_request, github_headers
+from .services.single_flight_services import single_flight
+from .services.metrics_services import record_github_call
 
+@single_flight("fetch_file_content")
 def fetch_file_content(contents_url: str):
     """
     Fetches full content of a file given its contents_url from GitHub API.
@@ -13,10 +17,27 @@ def fetch_file_content(contents_url: str):
     }   
 
     response = requests.get(contents_url, headers=headers)
+    record_github_call("contents", response)
     if response.status_code != 200:
         return {"error": f"Failed: {response.text}"}
     
-    data = response.json()
+    return _decode_file_content(response.json())
+
+
+@single_flight("fetch_file_content")
+async def fetch_file_content_async(contents_url: str):
+    """
+    Async counterpart of `fetch_file_content` on the shared HTTP client.
+    """
+    response = await http_request("GET", contents_url, headers=github_headers())
+    record_github_call("contents", response)
+    if response.status_code != 200:
+        return {"error": f"Failed: {response.text}"}
+
+    return _decode_file_content(response.json())
+
+
+def _decode_file_content(data: dict):
     encoded_content = data.get("content")
     if not encoded_content:
         raise Exception("No content found in the response")
@@ -27,4 +48,4 @@ def fetch_file_content(contents_url: str):
     return {
         "file_path": data.get("path"),
         "file_content": decoded_content
-    }
\ No newline at end of file
+    }
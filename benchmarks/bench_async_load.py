@@ -0,0 +1,130 @@
+"""
+Concurrency of the sync vs. async request path under slow upstreams.
+
+Starts the GitHub stand-in (benchmarks/github_standin.py) with a fixed
+response latency, and the app (uvicorn, one worker) pointed at it via
+GITHUB_API_URL. Then it drives the same PR-contents workload through:
+
+- sync:  `fetch_all_file_contents` in a sync `def` route (the previous
+         request path: blocking `requests`, one threadpool slot per request,
+         files fetched one after another)
+- async: /pr/fetch_all_file_contents (shared httpx pool, files fetched
+         concurrently, no threadpool slot held)
+
+and prints throughput and latency per concurrency level. With the sync
+path, throughput flattens once concurrency exceeds the threadpool (40).
+
+Usage:
+    python -m benchmarks.bench_async_load --concurrency 10 50 200 --latency 0.2 --files 5
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_ready(url: str, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(url, timeout=1.0)
+            return
+        except httpx.TransportError:
+            time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up")
+
+
+def serve(port: int):
+    """Subject app: the real routes plus the old sync route for comparison."""
+    import uvicorn
+    from app.main import app
+    from app.schema import AllFilesContentResponse
+    from app.services.pr_services import fetch_all_file_contents
+
+    @app.get("/bench/sync/fetch_all_file_contents", response_model=AllFilesContentResponse)
+    def sync_route(owner: str, repo: str, pr_number: int):
+        return fetch_all_file_contents(owner, repo, pr_number)
+
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning", access_log=False, timeout_keep_alive=60)
+
+
+async def _load(base_url: str, path: str, concurrency: int, requests_total: int):
+    latencies, errors = [], 0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=300.0, limits=limits) as client:
+        queue = asyncio.Queue()
+        for n in range(requests_total):
+            queue.put_nowait(n)
+
+        async def worker():
+            nonlocal errors
+            while not queue.empty():
+                n = queue.get_nowait()
+                start = time.perf_counter()
+                resp = await client.get(path, params={"owner": "bench", "repo": "repo", "pr_number": n})
+                latencies.append(time.perf_counter() - start)
+                if resp.status_code != 200:
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        wall = time.perf_counter() - start
+
+    latencies.sort()
+    p = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+    return requests_total / wall, p(0.5), p(0.95), errors
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--requests-per-client", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--files", type=int, default=5)
+    parser.add_argument("--serve", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve)
+        return
+
+    standin_port, app_port = _free_port(), _free_port()
+    env = {**os.environ, "GITHUB_API_URL": f"http://127.0.0.1:{standin_port}", "GITHUB_TOKEN": "bench"}
+    procs = [
+        subprocess.Popen([sys.executable, "-m", "benchmarks.github_standin", "--port", str(standin_port),
+                          "--latency", str(args.latency), "--files", str(args.files)], env=env),
+        subprocess.Popen([sys.executable, "-m", "benchmarks.bench_async_load", "--serve", str(app_port)], env=env),
+    ]
+    try:
+        _wait_ready(f"http://127.0.0.1:{standin_port}/docs")
+        _wait_ready(f"http://127.0.0.1:{app_port}/docs")
+        base_url = f"http://127.0.0.1:{app_port}"
+
+        print(f"upstream latency {args.latency}s, {args.files} files per PR")
+        print(f"{'path':<8}{'clients':>8}{'req/sec':>10}{'p50 s':>9}{'p95 s':>9}{'errors':>8}")
+        for concurrency in args.concurrency:
+            total = concurrency * args.requests_per_client
+            for name, path in (("sync", "/bench/sync/fetch_all_file_contents"), ("async", "/pr/fetch_all_file_contents")):
+                rate, p50, p95, errors = asyncio.run(_load(base_url, path, concurrency, total))
+                print(f"{name:<8}{concurrency:>8}{rate:>10.1f}{p50:>9.2f}{p95:>9.2f}{errors:>8}")
+    finally:
+        for proc in procs:
+            proc.terminate()
+            proc.wait()
+
+
+if __name__ == "__main__":
+    main()
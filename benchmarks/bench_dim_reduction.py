@@ -0,0 +1,106 @@
+"""
+Recall vs. storage size for reduced embedding dimensions.
+
+Chunks a source tree, embeds every chunk once at the provider's native
+dimension, then for each candidate dimension truncates + renormalises the
+vectors (equivalent to the OpenAI `dimensions` parameter for Matryoshka
+models) and measures:
+
+- recall@k of the reduced index against the full-dimension ground truth
+- bytes per vector and total float32 index size
+- brute-force search time for all queries
+
+Queries are the first lines of randomly sampled chunks, so every query has
+a realistic near neighbour in the index.
+
+Usage:
+    python -m benchmarks.bench_dim_reduction --path app --provider local
+    python -m benchmarks.bench_dim_reduction --path ../big-repo --provider openai --dims 3072 1536 768 256
+"""
+
+import argparse
+import os
+import random
+import time
+
+import numpy as np
+
+from app.schema import RepoIndexItem, RepoIndexResponse
+from app.services.chunk_services import chunk_repo_contents
+from app.services.embedding_services import embed_texts
+
+
+def _load_tree(root: str) -> RepoIndexResponse:
+    items = []
+    for dirpath, _, files in os.walk(root):
+        if ".git" in dirpath.split(os.sep):
+            continue
+        for filename in files:
+            path = os.path.join(dirpath, filename)
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    items.append(RepoIndexItem(path=os.path.relpath(path, root), content=f.read()))
+            except Exception:
+                continue
+    return RepoIndexResponse(items=items)
+
+
+def _normalize(m: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(m, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return m / norms
+
+
+def _top_k(index: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    scores = queries @ index.T
+    top = np.argpartition(-scores, kth=min(k, scores.shape[1] - 1), axis=1)[:, :k]
+    return top
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--path", default="app")
+    parser.add_argument("--provider", default="local")
+    parser.add_argument("--dims", type=int, nargs="*")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    chunks = chunk_repo_contents(_load_tree(args.path)).chunks
+    if len(chunks) <= args.k:
+        raise SystemExit(f"Need more than k={args.k} chunks, found {len(chunks)}")
+
+    rng = random.Random(0)
+    sample = rng.sample(chunks, min(args.queries, len(chunks)))
+    query_texts = ["\n".join(c.content.split("\n")[:3]) for c in sample]
+
+    docs = np.asarray([r["embedding"] for r in embed_texts([c.content for c in chunks], args.provider)], dtype=np.float32)
+    queries = np.asarray([r["embedding"] for r in embed_texts(query_texts, args.provider)], dtype=np.float32)
+
+    native = docs.shape[1]
+    dims = sorted({d for d in (args.dims or [native, 1536, 1024, 768, 512, 256, 128, 64]) if d <= native}, reverse=True)
+
+    truth = _top_k(_normalize(docs), _normalize(queries), args.k)
+
+    print(f"{len(chunks)} chunks, {len(query_texts)} queries, provider={args.provider}, native dim={native}")
+    print(f"{'dim':>6}{'bytes/vec':>11}{'index MB':>10}{'recall@' + str(args.k):>11}{'search ms':>11}")
+
+    for dim in dims:
+        d = _normalize(docs[:, :dim])
+        q = _normalize(queries[:, :dim])
+
+        start = time.perf_counter()
+        found = _top_k(d, q, args.k)
+        elapsed = (time.perf_counter() - start) * 1000
+
+        recall = np.mean([
+            len(set(found[i]) & set(truth[i])) / args.k
+            for i in range(len(q))
+        ])
+        size_mb = d.nbytes / 1e6
+
+        print(f"{dim:>6}{dim * 4:>11}{size_mb:>10.2f}{recall:>11.3f}{elapsed:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Local embedding throughput vs. worker count.
+
+Runs the same synthetic chunk set through `embed_local` (single process) and
+through `LocalEmbeddingPool` with 1, 2, 4, ... workers, and prints chunks/sec.
+
+Usage:
+    python -m benchmarks.bench_embedding_pool --chunks 2000 --max-workers 8
+"""
+
+import argparse
+import os
+import random
+import time
+
+from app.services.embedding_pool_services import LocalEmbeddingPool
+from app.services.embedding_services import _get_local_model
+
+
+def _synthetic_chunks(n: int, seed: int = 0):
+    rng = random.Random(seed)
+    words = ["def", "class", "return", "self", "value", "request", "config",
+             "for", "in", "if", "else", "items", "result", "path", "None"]
+    chunks = []
+    for i in range(n):
+        lines = [
+            " ".join(rng.choice(words) for _ in range(rng.randint(4, 12)))
+            for _ in range(rng.randint(15, 30))
+        ]
+        chunks.append(f"def handler_{i}():\n    " + "\n    ".join(lines))
+    return chunks
+
+
+def _worker_counts(max_workers: int):
+    counts, n = [], 1
+    while n <= max_workers:
+        counts.append(n)
+        n *= 2
+    if counts[-1] != max_workers:
+        counts.append(max_workers)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    texts = _synthetic_chunks(args.chunks)
+
+    # Baseline: one model, one process
+    model = _get_local_model()
+    start = time.perf_counter()
+    model.encode(texts, batch_size=args.batch_size)
+    baseline = len(texts) / (time.perf_counter() - start)
+    print(f"{'mode':<16}{'workers':>8}{'chunks/sec':>14}{'speedup':>10}")
+    print(f"{'in-process':<16}{1:>8}{baseline:>14.1f}{1.0:>10.2f}")
+
+    for workers in _worker_counts(args.max_workers):
+        with LocalEmbeddingPool(workers=workers, batch_size=args.batch_size) as pool:
+            # Warm-up: model load happens in the worker initializers
+            pool.embed(texts[: workers * args.batch_size])
+
+            start = time.perf_counter()
+            pool.embed(texts)
+            rate = len(texts) / (time.perf_counter() - start)
+
+        print(f"{'pool':<16}{workers:>8}{rate:>14.1f}{rate / baseline:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
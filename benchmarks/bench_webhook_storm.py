@@ -0,0 +1,100 @@
+"""
+Webhook debouncing under event storms.
+
+Replays `pull_request` / `push` deliveries through `WebhookIngestor` on a
+simulated clock and counts how many jobs would be submitted, and for which
+SHA. Nothing is fetched or indexed: submitted jobs are only recorded.
+
+Deliveries are either recorded payloads (JSON files as saved from GitHub's
+"Recent Deliveries" page, with the event name in an "event" key or given
+via --event) or a synthetic force-push storm: --prs PRs receiving
+--pushes `synchronize` events each, --interval seconds apart.
+
+Usage:
+    python -m benchmarks.bench_webhook_storm --prs 5 --pushes 40 --interval 2 --window 30
+    python -m benchmarks.bench_webhook_storm --event pull_request --payloads recorded/*.json --interval 1
+"""
+
+import argparse
+import hashlib
+import json
+
+from app.services.webhook_services import WebhookIngestor
+
+
+def _synthetic_storm(prs: int, pushes: int):
+    deliveries = []
+    for push in range(pushes):
+        for pr in range(1, prs + 1):
+            sha = hashlib.sha1(f"{pr}:{push}".encode()).hexdigest()
+            deliveries.append(("pull_request", {
+                "action": "opened" if push == 0 else "synchronize",
+                "number": pr,
+                "pull_request": {"number": pr, "head": {"sha": sha}},
+                "repository": {"full_name": "bench/repo", "default_branch": "main"},
+            }))
+    return deliveries
+
+
+def _recorded(paths, event):
+    deliveries = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        name = data.pop("event", None) or event
+        payload = data.get("payload", data)
+        deliveries.append((name, payload))
+    return deliveries
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--prs", type=int, default=5)
+    parser.add_argument("--pushes", type=int, default=40)
+    parser.add_argument("--interval", type=float, default=2.0, help="simulated seconds between deliveries")
+    parser.add_argument("--window", type=float, default=30.0)
+    parser.add_argument("--max-delay", type=float, default=300.0)
+    parser.add_argument("--payloads", nargs="*")
+    parser.add_argument("--event", default="pull_request")
+    args = parser.parse_args()
+
+    deliveries = _recorded(args.payloads, args.event) if args.payloads else _synthetic_storm(args.prs, args.pushes)
+
+    now = [0.0]
+    submitted = []
+    ingestor = WebhookIngestor(
+        submit=lambda kind, params: submitted.append((now[0], kind, params)) or f"job-{len(submitted)}",
+        cancel=lambda job_id: None,
+        window=args.window,
+        max_delay=args.max_delay,
+        clock=lambda: now[0],
+        background=False
+    )
+
+    latest = {}
+    for n, (event, payload) in enumerate(deliveries):
+        now[0] = n * args.interval
+        ingestor.debouncer.flush()
+        ack = ingestor.handle(event, payload, delivery_id=f"delivery-{n}")
+        if ack.get("sha"):
+            latest[ack["key"]] = ack["sha"]
+
+    now[0] += args.max_delay
+    ingestor.debouncer.flush()
+
+    stats = ingestor.status()["stats"]
+    final = {}
+    for _, kind, params in submitted:
+        key = f"{kind}:{params['owner']}/{params['repo']}:{params.get('pr_number', params.get('branch'))}"
+        final[key] = params.get("head_sha") or params.get("commit_sha")
+
+    print(f"{'deliveries':<22}{len(deliveries):>8}")
+    print(f"{'coalesced':<22}{stats['coalesced']:>8}")
+    print(f"{'ignored':<22}{stats['ignored']:>8}")
+    print(f"{'jobs submitted':<22}{len(submitted):>8}")
+    print(f"{'superseded (cancel)':<22}{stats['jobs_superseded']:>8}")
+    print(f"{'latest SHA processed':<22}{str(sorted(final.values()) == sorted(latest.values())):>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""
+Local stand-in for the parts of the GitHub REST API the app calls.
+
+Serves synthetic PRs and repository contents with a configurable response
+latency, so load tests and benchmarks run without network access or rate
+limits. Point the app at it with GITHUB_API_URL. With --repo-dir, trees and
+contents are those of a real checkout (e.g. a benchmarks.synthetic_repo
+tree), otherwise --files generated modules.
+
+GitHub responses carry X-RateLimit-* headers counting down from 5000.
+
+Endpoints:
+    GET  /repos/{owner}/{repo}/pulls/{n}              head SHA
+    GET  /repos/{owner}/{repo}/pulls/{n}/files        --files changed files with patches
+    GET  /repos/{owner}/{repo}/contents/{path}        base64 file content
+    GET  /repos/{owner}/{repo}/git/refs/heads/{b}     -> commit -> tree (recursive)
+    POST /v1/embeddings                               OpenAI-compatible, deterministic vectors
+                                                      (point the app at it with OPENAI_BASE_URL)
+
+Usage:
+    python -m benchmarks.github_standin --port 9010 --latency 0.2 --files 10
+    python -m benchmarks.github_standin --port 9010 --latency 0.05 --repo-dir /tmp/bench/work/bench/synthetic
+"""
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import itertools
+import math
+import os
+import random
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+
+LATENCY = float(os.getenv("STANDIN_LATENCY", "0.2"))
+FILES = int(os.getenv("STANDIN_FILES", "10"))
+REPO_DIR = os.getenv("STANDIN_REPO_DIR")
+EMBED_DIM = int(os.getenv("STANDIN_EMBED_DIM", "256"))
+
+RATE_LIMIT = 5000
+_requests = itertools.count()
+_repo_paths = None
+
+
+def _generated(path: str) -> str:
+    body = "\n".join(
+        f"def handler_{i}(request):\n    return process(request, {i})  # {path}\n" for i in range(20)
+    )
+    return f"# {path}\n{body}"
+
+
+def _content(path: str) -> bytes:
+    if REPO_DIR:
+        with open(os.path.join(REPO_DIR, path), "rb") as f:
+            return f.read()
+    return _generated(path).encode("utf-8")
+
+
+def _paths():
+    """Repository files (--repo-dir, sorted, without .git) or generated modules."""
+    global _repo_paths
+    if not REPO_DIR:
+        return [f"src/module_{i}.py" for i in range(FILES)]
+    if _repo_paths is None:
+        found = []
+        for root, dirs, files in os.walk(REPO_DIR):
+            dirs[:] = sorted(d for d in dirs if d != ".git")
+            found.extend(os.path.relpath(os.path.join(root, f), REPO_DIR) for f in sorted(files))
+        _repo_paths = found
+    return _repo_paths
+
+
+def _json(payload) -> JSONResponse:
+    """GitHub-style response: rate-limit headers counting down per request."""
+    used = next(_requests) % RATE_LIMIT
+    return JSONResponse(payload, headers={
+        "X-RateLimit-Limit": str(RATE_LIMIT),
+        "X-RateLimit-Remaining": str(RATE_LIMIT - used - 1),
+        "X-RateLimit-Reset": str(int(time.time()) + 3600),
+        "X-RateLimit-Resource": "core",
+    })
+
+
+def _vector(text: str, dim: int):
+    rng = random.Random(hashlib.sha1(text.encode("utf-8")).digest())
+    values = [rng.gauss(0.0, 1.0) for _ in range(dim)]
+    norm = math.sqrt(sum(v * v for v in values)) or 1.0
+    return [v / norm for v in values]
+
+
+def _sha(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def build_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/repos/{owner}/{repo}/pulls/{number}")
+    async def pull(owner: str, repo: str, number: int):
+        await asyncio.sleep(LATENCY)
+        return _json({"number": number, "head": {"sha": _sha(f"{owner}/{repo}#{number}")}})
+
+    @app.get("/repos/{owner}/{repo}/pulls/{number}/files")
+    async def pull_files(owner: str, repo: str, number: int, request: Request):
+        await asyncio.sleep(LATENCY)
+        base = str(request.base_url).rstrip("/")
+        return _json([
+            {
+                "filename": path,
+                "status": "modified",
+                "patch": "@@ -1,2 +1,2 @@\n def handler_0(request):\n-    return None\n+    return process(request, 0)\n",
+                "contents_url": f"{base}/repos/{owner}/{repo}/contents/{path}?ref=pr{number}",
+            }
+            for path in _paths()[:FILES]
+        ])
+
+    @app.get("/repos/{owner}/{repo}/contents/{path:path}")
+    async def contents(owner: str, repo: str, path: str):
+        await asyncio.sleep(LATENCY)
+        encoded = base64.b64encode(_content(path)).decode("ascii")
+        return _json({"path": path, "content": encoded, "encoding": "base64"})
+
+    @app.get("/repos/{owner}/{repo}/git/refs/heads/{branch}")
+    async def ref(owner: str, repo: str, branch: str, request: Request):
+        await asyncio.sleep(LATENCY)
+        sha = _sha(f"{owner}/{repo}@{branch}")
+        base = str(request.base_url).rstrip("/")
+        return _json({"object": {"sha": sha, "url": f"{base}/repos/{owner}/{repo}/git/commits/{sha}"}})
+
+    @app.get("/repos/{owner}/{repo}/git/commits/{sha}")
+    async def commit(owner: str, repo: str, sha: str, request: Request):
+        await asyncio.sleep(LATENCY)
+        base = str(request.base_url).rstrip("/")
+        return _json({"sha": sha, "tree": {"url": f"{base}/repos/{owner}/{repo}/git/trees/{sha}"}})
+
+    @app.get("/repos/{owner}/{repo}/git/trees/{sha}")
+    async def tree(owner: str, repo: str, sha: str):
+        await asyncio.sleep(LATENCY)
+        return _json({
+            "sha": sha,
+            "truncated": False,
+            "tree": [
+                {"path": path, "type": "blob", "sha": _sha(path), "mode": "100644", "size": len(_content(path))}
+                for path in _paths()
+            ],
+        })
+
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request):
+        body = await request.json()
+        texts = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        dim = body.get("dimensions") or EMBED_DIM
+        await asyncio.sleep(LATENCY)
+        return {
+            "object": "list",
+            "model": body.get("model"),
+            "data": [{"object": "embedding", "index": i, "embedding": _vector(t, dim)} for i, t in enumerate(texts)],
+            "usage": {"prompt_tokens": sum(len(t) // 4 for t in texts), "total_tokens": sum(len(t) // 4 for t in texts)},
+        }
+
+    return app
+
+
+app = build_app()
+
+
+def main():
+    global LATENCY, FILES, REPO_DIR
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=9010)
+    parser.add_argument("--latency", type=float, default=LATENCY)
+    parser.add_argument("--files", type=int, default=FILES)
+    parser.add_argument("--repo-dir", default=REPO_DIR)
+    args = parser.parse_args()
+
+    LATENCY, FILES, REPO_DIR = args.latency, args.files, args.repo_dir
+
+    import uvicorn
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning", access_log=False, timeout_keep_alive=60)
+
+
+if __name__ == "__main__":
+    main()
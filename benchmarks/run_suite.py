@@ -0,0 +1,445 @@
+"""
+Reproducible benchmark suite: per-stage and end-to-end throughput, latency
+and peak RSS on a synthetic repository, comparable against a saved baseline.
+
+Setup (not measured):
+- a synthetic multi-language repo (benchmarks.synthetic_repo), published as
+  a local git remote the app clones through GITHUB_CLONE_URL
+- the GitHub stand-in (benchmarks.github_standin) serving the same tree,
+  PRs and OpenAI-compatible embeddings with a fixed latency
+
+Stages, each run --repeat times in a fresh subprocess (so peak RSS belongs
+to the stage; one untimed warm-up run, timings are medians):
+    clone        clone_repo from the local remote
+    scan         iter_repo_files over the checkout
+    chunk_text   chunk_text over every code file
+    chunk_file   chunk_file: chunk_text + symbols + RepoChunk models
+    serialize    JSON page body of every chunk (bulk route encoder)
+    embed        embed_texts(provider="openai") against the stand-in
+
+End to end, against the app under uvicorn (one worker, restarted per
+scenario so server peak RSS belongs to the scenario):
+    index_repo_clone, chunk_repo, index_repo_crawl, pr_contents, embed_batch
+
+Results are written as JSON (--output) with the config and environment.
+With --baseline, every metric is compared against a previous result file;
+`*_per_sec` metrics are better when higher, all others when lower.
+--fail-on-regression exits with status 1 if a metric got worse by more than
+--threshold percent.
+
+Usage:
+    python -m benchmarks.run_suite --output baseline.json
+    python -m benchmarks.run_suite --baseline baseline.json --fail-on-regression
+    python -m benchmarks.run_suite --stages chunk_text chunk_file --scenarios none --files 1000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.synthetic_repo import make_remote
+
+
+MB = 1024 * 1024
+
+STAGES = ["clone", "scan", "chunk_text", "chunk_file", "serialize", "embed"]
+SCENARIOS = ["index_repo_clone", "chunk_repo", "index_repo_crawl", "pr_contents", "embed_batch"]
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_ready(url: str, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(url, timeout=1.0)
+            return
+        except httpx.TransportError:
+            time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up")
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / MB if sys.platform == "darwin" else peak / 1024
+
+
+def _process_peak_rss_mb(pid: int):
+    """VmHWM of another process (Linux only)."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def _percentile(values, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+#################################################################################################################
+# Stages: `setup(ctx)` returns `run() -> metrics`; setup is not timed
+
+def _code_items(ctx):
+    from app.services.repo_index_services import iter_repo_files
+    return list(iter_repo_files(ctx["work_dir"]))
+
+
+def _stage_clone(ctx):
+    import shutil
+    from app.services.repo_index_services import clone_repo, _object_bytes
+
+    def run():
+        start = time.perf_counter()
+        directory, _ = clone_repo(ctx["owner"], ctx["repo"], ctx["branch"])
+        seconds = time.perf_counter() - start
+        size = _object_bytes(directory)
+        shutil.rmtree(directory, ignore_errors=True)
+        return {"seconds": seconds, "mb_per_sec": size / MB / seconds}
+    return run
+
+
+def _stage_scan(ctx):
+    from app.services.repo_index_services import iter_repo_files
+
+    def run():
+        start = time.perf_counter()
+        items = list(iter_repo_files(ctx["work_dir"]))
+        seconds = time.perf_counter() - start
+        size = sum(item.size for item in items)
+        return {"seconds": seconds, "files_per_sec": len(items) / seconds, "mb_per_sec": size / MB / seconds}
+    return run
+
+
+def _stage_chunk_text(ctx):
+    from app.services.chunk_services import chunk_text, CODE_EXTENSIONS
+
+    contents = [
+        item.content for item in _code_items(ctx)
+        if os.path.splitext(item.path)[1] in CODE_EXTENSIONS
+    ]
+    size = sum(len(c) for c in contents)
+
+    def run():
+        start = time.perf_counter()
+        chunks = sum(len(chunk_text(content)) for content in contents)
+        seconds = time.perf_counter() - start
+        return {"seconds": seconds, "mb_per_sec": size / MB / seconds, "chunks_per_sec": chunks / seconds}
+    return run
+
+
+def _stage_chunk_file(ctx):
+    from app.services.chunk_services import iter_repo_chunks
+
+    items = _code_items(ctx)
+
+    def run():
+        start = time.perf_counter()
+        chunks = sum(1 for _ in iter_repo_chunks(items))
+        seconds = time.perf_counter() - start
+        return {"seconds": seconds, "chunks_per_sec": chunks / seconds, "files_per_sec": len(items) / seconds}
+    return run
+
+
+def _stage_serialize(ctx):
+    from app.services.chunk_services import iter_repo_chunks
+    from app.services.pagination_services import BulkSource, json_page_body
+
+    chunks = list(iter_repo_chunks(_code_items(ctx)))
+
+    def run():
+        source = BulkSource("chunks", "bench/synthetic", ctx["commit"], ((c, {}) for c in chunks))
+        start = time.perf_counter()
+        body = json_page_body(source, "chunks", None, None)
+        seconds = time.perf_counter() - start
+        return {"seconds": seconds, "mb_per_sec": len(body) / MB / seconds, "chunks_per_sec": len(chunks) / seconds}
+    return run
+
+
+def _stage_embed(ctx):
+    from app.services.chunk_services import iter_repo_chunks
+    from app.services.embedding_services import embed_texts
+
+    texts = [c.content for c in iter_repo_chunks(_code_items(ctx))][:ctx["embed_texts"]]
+
+    def run():
+        start = time.perf_counter()
+        embed_texts(texts, "openai")
+        seconds = time.perf_counter() - start
+        return {"seconds": seconds, "texts_per_sec": len(texts) / seconds}
+    return run
+
+
+_STAGE_SETUP = {
+    "clone": _stage_clone,
+    "scan": _stage_scan,
+    "chunk_text": _stage_chunk_text,
+    "chunk_file": _stage_chunk_file,
+    "serialize": _stage_serialize,
+    "embed": _stage_embed,
+}
+
+
+def run_stage_child(name: str, ctx: dict, repeat: int) -> dict:
+    """Body of a stage subprocess: setup, `repeat` timed runs, medians + peak RSS."""
+    run = _STAGE_SETUP[name](ctx)
+    rss_before = _peak_rss_mb()
+
+    run()       # warm-up: imports, regex compilation, connection setup
+    runs = [run() for _ in range(repeat)]
+    metrics = {key: statistics.median(r[key] for r in runs) for key in runs[0]}
+    metrics["peak_rss_mb"] = _peak_rss_mb()
+    metrics["rss_growth_mb"] = metrics["peak_rss_mb"] - rss_before
+    return metrics
+
+
+def run_stage(name: str, ctx: dict, repeat: int, env: dict) -> dict:
+    proc = subprocess.run(
+        [sys.executable, "-m", "benchmarks.run_suite", "--run-stage", name,
+         "--context", json.dumps(ctx), "--repeat", str(repeat)],
+        env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"stage {name} failed:\n{proc.stderr}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+#################################################################################################################
+# End-to-end scenarios: (method, path, request kwargs for the n-th request)
+
+def _scenario_request(name: str, ctx: dict, n: int, embed_texts: list):
+    repo = {"owner": ctx["owner"], "repo": ctx["repo"], "branch": ctx["branch"]}
+    if name == "index_repo_clone":
+        return "GET", "/repo_index/index_repo_clone", {"params": repo}
+    if name == "chunk_repo":
+        return "GET", "/chunk/chunk_repo", {"params": repo}
+    if name == "index_repo_crawl":
+        return "GET", "/repo_index/index_repo_crawl", {"params": repo}
+    if name == "pr_contents":
+        params = {"owner": ctx["owner"], "repo": ctx["repo"], "pr_number": n + 1}
+        return "GET", "/pr/fetch_all_file_contents", {"params": params}
+    if name == "embed_batch":
+        return "POST", "/embed/batch", {"json": {"texts": embed_texts, "provider": "openai"}}
+    raise ValueError(f"Unknown scenario '{name}'")
+
+
+async def _load(base_url: str, name: str, ctx: dict, requests_total: int, concurrency: int, embed_texts: list):
+    latencies, errors = [], 0
+    counter = iter(range(requests_total))
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=600.0) as client:
+        async def worker():
+            nonlocal errors
+            for n in counter:
+                method, path, kwargs = _scenario_request(name, ctx, n, embed_texts)
+                start = time.perf_counter()
+                response = await client.request(method, path, **kwargs)
+                latencies.append(time.perf_counter() - start)
+                if response.status_code != 200:
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        wall = time.perf_counter() - start
+
+    return {
+        "p50_ms": _percentile(latencies, 0.50) * 1000,
+        "p95_ms": _percentile(latencies, 0.95) * 1000,
+        "requests_per_sec": requests_total / wall,
+        "errors": errors,
+    }
+
+
+def run_scenario(name: str, ctx: dict, env: dict, requests_total: int, concurrency: int) -> dict:
+    port = _free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port),
+         "--log-level", "warning", "--no-access-log"],
+        env=env
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    embed_texts = [f"def handler_{i}(request):\n    return process(request, {i})\n" for i in range(64)]
+    try:
+        _wait_ready(f"{base_url}/docs")
+        asyncio.run(_load(base_url, name, ctx, 1, 1, embed_texts))      # warm-up
+        metrics = asyncio.run(_load(base_url, name, ctx, requests_total, concurrency, embed_texts))
+        metrics["server_peak_rss_mb"] = _process_peak_rss_mb(server.pid)
+        return metrics
+    finally:
+        server.terminate()
+        server.wait()
+
+#################################################################################################################
+# Baseline comparison
+
+def _flatten(results: dict) -> dict:
+    return {
+        f"{group}.{name}.{metric}": value
+        for group, entries in results.items()
+        for name, metrics in entries.items()
+        for metric, value in metrics.items()
+        if isinstance(value, (int, float))
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float):
+    """Rows (metric, baseline, current, change %, verdict) and the regression count."""
+    now, before = _flatten(current["results"]), _flatten(baseline["results"])
+    rows, regressions = [], 0
+
+    for key in sorted(now.keys() & before.keys()):
+        old, new = before[key], now[key]
+        higher_is_better = key.endswith("_per_sec")
+        if old == 0:
+            change = 0.0 if new == 0 else float("inf")
+        else:
+            change = (new - old) / abs(old) * 100
+        worse = -change if higher_is_better else change
+
+        verdict = ""
+        if worse > threshold:
+            verdict = "REGRESSION"
+            regressions += 1
+        elif worse < -threshold:
+            verdict = "improved"
+        rows.append((key, old, new, change, verdict))
+
+    return rows, regressions
+
+#################################################################################################################
+
+def _environment() -> dict:
+    def git(*args):
+        try:
+            return subprocess.run(["git", *args], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True).stdout.strip()
+        except OSError:
+            return None
+
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "git_commit": git("rev-parse", "HEAD"),
+        "git_dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=300, help="code files in the synthetic repo")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--stages", nargs="+", default=STAGES, help=f"{STAGES} or 'none'")
+    parser.add_argument("--scenarios", nargs="+", default=SCENARIOS, help=f"{SCENARIOS} or 'none'")
+    parser.add_argument("--requests", type=int, default=10, help="requests per end-to-end scenario")
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--latency", type=float, default=0.02, help="stand-in response latency (s)")
+    parser.add_argument("--pr-files", type=int, default=10)
+    parser.add_argument("--embed-texts", type=int, default=512)
+    parser.add_argument("--workdir", help="where the synthetic repo is generated (default: temp dir)")
+    parser.add_argument("--output", help="write results JSON here")
+    parser.add_argument("--baseline", help="results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=10.0, help="regression threshold, percent")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    parser.add_argument("--run-stage", help=argparse.SUPPRESS)
+    parser.add_argument("--context", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_stage:
+        print(json.dumps(run_stage_child(args.run_stage, json.loads(args.context), args.repeat)))
+        return
+
+    stages = [] if args.stages == ["none"] else args.stages
+    scenarios = [] if args.scenarios == ["none"] else args.scenarios
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="pr-review-bench-")
+    repo = make_remote(workdir, files=args.files, seed=args.seed)
+    ctx = {key: repo[key] for key in ("work_dir", "owner", "repo", "branch", "commit")}
+    ctx["embed_texts"] = args.embed_texts
+    print(f"synthetic repo {repo['commit'][:12]} {repo['counts']} in {workdir}")
+
+    standin_port = _free_port()
+    env = {
+        **os.environ,
+        "GITHUB_CLONE_URL": repo["clone_url"],
+        "GITHUB_API_URL": f"http://127.0.0.1:{standin_port}",
+        "GITHUB_TOKEN": "bench",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{standin_port}",
+        "OPENAI_API_KEY": "bench",
+        "REPO_INDEX_DATA_DIR": os.path.join(workdir, "data"),
+    }
+    standin = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.github_standin", "--port", str(standin_port),
+         "--latency", str(args.latency), "--files", str(args.pr_files), "--repo-dir", repo["work_dir"]],
+        env=env
+    )
+
+    results = {"stage": {}, "e2e": {}}
+    try:
+        _wait_ready(f"http://127.0.0.1:{standin_port}/docs")
+
+        for name in stages:
+            results["stage"][name] = run_stage(name, ctx, args.repeat, env)
+            print(f"stage {name:<18}" + "  ".join(f"{k}={v:.3f}" for k, v in results["stage"][name].items()))
+
+        for name in scenarios:
+            results["e2e"][name] = run_scenario(name, ctx, env, args.requests, args.concurrency)
+            print(f"e2e   {name:<18}" + "  ".join(
+                f"{k}={v:.3f}" for k, v in results["e2e"][name].items() if v is not None
+            ))
+    finally:
+        standin.terminate()
+        standin.wait()
+
+    report = {
+        "created": time.time(),
+        "config": {
+            "files": args.files, "seed": args.seed, "repeat": args.repeat, "requests": args.requests,
+            "concurrency": args.concurrency, "latency": args.latency, "pr_files": args.pr_files,
+            "embed_texts": args.embed_texts, "repo_commit": repo["commit"],
+        },
+        "environment": _environment(),
+        "results": results,
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("config") != report["config"]:
+            print("warning: baseline was recorded with a different config; differences may not be comparable")
+
+        rows, regressions = compare(report, baseline, args.threshold)
+        print(f"\n{'metric':<48}{'baseline':>12}{'current':>12}{'change':>10}")
+        for key, old, new, change, verdict in rows:
+            print(f"{key:<48}{old:>12.3f}{new:>12.3f}{change:>9.1f}%  {verdict}")
+        print(f"\n{regressions} regression(s) beyond {args.threshold:.0f}%")
+
+        if regressions and args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+"""
+Synthetic multi-language repositories for benchmarks.
+
+Generates a deterministic source tree (same seed and sizes -> same bytes)
+with Python, JavaScript, TypeScript, Go, Java, Rust and C modules, plus the
+files the indexer must skip (binary assets, vendored node_modules, one file
+over the 2MB limit) and non-code text (Markdown, JSON). The tree is
+committed and published as a bare repository, so the app can clone it as a
+local git remote:
+
+    GITHUB_CLONE_URL=file://<remote_root>/{owner}/{repo}.git
+
+Usage:
+    python -m benchmarks.synthetic_repo --out /tmp/bench-repos --files 300 --seed 0
+"""
+
+import argparse
+import os
+import random
+import shutil
+import subprocess
+
+
+LANGUAGES = ["python", "javascript", "typescript", "go", "java", "rust", "c"]
+
+EXTENSIONS = {
+    "python": ".py", "javascript": ".js", "typescript": ".ts", "go": ".go",
+    "java": ".java", "rust": ".rs", "c": ".c",
+}
+
+WORDS = [
+    "request", "config", "value", "items", "result", "path", "buffer", "index",
+    "cache", "token", "payload", "record", "offset", "limit", "client", "state",
+]
+
+
+def _name(rng: random.Random, parts: int = 2) -> str:
+    return "_".join(rng.choice(WORDS) for _ in range(parts))
+
+
+def _camel(name: str) -> str:
+    return "".join(part.capitalize() for part in name.split("_"))
+
+
+def _body_lines(rng: random.Random, lines: int):
+    for _ in range(lines):
+        a, b = _name(rng, 1), _name(rng, 1)
+        yield rng.choice([
+            f"{a} = {b} + {rng.randint(1, 99)}",
+            f"if {a} > {rng.randint(1, 9)}:",
+            f"{a}.append({b})",
+            f"{a} = process({b}, {rng.randint(1, 9)})",
+        ])
+
+#################################################################################################################
+
+def _python_module(rng: random.Random, functions: int) -> str:
+    out = ["import os", "import json", ""]
+    for i in range(functions):
+        if i % 4 == 0:
+            out.append(f"class {_camel(_name(rng))}{i}:")
+            out.append(f"    def __init__(self, {_name(rng, 1)}):")
+            out.append(f"        self.value = {rng.randint(0, 100)}")
+            out.append("")
+        name = _name(rng)
+        out.append(f"def {name}_{i}(request, limit={rng.randint(1, 50)}):")
+        out.append(f'    """Handle {name.replace("_", " ")} for the request."""')
+        for line in _body_lines(rng, rng.randint(4, 14)):
+            out.append(f"    {line}" if not line.endswith(":") else f"    {line}\n        pass")
+        out.append(f"    return {{'{name}': limit}}")
+        out.append("")
+    return "\n".join(out) + "\n"
+
+
+def _brace_module(rng: random.Random, functions: int, language: str) -> str:
+    header = {
+        "javascript": ["'use strict';", "const fs = require('fs');", ""],
+        "typescript": ["import { readFileSync } from 'fs';", ""],
+        "go": ["package service", "", 'import "fmt"', ""],
+        "java": ["package com.example.service;", "", "import java.util.List;", "", "public class Service {"],
+        "rust": ["use std::collections::HashMap;", ""],
+        "c": ["#include <stdio.h>", "#include <stdlib.h>", ""],
+    }[language]
+    out = list(header)
+    indent = "    " if language == "java" else ""
+
+    for i in range(functions):
+        name = f"{_camel(_name(rng))}{i}"
+        signature = {
+            "javascript": f"function {name}(request, limit) {{",
+            "typescript": f"export function {name}(request: Request, limit: number): number {{",
+            "go": f"func {name}(request *Request, limit int) int {{",
+            "java": f"public int {name}(Request request, int limit) {{",
+            "rust": f"pub fn {name.lower()}(request: &Request, limit: usize) -> usize {{",
+            "c": f"int {name.lower()}(struct request *request, int limit) {{",
+        }[language]
+        out.append(indent + signature)
+        for j in range(rng.randint(4, 14)):
+            var = _name(rng, 1)
+            if j % 5 == 4:
+                out.append(f"{indent}    if ({var} > {rng.randint(1, 9)}) {{")
+                out.append(f"{indent}        {var} = {var} + limit;")
+                out.append(f"{indent}    }}")
+            else:
+                out.append(f"{indent}    {var} = process(request, {rng.randint(1, 99)});")
+        out.append(f"{indent}    return limit;")
+        out.append(indent + "}")
+        out.append("")
+
+    if language == "java":
+        out.append("}")
+    return "\n".join(out) + "\n"
+
+
+def _module(rng: random.Random, language: str, functions: int) -> str:
+    if language == "python":
+        return _python_module(rng, functions)
+    return _brace_module(rng, functions, language)
+
+#################################################################################################################
+
+def generate_tree(root: str, files: int = 300, functions: tuple = (4, 30), seed: int = 0) -> dict:
+    """
+    Write the source tree under `root` (created, must not exist).
+    Returns counts by kind: code, text, skipped.
+    """
+    rng = random.Random(seed)
+    os.makedirs(root)
+    counts = {"code": 0, "text": 0, "skipped": 0}
+
+    for i in range(files):
+        language = LANGUAGES[i % len(LANGUAGES)]
+        directory = os.path.join(root, "src", language, f"pkg_{i // 25}")
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"module_{i}{EXTENSIONS[language]}")
+        with open(path, "w") as f:
+            f.write(_module(rng, language, rng.randint(*functions)))
+        counts["code"] += 1
+
+    # Non-code text: indexed as files, not chunked
+    os.makedirs(os.path.join(root, "docs"))
+    for i in range(max(1, files // 20)):
+        with open(os.path.join(root, "docs", f"guide_{i}.md"), "w") as f:
+            f.write(f"# Guide {i}\n\n" + "\n".join(" ".join(_body_lines(rng, 3)) for _ in range(20)) + "\n")
+        counts["text"] += 1
+    with open(os.path.join(root, "package.json"), "w") as f:
+        f.write('{"name": "synthetic", "version": "1.0.0"}\n')
+    counts["text"] += 1
+
+    # Skipped by the indexer: binary extensions, vendored dirs, files > 2MB
+    os.makedirs(os.path.join(root, "assets"))
+    for i in range(max(1, files // 50)):
+        with open(os.path.join(root, "assets", f"image_{i}.png"), "wb") as f:
+            f.write(bytes(rng.getrandbits(8) for _ in range(2048)))
+        counts["skipped"] += 1
+    os.makedirs(os.path.join(root, "node_modules", "left-pad"))
+    with open(os.path.join(root, "node_modules", "left-pad", "index.js"), "w") as f:
+        f.write("module.exports = function leftPad() {};\n")
+    counts["skipped"] += 1
+    with open(os.path.join(root, "data_dump.sql"), "w") as f:
+        line = "INSERT INTO records VALUES (1, 'synthetic benchmark row');\n"
+        f.write(line * (2 * 1024 * 1024 // len(line) + 1))
+    counts["skipped"] += 1
+
+    return counts
+
+
+def _git(*args, cwd=None):
+    subprocess.run(
+        ["git", *args], cwd=cwd, check=True,
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+    )
+
+
+def make_remote(out_dir: str, owner: str = "bench", repo: str = "synthetic", branch: str = "main", **tree_options) -> dict:
+    """
+    Generate a tree, commit it and publish it as
+    `<out_dir>/remotes/<owner>/<repo>.git`. Returns paths, commit and counts;
+    `clone_url` is the GITHUB_CLONE_URL template pointing at the remotes.
+    """
+    work_dir = os.path.join(out_dir, "work", owner, repo)
+    remote_root = os.path.join(out_dir, "remotes")
+    remote = os.path.join(remote_root, owner, f"{repo}.git")
+    for path in (work_dir, remote):
+        if os.path.exists(path):
+            shutil.rmtree(path)
+
+    counts = generate_tree(work_dir, **tree_options)
+
+    author = ["-c", "user.name=bench", "-c", "user.email=bench@example.com"]
+    _git("init", "--quiet", "--initial-branch", branch, cwd=work_dir)
+    _git("add", "--all", cwd=work_dir)
+    # Fixed dates: the same tree always gets the same commit SHA
+    env_dates = {"GIT_AUTHOR_DATE": "2024-01-01T00:00:00Z", "GIT_COMMITTER_DATE": "2024-01-01T00:00:00Z"}
+    subprocess.run(
+        ["git", *author, "commit", "--quiet", "-m", "Synthetic benchmark repository"],
+        cwd=work_dir, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        env={**os.environ, **env_dates}
+    )
+
+    os.makedirs(os.path.dirname(remote), exist_ok=True)
+    _git("clone", "--quiet", "--bare", work_dir, remote)
+    # Pinned-commit fetches (`clone_repo(commit_sha=...)`) ask for a SHA
+    _git("config", "uploadpack.allowAnySHA1InWant", "true", cwd=remote)
+
+    commit = subprocess.run(
+        ["git", "rev-parse", "HEAD"], cwd=work_dir, check=True, stdout=subprocess.PIPE, text=True
+    ).stdout.strip()
+
+    return {
+        "work_dir": work_dir,
+        "remote": remote,
+        "clone_url": "file://" + os.path.abspath(remote_root) + "/{owner}/{repo}.git",
+        "owner": owner,
+        "repo": repo,
+        "branch": branch,
+        "commit": commit,
+        "counts": counts,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--out", required=True)
+    parser.add_argument("--files", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--owner", default="bench")
+    parser.add_argument("--repo", default="synthetic")
+    args = parser.parse_args()
+
+    info = make_remote(args.out, args.owner, args.repo, files=args.files, seed=args.seed)
+    print(f"commit {info['commit']}  {info['counts']}")
+    print(f"GITHUB_CLONE_URL={info['clone_url']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,11 @@
+import os
+import tempfile
+
+# Services read their storage locations at import time: point them at a
+# throwaway directory before any `app` module is imported.
+_DATA_ROOT = tempfile.mkdtemp(prefix="pr-review-tests-")
+
+os.environ.setdefault("REPO_INDEX_DATA_DIR", os.path.join(_DATA_ROOT, "repo_index"))
+os.environ.setdefault("FLAT_INDEX_DIR", os.path.join(_DATA_ROOT, "flat"))
+os.environ.setdefault("CHROMA_PERSISTANT_DIR", os.path.join(_DATA_ROOT, "chroma"))
+os.environ.setdefault("VECTOR_BACKEND", "flat")
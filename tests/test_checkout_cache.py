@@ -0,0 +1,99 @@
+import os
+import tempfile
+import threading
+import time
+
+import pytest
+
+from app.services import repo_index_services
+from app.services.repo_index_services import CheckoutCache
+from app.services.single_flight_services import SingleFlight
+
+
+SHA = "c" * 40
+
+
+@pytest.fixture
+def clones(monkeypatch):
+    """clone_repo replaced by a slow local checkout; records every clone."""
+    made = []
+
+    def fake_clone(owner, repo, branch="main", commit_sha=None):
+        time.sleep(0.05)
+        directory = tempfile.mkdtemp()
+        with open(os.path.join(directory, "a.py"), "w") as f:
+            f.write("x = 1\n")
+        made.append(directory)
+        return directory, commit_sha or SHA
+
+    monkeypatch.setattr(repo_index_services, "clone_repo", fake_clone)
+    monkeypatch.setattr(repo_index_services, "get_single_flight", lambda: flight)
+    flight = SingleFlight(ttl=0)
+    return made
+
+
+def test_concurrent_acquires_share_one_clone(clones):
+    cache = CheckoutCache(size=2, ttl=60)
+    results = []
+
+    def worker():
+        results.append(cache.acquire("o", "r", "main"))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(clones) == 1
+    assert set(results) == {(clones[0], SHA)}
+    assert cache._entries[("o", "r", SHA)]["users"] == 8
+
+    for _ in range(8):
+        cache.release("o", "r", SHA)
+    assert cache._entries[("o", "r", SHA)]["users"] == 0
+
+
+def test_follower_reclones_when_the_shared_checkout_was_evicted(clones, monkeypatch):
+    cache = CheckoutCache(size=0, ttl=0)           # released checkouts are removed at once
+
+    directory, sha = cache.acquire("o", "r", "main")
+    leader_result = ((("o", "r", sha)), cache._entries[("o", "r", sha)])
+    cache.release("o", "r", sha)
+    assert not os.path.exists(directory)
+
+    # A follower of that same flight only now gets the (stale) shared result
+    calls = []
+
+    class ScriptedFlight:
+        def do(self, key, fn, ttl=None):
+            calls.append(key)
+            return leader_result if len(calls) == 1 else fn()
+
+    monkeypatch.setattr(repo_index_services, "get_single_flight", lambda: ScriptedFlight())
+
+    follower_dir, follower_sha = cache.acquire("o", "r", "main")
+    assert len(calls) == 2
+    assert follower_dir != directory
+    assert os.path.exists(os.path.join(follower_dir, "a.py"))
+    assert cache._entries[("o", "r", follower_sha)]["users"] == 1
+
+
+def test_pinned_commit_reuses_the_cached_checkout(clones):
+    cache = CheckoutCache(size=2, ttl=60)
+    directory, sha = cache.acquire("o", "r", "main")
+    assert cache.acquire("o", "r", "main", commit_sha=sha) == (directory, sha)
+    assert len(clones) == 1
+
+
+def test_idle_checkouts_beyond_size_are_evicted_oldest_first(clones):
+    cache = CheckoutCache(size=1, ttl=60)
+    first, _ = cache.acquire("o", "r", commit_sha="1" * 40)
+    second, _ = cache.acquire("o", "r", commit_sha="2" * 40)
+
+    cache.release("o", "r", "1" * 40)
+    cache.release("o", "r", "2" * 40)
+
+    assert not os.path.exists(first)
+    assert os.path.exists(second)
+    assert list(cache._entries) == [("o", "r", "2" * 40)]
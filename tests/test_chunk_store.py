@@ -0,0 +1,89 @@
+import os
+
+import pytest
+
+from app.services import chunk_store_services
+from app.services.chunk_store_services import ChunkContentStore, content_digest
+
+
+TEXTS = [f"def f{i}():\n    return {i}\n" * (i + 1) for i in range(20)]
+
+
+@pytest.fixture(params=["zstd", "zlib"])
+def codec(request):
+    return request.param
+
+
+def test_round_trip_and_dedup(tmp_path, codec):
+    store = ChunkContentStore(str(tmp_path), codec=codec)
+    assert store.put_many(TEXTS + TEXTS[:5]) == len(TEXTS)
+    assert store.put_many(TEXTS) == 0
+
+    hashes = [content_digest(t) for t in TEXTS]
+    assert store.get_many(hashes + ["0" * 64]) == dict(zip(hashes, TEXTS))
+    assert ChunkContentStore(str(tmp_path), codec=codec).get_many(hashes[:3]) == dict(zip(hashes[:3], TEXTS[:3]))
+
+
+def test_mixed_codecs_stay_readable(tmp_path):
+    ChunkContentStore(str(tmp_path), codec="zlib").put_many(TEXTS[:10])
+    store = ChunkContentStore(str(tmp_path), codec="zstd")
+    store.put_many(TEXTS[10:])
+    hashes = [content_digest(t) for t in TEXTS]
+    assert store.get_many(hashes) == dict(zip(hashes, TEXTS))
+
+
+def test_torn_trailing_record_is_ignored(tmp_path):
+    store = ChunkContentStore(str(tmp_path))
+    store.put_many(TEXTS[:3])
+    with open(store._index_path, "ab") as f:
+        f.write(b"\x01" * 20)
+
+    reopened = ChunkContentStore(str(tmp_path))
+    assert reopened.stats()["blobs"] == 3
+
+
+def test_compact_switches_generation(tmp_path):
+    store = ChunkContentStore(str(tmp_path))
+    store.put_many(TEXTS)
+    live = [content_digest(t) for t in TEXTS[::2]]
+
+    assert store.compact(live) == len(TEXTS) // 2
+    assert store.generation == 1
+    assert sorted(os.listdir(tmp_path)) == ["CURRENT", "chunks.1.dat", "chunks.1.idx"]
+
+    for s in (store, ChunkContentStore(str(tmp_path))):
+        assert s.get_many(live) == dict(zip(live, TEXTS[::2]))
+        assert s.stats()["blobs"] == len(live)
+
+    store.put_many(TEXTS[1:2])
+    assert ChunkContentStore(str(tmp_path)).get_many([content_digest(TEXTS[1])]) == {content_digest(TEXTS[1]): TEXTS[1]}
+
+
+@pytest.mark.parametrize("crash_before", ["index", "current"])
+def test_crash_during_compaction_keeps_the_old_generation(tmp_path, monkeypatch, crash_before):
+    store = ChunkContentStore(str(tmp_path))
+    store.put_many(TEXTS)
+    hashes = [content_digest(t) for t in TEXTS]
+
+    real = ChunkContentStore._write_synced
+    target = ".idx" if crash_before == "index" else "CURRENT.tmp"
+
+    def crash(path, data):
+        if path.endswith(target):
+            raise OSError("simulated crash")
+        real(path, data)
+
+    monkeypatch.setattr(ChunkContentStore, "_write_synced", staticmethod(crash))
+    with pytest.raises(OSError):
+        store.compact(hashes[:2])
+    monkeypatch.undo()
+
+    reopened = ChunkContentStore(str(tmp_path))
+    assert reopened.generation == 0
+    assert reopened.get_many(hashes) == dict(zip(hashes, TEXTS))
+    assert sorted(os.listdir(tmp_path)) == ["chunks.dat", "chunks.idx"]
+
+
+def test_default_codec_is_zstd():
+    assert chunk_store_services.zstandard is not None
+    assert chunk_store_services.CHUNK_STORE_CODEC == "zstd"
@@ -0,0 +1,127 @@
+import os
+import subprocess
+
+import pytest
+
+from app.services import chunk_services, metrics_services, repo_index_services
+
+
+@pytest.fixture
+def remote(tmp_path, monkeypatch):
+    """A one-commit bare repo served through GITHUB_CLONE_URL."""
+    work = tmp_path / "work"
+    work.mkdir()
+    (work / "a.py").write_text("x = 1\n")
+    git = ["git", "-c", "user.name=t", "-c", "user.email=t@example.com"]
+    subprocess.run(git + ["init", "--quiet", "--initial-branch", "main"], cwd=work, check=True)
+    subprocess.run(git + ["add", "a.py"], cwd=work, check=True)
+    subprocess.run(git + ["commit", "--quiet", "-m", "init"], cwd=work, check=True)
+    subprocess.run(["git", "clone", "--quiet", "--bare", str(work), str(tmp_path / "o" / "r.git")], check=True)
+    subprocess.run(["git", "config", "uploadpack.allowAnySHA1InWant", "true"], cwd=tmp_path / "o" / "r.git", check=True)
+
+    monkeypatch.setattr(repo_index_services, "GITHUB_CLONE_URL", f"file://{tmp_path}/{{owner}}/{{repo}}.git")
+    sha = subprocess.run(["git", "rev-parse", "HEAD"], cwd=work, stdout=subprocess.PIPE, text=True).stdout.strip()
+    return sha
+
+
+@pytest.mark.parametrize("commit", ["--upload-pack=touch {marker}; git-upload-pack", "HEAD", "abc1234"])
+def test_clone_rejects_non_sha_commits(remote, tmp_path, commit):
+    marker = tmp_path / "pwned"
+    with pytest.raises(ValueError):
+        repo_index_services.clone_repo("o", "r", commit_sha=commit.format(marker=marker))
+    assert not marker.exists()
+
+
+def test_clone_branch_and_commit(remote):
+    for kwargs in ({"branch": "main"}, {"commit_sha": remote}):
+        directory, commit = repo_index_services.clone_repo("o", "r", **kwargs)
+        try:
+            assert commit == remote
+            assert os.path.exists(os.path.join(directory, "a.py"))
+        finally:
+            repo_index_services.shutil.rmtree(directory)
+
+
+@pytest.mark.parametrize("enabled", [True, False])
+def test_pack_size_is_measured_only_with_metrics_enabled(remote, monkeypatch, enabled):
+    measured = []
+    real = repo_index_services._object_bytes
+    monkeypatch.setattr(metrics_services, "METRICS_ENABLED", enabled)
+    monkeypatch.setattr(repo_index_services, "_object_bytes", lambda d: measured.append(d) or real(d))
+
+    directory, _ = repo_index_services.clone_repo("o", "r", commit_sha=remote)
+    repo_index_services.shutil.rmtree(directory)
+    assert len(measured) == (1 if enabled else 0)
+
+#################################################################################################################
+
+@pytest.fixture
+def checkout(tmp_path, monkeypatch):
+    """A checkout with a binary, an unreadable (non-UTF-8) and three text files, served by a fake cache."""
+    root = tmp_path / "checkout"
+    root.mkdir()
+    (root / "a.py").write_text("a = 1\n")
+    (root / "b.png").write_bytes(b"\x89PNG")
+    (root / "c.py").write_bytes(b"\xff\xfe latin-1 \xe9")
+    (root / "d.py").write_text("d = 1\n")
+    (root / "e.py").write_text("e = 1\n")
+
+    class Cache:
+        def acquire(self, owner, repo, branch, commit):
+            return str(root), "c" * 40
+
+        def release(self, owner, repo, commit):
+            pass
+
+    monkeypatch.setattr(repo_index_services, "get_checkout_cache", lambda: Cache())
+    monkeypatch.setattr(chunk_services, "get_checkout_cache", lambda: Cache())
+    return str(root)
+
+
+@pytest.fixture
+def opened(monkeypatch):
+    paths = []
+
+    def tracking_open(path, *args, **kwargs):
+        paths.append(os.path.basename(path))
+        return open(path, *args, **kwargs)
+
+    monkeypatch.setattr(repo_index_services, "open", tracking_open, raising=False)
+    return paths
+
+
+def _scanned():
+    return repo_index_services.FILES_SCANNED._values.get((), 0)
+
+
+def test_resuming_a_scan_does_not_open_earlier_files(checkout, opened):
+    assert [(p, item.path) for p, item in repo_index_services.enumerate_repo_files(checkout)] == [
+        (0, "a.py"), (2, "d.py"), (3, "e.py")    # c.py keeps its position without being yielded
+    ]
+
+    opened.clear()
+    before = _scanned()
+    assert [(p, item.path) for p, item in repo_index_services.enumerate_repo_files(checkout, 3)] == [(3, "e.py")]
+    assert opened == ["e.py"]
+    assert _scanned() - before == 1
+
+
+def test_chunk_cursor_resumes_without_reading_earlier_files(checkout, opened):
+    source = chunk_services.clone_chunks_source("o", "r", cursor_state={"file": 2, "skip": 0, "next_id": 4})
+    list(source.entries)
+    source.close()
+    assert opened == ["d.py", "e.py"]
+
+
+def test_paging_files_visits_each_readable_file_once(checkout):
+    state, paths = {}, []
+    while True:
+        source = repo_index_services.clone_files_source("o", "r", cursor_state=state)
+        entry = next(source.entries, None)
+        source.close()
+        if entry is None:
+            break
+        item, state = entry
+        paths.append(item.path)
+
+    assert paths == ["a.py", "d.py", "e.py"]
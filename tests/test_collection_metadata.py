@@ -0,0 +1,43 @@
+import uuid
+
+import pytest
+
+from app.services import vector_db_services
+from app.services.vector_db_services import get_client, get_collection, get_vector_store
+
+
+@pytest.fixture
+def repo_name():
+    return f"tests/{uuid.uuid4().hex[:8]}"
+
+
+def test_later_calls_record_the_dimension_on_an_existing_collection(repo_name):
+    collection = get_collection(repo_name)
+    assert "embedding_dim" not in collection.metadata
+
+    get_collection(repo_name, embedding_dim=8, embedding_provider="local")
+
+    stored = get_client().get_collection(collection.name).metadata
+    assert stored["embedding_dim"] == 8
+    assert stored["embedding_provider"] == "local"
+    assert stored["dim_reduction"] == "truncate"
+
+
+def test_recorded_dimension_and_provider_are_enforced(repo_name):
+    get_collection(repo_name, embedding_dim=8, embedding_provider="local")
+
+    with pytest.raises(ValueError, match="dimension mismatch"):
+        get_collection(repo_name, embedding_dim=16)
+    with pytest.raises(ValueError, match="provider mismatch"):
+        get_collection(repo_name, embedding_provider="openai")
+
+
+def test_chroma_store_records_metadata_through_the_same_path(repo_name, monkeypatch):
+    monkeypatch.setattr(vector_db_services, "VECTOR_BACKEND", "chroma")
+    monkeypatch.setattr(vector_db_services, "_stores", {})
+
+    get_vector_store(repo_name)
+    store = get_vector_store(repo_name, embedding_dim=8, embedding_provider="local")
+
+    assert store.metadata()["embedding_dim"] == 8
+    assert get_client().get_collection(store.collection.name).metadata["embedding_dim"] == 8
@@ -0,0 +1,163 @@
+import os
+import uuid
+
+import pytest
+
+from app.schema import FileChange, PRContextRequest, PRFilesResponse
+from app.services import context_services, vector_db_services
+from app.services.context_services import _Candidate, count_tokens, pack_context, split_hunks
+from app.services.vector_db_services import lookup_symbol_definitions, lookup_symbol_definitions_batch
+
+from test_index_build import _function, _vector, index_version
+
+
+HEADER = "# Pull request o/r#1 @ abc\n"
+
+
+def _candidate(name: str, size: int, scores: dict) -> _Candidate:
+    return _Candidate(f"{name}.py", abs(hash(name)) % 1000, (name + " ") * size, dict(scores))
+
+
+def _patch(name: str, size: int):
+    return (f"{name}.py", f"## {name}.py (modified)\n```diff\n{'+x' * size}\n```\n")
+
+
+@pytest.mark.parametrize("budget", [10, 60, 150, 400, 2000])
+def test_packed_text_never_exceeds_the_budget(budget):
+    candidates = [_candidate(f"c{i}", 5 + 7 * i, {i % 3: 1.0 - i / 20}) for i in range(12)]
+    patches = [_patch("p1", 40), _patch("p2", 300)]
+
+    text, tokens, files, dropped_files, included, dropped = pack_context(HEADER, patches, 3, candidates, budget)
+
+    assert tokens == count_tokens(text)
+    assert tokens <= budget or (not included and not files)
+    assert len(included) + dropped == len(candidates)
+    assert len({id(c) for c, _, _ in included}) == len(included)
+
+
+def test_patches_are_whole_or_reported_as_dropped():
+    patches = [_patch("small", 10), _patch("huge", 2000), _patch("medium", 50)]
+    budget = count_tokens(HEADER) + count_tokens(patches[0][1]) + count_tokens(patches[2][1])
+
+    text, _, files, dropped_files, _, _ = pack_context(HEADER, patches, 0, [], budget)
+
+    assert files == ["small.py", "medium.py"]
+    assert dropped_files == ["huge.py"]
+    assert patches[0][1] in text and patches[2][1] in text
+    assert "huge.py" not in text
+
+
+def test_every_hunk_gets_its_best_chunk_before_any_gets_a_second():
+    first = [_candidate(f"h0_{i}", 20, {0: 1.0 - i / 10}) for i in range(3)]
+    second = [_candidate(f"h1_{i}", 20, {1: 0.5 - i / 10}) for i in range(3)]
+    budget = count_tokens(HEADER) + 2 * count_tokens(first[0].block()) + 1
+
+    _, _, _, _, included, dropped = pack_context(HEADER, [], 2, first + second, budget)
+
+    assert [c.file_path for c, _, _ in included] == ["h0_0.py", "h1_0.py"]
+    assert dropped == 4
+
+
+def test_a_chunk_too_large_is_skipped_for_a_smaller_one():
+    big = _candidate("big", 500, {0: 0.9})
+    small = _candidate("small", 10, {0: 0.1})
+    budget = count_tokens(HEADER) + count_tokens(small.block()) + 5
+
+    _, _, _, _, included, _ = pack_context(HEADER, [], 1, [big, small], budget)
+    assert [c.file_path for c, _, _ in included] == ["small.py"]
+
+
+def test_split_hunks_keeps_each_hunk_with_its_header():
+    patch = "@@ -1,2 +1,2 @@\n-a\n+b\n@@ -10 +10 @@\n+c"
+    hunks = split_hunks("f.py", patch)
+    assert [h.text.split("\n")[0] for h in hunks] == ["@@ -1,2 +1,2 @@", "@@ -10 +10 @@"]
+    assert hunks[1].query() == "c"
+
+#################################################################################################################
+
+def test_disk_memo_is_bounded_lru(tmp_path, monkeypatch):
+    monkeypatch.setattr(context_services, "CONTEXT_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(context_services, "CONTEXT_DISK_CACHE_SIZE", 2)
+    monkeypatch.setattr(context_services, "_memo", context_services.OrderedDict())
+
+    context_services._memo_put("a", {"v": 1})
+    context_services._memo_put("b", {"v": 2})
+    os.utime(tmp_path / "a.json", (1, 1))
+    os.utime(tmp_path / "b.json", (2, 2))
+
+    context_services._memo.clear()
+    assert context_services._memo_get("a") == {"v": 1}      # disk hit refreshes recency
+    context_services._memo_put("c", {"v": 3})
+
+    assert sorted(os.listdir(tmp_path)) == ["a.json", "c.json"]
+    context_services._memo.clear()
+    assert context_services._memo_get("b") is None
+
+#################################################################################################################
+
+def test_batched_symbol_lookup_matches_single_lookups():
+    repo_name = f"tests/{uuid.uuid4().hex[:8]}"
+    commit = "5" * 40
+    index_version(repo_name, {"a.py": _function("alpha"), "b.py": _function("beta")}, commit)
+
+    patches = ["@@ -1 +1 @@\n+alpha()", "@@ -1 +1 @@\n+beta()\n+alpha()", "@@ -1 +1 @@\n+nothing_here()"]
+    batch = lookup_symbol_definitions_batch(repo_name, patches, commit=commit)
+    single = [lookup_symbol_definitions(repo_name, patch, commit=commit) for patch in patches]
+
+    assert batch == single
+    assert [[d.symbol for d in r.results] for r in batch] == [["alpha"], ["beta", "alpha"], []]
+    assert all(d.content.startswith("def ") for r in batch for d in r.results)
+
+#################################################################################################################
+
+def test_estimated_counts_never_undercount(monkeypatch):
+    monkeypatch.setattr(context_services, "tiktoken", None)
+    monkeypatch.setattr(context_services, "_token_counts", context_services.OrderedDict())
+
+    text = "def f():\n    return 'é'\n"
+    assert count_tokens(text) == len(text.encode("utf-8"))      # byte-level BPE: <= 1 token per byte
+
+#################################################################################################################
+
+def _fake_pr(monkeypatch, heads, patches):
+    heads = iter(heads)
+    fetched = []
+
+    def fetch_pr_files(owner, repo, pr_number):
+        patch = patches[len(fetched)]
+        fetched.append(patch)
+        return PRFilesResponse(files=[FileChange(filename="a.py", status="modified", patch=patch)])
+
+    monkeypatch.setattr(
+        vector_db_services, "embed_texts",
+        lambda texts, provider, dimensions=None: [{"embedding": _vector(text)} for text in texts]
+    )
+    monkeypatch.setattr(context_services, "fetch_pr_head_sha", lambda owner, repo, pr_number: next(heads))
+    monkeypatch.setattr(context_services, "fetch_pr_files", fetch_pr_files)
+    return fetched
+
+
+def test_context_is_built_from_one_pr_snapshot(monkeypatch):
+    repo_name = f"tests/{uuid.uuid4().hex[:8]}"
+    index_version(repo_name, {"a.py": _function("alpha")}, "6" * 40)
+    # A push lands between the first head read and the file fetch
+    fetched = _fake_pr(monkeypatch, ["old", "new", "new"], ["@@ -1 +1 @@\n+stale()", "@@ -1 +1 @@\n+fresh()"])
+
+    req = PRContextRequest(owner="o", repo="r", pr_number=1, repo_name=repo_name, token_budget=4000)
+    response = context_services.assemble_pr_context(req)
+
+    assert len(fetched) == 2
+    assert response.head_sha == "new"
+    assert "fresh()" in response.context and "stale()" not in response.context
+    assert response.tokens_approximate == (context_services.tiktoken is None)
+
+
+def test_context_gives_up_on_a_head_that_keeps_moving(monkeypatch):
+    repo_name = f"tests/{uuid.uuid4().hex[:8]}"
+    index_version(repo_name, {"a.py": _function("alpha")}, "6" * 40)
+    monkeypatch.setattr(context_services, "PR_SNAPSHOT_ATTEMPTS", 2)
+    _fake_pr(monkeypatch, ["h0", "h1", "h2"], ["@@ -1 +1 @@\n+a()"] * 2)
+
+    req = PRContextRequest(owner="o", repo="r", pr_number=1, repo_name=repo_name)
+    with pytest.raises(RuntimeError):
+        context_services.assemble_pr_context(req)
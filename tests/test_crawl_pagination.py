@@ -0,0 +1,77 @@
+import asyncio
+import json
+
+import pytest
+
+from app.schema import RepoTreeItem, RepoTreeResponse
+from app.services import repo_index_services
+from app.services.pagination_services import decode_cursor, json_page_body
+
+
+SHA = "0123456789abcdef0123456789abcdef01234567"
+PATHS = [f"f{i}.py" for i in range(10)]
+
+
+@pytest.fixture
+def github(monkeypatch):
+    """A 10-file tree whose content downloads fail for the paths in `failing`."""
+    failing = set()
+    fetched = []
+
+    async def fake_tree(owner, repo, branch="main", commit_sha=None):
+        tree = [RepoTreeItem(path=p, type="blob", sha="0" * 40, size=6) for p in PATHS]
+        return RepoTreeResponse(tree=[RepoTreeItem(path="pkg", type="tree", sha="1" * 40)] + tree, commit_sha=SHA)
+
+    async def fake_content(url):
+        path = url.split("/contents/")[1].split("?")[0]
+        fetched.append(path)
+        if path in failing:
+            raise RuntimeError("502 from GitHub")
+        return {"file_content": f"# {path}\n"}
+
+    monkeypatch.setattr(repo_index_services, "fetch_repo_tree_async", fake_tree)
+    monkeypatch.setattr(repo_index_services, "fetch_file_content_async", fake_content)
+    return failing, fetched
+
+
+def _crawl(limit):
+    pages, cursor = [], None
+    while True:
+        state = decode_cursor(cursor, "crawl", "o/r")
+        source = asyncio.run(repo_index_services.crawl_files_source_async("o", "r", "main", state, limit=limit))
+        page = json.loads(json_page_body(source, "items", limit, None))
+        pages.append(page)
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return pages
+
+
+@pytest.mark.parametrize("limit", [1, 2, 3, 4, None])
+def test_failed_downloads_are_skipped_and_reported_without_ending_the_crawl(github, limit):
+    failing, _ = github
+    failing.update({"f2.py", "f3.py", "f9.py"})
+
+    pages = _crawl(limit)
+
+    items = [item["path"] for page in pages for item in page["items"]]
+    skipped = [path for page in pages for path in page["skipped"]]
+    assert items == [p for p in PATHS if p not in failing]
+    assert sorted(skipped) == sorted(failing)                # each reported once
+    assert all(len(page["items"]) == limit for page in pages[:-1])
+
+
+def test_a_page_keeps_fetching_past_failures(github):
+    failing, fetched = github
+    failing.add("f1.py")
+
+    [first, *_] = _crawl(2)
+    assert [item["path"] for item in first["items"]] == ["f0.py", "f2.py"]
+    assert first["skipped"] == ["f1.py"]
+    assert first["next_cursor"] is not None
+    assert fetched[:4] == ["f0.py", "f1.py", "f2.py", "f3.py"]    # f3.py: look-ahead
+
+
+def test_crawl_without_failures_reports_nothing_skipped(github):
+    pages = _crawl(4)
+    assert [len(page["items"]) for page in pages] == [4, 4, 2]
+    assert all(page["skipped"] == [] for page in pages)
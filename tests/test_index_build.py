@@ -0,0 +1,81 @@
+import hashlib
+import uuid
+
+import pytest
+
+from app.schema import RepoIndexItem
+from app.services.chunk_services import iter_repo_chunks
+from app.services.vector_db_services import _IndexBuild, _expand_hits, get_vector_store
+
+
+DIM = 8
+
+
+def _vector(text: str):
+    digest = hashlib.sha256(text.encode("utf-8")).digest()
+    return [b / 255 + 0.01 for b in digest[:DIM]]
+
+
+def _function(name: str, lines: int = 10) -> str:
+    body = "\n".join(f"    {name}_{i} = compute({i})" for i in range(lines))
+    return f"def {name}():\n{body}\n    return {name}_0\n\n"
+
+
+def index_version(repo_name: str, files: dict, commit: str, ref: str = "main"):
+    """Run the real prepare -> write -> finish stages, with deterministic vectors."""
+    items = [RepoIndexItem(path=path, content=content, size=len(content)) for path, content in files.items()]
+    build = _IndexBuild(repo_name, "local", DIM, ref, 0, commit)
+    new = build.prepare(list(iter_repo_chunks(items))) or []
+    build.write([(entry, _vector(entry[1].content)) for entry in new])
+    return build.finish()
+
+
+@pytest.fixture
+def repo_name():
+    return f"tests/{uuid.uuid4().hex[:8]}"
+
+
+def _search(repo_name, commit, text, expand=0):
+    store = get_vector_store(repo_name)
+    hits = store.query([_vector(text)], 1)
+    return _expand_hits(store, repo_name, commit, hits, expand)[0]
+
+
+def _chunks(path: str, content: str):
+    return [c.content for c in iter_repo_chunks([RepoIndexItem(path=path, content=content, size=len(content))])]
+
+
+def test_shared_vectors_report_the_searched_versions_location(repo_name):
+    target = _function("target")
+    v1, v2 = "1" * 40, "2" * 40
+
+    index_version(repo_name, {"a.py": _function("alpha"), "b.py": target}, v1)
+    # Two files inserted before b.py: its chunk_id shifts, its vector is reused
+    report = index_version(repo_name, {
+        "a.py": _function("alpha"), "a2.py": _function("beta"), "a3.py": _function("gamma"), "b.py": target
+    }, v2)
+    assert report["chunks_new"] == 2
+
+    chunk, = _chunks("b.py", target)
+    old, = _search(repo_name, v1, chunk)
+    new, = _search(repo_name, v2, chunk)
+    assert (old.file_path, new.file_path) == ("b.py", "b.py")
+    assert (old.chunk_id, new.chunk_id) == (1, 3)
+    assert new.local_index == old.local_index == 0
+
+
+def test_neighbours_point_at_the_searched_versions_chunk_ids(repo_name):
+    v1, v2 = "3" * 40, "4" * 40
+    shared = _function("long", lines=60)
+    first, second = _chunks("b.py", shared)[:2]
+
+    index_version(repo_name, {"b.py": shared}, v1)
+    index_version(repo_name, {"a.py": _function("zero"), "b.py": shared}, v2)
+
+    results = _search(repo_name, v2, first, expand=1)
+    hit = next(r for r in results if r.neighbour_of is None)
+    neighbours = [r for r in results if r.neighbour_of is not None]
+
+    assert (hit.chunk_id, hit.content) == (1, first)
+    assert [(n.chunk_id, n.content) for n in neighbours] == [(2, second)]
+    assert all(n.neighbour_of == hit.chunk_id for n in neighbours)
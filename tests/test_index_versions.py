@@ -0,0 +1,67 @@
+import os
+
+import pytest
+
+from app.services import index_version_services as versions
+
+
+SHA = "a" * 40
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(versions, "REPO_INDEX_DATA_DIR", str(tmp_path))
+    return tmp_path
+
+
+@pytest.mark.parametrize("version", ["..", ".", "../repo_b", "a/../..", "ABCDEF1", "abc", "g" * 40, "", None])
+def test_invalid_versions_are_rejected(version):
+    with pytest.raises(ValueError):
+        versions.validate_version(version)
+
+
+@pytest.mark.parametrize("version", [SHA, "abc1234", versions.UNVERSIONED])
+def test_valid_versions(version):
+    assert versions.validate_version(version) == version
+
+
+def test_version_dir_stays_under_versions_root(data_dir):
+    path = versions.version_dir("repo_a_b", SHA)
+    assert path == os.path.realpath(os.path.join(data_dir, "repo_a_b", "versions", SHA))
+
+
+def test_delete_dotdot_does_not_touch_the_collection(data_dir):
+    versions.save_version("repo_a_b", SHA, "main", ["v1", "v2"], logical_chunks=2)
+
+    with pytest.raises(ValueError):
+        versions.delete_version("repo_a_b", "..")
+
+    assert os.path.exists(data_dir / "repo_a_b" / "refs.json")
+    assert versions.load_version("repo_a_b", SHA)["vector_ids"] == frozenset({"v1", "v2"})
+
+
+def test_symlinked_version_outside_root_is_rejected(data_dir, tmp_path_factory):
+    outside = tmp_path_factory.mktemp("outside")
+    root = data_dir / "repo_a_b" / "versions"
+    root.mkdir(parents=True)
+    os.symlink(outside, root / SHA)
+
+    with pytest.raises(ValueError):
+        versions.delete_version("repo_a_b", SHA)
+    assert outside.exists()
+
+
+def test_save_delete_round_trip(data_dir):
+    versions.save_version("repo_a_b", SHA, "main", ["v1"], logical_chunks=1)
+    assert [v["commit"] for v in versions.list_versions("repo_a_b")] == [SHA]
+    assert versions.resolve_version("repo_a_b", ref="main") == SHA
+
+    assert versions.delete_version("repo_a_b", SHA)
+    assert versions.list_versions("repo_a_b") == []
+    with pytest.raises(ValueError):
+        versions.resolve_version("repo_a_b", ref="main")
+
+
+def test_resolve_version_validates_commit(data_dir):
+    with pytest.raises(ValueError):
+        versions.resolve_version("repo_a_b", commit="../../etc")
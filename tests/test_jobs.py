@@ -0,0 +1,147 @@
+import json
+import os
+import subprocess
+import time
+
+import pytest
+
+from app.services import job_services, repo_index_services
+from app.services.job_services import CANCELLED, FAILED, FINAL_STATES, INTERRUPTED, SUCCEEDED, JobManager
+
+
+GIT = ["git", "-c", "user.name=t", "-c", "user.email=t@example.com"]
+FILES = 7
+
+
+def _commit(work, version: str) -> str:
+    for i in range(FILES):
+        body = "".join(f"    value_{j} = compute({i}, {j})\n" for j in range(20))
+        (work / f"f{i}.py").write_text(f"VERSION = '{version}'\n\ndef f{i}():\n{body}")
+    subprocess.run(GIT + ["add", "."], cwd=work, check=True)
+    subprocess.run(GIT + ["commit", "--quiet", "-m", version], cwd=work, check=True)
+    subprocess.run(["git", "push", "--quiet", "origin", "main"], cwd=work, check=True)
+    return subprocess.run(["git", "rev-parse", "HEAD"], cwd=work, stdout=subprocess.PIPE, text=True).stdout.strip()
+
+
+@pytest.fixture
+def remote(tmp_path, monkeypatch):
+    """A bare repo served through GITHUB_CLONE_URL; returns (push, sha)."""
+    bare = tmp_path / "o" / "r.git"
+    subprocess.run(["git", "init", "--quiet", "--bare", "--initial-branch", "main", str(bare)], check=True)
+    subprocess.run(["git", "config", "uploadpack.allowAnySHA1InWant", "true"], cwd=bare, check=True)
+    work = tmp_path / "work"
+    subprocess.run(["git", "clone", "--quiet", str(bare), str(work)], check=True, stderr=subprocess.DEVNULL)
+    subprocess.run(["git", "checkout", "--quiet", "-b", "main"], cwd=work, check=True)
+
+    monkeypatch.setattr(repo_index_services, "GITHUB_CLONE_URL", f"file://{tmp_path}/{{owner}}/{{repo}}.git")
+    monkeypatch.setattr(job_services, "JOBS_DIR", str(tmp_path / "jobs"))
+    monkeypatch.setattr(job_services, "JOB_CHECKPOINT_FILES", 2)
+    return (lambda version: _commit(work, version)), _commit(work, "v1")
+
+
+@pytest.fixture
+def fail_at(monkeypatch):
+    """Make the next walk raise when it reaches file position `n`."""
+    real = job_services.iter_repo_files
+    state = {"n": None}
+
+    def walk(root):
+        for position, item in enumerate(real(root)):
+            if position == state["n"]:
+                state["n"] = None
+                raise RuntimeError("disk full")
+            yield item
+
+    monkeypatch.setattr(job_services, "iter_repo_files", walk)
+    return state
+
+
+def _wait(job, timeout=20):
+    deadline = time.monotonic() + timeout
+    while job.state not in FINAL_STATES:
+        assert time.monotonic() < deadline, f"job still {job.state}"
+        time.sleep(0.01)
+    return job
+
+
+def test_failed_job_resumes_from_its_checkpoint_at_the_pinned_commit(remote, fail_at):
+    push, sha = remote
+    manager = JobManager(workers=1)
+
+    fail_at["n"] = 5
+    job = _wait(manager.submit("index_repo_clone", {"owner": "o", "repo": "r", "branch": "main"}))
+    assert job.state == FAILED and job.error == "disk full"
+    assert job.checkpoint["commit_sha"] == sha
+    assert job.checkpoint["files_done"] == 4                # last multiple of JOB_CHECKPOINT_FILES
+
+    push("v2")                                              # the branch moves on meanwhile
+    _wait(manager.resume(job.id))
+    assert job.state == SUCCEEDED and job.attempts == 2
+
+    result = manager.result(job.id)
+    assert result.commit_sha == sha
+    assert [item.path for item in result.items] == [f"f{i}.py" for i in range(FILES)]
+    assert all("'v1'" in item.content for item in result.items)
+
+
+def test_chunk_job_resume_continues_chunk_ids(remote, fail_at):
+    manager = JobManager(workers=1)
+    params = {"owner": "o", "repo": "r", "branch": "main"}
+
+    fail_at["n"] = 3
+    job = _wait(manager.submit("chunk_repo", params))
+    assert job.state == FAILED
+    _wait(manager.resume(job.id))
+
+    fresh = _wait(manager.submit("chunk_repo", params))
+    resumed, expected = manager.result(job.id).chunks, manager.result(fresh.id).chunks
+    assert len(expected) == FILES
+    assert [(c.chunk_id, c.file_path, c.content) for c in resumed] == [(c.chunk_id, c.file_path, c.content) for c in expected]
+
+
+def test_cancelled_job_stops_and_resumes(remote, monkeypatch):
+    manager = JobManager(workers=1)
+    real = job_services.iter_repo_files
+    jobs = []
+
+    def walk(root):
+        for position, item in enumerate(real(root)):
+            if position == 3 and jobs[0].attempts == 1:
+                manager.cancel(jobs[0].id)
+            yield item
+
+    monkeypatch.setattr(job_services, "iter_repo_files", walk)
+    jobs.append(manager.submit("index_repo_clone", {"owner": "o", "repo": "r", "branch": "main"}))
+    job = _wait(jobs[0])
+    assert job.state == CANCELLED
+    with pytest.raises(ValueError):
+        manager.result(job.id)
+
+    _wait(manager.resume(job.id))
+    assert job.state == SUCCEEDED
+    assert len(manager.result(job.id).items) == FILES
+
+
+def test_running_jobs_are_interrupted_by_a_restart(remote):
+    job_dir = os.path.join(job_services.JOBS_DIR, "abc")
+    os.makedirs(job_dir)
+    with open(os.path.join(job_dir, "job.json"), "w", encoding="utf-8") as f:
+        json.dump({"job_id": "abc", "kind": "index_repo_clone", "params": {}, "state": "running"}, f)
+
+    job = JobManager(workers=1).get("abc")
+    assert job.state == INTERRUPTED
+    assert job.to_dict()["resumable"]
+    with open(os.path.join(job_dir, "job.json"), encoding="utf-8") as f:
+        assert json.load(f)["state"] == INTERRUPTED
+
+
+def test_only_resumable_jobs_resume(remote):
+    manager = JobManager(workers=1)
+    job = _wait(manager.submit("index_repo_clone", {"owner": "o", "repo": "r", "branch": "main"}))
+    assert job.state == SUCCEEDED
+    with pytest.raises(ValueError):
+        manager.resume(job.id)
+    with pytest.raises(ValueError):
+        manager.cancel(job.id)
+    with pytest.raises(ValueError):
+        manager.submit("unknown", {})
@@ -0,0 +1,144 @@
+import uuid
+
+import numpy as np
+import pytest
+
+from app.schema import RepoIndexItem
+from app.services.chunk_services import iter_repo_chunks
+from app.services.near_duplicate_services import NearDuplicateIndex, _lsh_params, collapse_near_duplicates
+from app.services.chunk_store_services import get_chunk_store
+from app.services.vector_db_services import (
+    _IndexBuild,
+    _content_hash,
+    _normalize_collection_name,
+    collect_garbage,
+    lookup_symbol_definitions,
+    remove_index_version,
+    storage_report,
+)
+
+from test_index_build import DIM, _chunks, _function, _search, _vector
+
+
+def _edited(text: str, old: str, new: str) -> str:
+    assert old in text
+    return text.replace(old, new, 1)
+
+
+def _index_near_duplicates(repo_name: str, files: dict, commit: str) -> dict:
+    items = [RepoIndexItem(path=path, content=content, size=len(content)) for path, content in files.items()]
+    build = _IndexBuild(repo_name, "local", DIM, "main", 0.9, commit)
+    new = build.prepare(list(iter_repo_chunks(items))) or []
+    build.write([(entry, _vector(entry[1].content)) for entry in new])
+    return build.finish()
+
+
+def _similarity(a: str, b: str) -> float:
+    index = NearDuplicateIndex(threshold=0.5)
+    return float(np.mean(index.signature(a) == index.signature(b)))
+
+
+@pytest.mark.parametrize("threshold", [0.5, 0.8, 0.9, 0.95])
+def test_lsh_threshold_sits_at_or_below_the_similarity_threshold(threshold):
+    bands, rows = _lsh_params(threshold, 128)
+    assert bands * rows <= 128
+    assert (1 / bands) ** (1 / rows) <= threshold
+
+
+def test_identical_and_reformatted_text_collapse():
+    text = _function("alpha", lines=35)
+    index = NearDuplicateIndex(threshold=0.9)
+
+    assert index.add("a", text) is None
+    assert index.add("b", text) == ("a", 1.0)
+    assert index.add("c", text.replace("    ", "\t")) == ("a", 1.0)      # whitespace is not a token
+    assert index.stats()["representatives"] == 1
+
+
+def test_similarity_threshold_is_the_collapse_boundary():
+    text = _function("alpha", lines=35)
+    edited = _edited(text, "alpha_17 = compute(17)", "alpha_17 = other(17)")
+    similarity = _similarity(text, edited)
+    assert 0.8 < similarity < 1.0
+
+    below = NearDuplicateIndex(threshold=similarity - 0.02)
+    below.add("a", text)
+    assert below.add("b", edited) == ("a", round(similarity, 4))
+
+    above = NearDuplicateIndex(threshold=min(1.0, similarity + 0.02))
+    above.add("a", text)
+    assert above.add("b", edited) is None
+
+
+def test_unrelated_text_stays_a_representative():
+    aliases = collapse_near_duplicates(
+        [("a", _function("alpha", lines=35)), ("b", "class Config:\n    debug = True\n    level = 3\n")],
+        threshold=0.9
+    )
+    assert aliases == {}
+
+
+def test_invalid_thresholds():
+    with pytest.raises(ValueError):
+        NearDuplicateIndex(threshold=0)
+    assert collapse_near_duplicates([("a", "x"), ("b", "x")], threshold=0) == {}
+
+#################################################################################################################
+
+def test_expansion_skips_near_duplicates_of_another_files_chunk():
+    repo_name = f"tests/{uuid.uuid4().hex[:8]}"
+    commit = "6" * 40
+    shared = _function("shared", lines=35)
+    files = {
+        "b.py": _function("b_first", lines=35) + shared + _function("b_last", lines=35),
+        "a.py": _function("a_first", lines=35) + shared + _function("a_last", lines=35),
+    }
+
+    report = _index_near_duplicates(repo_name, files, commit)
+    assert report["chunks_near_duplicate"] == 1
+
+    a_first, a_shared, a_last = _chunks("a.py", files["a.py"])
+
+    # a.py's middle chunk is an alias of b.py's: the window around a.py's
+    # first chunk must not pull b.py's chunk in as a neighbour
+    results = _search(repo_name, commit, a_first, expand=1)
+    assert [(r.file_path, r.content) for r in results] == [("a.py", a_first)]
+
+    results = _search(repo_name, commit, a_last, expand=1)
+    assert [(r.file_path, r.content) for r in results] == [("a.py", a_last)]
+
+    # The representative's own window is intact
+    b_first, b_shared, b_last = _chunks("b.py", files["b.py"])
+    results = _search(repo_name, commit, b_shared, expand=1)
+    assert [(r.file_path, r.content) for r in results] == [("b.py", b_first), ("b.py", b_shared), ("b.py", b_last)]
+    hit = next(r for r in results if r.neighbour_of is None)
+    assert [(alias.file_path, alias.chunk_id) for alias in hit.aliases] == [("a.py", 4)]
+
+
+def test_garbage_collection_keeps_alias_and_symbol_text():
+    repo_name = f"tests/{uuid.uuid4().hex[:8]}"
+    old, live = "7" * 40, "8" * 40
+    shared = _function("shared", lines=35)
+    renamed = shared.replace("def shared():", "def shared_copy():")    # near-duplicate, own symbol
+    files = {
+        "b.py": _function("b_first", lines=35) + shared,
+        "a.py": _function("a_first", lines=35) + renamed,
+    }
+
+    _index_near_duplicates(repo_name, {"gone.py": _function("gone", lines=35)}, old)
+    assert _index_near_duplicates(repo_name, files, live)["chunks_near_duplicate"] == 1
+    alias_text = _chunks("a.py", files["a.py"])[1]
+
+    assert remove_index_version(repo_name, old)
+    size = storage_report(repo_name)["physical_bytes"]
+    report = collect_garbage(repo_name)
+    assert report["deleted_vectors"] == 1 and report["deleted_contents"] == 1
+    assert report["compacted_rows"] == 1
+    assert report["reclaimed_bytes"] > 0
+    assert storage_report(repo_name)["physical_bytes"] < size
+
+    store = get_chunk_store(_normalize_collection_name(repo_name))
+    assert store.get_many([_content_hash(alias_text)]) == {_content_hash(alias_text): alias_text}
+
+    [definition] = lookup_symbol_definitions(repo_name, "@@ -1 +1 @@\n+shared_copy()", commit=live).results
+    assert (definition.file_path, definition.content) == ("a.py", alias_text)
@@ -0,0 +1,107 @@
+import json
+
+import pytest
+
+from app.schema import RepoIndexItem
+from app.services.pagination_services import (
+    BulkSource,
+    decode_cursor,
+    encode_cursor,
+    json_page_body,
+    parse_fields,
+    _take,
+)
+
+
+SHA = "0123456789abcdef0123456789abcdef01234567"
+ITEMS = [RepoIndexItem(path=f"f{i}.py", content=f"x = {i}\n", size=6) for i in range(7)]
+
+
+def _source(cursor_state: dict) -> BulkSource:
+    start = cursor_state.get("position", 0)
+    entries = ((item, {"position": i + 1}) for i, item in enumerate(ITEMS) if i >= start)
+    return BulkSource("files", "o/r", cursor_state.get("commit", SHA), entries)
+
+
+def _page(cursor, limit):
+    state = decode_cursor(cursor, "files", "o/r")
+    return json.loads(json_page_body(_source(state), "items", limit, None))
+
+
+@pytest.mark.parametrize("limit", [1, 2, 3, 7, 100])
+def test_pages_cover_every_record_once(limit):
+    paths, cursor, pages = [], None, 0
+    while True:
+        page = _page(cursor, limit)
+        pages += 1
+        assert len(page["items"]) <= limit
+        assert page["commit_sha"] == SHA
+        paths += [item["path"] for item in page["items"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert paths == [item.path for item in ITEMS]
+    assert pages == max(1, -(-len(ITEMS) // limit))
+
+
+def test_take_marks_the_last_entry():
+    taken = list(_take(_source({}), None))
+    assert [state for _, state in taken][-1] is None
+    assert all(state is not None for _, state in taken[:-1])
+
+
+def test_take_stops_at_limit_with_state():
+    taken = list(_take(_source({}), 3))
+    assert len(taken) == 3
+    assert taken[-1][1] == {"position": 3}
+
+
+def test_empty_source():
+    page = json.loads(json_page_body(BulkSource("files", "o/r", None, iter(())), "items", 5, None))
+    assert page == {"items": [], "commit_sha": None, "next_cursor": None}
+
+
+def test_projection():
+    page = json.loads(json_page_body(_source({}), "items", 2, parse_fields("path", RepoIndexItem)))
+    assert page["items"] == [{"path": "f0.py"}, {"path": "f1.py"}]
+    with pytest.raises(ValueError):
+        parse_fields("path,nope", RepoIndexItem)
+
+
+def test_cursor_round_trip():
+    state = {"kind": "files", "repo": "o/r", "commit": SHA, "position": 4}
+    assert decode_cursor(encode_cursor(state), "files", "o/r") == state
+    assert decode_cursor(None, "files", "o/r") == {}
+
+
+@pytest.mark.parametrize("kind, repo", [("chunks", "o/r"), ("files", "o/other")])
+def test_cursor_for_another_listing_is_rejected(kind, repo):
+    cursor = encode_cursor({"kind": "files", "repo": "o/r", "commit": SHA})
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, kind, repo)
+
+
+@pytest.mark.parametrize("commit", [
+    "--upload-pack=touch /tmp/pwned; git-upload-pack",
+    "-c",
+    SHA.upper(),
+    SHA[:12],
+    SHA + "0",
+    "main",
+    123,
+])
+def test_cursor_commit_must_be_a_full_sha(commit):
+    cursor = encode_cursor({"kind": "files", "repo": "o/r", "commit": commit})
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, "files", "o/r")
+
+
+def test_cursor_without_commit_is_accepted():
+    state = {"kind": "files", "repo": "o/r", "commit": None, "position": 1}
+    assert decode_cursor(encode_cursor(state), "files", "o/r") == state
+
+
+@pytest.mark.parametrize("cursor", ["not base64!", encode_cursor(["a", "list"])])
+def test_malformed_cursor(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, "files", "o/r")
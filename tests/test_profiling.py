@@ -0,0 +1,67 @@
+import sys
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.services import profiling_services
+from app.services.profiling_services import ProfileStore, ProfilingMiddleware, instrument_endpoints
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    store = ProfileStore(str(tmp_path / "profiles"), size=3)
+    monkeypatch.setattr(profiling_services, "_store", store)
+    monkeypatch.setattr(profiling_services, "PROFILE_ADMIN_TOKEN", None)
+
+    app = FastAPI()
+    app.add_middleware(ProfilingMiddleware)
+
+    @app.get("/switch")
+    def switch():
+        time.sleep(0.05)            # let the sampler thread start and adjust
+        return {"interval": sys.getswitchinterval()}
+
+    instrument_endpoints(app)
+    with TestClient(app) as client:
+        client.store = store
+        yield client
+
+
+def test_plain_request_is_not_profiled_by_default(client):
+    assert profiling_services.PROFILE_SLOW_SECONDS == 0
+
+    original = sys.getswitchinterval()
+    response = client.get("/switch")
+    assert response.json()["interval"] == original
+    assert "x-profile-id" not in response.headers
+    assert client.store.list() == []
+
+
+def test_slow_capture_keeps_the_switch_interval(client, monkeypatch):
+    monkeypatch.setattr(profiling_services, "PROFILE_SLOW_SECONDS", 0.01)
+
+    original = sys.getswitchinterval()
+    response = client.get("/switch")
+    assert response.json()["interval"] == original
+    assert [p["trigger"] for p in client.store.list()] == ["slow"]
+
+
+def test_requested_profile_lowers_and_restores_the_switch_interval(client):
+    original = sys.getswitchinterval()
+    response = client.get("/switch", headers={"X-Profile": "1"})
+
+    assert response.json()["interval"] < original
+    profile = client.store.get(response.headers["x-profile-id"])
+    assert profile["trigger"] == "requested"
+
+    deadline = time.monotonic() + 2
+    while sys.getswitchinterval() != original and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert sys.getswitchinterval() == original
+
+
+def test_ring_buffer_keeps_the_newest(client):
+    ids = [client.get("/switch?profile=1").headers["x-profile-id"] for _ in range(5)]
+    assert {p["id"] for p in client.store.list()} == set(ids[-3:])
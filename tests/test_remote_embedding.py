@@ -0,0 +1,231 @@
+import json
+import time
+import asyncio
+import threading
+
+import httpx
+import pytest
+
+from app.services import remote_embedding_services as remote
+from app.services.http_client_services import close_http_clients
+from app.services.metrics_services import render_metrics
+from app.services.remote_embedding_services import EmbeddingRequestError, RateBudget, RemoteEmbeddingClient
+
+
+def _vector(text):
+    return [float(len(text)), 1.0]
+
+
+def _client(handler, **kwargs) -> RemoteEmbeddingClient:
+    client = RemoteEmbeddingClient("openai", "key", base_url="http://provider", backoff_base=0.001, **kwargs)
+    client._http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return client
+
+
+def _ok(request):
+    texts = _inputs(request)
+    return httpx.Response(200, json={"data": [{"index": i, "embedding": _vector(t)} for i, t in enumerate(texts)]})
+
+
+def _inputs(request):
+    return json.loads(request.content)["input"]
+
+#################################################################################################################
+# RateBudget
+
+def test_budget_paces_requests():
+    budget = RateBudget(rpm=60)
+    assert all(budget.try_acquire() == 0 for _ in range(60))
+    wait = budget.try_acquire()
+    assert 0.9 < wait <= 1.0
+
+
+def test_budget_paces_tokens_and_lets_oversized_batches_through_when_full():
+    budget = RateBudget(tpm=600)
+    assert budget.try_acquire(500) == 0
+    assert budget.try_acquire(500) == pytest.approx(40, abs=0.5)     # 400 tokens short at 10/s
+
+    full = RateBudget(tpm=600)
+    assert full.try_acquire(10_000) == 0
+
+
+def test_budget_pause_blocks_everyone():
+    budget = RateBudget(rpm=1000)
+    budget.pause(5)
+    assert budget.try_acquire() == pytest.approx(5, abs=0.1)
+
+
+def test_budget_is_shared_across_threads():
+    budget = RateBudget(rpm=100)
+    granted = []
+
+    def worker():
+        granted.append(sum(1 for _ in range(100) if budget.try_acquire() == 0))
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sum(granted) == 100
+
+
+def test_budget_per_provider_account(monkeypatch):
+    monkeypatch.setattr(remote, "_budgets", {})
+    a = remote.get_rate_budget("openai", "k1")
+    assert remote.get_rate_budget("OpenAI", "k1") is a
+    assert remote.get_rate_budget("openai", "k2") is not a
+    assert RemoteEmbeddingClient("openai", "k1").budget is a
+    assert RemoteEmbeddingClient("openai", "k1", rpm=10).budget is not a
+
+
+def test_budget_headroom_is_exported_per_provider(monkeypatch):
+    monkeypatch.setattr(remote, "_budgets", {})
+    monkeypatch.setenv("OPENAI_RPM", "10")
+    monkeypatch.setenv("OPENAI_TPM", "1000")
+    remote.get_rate_budget("openai", "k1").try_acquire(100)
+    remote.get_rate_budget("openai", "k2").try_acquire(300)
+
+    text = render_metrics()
+    assert "k1" not in text and "k2" not in text
+    samples = {
+        line.split(" ")[0]: float(line.split(" ")[1])
+        for line in text.splitlines() if line.startswith("pr_review_embedding_rate_headroom{")
+    }
+    assert samples['pr_review_embedding_rate_headroom{provider="openai",resource="requests"}'] == pytest.approx(18, abs=0.1)
+    assert samples['pr_review_embedding_rate_headroom{provider="openai",resource="tokens"}'] == pytest.approx(1600, abs=1)
+
+#################################################################################################################
+# Client
+
+def test_embed_preserves_order_across_batches():
+    client = _client(_ok, batch_size=3)
+    texts = [f"t{'x' * i}" for i in range(10)]
+    assert asyncio.run(client.embed(texts)) == [_vector(t) for t in texts]
+
+
+def test_missing_inputs_are_retried_alone():
+    sent = []
+
+    def handler(request):
+        texts = _inputs(request)
+        sent.append(texts)
+        data = [{"index": i, "embedding": _vector(t)} for i, t in enumerate(texts) if t != "b" or len(sent) > 1]
+        return httpx.Response(200, json={"data": data})
+
+    assert asyncio.run(_client(handler).embed(["a", "b", "c"])) == [_vector(t) for t in "abc"]
+    assert sent == [["a", "b", "c"], ["b"]]
+
+
+@pytest.mark.parametrize("status", [401, 403, 404])
+def test_auth_errors_are_not_bisected(status):
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(status, json={"error": "no"})
+
+    client = _client(handler)
+    with pytest.raises(EmbeddingRequestError) as e:
+        asyncio.run(client.embed([f"t{i}" for i in range(16)]))
+    assert e.value.status_code == status
+    assert len(calls) == 1
+    assert client.stats["splits"] == 0
+
+
+@pytest.mark.parametrize("status", [400, 413, 422])
+def test_content_rejections_are_bisected(status):
+    def handler(request):
+        return httpx.Response(status) if len(_inputs(request)) > 2 else _ok(request)
+
+    client = _client(handler)
+    texts = [f"t{i}" for i in range(8)]
+    assert asyncio.run(client.embed(texts)) == [_vector(t) for t in texts]
+    assert client.stats["splits"] == 3
+
+
+def test_single_bad_input_raises():
+    def handler(request):
+        return httpx.Response(400) if "bad" in _inputs(request) else _ok(request)
+
+    with pytest.raises(EmbeddingRequestError):
+        asyncio.run(_client(handler).embed(["a", "bad", "c", "d"]))
+
+
+def test_throttling_is_retried_with_retry_after():
+    responses = iter([httpx.Response(429, headers={"retry-after": "0"}), None])
+
+    def handler(request):
+        return next(responses) or _ok(request)
+
+    client = _client(handler)
+    assert asyncio.run(client.embed(["a"])) == [_vector("a")]
+    assert client.stats["throttled"] == 1
+
+
+@pytest.mark.parametrize("retry_after", ["86400", "Wed, 21 Oct 2099 07:28:00 GMT"])
+def test_retry_after_is_capped_at_backoff_max(monkeypatch, retry_after):
+    responses = iter([httpx.Response(429, headers={"retry-after": retry_after}), None])
+    slept = []
+
+    async def sleep(seconds):
+        assert seconds <= 0.05, f"slept {seconds}s"
+        slept.append(seconds)
+
+    def handler(request):
+        return next(responses) or _ok(request)
+
+    monkeypatch.setattr(remote.asyncio, "sleep", sleep)
+    client = _client(handler, backoff_max=0.05, rpm=1000)
+    assert asyncio.run(client.embed(["a"])) == [_vector("a")]
+    assert slept
+    assert client.budget._paused_until - time.monotonic() <= 0.05
+
+#################################################################################################################
+# Shared clients
+
+def test_sync_callers_share_one_client(monkeypatch):
+    created = []
+    original_init = RemoteEmbeddingClient.__init__
+
+    def tracking_init(self, *args, **kwargs):
+        original_init(self, *args, **kwargs)
+        created.append(self)
+
+    monkeypatch.setattr(RemoteEmbeddingClient, "__init__", tracking_init)
+    monkeypatch.setattr(remote, "get_http_client", lambda: httpx.AsyncClient(transport=httpx.MockTransport(_ok)))
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(remote.embed_remote_batch(["a", "bb"], "openai", "shared-key")))
+        for _ in range(4)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert results == [[_vector("a"), _vector("bb")]] * 4
+    assert len(created) == 1
+    assert created[0].budget is remote.get_rate_budget("openai", "shared-key")
+
+
+def test_shared_client_borrows_the_loop_http_client():
+    async def run():
+        client = remote._shared_client("openai", "borrow-key", None)
+        assert client._http is remote.get_http_client()
+        assert remote._shared_client("openai", "borrow-key", None) is client
+
+        await remote.close_remote_clients()
+        assert not remote.get_http_client().is_closed      # closed by close_http_clients, not here
+        await close_http_clients()
+
+    asyncio.run(run())
+
+
+def test_sync_wrapper_refuses_running_loop():
+    async def call():
+        remote.embed_remote_batch(["a"], "openai", "key")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(call())
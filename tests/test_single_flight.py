@@ -0,0 +1,100 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.services.single_flight_services import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight(ttl=0)
+    runs = []
+    results = []
+
+    def slow():
+        runs.append(1)
+        time.sleep(0.05)
+        return {"value": 42}
+
+    threads = [threading.Thread(target=lambda: results.append(flight.do("k", slow))) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(runs) == 1
+    assert len(results) == 6 and all(r is results[0] for r in results)
+    assert flight.stats["executions"] == 1 and flight.stats["shared"] == 5
+    assert flight.snapshot()["in_flight"] == 0
+
+
+def test_followers_receive_the_leaders_error_and_it_is_not_kept():
+    flight = SingleFlight(ttl=60)
+    started = threading.Event()
+    errors = []
+
+    def failing():
+        started.set()
+        time.sleep(0.05)
+        raise RuntimeError("boom")
+
+    def call():
+        try:
+            flight.do("k", failing)
+        except RuntimeError as e:
+            errors.append(e)
+
+    leader = threading.Thread(target=call)
+    leader.start()
+    started.wait()
+    follower = threading.Thread(target=call)
+    follower.start()
+    leader.join()
+    follower.join()
+
+    assert len(errors) == 2 and errors[0] is errors[1]
+    assert flight.do("k", lambda: "ok") == "ok"
+
+
+def test_ttl_reuses_a_finished_result_until_it_expires():
+    flight = SingleFlight(ttl=0.1)
+    counter = iter(range(100))
+
+    first = flight.do("k", lambda: next(counter))
+    assert flight.do("k", lambda: next(counter)) == first
+    assert flight.stats["reused"] == 1
+
+    time.sleep(0.15)
+    assert flight.do("k", lambda: next(counter)) != first
+
+
+def test_zero_ttl_only_shares_in_flight_calls():
+    flight = SingleFlight(ttl=60)
+    counter = iter(range(100))
+
+    assert flight.do("k", lambda: next(counter), ttl=0) == 0
+    assert flight.do("k", lambda: next(counter), ttl=0) == 1
+
+
+def test_async_calls_share_one_task_and_survive_a_cancelled_caller():
+    flight = SingleFlight(ttl=0)
+    runs = []
+
+    async def slow():
+        runs.append(1)
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def main():
+        cancelled = asyncio.ensure_future(flight.do_async("k", slow))
+        others = [asyncio.ensure_future(flight.do_async("k", slow)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        cancelled.cancel()
+        results = await asyncio.gather(*others)
+        with pytest.raises(asyncio.CancelledError):
+            await cancelled
+        return results
+
+    assert asyncio.run(main()) == ["done"] * 3
+    assert len(runs) == 1
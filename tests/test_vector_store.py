@@ -0,0 +1,144 @@
+import os
+import uuid
+
+import numpy as np
+import pytest
+
+from app.services.vector_db_services import get_client
+from app.services.vector_store_services import (
+    ChromaVectorStore,
+    FlatVectorStore,
+    SearchFilter,
+    path_prefix_metadata,
+)
+
+
+DIM = 16
+PATHS = ["app/services/a.py", "app/routes/b.py", "web/src/c.ts", "README.go"]
+LANGUAGES = {"py": "python", "ts": "typescript", "go": "go"}
+
+
+@pytest.fixture(params=["flat", "chroma"])
+def store(request, tmp_path):
+    if request.param == "flat":
+        return FlatVectorStore(str(tmp_path / "flat"))
+    # The app's client: chroma allows one in-memory system per settings
+    collection = get_client().get_or_create_collection(f"test-{uuid.uuid4().hex}")
+    return ChromaVectorStore(collection)
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(60, DIM)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    ids = [f"v{i}" for i in range(len(vectors))]
+    metadatas = []
+    for i in range(len(vectors)):
+        path = PATHS[i % len(PATHS)]
+        metadatas.append({
+            "file_path": path,
+            "language": LANGUAGES[path.rsplit(".", 1)[1]],
+            **path_prefix_metadata(path),
+        })
+    return ids, vectors, metadatas
+
+
+def _fill(store, data):
+    ids, vectors, metadatas = data
+    store.upsert(ids=ids, embeddings=vectors.tolist(), metadatas=metadatas)
+
+
+def _expected(data, query, rows, top_k):
+    ids, vectors, _ = data
+    scores = vectors[rows] @ query
+    order = np.argsort(-scores)[:top_k]
+    return [ids[rows[i]] for i in order], scores[order]
+
+
+def test_scores_are_cosine_and_ranked(store, data):
+    _fill(store, data)
+    query = data[1][7]
+    hits, = store.query([query.tolist()], 5)
+
+    ids, scores = _expected(data, query, list(range(len(data[0]))), 5)
+    assert [h["id"] for h in hits] == ids
+    assert [h["score"] for h in hits] == pytest.approx(scores.tolist(), abs=1e-4)
+    assert hits[0]["id"] == "v7" and hits[0]["score"] == pytest.approx(1.0, abs=1e-4)
+
+
+def test_one_result_list_per_query(store, data):
+    _fill(store, data)
+    results = store.query([data[1][0].tolist(), data[1][1].tolist()], 3)
+    assert [r[0]["id"] for r in results] == ["v0", "v1"]
+    assert all(len(r) == 3 for r in results)
+
+
+def test_prefix_and_language_filters(store, data):
+    _fill(store, data)
+    query = data[1][0]
+
+    hits, = store.query([query.tolist()], 50, SearchFilter(path_prefixes=["app"], languages=["python"]))
+    rows = [i for i, m in enumerate(data[2]) if m["file_path"].startswith("app/")]
+    assert [h["id"] for h in hits] == _expected(data, query, rows, 50)[0]
+
+    hits, = store.query([query.tolist()], 50, SearchFilter(path_prefixes=["web/src/c.ts"]))
+    assert {h["metadata"]["file_path"] for h in hits} == {"web/src/c.ts"}
+
+
+def test_version_membership_excludes_better_matches(store, data):
+    _fill(store, data)
+    query = data[1][0]
+    # Members are the 10 WORST matches: a post-filter over top_k would return nothing
+    ids, _ = _expected(data, query, list(range(len(data[0]))), len(data[0]))
+    members = frozenset(ids[-10:])
+
+    hits, = store.query([query.tolist()], 4, SearchFilter(ids=members))
+    assert [h["id"] for h in hits] == ids[-10:][:4]
+
+
+def test_membership_with_unknown_and_no_ids(store, data):
+    _fill(store, data)
+    query = data[1][3].tolist()
+
+    hits, = store.query([query], 2, SearchFilter(ids=frozenset({"v3", "gone"})))
+    assert [h["id"] for h in hits] == ["v3"]
+
+    assert store.query([query], 2, SearchFilter(ids=frozenset())) == [[]]
+
+
+def test_upsert_overwrites_and_delete_removes(store, data):
+    _fill(store, data)
+    ids, vectors, metadatas = data
+
+    store.upsert(ids=["v0"], embeddings=[vectors[1].tolist()], metadatas=[{**metadatas[0], "file_path": "moved.py"}])
+    store.delete(["v1"])
+
+    assert store.count() == len(ids) - 1
+    assert store.existing_ids(["v0", "v1", "nope"]) == {"v0"}
+    hit = store.query([vectors[1].tolist()], 1)[0][0]
+    assert (hit["id"], hit["metadata"]["file_path"]) == ("v0", "moved.py")
+
+
+def test_flat_compaction_shrinks_files_and_keeps_results(tmp_path, data):
+    path = str(tmp_path / "flat")
+    store = FlatVectorStore(path)
+    _fill(store, data)
+    ids, vectors, _ = data
+    store.delete(ids[:40])
+    query = vectors[45]
+    before = store.query([query.tolist()], 5)
+    size = store.disk_bytes()
+
+    assert store.compact() == 40
+    assert store.compact() == 0
+    assert store.disk_bytes() < size
+    assert store.query([query.tolist()], 5) == before
+
+    reopened = FlatVectorStore(path)
+    assert reopened.count() == 20
+    assert reopened.query([query.tolist()], 5) == before
+    assert not {"vectors.f32", "records.jsonl"} & set(os.listdir(path))
+
+    reopened.upsert(ids=[ids[0]], embeddings=[vectors[0].tolist()], metadatas=[data[2][0]])
+    assert FlatVectorStore(path).query([vectors[0].tolist()], 1)[0][0]["id"] == ids[0]
@@ -0,0 +1,163 @@
+import threading
+
+import pytest
+
+from app.schema import PRContextRequest
+from app.services.context_services import assemble_pr_context
+from app.services.pipeline_services import PipelineCancelled
+from app.services.webhook_services import Debouncer, WebhookIngestor
+
+
+class Clock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _debouncer(on_flush, clock, window=30, max_delay=300):
+    return Debouncer(on_flush, window=window, max_delay=max_delay, clock=clock, background=False)
+
+
+def test_burst_becomes_one_flush_for_the_latest_sha():
+    clock, flushed = Clock(), []
+    debouncer = _debouncer(flushed.append, clock)
+
+    for i, sha in enumerate(["a", "b", "c"]):
+        status, _ = debouncer.offer(("pr", "o/r", 1), "pr_review", {"n": i}, sha)
+        assert status == ("scheduled" if i == 0 else "coalesced")
+        clock.now += 10
+
+    assert debouncer.flush() == []            # window restarted by the last event
+    clock.now += 20
+    [item] = debouncer.flush()
+
+    assert flushed == [item]
+    assert (item.sha, item.shas, item.events, item.params) == ("c", ["a", "b"], 3, {"n": 2})
+    assert debouncer.pending() == []
+
+
+def test_max_delay_bounds_an_endless_storm():
+    clock, flushed = Clock(), []
+    debouncer = _debouncer(flushed.append, clock, window=30, max_delay=60)
+
+    for _ in range(7):
+        debouncer.offer(("pr", "o/r", 1), "pr_review", {}, "x")
+        clock.now += 10
+        debouncer.flush()
+
+    assert len(flushed) == 1
+    assert flushed[0].deadline == 1060.0
+
+
+def test_zero_window_submits_immediately():
+    flushed = []
+    debouncer = _debouncer(flushed.append, Clock(), window=0)
+
+    status, item = debouncer.offer(("push", "o/r", "refs/heads/main"), "init_repo", {}, "x")
+    assert status == "submitted" and flushed == [item]
+
+
+def test_failed_flush_is_counted_and_requeued_without_losing_other_items():
+    clock, flushed = Clock(), []
+
+    def on_flush(item):
+        if item.key[2] == 1 and not flushed:
+            raise RuntimeError("job manager unavailable")
+        flushed.append(item.key[2])
+
+    debouncer = _debouncer(on_flush, clock)
+    debouncer.offer(("pr", "o/r", 1), "pr_review", {}, "a")
+    debouncer.offer(("pr", "o/r", 2), "pr_review", {}, "b")
+
+    clock.now += 30
+    handed = debouncer.flush()
+    assert [item.key[2] for item in handed] == [2]
+    assert debouncer.flush_errors == 1
+    assert [p["key"] for p in debouncer.pending()] == ["pr/o/r/1"]
+
+    clock.now += 30
+    debouncer.flush()
+    assert flushed == [2, 1]
+
+
+def test_requeue_keeps_a_newer_event_for_the_same_key():
+    clock = Clock()
+    debouncer = None
+
+    def on_flush(item):
+        debouncer.offer(item.key, item.kind, item.params, "newer")
+        raise RuntimeError("submit failed")
+
+    debouncer = _debouncer(on_flush, clock)
+    debouncer.offer(("pr", "o/r", 1), "pr_review", {}, "old")
+    clock.now += 30
+    debouncer.flush()
+
+    [pending] = debouncer.pending()
+    assert pending["sha"] == "newer"
+    assert debouncer.flush_errors == 1
+
+
+def test_ingestor_cancels_the_superseded_job_and_reports_flush_errors():
+    clock = Clock()
+    submitted, cancelled = [], []
+
+    def submit(kind, params):
+        submitted.append(params["head_sha"])
+        return f"job-{len(submitted)}"
+
+    ingestor = WebhookIngestor(submit, cancelled.append, window=30, max_delay=300, clock=clock, background=False)
+    payload = lambda sha: {
+        "action": "synchronize",
+        "number": 7,
+        "repository": {"full_name": "o/r"},
+        "pull_request": {"head": {"sha": sha}},
+    }
+
+    ingestor.handle("pull_request", payload("a"), delivery_id="1")
+    assert ingestor.handle("pull_request", payload("a"), delivery_id="1")["status"] == "duplicate"
+    clock.now += 30
+    ingestor.debouncer.flush()
+    ingestor.handle("pull_request", payload("b"), delivery_id="2")
+    clock.now += 30
+    ingestor.debouncer.flush()
+
+    assert submitted == ["a", "b"]
+    assert cancelled == ["job-1"]
+    status = ingestor.status()
+    assert status["stats"]["jobs_superseded"] == 1
+    assert status["stats"]["flush_errors"] == 0
+
+
+def test_redelivery_of_a_failed_delivery_is_processed():
+    clock = Clock()
+    ingestor = WebhookIngestor(lambda kind, params: "job", lambda job_id: None,
+                               window=30, max_delay=300, clock=clock, background=False)
+    payload = {
+        "action": "opened",
+        "number": 7,
+        "repository": {"full_name": "o/r"},
+        "pull_request": {"head": {"sha": "a"}},
+    }
+    offer = ingestor.debouncer.offer
+
+    def failing_offer(*args, **kwargs):
+        raise RuntimeError("debouncer unavailable")
+
+    ingestor.debouncer.offer = failing_offer
+    with pytest.raises(RuntimeError):
+        ingestor.handle("pull_request", payload, delivery_id="9")
+
+    ingestor.debouncer.offer = offer
+    assert ingestor.handle("pull_request", payload, delivery_id="9")["status"] == "scheduled"
+    assert ingestor.handle("pull_request", payload, delivery_id="9")["status"] == "duplicate"
+
+
+def test_pr_context_stops_before_fetching_when_cancelled():
+    event = threading.Event()
+    event.set()
+    with pytest.raises(PipelineCancelled):
+        assemble_pr_context(PRContextRequest(owner="o", repo="r", pr_number=1), cancel_event=event)